@@ -247,34 +247,26 @@ def render_audio_upload_section():
                         if use_custom_duration and custom_duration and audio_service.splitter:
                             # カスタム分割時間を使用する場合（ffmpeg利用可能）
                             st.info("🔧 高精度音声分割機能を使用します（ffmpeg使用）")
-                            chunks = audio_service.splitter.split_audio_file(
+                            chunks = audio_service.splitter.iter_chunks(
                                 audio_data, 
                                 uploaded_file.name, 
                                 chunk_duration_minutes=custom_duration
                             )
                             
-                            # 各チャンクを処理
+                            # 各チャンクを並列に処理（結果はチャンク順）
                             progress_bar = st.progress(0)
                             status_text = st.empty()
                             
-                            for i, chunk in enumerate(chunks):
-                                status_text.text(f"チャンク {i+1}/{len(chunks)} を処理中...")
-                                progress_bar.progress((i + 1) / len(chunks))
-                                
-                                chunk_result = audio_service._transcribe_single_audio(
-                                    chunk["data"], 
-                                    chunk["filename"], 
-                                    lang, 
-                                    prompt
-                                )
-                                chunk_result["chunk_info"] = {
-                                    "index": chunk["chunk_index"],
-                                    "start_time": chunk["start_time"],
-                                    "end_time": chunk["end_time"],
-                                    "duration": chunk["duration"],
-                                    "filename": chunk["filename"]
-                                }
-                                chunk_results.append(chunk_result)
+                            def update_chunk_progress(completed_chunks, total_chunks, current_status):
+                                progress_bar.progress(completed_chunks / total_chunks)
+                                status_text.text(f"{current_status} ({completed_chunks}/{total_chunks})")
+                            
+                            chunk_results = audio_service.transcribe_split_chunks(
+                                chunks,
+                                lang,
+                                prompt,
+                                progress_callback=update_chunk_progress
+                            )
                             
                             # 結果をマージ
                             result = audio_service.splitter.merge_transcriptions(chunk_results)
@@ -311,7 +303,8 @@ def render_audio_upload_section():
                                 audio_data,
                                 uploaded_file.name,
                                 lang,
-                                prompt
+                                prompt,
+                                progress_callback=update_progress
                             )
                             
                             progress_bar.empty()
@@ -334,11 +327,23 @@ def render_audio_upload_section():
                         
                         # 処理方法の表示
                         processing_method = result.get("processing_method", "single_file")
-                        if processing_method == "split_and_merge":
+                        if processing_method in ["split_and_merge", "frame_split"]:
                             chunk_info = result.get("merge_info", {})
                             st.info(f"📊 **分割処理完了**: {chunk_info.get('successful_chunks', 0)}個のチャンクを正常に処理しました")
                         elif processing_method == "custom_split_and_merge":
                             st.info(f"📊 **カスタム分割処理完了**: {len(chunk_results)}個のチャンクを処理しました")
+                        if result.get("cached"):
+                            st.caption("♻️ 同じ音声の文字起こし結果を再利用しました（Whisper APIは呼び出していません）")
+                        elif any(chunk.get("cached") for chunk in result.get("chunk_details") or []):
+                            reused = sum(1 for chunk in result["chunk_details"] if chunk.get("cached"))
+                            st.caption(f"♻️ {reused}個のチャンクは前回の文字起こし結果を再利用しました")
+                        transcode_info = result.get("transcode_info")
+                        if transcode_info:
+                            st.caption(
+                                f"🗜️ 16kHzモノラルに変換して送信しました: "
+                                f"{transcode_info['original_size_mb']:.1f}MB → {transcode_info['size_mb']:.1f}MB "
+                                f"（{transcode_info['ratio']:.0%}、変換 {transcode_info['seconds']:.1f}秒）"
+                            )
                         
                         # 結果のプレビュー表示
                         st.subheader("📝 文字起こし結果（プレビュー）")
@@ -385,7 +390,7 @@ def render_transcription_result_section():
     
     # 処理方法の表示
     processing_method = result.get("processing_method", "single_file")
-    if processing_method in ["split_and_merge", "custom_split_and_merge"]:
+    if processing_method in ["split_and_merge", "custom_split_and_merge", "frame_split"]:
         st.success("🔧 大きなファイルを分割して処理しました")
         
         # 分割処理の詳細
@@ -395,7 +400,10 @@ def render_transcription_result_section():
             with col1:
                 st.metric("処理チャンク数", f"{merge_info.get('successful_chunks', 0)}/{merge_info.get('successful_chunks', 0) + merge_info.get('failed_chunks', 0)}")
             with col2:
-                st.metric("処理方法", "自動分割" if processing_method == "split_and_merge" else "カスタム分割")
+                st.metric("処理方法", {
+                    "split_and_merge": "自動分割",
+                    "frame_split": "簡易分割（フレーム境界）"
+                }.get(processing_method, "カスタム分割"))
             with col3:
                 if merge_info.get('failed_chunks', 0) > 0:
                     st.metric("失敗チャンク", merge_info['failed_chunks'], delta_color="inverse")
@@ -505,7 +513,7 @@ def render_transcription_result_section():
         )
     
     # 分割処理の詳細情報
-    if processing_method in ["split_and_merge", "custom_split_and_merge"] and "chunk_details" in result:
+    if processing_method in ["split_and_merge", "custom_split_and_merge", "frame_split"] and "chunk_details" in result:
         with st.expander("🔍 分割処理の詳細情報", expanded=False):
             chunk_details = result["chunk_details"]
             
@@ -960,13 +968,24 @@ def render_meeting_minutes_section():
             try:
                 audio_service: AudioService = st.session_state.audio_service
                 
+                # 編集していない文字起こし結果なら、長い会議の区間要約にセグメントの時刻を使う
+                transcription_result = st.session_state.get("transcription_result") or {}
+                segments = None
+                if (
+                    transcription_result.get("segments")
+                    and not transcription_result.get("edited")
+                    and transcription_text == transcription_result.get("text")
+                ):
+                    segments = transcription_result["segments"]
+                
                 result = audio_service.create_meeting_minutes(
                     transcribed_text=transcription_text,
                     meeting_title=meeting_title,
                     participants=participants,
                     model=selected_model,
                     custom_prompt=custom_prompt,
-                    prompt_template=prompt_template
+                    prompt_template=prompt_template,
+                    segments=segments
                 )
                 
                 if result["success"]:
@@ -1006,6 +1025,11 @@ def render_meeting_minutes_section():
                                     "推定コスト",
                                     f"${cost_info['estimated_cost_usd']:.6f}"
                                 )
+                        if cost_info.get("mode") == "map_reduce":
+                            st.caption(
+                                f"🧩 長い会議のため {cost_info['sections']}区間に分けて並列に要約し、"
+                                f"議事録にまとめました（API呼び出し {cost_info['api_calls']}回の合計）"
+                            )
                         st.divider()
                     
                     minutes = result["minutes"]
@@ -31,12 +31,13 @@ def render_question_management_page():
             choice_service = ChoiceService(session)
             
             # タブで機能を分割
-            tab1, tab2, tab3, tab4, tab5 = st.tabs([
+            tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
                 "📝 問題一覧", 
                 "🤖 AI問題生成", 
                 "📄 PDF問題生成", 
                 "🔍 重複検査", 
-                "📊 生成統計"
+                "📊 生成統計",
+                "🩺 品質監査"
             ])
             
             with tab1:
@@ -53,6 +54,9 @@ def render_question_management_page():
             
             with tab5:
                 render_generation_stats_tab(question_service)
+            
+            with tab6:
+                render_quality_audit_tab(session)
                 
     except Exception as e:
         st.error(f"問題管理機能でエラーが発生しました: {e}")
@@ -424,13 +428,33 @@ def render_ai_generation_tab(session):
                 try:
                     generator = QuestionGenerator(session, model=selected_model)
                     
+                    # ストリーミング生成中のプレビュー表示
+                    partial_container = st.empty()
+                    partial_fields = {}
+                    field_labels = {"title": "タイトル", "content": "問題文", "explanation": "解説"}
+                    
+                    def partial_callback(field, value):
+                        if field == "title":
+                            partial_fields.clear()  # 次の問題の生成開始
+                        if field == "choices":
+                            partial_fields[field] = "\n".join(
+                                f"- {c.get('content', '')}" for c in value if isinstance(c, dict)
+                            )
+                        elif field in field_labels:
+                            partial_fields[field] = value
+                        preview_lines = [
+                            f"**{field_labels.get(k, '選択肢')}:** {v}" for k, v in partial_fields.items()
+                        ]
+                        partial_container.info("\n\n".join(preview_lines))
+                    
                     # 生成実行
                     if count == 1:
                         question_id = generator.generate_and_save_question(
                             category=category,
                             difficulty=difficulty,
                             topic=topic if topic else None,
-                            allow_multiple_correct=allow_multiple_correct
+                            allow_multiple_correct=allow_multiple_correct,
+                            partial_callback=partial_callback
                         )
                         generated_ids = [question_id] if question_id else []
                     else:
@@ -440,9 +464,12 @@ def render_ai_generation_tab(session):
                             difficulty=difficulty,
                             count=count,
                             topics=topics_list,
-                            allow_multiple_correct=allow_multiple_correct
+                            allow_multiple_correct=allow_multiple_correct,
+                            partial_callback=partial_callback
                         )
                     
+                    partial_container.empty()
+                    
                     if generated_ids:
                         st.success(f"✅ {len(generated_ids)}問の問題を生成しました！")
                         
@@ -541,7 +568,7 @@ def render_pdf_extraction_section(session):
     st.markdown("**過去問PDFから既存の問題・選択肢・解答・解説を抽出して問題を作成します**")
     
     try:
-        from services.pdf_processor import PDFProcessor
+        from services.pdf_processor import PDFProcessor, get_upload_buffer
         from services.pdf_question_extractor import PDFQuestionExtractor
         
         # PDFファイルアップロード
@@ -622,13 +649,17 @@ def render_pdf_extraction_section(session):
                         pdf_extractor = PDFQuestionExtractor(session)
                         
                         # テキスト抽出
-                        uploaded_file.seek(0)
-                        file_bytes = uploaded_file.read()
+                        # アップロードデータはコピーせずにそのまま参照する
+                        file_bytes = get_upload_buffer(uploaded_file)
                         extracted_text = pdf_processor.extract_text_auto(file_bytes)
                         
                         if not extracted_text:
                             st.error("PDFからテキストを抽出できませんでした")
                             return
+                        if pdf_processor.last_extraction.get("cached"):
+                            st.caption("⚡ 抽出済みのテキストをキャッシュから読み込みました")
+                        if pdf_processor.last_extraction.get("ocr_pages"):
+                            st.caption(f"🔍 {len(pdf_processor.last_extraction['ocr_pages'])}ページをOCRで読み取りました")
                         
                         # テキストのプレビュー表示
                         with st.expander("📖 抽出されたテキスト（最初の500文字）"):
@@ -725,8 +756,12 @@ def render_pdf_ai_generation_section(session):
     st.markdown("**PDFの内容を参考にして、AIが新しい問題を生成します**")
     
     try:
-        from services.pdf_processor import PDFProcessor
+        from services.pdf_processor import PDFProcessor, get_upload_buffer
         from services.pdf_question_generator import PDFQuestionGenerator
+        from services.pdf_cache import compute_pdf_hash
+        
+        # 中断した取り込みジョブ
+        render_resumable_import_jobs(session)
         
         # PDFファイルアップロード
         uploaded_file = st.file_uploader(
@@ -807,39 +842,68 @@ def render_pdf_ai_generation_section(session):
                         pdf_processor = PDFProcessor()
                         pdf_generator = PDFQuestionGenerator(session, model_name=pdf_selected_model)
                         
-                        # テキスト抽出
-                        uploaded_file.seek(0)
-                        file_bytes = uploaded_file.read()
-                        extracted_text = pdf_processor.extract_text_auto(file_bytes)
-                        
-                        if not extracted_text:
-                            st.error("PDFからテキストを抽出できませんでした")
+                        # ページ数の確認（無効なPDFはここでエラー表示）
+                        # アップロードデータはコピーせずにそのまま参照する
+                        file_bytes = get_upload_buffer(uploaded_file)
+                        total_pages = pdf_processor.get_page_count(file_bytes)
+                        if not total_pages:
                             return
                         
-                        # テキストのプレビュー表示
-                        with st.expander("📖 抽出されたテキスト（最初の500文字）"):
-                            st.text(extracted_text[:500] + "..." if len(extracted_text) > 500 else extracted_text)
-                        
                         # 進捗表示用コンテナ
                         progress_container = st.empty()
+                        generated_log = st.container()
                         
                         def progress_callback(message, progress):
                             progress_container.progress(progress, text=message)
                         
-                        # AI問題生成実行
-                        generated_ids = pdf_generator.generate_questions_from_pdf(
-                            text=extracted_text,
+                        def question_callback(question_id):
+                            generated_log.caption(f"✅ 問題を保存しました (ID: {question_id})")
+                        
+                        # プレビュー用に先頭のテキストだけ保持
+                        preview_parts = []
+                        
+                        def page_texts():
+                            for page in pdf_processor.iter_pages(file_bytes):
+                                if sum(len(part) for part in preview_parts) < 500:
+                                    preview_parts.append(page.text)
+                                yield page.text
+                        
+                        # ページを読み込みながらAI問題生成を実行
+                        generated_ids = pdf_generator.generate_questions_from_pages(
+                            page_texts(),
                             num_questions=pdf_num_questions,
+                            total_pages=total_pages,
                             difficulty=pdf_difficulty,
                             category=pdf_category,
                             model=pdf_selected_model,
                             include_explanation=pdf_include_explanation,
                             progress_callback=progress_callback,
-                            allow_multiple_correct=pdf_allow_multiple_correct
+                            allow_multiple_correct=pdf_allow_multiple_correct,
+                            question_callback=question_callback,
+                            source_hash=compute_pdf_hash(file_bytes),
+                            source_name=uploaded_file.name
                         )
                         
                         progress_container.empty()
                         
+                        preview_text = "".join(preview_parts).strip()
+                        if not preview_text:
+                            st.error("PDFからテキストを抽出できませんでした")
+                            return
+                        if pdf_processor.last_extraction.get("cached"):
+                            st.caption("⚡ 抽出済みのテキストをキャッシュから読み込みました")
+                        if pdf_processor.last_extraction.get("ocr_pages"):
+                            st.caption(f"🔍 {len(pdf_processor.last_extraction['ocr_pages'])}ページをOCRで読み取りました")
+                        job_info = pdf_generator.last_job_info
+                        if job_info and job_info["resumed"]:
+                            st.caption(f"♻️ 中断した取り込みジョブ #{job_info['job_id']} を再開しました（{job_info['reused_chunks']}セクションは生成済みの問題を再利用）")
+                        if job_info and job_info["status"] == "failed":
+                            st.warning(f"⚠️ {job_info['failed_chunks']}セクションで問題を生成できませんでした。同じPDFを同じ条件で再度生成すると、失敗したセクションから再開します")
+                        
+                        # テキストのプレビュー表示
+                        with st.expander("📖 抽出されたテキスト（最初の500文字）"):
+                            st.text(preview_text[:500] + "..." if len(preview_text) > 500 else preview_text)
+                        
                         if generated_ids:
                             st.success(f"✅ {len(generated_ids)}問の問題を生成しました！")
                             
@@ -900,6 +964,43 @@ def render_pdf_ai_generation_section(session):
     except Exception as e:
         st.error(f"PDF AI問題生成機能でエラーが発生しました: {e}")
 
+def render_resumable_import_jobs(session):
+    """中断・失敗した取り込みジョブの一覧と再開ボタン"""
+    from database.operations import ImportJobService
+    from services.pdf_question_generator import PDFQuestionGenerator, GENERATION_JOB_TYPE
+    
+    job_service = ImportJobService(session)
+    jobs = [
+        job for job in job_service.get_recent_jobs(limit=10, job_type=GENERATION_JOB_TYPE)
+        if job.status in ImportJobService.RESUMABLE_STATUSES
+    ]
+    if not jobs:
+        return
+    
+    with st.expander(f"⏸️ 中断した取り込みジョブ ({len(jobs)}件)"):
+        for job in jobs:
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.markdown(
+                    f"**#{job.id} {job.source_name or '(名称なし)'}** - "
+                    f"{job.completed_chunks}/{job.chunk_count}セクション完了, {job.question_count}問保存済み "
+                    f"({job.updated_at.strftime('%Y-%m-%d %H:%M')})"
+                )
+                if job.error:
+                    st.caption(f"エラー: {job.error}")
+            with col2:
+                if job.chunks_complete:
+                    if st.button("▶️ 再開", key=f"resume_import_job_{job.id}"):
+                        with st.spinner("中断したところから問題を生成中..."):
+                            try:
+                                generator = PDFQuestionGenerator(session, model_name=job.model)
+                                generated_ids = generator.resume_import_job(job.id)
+                                st.success(f"✅ ジョブ #{job.id} を再開し、合計{len(generated_ids)}問になりました")
+                            except Exception as e:
+                                st.error(f"ジョブの再開に失敗しました: {e}")
+                else:
+                    st.caption("同じPDFを再度アップロードすると続きから再開します")
+
 def render_duplicate_check_tab(question_service):
     """重複検査タブ"""
     st.markdown("### 🔍 重複検査")
@@ -962,6 +1063,95 @@ def render_generation_stats_tab(question_service):
     # except Exception as e:
     #     st.error(f"統計情報の取得でエラーが発生しました: {e}")
 
+def render_quality_audit_tab(session):
+    """品質監査タブ"""
+    st.markdown("### 🩺 品質監査")
+    st.caption("問題バンク全体をAIで並列に検証します。前回の監査から内容が変わっていない問題はスキップされます。")
+    
+    try:
+        from database.operations import QuestionAuditService
+        from services.question_audit import start_audit_job, get_active_audit_job
+        
+        audit_service = QuestionAuditService(session)
+        summary = audit_service.get_summary()
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("監査済み問題数", summary["audited_questions"])
+        with col2:
+            st.metric("平均スコア", summary["average_score"] if summary["average_score"] is not None else "-")
+        with col3:
+            st.metric("無効判定", summary["invalid_count"])
+        with col4:
+            last_audited = summary["last_audited_at"]
+            st.metric("最終監査", last_audited.strftime("%m/%d %H:%M") if last_audited else "-")
+        
+        # 監査の実行
+        job = get_active_audit_job()
+        if job is not None and job.is_running():
+            status = job.get_status()
+            done = status["completed"] + status["failed"]
+            total = status["total"] or 1
+            st.progress(done / total, text=f"監査中... {done}/{status['total']}問 (スキップ {status['skipped']}問)")
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("🔄 進捗を更新", key="audit_refresh"):
+                    st.rerun()
+            with col2:
+                if st.button("⏹️ 中断", key="audit_cancel"):
+                    job.cancel()
+                    st.rerun()
+        else:
+            if job is not None:
+                status = job.get_status()
+                if status["state"] == "failed":
+                    st.error(f"前回の監査は失敗しました: {status['error']}")
+                else:
+                    st.info(
+                        f"前回の監査: 完了{status['completed']}問 / 失敗{status['failed']}問 / "
+                        f"スキップ{status['skipped']}問"
+                    )
+            
+            with st.form("quality_audit_form"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    model = st.selectbox("モデル", ["自動選択", "gpt-4o-mini", "gpt-4o"], key="audit_model")
+                    max_workers = st.slider("並列数", 1, 32, 8, key="audit_workers")
+                with col2:
+                    category = st.text_input("カテゴリで絞り込み（空欄で全問題）", key="audit_category")
+                    only_changed = st.checkbox("変更された問題のみ", value=True, key="audit_only_changed")
+                
+                if st.form_submit_button("🩺 監査を開始", type="primary"):
+                    start_audit_job(
+                        model=None if model == "自動選択" else model,
+                        max_workers=max_workers,
+                        only_changed=only_changed,
+                        category=category or None
+                    )
+                    st.rerun()
+        
+        # 要確認の問題
+        flagged = audit_service.get_flagged_audits()
+        if flagged:
+            st.markdown("#### ⚠️ 要確認の問題")
+            rows = [
+                {
+                    "問題ID": audit.question_id,
+                    "スコア": audit.score,
+                    "判定": "有効" if audit.is_valid else "無効",
+                    "推奨": audit.recommendation,
+                    "詳細": audit.details,
+                    "監査日時": audit.audited_at.strftime("%Y-%m-%d %H:%M")
+                }
+                for audit in flagged
+            ]
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+        elif summary["audited_questions"]:
+            st.success("要確認の問題はありません")
+    
+    except Exception as e:
+        st.error(f"品質監査機能でエラーが発生しました: {e}")
+
 def render_demo_management():
     """デモモード用の問題管理表示"""
     st.info("🔄 デモモードで問題管理を表示しています。")
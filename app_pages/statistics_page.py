@@ -30,6 +30,9 @@ def render_statistics_page():
     except Exception as e:
         st.error(f"統計機能でエラーが発生しました: {e}")
         render_demo_statistics()
+        return
+    
+    display_llm_usage_statistics()
 
 def display_main_statistics(user_answer_service):
     """メイン統計情報の表示"""
@@ -121,6 +124,116 @@ def display_timeline_statistics(user_answer_service):
     except Exception as e:
         st.warning(f"時系列統計の取得でエラーが発生しました: {e}")
 
+def display_llm_usage_statistics():
+    """LLM API利用状況（トークン・コスト）の表示"""
+    st.markdown("---")
+    st.markdown("### 🤖 API利用状況")
+    
+    try:
+        from database.operations import LLMUsageService
+        from database.connection import get_session_context
+        
+        days = st.selectbox("集計期間", [1, 7, 30, 90], index=2, format_func=lambda d: f"過去{d}日間")
+        
+        with get_session_context() as session:
+            usage_service = LLMUsageService(session)
+            summary = usage_service.get_summary(days=days)
+            session_summary = usage_service.get_summary(days=days, session_id=st.session_state.session_id)
+            daily_costs = usage_service.get_daily_costs(days=days)
+        
+        if summary["calls"] == 0:
+            st.info("この期間のAPI利用記録はありません。")
+            return
+        
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("推定コスト", f"${summary['cost_usd']:.4f}")
+        with col2:
+            st.metric("API呼び出し", summary["calls"], delta=f"失敗 {summary['failed_calls']}", delta_color="off")
+        with col3:
+            st.metric("総トークン", f"{summary['total_tokens']:,}")
+        with col4:
+            st.metric("平均レイテンシ", f"{summary['avg_latency_ms']} ms")
+        
+        st.caption(
+            f"このセッション: {session_summary['calls']}回 / ${session_summary['cost_usd']:.4f} ・ "
+            f"リトライ合計: {summary['retries']}回 ・ 音声: {summary['audio_seconds'] / 60:.1f}分"
+        )
+        
+        feature_labels = {
+            "generation": "問題生成",
+            "verification": "問題検証",
+            "pdf_extraction": "過去問抽出",
+            "pdf_generation": "PDF問題生成",
+            "transcription": "文字起こし",
+            "minutes": "議事録作成",
+            "connection_test": "接続テスト",
+            "other": "その他"
+        }
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("#### 機能別")
+            st.dataframe([
+                {
+                    "機能": feature_labels.get(name, name),
+                    "呼び出し": stats["calls"],
+                    "トークン": stats["total_tokens"],
+                    "コスト(USD)": round(stats["cost_usd"], 4),
+                    "平均レイテンシ(ms)": stats["avg_latency_ms"],
+                    "リトライ": stats["retries"]
+                }
+                for name, stats in sorted(summary["by_feature"].items(), key=lambda x: -x[1]["cost_usd"])
+            ], use_container_width=True, hide_index=True)
+        
+        with col2:
+            st.markdown("#### モデル別")
+            st.dataframe([
+                {
+                    "モデル": name,
+                    "呼び出し": stats["calls"],
+                    "トークン": stats["total_tokens"],
+                    "コスト(USD)": round(stats["cost_usd"], 4)
+                }
+                for name, stats in sorted(summary["by_model"].items(), key=lambda x: -x[1]["cost_usd"])
+            ], use_container_width=True, hide_index=True)
+        
+        if daily_costs:
+            st.markdown("#### 日別コスト (USD)")
+            st.bar_chart({date: stats["cost_usd"] for date, stats in daily_costs.items()})
+        
+        # モデル選択とサーキットの状態（このプロセス内の直近の状況）
+        from services.model_router import get_model_router
+        from services.resilience import get_circuit_states
+        
+        decisions = get_model_router().get_recent_decisions()
+        circuits = get_circuit_states()
+        if decisions or circuits:
+            with st.expander("🔀 モデル選択とAPIの状態"):
+                if circuits:
+                    st.dataframe([
+                        {
+                            "エンドポイント": name,
+                            "状態": state["state"],
+                            "p95レイテンシ(ms)": state["p95_latency_ms"]
+                        }
+                        for name, state in circuits.items()
+                    ], use_container_width=True, hide_index=True)
+                if decisions:
+                    st.dataframe([
+                        {
+                            "日時": decision.decided_at.strftime("%H:%M:%S"),
+                            "機能": feature_labels.get(decision.task, decision.task),
+                            "モデル": decision.model,
+                            "理由": decision.reason,
+                            "除外": ", ".join(f"{m}: {r}" for m, r in decision.rejected.items())
+                        }
+                        for decision in decisions
+                    ], use_container_width=True, hide_index=True)
+    
+    except Exception as e:
+        st.warning(f"API利用状況の取得でエラーが発生しました: {e}")
+
 def render_demo_statistics():
     """デモモード用の統計表示"""
     st.info("🔄 デモモードで統計を表示しています。")
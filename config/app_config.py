@@ -117,15 +117,25 @@ class ModelRegistry:
             from models.question import Question
             from models.choice import Choice  
             from models.user_answer import UserAnswer
+            from models.batch_job import BatchJob, BatchJobItem
+            from models.llm_usage import LLMUsage
+            from models.question_audit import QuestionAudit
+            from models.import_job import ImportJob, ImportJobChunk
             
             # 手動でメタデータに強制登録
             Question.metadata = SQLModel.metadata
             Choice.metadata = SQLModel.metadata
             UserAnswer.metadata = SQLModel.metadata
+            BatchJob.metadata = SQLModel.metadata
+            BatchJobItem.metadata = SQLModel.metadata
+            LLMUsage.metadata = SQLModel.metadata
+            QuestionAudit.metadata = SQLModel.metadata
+            ImportJob.metadata = SQLModel.metadata
+            ImportJobChunk.metadata = SQLModel.metadata
             
             # 登録確認
             table_names = [table.name for table in SQLModel.metadata.tables.values()]
-            expected_tables = ['question', 'choice', 'user_answer']
+            expected_tables = ['question', 'choice', 'user_answer', 'batch_job', 'batch_job_item', 'llm_usage', 'question_audit', 'import_job', 'import_job_chunk']
             
             all_registered = True
             for table_name in expected_tables:
@@ -189,6 +199,13 @@ def initialize_session_state():
     if 'session_id' not in st.session_state:
         st.session_state.session_id = generate_session_id()
     
+    # LLM利用記録をこのセッションに帰属させる
+    try:
+        from services.usage_ledger import set_usage_session
+        set_usage_session(st.session_state.session_id)
+    except ImportError:
+        pass
+    
     if 'answered_questions' not in st.session_state:
         st.session_state.answered_questions = set()
     
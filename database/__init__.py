@@ -1,6 +1,6 @@
 # Database package
 from .connection import engine, get_database_session, create_tables
-from .operations import QuestionService, ChoiceService, UserAnswerService
+from .operations import QuestionService, ChoiceService, UserAnswerService, BatchJobService, LLMUsageService, QuestionAuditService, ImportJobService
 
 __all__ = [
     "engine", 
@@ -8,5 +8,9 @@ __all__ = [
     "create_tables",
     "QuestionService",
     "ChoiceService", 
-    "UserAnswerService"
+    "UserAnswerService",
+    "BatchJobService",
+    "LLMUsageService",
+    "QuestionAuditService",
+    "ImportJobService"
 ]
@@ -40,6 +40,10 @@ class DatabaseRegistry:
             from models.question import Question
             from models.choice import Choice  
             from models.user_answer import UserAnswer
+            from models.batch_job import BatchJob, BatchJobItem
+            from models.llm_usage import LLMUsage
+            from models.question_audit import QuestionAudit
+            from models.import_job import ImportJob, ImportJobChunk
             
             self._models_imported = True
             print("✅ Models imported successfully (database singleton)")
@@ -1,7 +1,7 @@
 from typing import List, Optional
-from sqlmodel import Session, select, func, delete
+from sqlmodel import Session, select, func, delete, case
 from datetime import datetime, timedelta
-from models import Question, Choice, UserAnswer
+from models import Question, Choice, UserAnswer, BatchJob, BatchJobItem, LLMUsage, QuestionAudit, ImportJob, ImportJobChunk
 
 
 class QuestionService:
@@ -38,6 +38,64 @@ class QuestionService:
             self.session.rollback()  # ロールバックを追加
             return None
     
+    def create_questions_with_choices(self, items: List[dict]) -> List[Optional[int]]:
+        """複数の問題と選択肢を1回のコミットで作成
+        
+        Args:
+            items: {"title", "content", "category", "difficulty", "explanation",
+                    "choices": [{"content", "is_correct"}, ...]} のリスト
+        
+        Returns:
+            作成した問題IDのリスト（items と同じ順。失敗した問題は None）
+            一括保存に失敗した場合はロールバックして1問ずつ保存し直す
+        """
+        try:
+            questions = [
+                Question(
+                    title=item["title"],
+                    content=item["content"],
+                    category=item["category"],
+                    explanation=item.get("explanation"),
+                    difficulty=item.get("difficulty", "medium")
+                )
+                for item in items
+            ]
+            self.session.add_all(questions)
+            self.session.flush()  # 問題IDを採番
+            for question, item in zip(questions, items):
+                self.session.add_all([
+                    Choice(
+                        question_id=question.id,
+                        content=choice["content"],
+                        is_correct=choice["is_correct"],
+                        order_num=order + 1
+                    )
+                    for order, choice in enumerate(item["choices"])
+                ])
+            self.session.commit()
+            return [question.id for question in questions]
+        except Exception as e:
+            print(f"⚠️ 一括保存に失敗したため1問ずつ保存します: {e}")
+            self.session.rollback()
+        
+        question_ids = []
+        for item in items:
+            question = self.create_question(
+                title=item["title"],
+                content=item["content"],
+                category=item["category"],
+                explanation=item.get("explanation"),
+                difficulty=item.get("difficulty", "medium")
+            )
+            if question is None:
+                question_ids.append(None)
+                continue
+            choice_service = ChoiceService(self.session)
+            for order, choice in enumerate(item["choices"]):
+                choice_service.create_choice(question.id, choice["content"], choice["is_correct"], order + 1)
+            question_ids.append(question.id)
+        return question_ids
+    
     def get_question_by_id(self, question_id: int) -> Optional[Question]:
         """IDで問題を取得"""
         question = self.session.get(Question, question_id)
@@ -260,7 +318,7 @@ class QuestionService:
         """AIを使用した高度な検証"""
         try:
             from services.enhanced_openai_service import EnhancedOpenAIService
-            openai_service = EnhancedOpenAIService(model_name="gpt-4o-mini")
+            openai_service = EnhancedOpenAIService(task="verification")
         except ImportError:
             # インポートエラーの場合は基本検証のみ
             return {"coherent": True, "error": "AI検証は利用できません"}
@@ -292,7 +350,7 @@ class QuestionService:
 }}"""
 
         try:
-            response = openai_service.generate_response(prompt, temperature=0.1)
+            response = openai_service.call_openai_api(prompt, temperature=0.1, feature="verification")
             
             # JSON解析を試行
             import json
@@ -767,6 +825,19 @@ class ChoiceService:
         """問題IDで選択肢を取得（エイリアス）"""
         return self.get_choices_by_question(question_id)
     
+    def get_choices_for_questions(self, question_ids: List[int]) -> dict:
+        """複数の問題の選択肢を1回のクエリで取得（問題ID → 選択肢リスト）"""
+        grouped = {question_id: [] for question_id in question_ids}
+        if not question_ids:
+            return grouped
+        
+        statement = select(Choice).where(
+            Choice.question_id.in_(question_ids)
+        ).order_by(Choice.question_id, Choice.order_num)
+        for choice in self.session.exec(statement).all():
+            grouped[choice.question_id].append(choice)
+        return grouped
+    
     def update_choice(
         self,
         choice_id: int,
@@ -961,3 +1032,423 @@ class UserAnswerService:
             print(f"回答削除エラー: {e}")
             self.session.rollback()
             return False
+
+
+class BatchJobService:
+    """Batchジョブ関連の操作"""
+    
+    def __init__(self, session: Session):
+        self.session = session
+    
+    def create_job(
+        self,
+        job_type: str,
+        model: str,
+        custom_ids: List[str],
+        params: Optional[str] = None,
+        question_ids: Optional[List[Optional[int]]] = None
+    ) -> BatchJob:
+        """ジョブと個別リクエストを作成"""
+        job = BatchJob(
+            job_type=job_type,
+            model=model,
+            request_count=len(custom_ids),
+            params=params
+        )
+        self.session.add(job)
+        self.session.commit()
+        self.session.refresh(job)
+        
+        for i, custom_id in enumerate(custom_ids):
+            question_id = question_ids[i] if question_ids else None
+            self.session.add(BatchJobItem(job_id=job.id, custom_id=custom_id, question_id=question_id))
+        self.session.commit()
+        return job
+    
+    def get_job(self, job_id: int) -> Optional[BatchJob]:
+        """IDでジョブを取得"""
+        return self.session.get(BatchJob, job_id)
+    
+    def get_open_jobs(self) -> List[BatchJob]:
+        """結果の取り込みが終わっていないジョブを取得"""
+        statement = select(BatchJob).where(
+            BatchJob.status.in_(["submitted", "completed"])
+        ).order_by(BatchJob.created_at)
+        return self.session.exec(statement).all()
+    
+    def get_recent_jobs(self, limit: int = 20) -> List[BatchJob]:
+        """最近のジョブを取得"""
+        statement = select(BatchJob).order_by(BatchJob.created_at.desc()).limit(limit)
+        return self.session.exec(statement).all()
+    
+    def update_job(self, job: BatchJob, **fields) -> BatchJob:
+        """ジョブの状態を更新"""
+        for key, value in fields.items():
+            setattr(job, key, value)
+        job.updated_at = datetime.now()
+        self.session.add(job)
+        self.session.commit()
+        self.session.refresh(job)
+        return job
+    
+    def get_item_by_custom_id(self, custom_id: str) -> Optional[BatchJobItem]:
+        """custom_idで個別リクエストを取得"""
+        statement = select(BatchJobItem).where(BatchJobItem.custom_id == custom_id)
+        return self.session.exec(statement).first()
+    
+    def mark_item(
+        self,
+        item: BatchJobItem,
+        status: str,
+        question_id: Optional[int] = None,
+        result: Optional[str] = None,
+        error: Optional[str] = None
+    ) -> BatchJobItem:
+        """個別リクエストの取り込み結果を記録"""
+        item.status = status
+        if question_id is not None:
+            item.question_id = question_id
+        item.result = result
+        item.error = error
+        item.ingested_at = datetime.now()
+        self.session.add(item)
+        self.session.commit()
+        return item
+    
+    def count_items(self, job_id: int, status: str) -> int:
+        """指定状態の個別リクエスト数をカウント"""
+        statement = select(func.count(BatchJobItem.id)).where(
+            BatchJobItem.job_id == job_id,
+            BatchJobItem.status == status
+        )
+        return self.session.exec(statement).one()
+
+
+class LLMUsageService:
+    """LLM利用記録関連の操作"""
+    
+    def __init__(self, session: Session):
+        self.session = session
+    
+    def record_usage(self, **fields) -> LLMUsage:
+        """利用記録を追加"""
+        usage = LLMUsage(**fields)
+        self.session.add(usage)
+        self.session.commit()
+        self.session.refresh(usage)
+        return usage
+    
+    def get_summary(self, days: int = 30, session_id: Optional[str] = None) -> dict:
+        """期間内の利用量を機能別・モデル別に集計"""
+        start_date = datetime.now() - timedelta(days=days)
+        # 機能×モデルごとにDB側で集計し、全体・機能別・モデル別はその少数の行から合算する
+        statement = select(
+            LLMUsage.feature,
+            LLMUsage.model,
+            func.count(LLMUsage.id).label('calls'),
+            func.sum(case((LLMUsage.success.is_(False), 1), else_=0)).label('failed_calls'),
+            func.sum(LLMUsage.retries).label('retries'),
+            func.sum(LLMUsage.prompt_tokens).label('prompt_tokens'),
+            func.sum(LLMUsage.completion_tokens).label('completion_tokens'),
+            func.sum(LLMUsage.total_tokens).label('total_tokens'),
+            func.sum(LLMUsage.audio_seconds).label('audio_seconds'),
+            func.sum(LLMUsage.cost_usd).label('cost_usd'),
+            func.sum(LLMUsage.latency_ms).label('latency_ms')
+        ).where(LLMUsage.created_at >= start_date)
+        if session_id:
+            statement = statement.where(LLMUsage.session_id == session_id)
+        statement = statement.group_by(LLMUsage.feature, LLMUsage.model)
+        rows = self.session.exec(statement).all()
+        
+        summary = {
+            "calls": 0,
+            "failed_calls": 0,
+            "retries": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0,
+            "audio_seconds": 0.0,
+            "cost_usd": 0.0,
+            "avg_latency_ms": 0,
+            "by_feature": {},
+            "by_model": {}
+        }
+        total_latency = 0
+        
+        for row in rows:
+            calls = int(row.calls)
+            retries = int(row.retries or 0)
+            total_tokens = int(row.total_tokens or 0)
+            cost_usd = float(row.cost_usd or 0)
+            latency_ms = int(row.latency_ms or 0)
+            
+            summary["calls"] += calls
+            summary["failed_calls"] += int(row.failed_calls or 0)
+            summary["retries"] += retries
+            summary["prompt_tokens"] += int(row.prompt_tokens or 0)
+            summary["completion_tokens"] += int(row.completion_tokens or 0)
+            summary["total_tokens"] += total_tokens
+            summary["audio_seconds"] += float(row.audio_seconds or 0)
+            summary["cost_usd"] += cost_usd
+            total_latency += latency_ms
+            
+            for group_key, group_name in (("by_feature", row.feature), ("by_model", row.model)):
+                group = summary[group_key].setdefault(group_name, {
+                    "calls": 0, "total_tokens": 0, "cost_usd": 0.0, "latency_ms": 0, "retries": 0
+                })
+                group["calls"] += calls
+                group["total_tokens"] += total_tokens
+                group["cost_usd"] += cost_usd
+                group["latency_ms"] += latency_ms
+                group["retries"] += retries
+        
+        if summary["calls"]:
+            summary["avg_latency_ms"] = int(total_latency / summary["calls"])
+        for group_key in ("by_feature", "by_model"):
+            for group in summary[group_key].values():
+                group["avg_latency_ms"] = int(group.pop("latency_ms") / group["calls"])
+        
+        return summary
+    
+    def get_daily_costs(self, days: int = 30) -> dict:
+        """日別のコストを取得"""
+        start_date = datetime.now() - timedelta(days=days)
+        statement = select(
+            func.date(LLMUsage.created_at).label('date'),
+            func.sum(LLMUsage.cost_usd).label('cost'),
+            func.sum(LLMUsage.total_tokens).label('tokens')
+        ).where(
+            LLMUsage.created_at >= start_date
+        ).group_by(func.date(LLMUsage.created_at)).order_by(func.date(LLMUsage.created_at))
+        
+        results = self.session.exec(statement).all()
+        
+        return {
+            str(result.date): {"cost_usd": float(result.cost or 0), "total_tokens": int(result.tokens or 0)}
+            for result in results
+        }
+
+
+class QuestionAuditService:
+    """問題品質監査結果関連の操作"""
+    
+    def __init__(self, session: Session):
+        self.session = session
+    
+    def save_audit(
+        self,
+        question_id: int,
+        content_hash: str,
+        model: str,
+        result: dict
+    ) -> QuestionAudit:
+        """監査結果を保存"""
+        import json
+        
+        audit = QuestionAudit(
+            question_id=question_id,
+            content_hash=content_hash,
+            model=model,
+            score=result.get('score'),
+            is_valid=result.get('is_valid'),
+            issues=json.dumps(result.get('issues', []), ensure_ascii=False),
+            recommendation=result.get('recommendation'),
+            details=result.get('details')
+        )
+        self.session.add(audit)
+        self.session.commit()
+        self.session.refresh(audit)
+        return audit
+    
+    @staticmethod
+    def _latest_audit_ids():
+        """問題ごとの最新の監査結果のIDのサブクエリ（IDは保存順に増えるため最大値が最新）"""
+        return select(
+            func.max(QuestionAudit.id).label("id")
+        ).group_by(QuestionAudit.question_id).subquery()
+    
+    def get_latest_audits(self) -> dict:
+        """問題ごとの最新の監査結果を取得（問題ID → QuestionAudit）"""
+        latest_ids = self._latest_audit_ids()
+        statement = select(QuestionAudit).join(latest_ids, QuestionAudit.id == latest_ids.c.id)
+        return {audit.question_id: audit for audit in self.session.exec(statement).all()}
+    
+    def get_latest_hashes(self) -> dict:
+        """問題ごとの最新監査時のハッシュを取得（問題ID → content_hash）"""
+        latest_ids = self._latest_audit_ids()
+        statement = select(QuestionAudit.question_id, QuestionAudit.content_hash).join(
+            latest_ids, QuestionAudit.id == latest_ids.c.id
+        )
+        return {question_id: content_hash for question_id, content_hash in self.session.exec(statement).all()}
+    
+    def get_latest_audit(self, question_id: int) -> Optional[QuestionAudit]:
+        """指定した問題の最新の監査結果を取得"""
+        statement = select(QuestionAudit).where(
+            QuestionAudit.question_id == question_id
+        ).order_by(QuestionAudit.audited_at.desc())
+        return self.session.exec(statement).first()
+    
+    def get_flagged_audits(self, max_score: int = 5, limit: int = 100) -> List[QuestionAudit]:
+        """スコアが低い、または無効と判定された最新の監査結果を取得"""
+        latest_ids = self._latest_audit_ids()
+        statement = select(QuestionAudit).join(
+            latest_ids, QuestionAudit.id == latest_ids.c.id
+        ).where(
+            QuestionAudit.is_valid.is_(False) | (QuestionAudit.score <= max_score)
+        ).order_by(func.coalesce(QuestionAudit.score, 0)).limit(limit)
+        return list(self.session.exec(statement).all())
+    
+    def get_summary(self) -> dict:
+        """監査結果の集計"""
+        latest = list(self.get_latest_audits().values())
+        scores = [audit.score for audit in latest if audit.score is not None]
+        recommendations = {}
+        for audit in latest:
+            key = audit.recommendation or "不明"
+            recommendations[key] = recommendations.get(key, 0) + 1
+        
+        return {
+            "audited_questions": len(latest),
+            "average_score": round(sum(scores) / len(scores), 2) if scores else None,
+            "invalid_count": sum(1 for audit in latest if audit.is_valid is False),
+            "recommendations": recommendations,
+            "last_audited_at": max((audit.audited_at for audit in latest), default=None)
+        }
+
+
+class ImportJobService:
+    """PDF取り込みジョブ関連の操作"""
+    
+    # 再開の対象にする状態
+    RESUMABLE_STATUSES = ["running", "failed"]
+    
+    def __init__(self, session: Session):
+        self.session = session
+    
+    def create_job(
+        self,
+        job_type: str,
+        source_hash: str,
+        source_name: Optional[str] = None,
+        params: Optional[str] = None,
+        category: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> ImportJob:
+        """ジョブを作成（チャンクは add_chunk で追加）"""
+        job = ImportJob(
+            job_type=job_type,
+            source_hash=source_hash,
+            source_name=source_name,
+            params=params,
+            category=category,
+            model=model
+        )
+        self.session.add(job)
+        self.session.commit()
+        self.session.refresh(job)
+        return job
+    
+    def get_job(self, job_id: int) -> Optional[ImportJob]:
+        """IDでジョブを取得"""
+        return self.session.get(ImportJob, job_id)
+    
+    def find_resumable_job(self, job_type: str, source_hash: str, params: Optional[str] = None) -> Optional[ImportJob]:
+        """同じ取り込み元・同じ条件で、完了していない最新のジョブを取得"""
+        statement = select(ImportJob).where(
+            ImportJob.job_type == job_type,
+            ImportJob.source_hash == source_hash,
+            ImportJob.status.in_(self.RESUMABLE_STATUSES)
+        ).order_by(ImportJob.created_at.desc())
+        for job in self.session.exec(statement).all():
+            if job.params == params:
+                return job
+        return None
+    
+    def get_recent_jobs(self, limit: int = 20, job_type: Optional[str] = None) -> List[ImportJob]:
+        """最近のジョブを取得"""
+        statement = select(ImportJob)
+        if job_type:
+            statement = statement.where(ImportJob.job_type == job_type)
+        statement = statement.order_by(ImportJob.created_at.desc()).limit(limit)
+        return self.session.exec(statement).all()
+    
+    def update_job(self, job: ImportJob, **fields) -> ImportJob:
+        """ジョブの状態を更新"""
+        for key, value in fields.items():
+            setattr(job, key, value)
+        job.updated_at = datetime.now()
+        self.session.add(job)
+        self.session.commit()
+        self.session.refresh(job)
+        return job
+    
+    def get_chunks(self, job_id: int) -> List[ImportJobChunk]:
+        """ジョブのチャンクを順番に取得"""
+        statement = select(ImportJobChunk).where(
+            ImportJobChunk.job_id == job_id
+        ).order_by(ImportJobChunk.chunk_index)
+        return self.session.exec(statement).all()
+    
+    def add_chunk(
+        self,
+        job: ImportJob,
+        chunk_index: int,
+        text: str,
+        target_questions: Optional[int] = None
+    ) -> ImportJobChunk:
+        """チャンクを保存"""
+        chunk = ImportJobChunk(
+            job_id=job.id,
+            chunk_index=chunk_index,
+            text=text,
+            target_questions=target_questions
+        )
+        self.session.add(chunk)
+        job.chunk_count = max(job.chunk_count, chunk_index + 1)
+        job.updated_at = datetime.now()
+        self.session.add(job)
+        self.session.commit()
+        self.session.refresh(chunk)
+        return chunk
+    
+    def start_chunk(self, chunk: ImportJobChunk) -> ImportJobChunk:
+        """チャンクの処理開始を記録"""
+        chunk.status = "running"
+        chunk.attempts += 1
+        chunk.error = None
+        self.session.add(chunk)
+        self.session.commit()
+        return chunk
+    
+    def add_chunk_question(self, chunk: ImportJobChunk, question_id: int) -> ImportJobChunk:
+        """チャンクから保存した問題IDを記録（中断しても保存済みの問題を二重に作らないため）"""
+        import json
+        
+        question_ids = json.loads(chunk.question_ids) if chunk.question_ids else []
+        question_ids.append(question_id)
+        chunk.question_ids = json.dumps(question_ids)
+        self.session.add(chunk)
+        self.session.commit()
+        return chunk
+    
+    def finish_chunk(self, chunk: ImportJobChunk, status: str, error: Optional[str] = None) -> ImportJobChunk:
+        """チャンクの処理結果を記録（completed / failed）"""
+        chunk.status = status
+        chunk.error = error
+        chunk.completed_at = datetime.now()
+        self.session.add(chunk)
+        self.session.commit()
+        return chunk
+    
+    def refresh_counts(self, job: ImportJob) -> ImportJob:
+        """チャンクの状態からジョブの集計を更新"""
+        import json
+        
+        chunks = self.get_chunks(job.id)
+        return self.update_job(
+            job,
+            chunk_count=len(chunks),
+            completed_chunks=sum(1 for chunk in chunks if chunk.status == "completed"),
+            failed_chunks=sum(1 for chunk in chunks if chunk.status == "failed"),
+            question_count=sum(len(json.loads(chunk.question_ids)) for chunk in chunks if chunk.question_ids)
+        )
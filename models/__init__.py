@@ -2,5 +2,9 @@
 from .question import Question
 from .choice import Choice
 from .user_answer import UserAnswer
+from .batch_job import BatchJob, BatchJobItem
+from .llm_usage import LLMUsage
+from .question_audit import QuestionAudit
+from .import_job import ImportJob, ImportJobChunk
 
-__all__ = ["Question", "Choice", "UserAnswer"]
+__all__ = ["Question", "Choice", "UserAnswer", "BatchJob", "BatchJobItem", "LLMUsage", "QuestionAudit", "ImportJob", "ImportJobChunk"]
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+
+class BatchJob(SQLModel, table=True):
+    """OpenAI Batchジョブテーブル"""
+    __tablename__ = "batch_job"
+    __table_args__ = {"extend_existing": True}
+    
+    id: Optional[int] = Field(primary_key=True)
+    job_type: str = Field(index=True)  # generation / verification
+    status: str = Field(default="created", index=True)  # created, submitted, completed, failed, ingested
+    batch_id: Optional[str] = Field(default=None, index=True)  # OpenAI側のバッチID
+    model: str = Field(default="gpt-4o-mini")
+    input_path: Optional[str] = None  # JSONLジョブファイルのパス
+    input_file_id: Optional[str] = None
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+    request_count: int = Field(default=0)
+    ingested_count: int = Field(default=0)
+    failed_count: int = Field(default=0)
+    params: Optional[str] = None  # 生成パラメータ（JSON）
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class BatchJobItem(SQLModel, table=True):
+    """Batchジョブの個別リクエストテーブル"""
+    __tablename__ = "batch_job_item"
+    __table_args__ = {"extend_existing": True}
+    
+    id: Optional[int] = Field(primary_key=True)
+    job_id: int = Field(foreign_key="batch_job.id", index=True)
+    custom_id: str = Field(index=True, unique=True)  # リクエストと結果を対応付けるID
+    status: str = Field(default="pending")  # pending, ingested, failed
+    question_id: Optional[int] = None  # 対象または生成された問題ID
+    result: Optional[str] = None  # 検証結果など（JSON）
+    error: Optional[str] = None
+    ingested_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field, UniqueConstraint
+
+
+class ImportJob(SQLModel, table=True):
+    """PDF取り込みジョブテーブル（中断しても完了済みのチャンクから再開できる）"""
+    __tablename__ = "import_job"
+    __table_args__ = {"extend_existing": True}
+    
+    id: Optional[int] = Field(primary_key=True)
+    job_type: str = Field(index=True)  # pdf_generation / past_extraction
+    status: str = Field(default="running", index=True)  # running, completed, failed, cancelled
+    source_name: Optional[str] = None  # アップロードされたファイル名
+    source_hash: str = Field(index=True)  # 取り込み元テキスト・PDFのハッシュ
+    params: Optional[str] = None  # 取り込み条件（JSON）。同じ条件のときだけ再開する
+    category: Optional[str] = None
+    model: Optional[str] = None
+    chunks_complete: bool = Field(default=False)  # チャンクの一覧をすべて保存済みか
+    chunk_count: int = Field(default=0)
+    completed_chunks: int = Field(default=0)
+    failed_chunks: int = Field(default=0)
+    question_count: int = Field(default=0)
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class ImportJobChunk(SQLModel, table=True):
+    """PDF取り込みジョブのチャンクテーブル"""
+    __tablename__ = "import_job_chunk"
+    __table_args__ = (
+        UniqueConstraint("job_id", "chunk_index"),
+        {"extend_existing": True}
+    )
+    
+    id: Optional[int] = Field(primary_key=True)
+    job_id: int = Field(foreign_key="import_job.id", index=True)
+    chunk_index: int
+    text: str  # チャンクのテキスト（再開時は元ファイルなしで処理できる）
+    target_questions: Optional[int] = None  # このチャンクから作る問題数
+    status: str = Field(default="pending")  # pending, running, completed, failed
+    question_ids: Optional[str] = None  # 保存した問題ID（JSON）。問題を保存するたびに更新
+    attempts: int = Field(default=0)
+    error: Optional[str] = None
+    completed_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,28 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+
+class LLMUsage(SQLModel, table=True):
+    """LLM API呼び出しの利用記録テーブル"""
+    __tablename__ = "llm_usage"
+    __table_args__ = {"extend_existing": True}
+    
+    id: Optional[int] = Field(primary_key=True)
+    feature: str = Field(index=True)  # generation, verification, pdf_extraction, transcription, minutes など
+    model: str = Field(index=True)
+    endpoint: str = Field(default="chat")  # chat, transcription, batch
+    session_id: Optional[str] = Field(default=None, index=True)
+    prompt_tokens: int = Field(default=0)
+    completion_tokens: int = Field(default=0)
+    total_tokens: int = Field(default=0)
+    audio_seconds: float = Field(default=0.0)  # Whisperの音声長
+    latency_ms: int = Field(default=0)
+    retries: int = Field(default=0)
+    cost_usd: float = Field(default=0.0)
+    success: bool = Field(default=True)
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now, index=True)
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+
+class QuestionAudit(SQLModel, table=True):
+    """問題のAI品質監査結果テーブル"""
+    __tablename__ = "question_audit"
+    __table_args__ = {"extend_existing": True}
+    
+    id: Optional[int] = Field(primary_key=True)
+    question_id: int = Field(index=True)
+    content_hash: str = Field(index=True)  # 問題文・選択肢から計算したハッシュ
+    model: str
+    score: Optional[int] = None  # 品質スコア (1-10)
+    is_valid: Optional[bool] = None
+    issues: Optional[str] = None  # 問題点のリスト（JSON）
+    recommendation: Optional[str] = None
+    details: Optional[str] = None
+    audited_at: datetime = Field(default_factory=datetime.now, index=True)
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+ffmpeg を使わない音声の分割（フレーム境界で切る）
+MP3・AAC(ADTS) はフレームヘッダーをたどり、WAV は RIFF のチャンクを読んで、
+フレーム（WAVはサンプル）の途中で切らないように分割する
+
+MP3・ADTS は各フレームが自己完結しているため、連続したフレームをそのまま切り出せば
+有効なファイルになる。WAV は元の fmt チャンクを使って各チャンクにヘッダーを付け直す。
+走査は memoryview 上で行い、コピーするのは切り出したチャンクのデータだけ。
+
+方式は拡張子ではなくデータの先頭から判定する（拡張子が m4a の ADTS なども分割できる）。
+MP4 コンテナの M4A・WebM はコンテナの索引（moov など）を作り直す必要があるため対象外。
+"""
+
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 分割を試みる拡張子（実際の方式はデータの先頭から判定する）
+FRAME_SPLIT_EXTENSIONS = {"mp3", "mpga", "mpeg", "aac", "m4a", "wav"}
+
+# MPEG オーディオのビットレート（kbps）: (MPEGバージョン系, レイヤー) → インデックス順
+_MPEG_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# サンプリングレート: バージョンビット → インデックス順（3: MPEG1, 2: MPEG2, 0: MPEG2.5）
+_MPEG_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+_ADTS_SAMPLE_RATES = [
+    96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050,
+    16000, 12000, 11025, 8000, 7350
+]
+
+# (フレームの開始位置, 長さ, サンプル数, サンプリングレート)
+Frame = Tuple[int, int, int, int]
+
+
+def _parse_mpeg_header(view: memoryview, offset: int) -> Optional[Tuple[int, int, int]]:
+    """MPEG オーディオのフレームヘッダーを解析し (フレーム長, サンプル数, サンプリングレート) を返す"""
+    if offset + 4 > len(view):
+        return None
+    b1, b2 = view[offset + 1], view[offset + 2]
+    if view[offset] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version_bits = (b1 >> 3) & 0x03
+    layer = 4 - ((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None  # 予約値・フリーフォーマットは扱わない
+
+    family = 1 if version_bits == 3 else 2
+    bitrate = _MPEG_BITRATES[(family, layer)][bitrate_index] * 1000
+    sample_rate = _MPEG_SAMPLE_RATES[version_bits][rate_index]
+    padding = (b2 >> 1) & 0x01
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    if layer == 3 and family == 2:
+        return 72 * bitrate // sample_rate + padding, 576, sample_rate
+    return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+
+
+def _skip_id3v2(view: memoryview) -> int:
+    """先頭の ID3v2 タグを読み飛ばした位置"""
+    if len(view) < 10 or bytes(view[:3]) != b"ID3":
+        return 0
+    size = 0
+    for byte in view[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if view[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _is_info_frame(view: memoryview, offset: int, length: int) -> bool:
+    """VBR の情報フレーム（Xing / Info / VBRI）か（全体のフレーム数を持つため分割後は外す）"""
+    head = bytes(view[offset:offset + min(length, 64)])
+    return b"Xing" in head or b"Info" in head or b"VBRI" in head
+
+
+def iter_mp3_frames(view: memoryview) -> Iterator[Frame]:
+    """MP3 のフレームを順に返す（壊れた箇所は次の有効なフレームまで読み飛ばす）"""
+    offset = _skip_id3v2(view)
+    end = len(view)
+    first = True
+    while offset + 4 <= end:
+        header = _parse_mpeg_header(view, offset)
+        if header is None or offset + header[0] > end:
+            # 同期を取り直す（次のヘッダーも有効な位置だけを採用）
+            offset += 1
+            while offset + 4 <= end:
+                candidate = _parse_mpeg_header(view, offset)
+                if candidate is not None and (
+                    offset + candidate[0] == end or _parse_mpeg_header(view, offset + candidate[0]) is not None
+                ):
+                    break
+                offset += 1
+            continue
+
+        length, samples, sample_rate = header
+        if not (first and _is_info_frame(view, offset, length)):
+            yield offset, length, samples, sample_rate
+        first = False
+        offset += length
+
+
+def iter_adts_frames(view: memoryview) -> Iterator[Frame]:
+    """AAC(ADTS) のフレームを順に返す"""
+    offset = _skip_id3v2(view)
+    end = len(view)
+    while offset + 7 <= end:
+        if view[offset] != 0xFF or (view[offset + 1] & 0xF6) != 0xF0:
+            offset += 1
+            continue
+        rate_index = (view[offset + 2] >> 2) & 0x0F
+        length = ((view[offset + 3] & 0x03) << 11) | (view[offset + 4] << 3) | (view[offset + 5] >> 5)
+        blocks = (view[offset + 6] & 0x03) + 1
+        if rate_index >= len(_ADTS_SAMPLE_RATES) or length < 7 or offset + length > end:
+            offset += 1
+            continue
+        yield offset, length, 1024 * blocks, _ADTS_SAMPLE_RATES[rate_index]
+        offset += length
+
+
+def detect_frame_format(view: memoryview) -> Optional[str]:
+    """データの先頭から分割方式（"wav" / "adts" / "mp3"）を判定（対応外は None）"""
+    if len(view) >= 12 and bytes(view[0:4]) == b"RIFF" and bytes(view[8:12]) == b"WAVE":
+        return "wav"
+    offset = _skip_id3v2(view)
+    if offset + 4 > len(view) or view[offset] != 0xFF:
+        return None
+    if (view[offset + 1] & 0xF6) == 0xF0:
+        return "adts"
+    if _parse_mpeg_header(view, offset) is not None:
+        return "mp3"
+    return None
+
+
+def _group_frames(frames: Iterator[Frame], max_chunk_bytes: int) -> Iterator[Tuple[int, int, float, float]]:
+    """フレームを max_chunk_bytes 以下のまとまりにし (開始位置, 終了位置, 開始秒, 終了秒) を返す
+
+    フレームが連続していない（途中を読み飛ばした）場合も、まとまりは連続したバイト範囲として返す。
+    """
+    chunk_start = None
+    chunk_end = 0
+    start_time = 0.0
+    current_time = 0.0
+    for offset, length, samples, sample_rate in frames:
+        if chunk_start is None:
+            chunk_start, start_time = offset, current_time
+        elif offset + length - chunk_start > max_chunk_bytes:
+            yield chunk_start, chunk_end, start_time, current_time
+            chunk_start, start_time = offset, current_time
+        chunk_end = offset + length
+        current_time += samples / sample_rate
+    if chunk_start is not None:
+        yield chunk_start, chunk_end, start_time, current_time
+
+
+def _parse_wav(view: memoryview) -> Optional[Tuple[memoryview, int, int, int, int]]:
+    """WAV の (fmtチャンク, data の開始位置, data の長さ, ブロック長, 1秒あたりのバイト数)"""
+    if len(view) < 12 or bytes(view[0:4]) != b"RIFF" or bytes(view[8:12]) != b"WAVE":
+        return None
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        size = struct.unpack_from("<I", view, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            fmt = view[offset:body + size]
+        elif chunk_id == b"data" and fmt is not None:
+            byte_rate, block_align = struct.unpack_from("<IH", fmt, 16)
+            # 書き込み途中のファイルなどでサイズが実際より大きい場合は末尾まで
+            size = min(size, len(view) - body)
+            if block_align == 0 or byte_rate == 0:
+                return None
+            return fmt, body, size, block_align, byte_rate
+        offset = body + size + (size & 1)
+    return None
+
+
+def _split_wav(view: memoryview, max_chunk_bytes: int) -> Optional[List[Tuple[bytes, float, float]]]:
+    parsed = _parse_wav(view)
+    if parsed is None:
+        return None
+    fmt, data_start, data_size, block_align, byte_rate = parsed
+
+    header_size = 12 + len(fmt) + (len(fmt) & 1) + 8
+    per_chunk = (max_chunk_bytes - header_size) // block_align * block_align
+    if per_chunk <= 0:
+        return None
+
+    chunks = []
+    for start in range(0, data_size, per_chunk):
+        size = min(per_chunk, data_size - start)
+        data = view[data_start + start:data_start + start + size]
+        riff_size = 4 + len(fmt) + (len(fmt) & 1) + 8 + size + (size & 1)
+        parts = [
+            b"RIFF", struct.pack("<I", riff_size), b"WAVE",
+            fmt, b"\x00" * (len(fmt) & 1),
+            b"data", struct.pack("<I", size), data, b"\x00" * (size & 1)
+        ]
+        chunks.append((b"".join(parts), start / byte_rate, (start + size) / byte_rate))
+    return chunks
+
+
+def split_on_frames(file_data: bytes, filename: str, max_chunk_bytes: int) -> Optional[List[Dict[str, Any]]]:
+    """音声データをフレーム境界で max_chunk_bytes 以下に分割
+
+    Returns:
+        AudioSplitter.split_audio_file と同じ形式のチャンク情報のリスト（"method" は frame_split）。
+        対応していない形式、またはフレームを読み取れなかった場合は None
+    """
+    extension = filename.rsplit(".", 1)[-1].lower()
+    if extension not in FRAME_SPLIT_EXTENSIONS:
+        return None
+
+    with memoryview(file_data) as view:
+        kind = detect_frame_format(view)
+        if kind is None:
+            return None
+        if kind == "wav":
+            pieces = _split_wav(view, max_chunk_bytes)
+        else:
+            frames = iter_mp3_frames(view) if kind == "mp3" else iter_adts_frames(view)
+            pieces = [
+                (bytes(view[start:end]), start_time, end_time)
+                for start, end, start_time, end_time in _group_frames(frames, max_chunk_bytes)
+            ]
+    if not pieces:
+        return None
+
+    base_name = filename.rsplit(".", 1)[0]
+    return [
+        {
+            "chunk_index": i,
+            "start_time": start_time,
+            "end_time": end_time,
+            "duration": end_time - start_time,
+            "data": data,
+            "filename": f"{base_name}_chunk_{i+1:02d}.{extension}",
+            "size_mb": len(data) / (1024 * 1024),
+            "has_overlap": False,
+            "method": "frame_split"
+        }
+        for i, (data, start_time, end_time) in enumerate(pieces)
+    ]
@@ -4,11 +4,22 @@
 OpenAI Whisper APIを使用した音声認識機能
 """
 
+import contextvars
 import os
 import tempfile
 import json
-from typing import Dict, Optional, List, Any
-from openai import OpenAI
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from services.openai_client import create_openai_client
+from services.rate_limiter import get_rate_limiter
+from services.usage_ledger import record_usage, tracked_chat_completion, _retry_after_seconds
+from services.model_router import select_model
+from services.text_chunker import TextChunker, count_tokens, get_context_window
+from services.audio_frames import split_on_frames
+from services.transcription_cache import TranscriptionCache
 from dotenv import load_dotenv
 import logging
 
@@ -38,6 +49,70 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def _format_timestamp(seconds: Optional[float]) -> str:
+    """秒を H:MM:SS に整形"""
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _format_time_range(start: Optional[float], end: Optional[float]) -> str:
+    if start is None and end is None:
+        return "時刻不明"
+    return f"{_format_timestamp(start)}-{_format_timestamp(end)}"
+
+
+class _MinutesCost:
+    """議事録生成の複数回の呼び出しの使用量・コストを合算（スレッドセーフ）"""
+    
+    def __init__(self, model_info: Dict[str, Any]):
+        self.model_info = model_info
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.total_tokens = 0
+        self.usage_missing = False
+        self._lock = threading.Lock()
+    
+    def add(self, usage: Any) -> None:
+        with self._lock:
+            self.calls += 1
+            if not usage:
+                self.usage_missing = True
+                return
+            self.input_tokens += usage.prompt_tokens
+            self.output_tokens += usage.completion_tokens
+            self.total_tokens += usage.total_tokens
+    
+    def summary(self, model: str, estimated_input_tokens: int) -> Dict[str, Any]:
+        """create_meeting_minutes の cost_info（使用量が1回も取れなかった場合は unavailable）"""
+        if self.usage_missing and not self.total_tokens:
+            return {
+                "model_used": model,
+                "estimated_cost_usd": "unavailable"
+            }
+        
+        input_cost = (self.input_tokens / 1_000_000) * self.model_info["input_cost_per_1m"]
+        output_cost = (self.output_tokens / 1_000_000) * self.model_info["output_cost_per_1m"]
+        total_cost = input_cost + output_cost
+        logger.info(f"Cost info: ${total_cost:.4f} USD ({self.total_tokens} tokens, {self.calls} calls)")
+        return {
+            "model_used": model,
+            "estimated_input_tokens": estimated_input_tokens,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.total_tokens,
+            "api_calls": self.calls,
+            "estimated_cost_usd": round(total_cost, 4),
+            "cost_breakdown": {
+                "input_cost": round(input_cost, 4),
+                "output_cost": round(output_cost, 4)
+            }
+        }
+
+
 class AudioService:
     """音声ファイル処理と文字起こしサービス"""
     
@@ -49,6 +124,49 @@ class AudioService:
     # 最大ファイルサイズ（25MB - OpenAI Whisperの制限）
     MAX_FILE_SIZE = 25 * 1024 * 1024
     
+    # 分割チャンクを並列に文字起こしする数（環境変数 WHISPER_MAX_WORKERS）
+    DEFAULT_TRANSCRIPTION_WORKERS = 4
+    # 失敗したチャンクの再試行回数と初回の待ち時間（秒、以降は倍々）
+    CHUNK_MAX_RETRIES = 2
+    CHUNK_RETRY_DELAY = 2.0
+    # この大きさ（MB）以上のファイルは送信前に 16kHz モノラルの低ビットレートMP3に変換する
+    DEFAULT_TRANSCODE_MIN_MB = 4
+    
+    # 議事録の map-reduce 生成（これを超える入力トークン数で切り替え・1区間のトークン数・並列数）
+    DEFAULT_SINGLE_PASS_MAX_TOKENS = 16000
+    DEFAULT_SECTION_TOKENS = 6000
+    DEFAULT_MINUTES_WORKERS = 4
+    SECTION_MAX_OUTPUT_TOKENS = 1500
+    
+    MINUTES_SYSTEM_MESSAGE = "あなたは会議の議事録作成の専門家です。音声から文字起こしされたテキストを基に、整理された議事録をJSON形式で作成してください。"
+    SECTION_SYSTEM_MESSAGE = "あなたは会議の議事録作成の専門家です。長い会議の一部分を、後で1つの議事録にまとめられるようにJSON形式で要約してください。"
+    SECTION_SUMMARY_PROMPT = """以下は長い会議の一部分（録音上の時刻 {time_range}）です。
+文字起こし、または区間ごとの要約のいずれかです。行頭の [H:MM:SS] は発言の時刻です。
+
+この部分の内容を、次のJSON形式で要約してください:
+{{
+    "summary": "この部分の概要（2-3文）",
+    "topics": [
+        {{
+            "topic": "話題",
+            "time": "話題が始まった時刻（H:MM:SS、分かる場合）",
+            "discussion": "議論内容の要約（経緯・背景・主な意見）",
+            "decisions": ["決定事項（日時・金額・担当者などは具体的に）"],
+            "open_issues": ["未決事項"],
+            "action_items": [{{"task": "タスク内容", "assignee": "担当者", "deadline": "期限（もしあれば）"}}]
+        }}
+    ],
+    "participants": ["発言から分かる参加者"]
+}}
+
+重要：
+- この部分から読み取れる内容のみを記載し、推測や追加情報は含めない
+- 雑談や重複は省き、決定事項・数値・固有名詞は落とさない
+
+【会議の一部分】
+{section_text}
+"""
+    
     # 議事録作成用プロンプトテンプレート
     PROMPT_TEMPLATES = {
         "standard": {
@@ -261,7 +379,10 @@ class AudioService:
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable is not set")
         
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = create_openai_client(api_key=self.api_key)
+        self.transcription_workers = max(
+            1, int(os.getenv("WHISPER_MAX_WORKERS", self.DEFAULT_TRANSCRIPTION_WORKERS))
+        )
         
         # Railway環境でのメモリ制限を考慮してファイルサイズを調整
         if os.environ.get('RAILWAY_ENVIRONMENT') or os.environ.get('PORT'):
@@ -276,6 +397,20 @@ class AudioService:
             self.splitter = None
             logger.warning("AudioSplitter not available - large file processing will be limited")
         
+        # 送信前の音声変換（AUDIO_TRANSCODE_ENABLED=false で無効化）
+        self.transcode_enabled = os.getenv("AUDIO_TRANSCODE_ENABLED", "true").lower() not in ("false", "0", "no")
+        self.transcode_min_bytes = int(
+            float(os.getenv("AUDIO_TRANSCODE_MIN_MB", self.DEFAULT_TRANSCODE_MIN_MB)) * 1024 * 1024
+        )
+        
+        # 文字起こし結果のキャッシュ（音声ファイル全体・分割チャンクごと）
+        self.transcription_cache = None
+        if TranscriptionCache.is_enabled():
+            try:
+                self.transcription_cache = TranscriptionCache()
+            except OSError as e:
+                logger.warning(f"Transcription cache not available: {e}")
+        
         logger.info("AudioService initialized successfully")
     
     def validate_audio_file(self, file_data: bytes, filename: str) -> Dict[str, Any]:
@@ -324,9 +459,11 @@ class AudioService:
                 if AudioSegment is not None:
                     audio = AudioSegment.from_file(temp_input.name)
                     
-                    # MP3形式で出力
+                    # 音声認識用に 16kHz モノラルの低ビットレートMP3で出力
+                    audio = audio.set_channels(1).set_frame_rate(16000)
+                    bitrate = self.splitter.speech_bitrate if self.splitter else "32k"
                     with tempfile.NamedTemporaryFile(suffix=".mp3") as temp_output:
-                        audio.export(temp_output.name, format="mp3")
+                        audio.export(temp_output.name, format="mp3", bitrate=bitrate)
                         temp_output.seek(0)
                         return temp_output.read()
                 else:
@@ -380,12 +517,21 @@ class AudioService:
         file_data: bytes, 
         filename: str,
         language: str = "ja",
-        prompt: Optional[str] = None
+        prompt: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int, str], None]] = None
     ) -> Dict[str, Any]:
-        """音声ファイルを文字起こし（大きなファイルは自動分割）"""
+        """音声ファイルを文字起こし（大きなファイルは自動分割）
+        
+        Args:
+            progress_callback: 分割処理時に (完了チャンク数, 総チャンク数, 状態) を受け取るコールバック
+        """
         try:
             logger.info(f"Starting transcription for file: {filename}")
             
+            # ファイルサイズが制限を超える場合は分割処理（検証のサイズ上限より先に判定）
+            if len(file_data) > self.MAX_FILE_SIZE:
+                return self._transcribe_large_audio(file_data, filename, language, prompt, progress_callback)
+            
             # ファイル検証
             validation = self.validate_audio_file(file_data, filename)
             if not validation["valid"]:
@@ -394,12 +540,16 @@ class AudioService:
                     "error": validation["error"]
                 }
             
-            # ファイルサイズが制限を超える場合は分割処理
-            if len(file_data) > self.MAX_FILE_SIZE:
-                return self._transcribe_large_audio(file_data, filename, language, prompt)
+            cached = self._get_cached_transcription(file_data, language, prompt)
+            if cached is not None:
+                return cached
             
-            # 通常サイズのファイルの処理
-            return self._transcribe_single_audio(file_data, filename, language, prompt)
+            # 通常サイズのファイルの処理（大きめのファイルは変換してから送信）
+            transcoded = self._transcode_for_upload(file_data, filename)
+            if transcoded is None:
+                return self._transcribe_single_audio(file_data, filename, language, prompt)
+            result = self._transcribe_single_audio(transcoded["data"], transcoded["filename"], language, prompt)
+            return self._finish_transcoded(result, transcoded, file_data, language, prompt)
                 
         except Exception as e:
             logger.error(f"Transcription error: {e}")
@@ -408,14 +558,61 @@ class AudioService:
                 "error": f"文字起こし中にエラーが発生しました: {str(e)}"
             }
     
+    def _transcode_for_upload(self, file_data: bytes, filename: str) -> Optional[Dict[str, Any]]:
+        """送信前に 16kHz モノラルの低ビットレートMP3に変換（変換しない・できない場合は None）"""
+        if not self.transcode_enabled or not self.splitter or len(file_data) < self.transcode_min_bytes:
+            return None
+        return self.splitter.transcode_for_speech(file_data, filename)
+    
+    @staticmethod
+    def _transcode_summary(transcoded: Dict[str, Any]) -> Dict[str, Any]:
+        """変換の計測結果（データ本体を除く）"""
+        return {key: value for key, value in transcoded.items() if key != "data"}
+    
+    def _finish_transcoded(
+        self,
+        result: Dict[str, Any],
+        transcoded: Optional[Dict[str, Any]],
+        file_data: bytes,
+        language: Optional[str],
+        prompt: Optional[str]
+    ) -> Dict[str, Any]:
+        """変換したデータの結果に計測結果を付け、元のデータのキーでもキャッシュする"""
+        if transcoded is None or not result.get("success"):
+            return result
+        result["transcode_info"] = self._transcode_summary(transcoded)
+        merge_info = result.get("merge_info")
+        if self.transcription_cache is not None and (merge_info is None or merge_info["failed_chunks"] == 0):
+            self.transcription_cache.set(file_data, language, prompt, result)
+        return result
+    
+    def _get_cached_transcription(
+        self,
+        file_data: bytes,
+        language: Optional[str],
+        prompt: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みの文字起こし結果（なければ None）"""
+        if self.transcription_cache is None:
+            return None
+        cached = self.transcription_cache.get(file_data, language, prompt)
+        if cached is not None:
+            logger.info(f"Transcription cache hit ({len(file_data) / (1024*1024):.2f}MB)")
+        return cached
+    
     def _transcribe_single_audio(
         self, 
         file_data: bytes, 
         filename: str,
         language: str = "ja",
-        prompt: Optional[str] = None
+        prompt: Optional[str] = None,
+        retries: int = 0
     ) -> Dict[str, Any]:
-        """単一音声ファイルの文字起こし"""
+        """単一音声ファイルの文字起こし
+        
+        Args:
+            retries: 再試行の回数（利用記録用）
+        """
         try:
             # ファイル検証
             validation = self.validate_audio_file(file_data, filename)
@@ -425,6 +622,10 @@ class AudioService:
                     "error": validation["error"]
                 }
             
+            cached = self._get_cached_transcription(file_data, language, prompt)
+            if cached is not None:
+                return cached
+            
             # 一時ファイルを作成してWhisper APIに送信
             with tempfile.NamedTemporaryFile(suffix=f".{validation['format']}") as temp_file:
                 temp_file.write(file_data)
@@ -443,7 +644,32 @@ class AudioService:
                     if prompt is not None:
                         kwargs["prompt"] = prompt
                     
-                    transcript = self.client.audio.transcriptions.create(**kwargs)
+                    started_at = time.time()
+                    try:
+                        transcript = self.client.audio.transcriptions.create(**kwargs)
+                    except Exception as api_error:
+                        if getattr(api_error, "status_code", None) == 429:
+                            # 並列実行中の他のチャンクも含めて送信を一時停止
+                            get_rate_limiter().pause(_retry_after_seconds(api_error))
+                        record_usage(
+                            model="whisper-1",
+                            feature="transcription",
+                            endpoint="transcription",
+                            latency_ms=int((time.time() - started_at) * 1000),
+                            retries=retries,
+                            success=False,
+                            error=str(api_error)
+                        )
+                        raise
+                
+                record_usage(
+                    model="whisper-1",
+                    feature="transcription",
+                    endpoint="transcription",
+                    audio_seconds=float(getattr(transcript, 'duration', None) or 0.0),
+                    latency_ms=int((time.time() - started_at) * 1000),
+                    retries=retries
+                )
                 
                 logger.info("プライバシー保護: OpenAI学習無効化ヘッダー送信完了 (Whisper API)")
                 
@@ -465,7 +691,7 @@ class AudioService:
                         }
                         segments_dict.append(segment_dict)
                 
-                return {
+                result = {
                     "success": True,
                     "text": transcript.text,
                     "language": getattr(transcript, 'language', 'ja'),
@@ -473,6 +699,9 @@ class AudioService:
                     "segments": segments_dict,
                     "processing_method": "single_file"
                 }
+                if self.transcription_cache is not None:
+                    self.transcription_cache.set(file_data, language, prompt, result)
+                return result
                 
         except Exception as e:
             logger.error(f"Single audio transcription error: {e}")
@@ -486,9 +715,14 @@ class AudioService:
         file_data: bytes, 
         filename: str,
         language: str = "ja",
-        prompt: Optional[str] = None
+        prompt: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int, str], None]] = None
     ) -> Dict[str, Any]:
-        """大きな音声ファイルの分割文字起こし（フォールバック対応）"""
+        """大きな音声ファイルの分割文字起こし（フォールバック対応）
+        
+        Args:
+            progress_callback: (完了チャンク数, 総チャンク数, 状態) を受け取るコールバック
+        """
         try:
             if not self.splitter:
                 return {
@@ -496,44 +730,38 @@ class AudioService:
                     "error": "音声分割機能が利用できません。大きなファイルは処理できません。"
                 }
             
+            cached = self._get_cached_transcription(file_data, language, prompt)
+            if cached is not None:
+                return cached
+            
             logger.info(f"Large file detected ({len(file_data) / (1024*1024):.2f}MB). Starting split processing.")
             
+            # 16kHz モノラルに変換して制限内に収まれば分割せずに送信
+            upload_data, upload_filename = file_data, filename
+            transcoded = self._transcode_for_upload(file_data, filename)
+            if transcoded is not None:
+                if len(transcoded["data"]) <= self.MAX_FILE_SIZE:
+                    logger.info("Transcoded audio fits within the size limit. Skipping split processing.")
+                    result = self._transcribe_single_audio(
+                        transcoded["data"], transcoded["filename"], language, prompt
+                    )
+                    return self._finish_transcoded(result, transcoded, file_data, language, prompt)
+                upload_data, upload_filename = transcoded["data"], transcoded["filename"]
+            
             try:
-                # 音声ファイルを分割
-                chunks = self.splitter.split_audio_file(file_data, filename)
-                logger.info(f"Audio split into {len(chunks)} chunks")
+                # 音声ファイルを分割（切り出しながら文字起こしに渡す。最初のチャンクで分割できるか確かめる）
+                chunk_iter = self.splitter.iter_chunks(upload_data, upload_filename)
+                chunks = chain([next(chunk_iter)], chunk_iter)
             except Exception as split_error:
                 logger.warning(f"Advanced splitting failed: {split_error}")
-                # フォールバック: 時間ベースの簡易分割
-                return self._simple_time_based_split(file_data, filename, language, prompt)
-            
-            # 各チャンクを文字起こし
-            chunk_results = []
-            for i, chunk in enumerate(chunks):
-                logger.info(f"Processing chunk {i+1}/{len(chunks)}: {chunk['filename']}")
-                
-                chunk_result = self._transcribe_single_audio(
-                    chunk["data"], 
-                    chunk["filename"], 
-                    language, 
-                    prompt
+                # フォールバック: フレーム境界での簡易分割
+                result = self._simple_time_based_split(
+                    upload_data, upload_filename, language, prompt, progress_callback
                 )
-                
-                # チャンク情報を追加
-                chunk_result["chunk_info"] = {
-                    "index": chunk["chunk_index"],
-                    "start_time": chunk["start_time"],
-                    "end_time": chunk["end_time"],
-                    "duration": chunk["duration"],
-                    "filename": chunk["filename"]
-                }
-                
-                chunk_results.append(chunk_result)
-                
-                if chunk_result["success"]:
-                    logger.info(f"Chunk {i+1} transcribed successfully")
-                else:
-                    logger.warning(f"Chunk {i+1} transcription failed: {chunk_result.get('error', 'Unknown error')}")
+                return self._finish_transcoded(result, transcoded, file_data, language, prompt)
+            
+            # 各チャンクを並列に文字起こし（結果はチャンク順）
+            chunk_results = self.transcribe_split_chunks(chunks, language, prompt, progress_callback)
             
             # 結果をマージ
             merged_result = self.splitter.merge_transcriptions(chunk_results)
@@ -541,7 +769,12 @@ class AudioService:
             if merged_result["success"]:
                 merged_result["processing_method"] = "split_and_merge"
                 merged_result["chunk_details"] = chunk_results
+                if transcoded is not None:
+                    merged_result["transcode_info"] = self._transcode_summary(transcoded)
                 logger.info(f"Large file transcription completed. Processed {merged_result['chunks_processed']}/{merged_result['total_chunks']} chunks successfully.")
+                # 一部のチャンクが失敗した結果は保存しない（再実行時は失敗したチャンクだけを送信する）
+                if self.transcription_cache is not None and merged_result["merge_info"]["failed_chunks"] == 0:
+                    self.transcription_cache.set(file_data, language, prompt, merged_result)
             
             return merged_result
             
@@ -552,77 +785,175 @@ class AudioService:
                 "error": f"大きな音声ファイルの処理に失敗しました: {str(e)}"
             }
     
+    def transcribe_split_chunks(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        language: str = "ja",
+        prompt: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int, str], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """AudioSplitter.iter_chunks / split_audio_file のチャンクを並列に文字起こし
+        
+        イテレーターを渡すと切り出しと文字起こしが並行し、送信中のチャンクだけがメモリに載る。
+        
+        Returns:
+            チャンク順の結果リスト（AudioSplitter.merge_transcriptions にそのまま渡せる）
+        """
+        return self._transcribe_chunks(
+            (
+                {
+                    "data": chunk["data"],
+                    "filename": chunk["filename"],
+                    "total_chunks": chunk.get("total_chunks"),
+                    "chunk_info": {
+                        "index": chunk["chunk_index"],
+                        "start_time": chunk["start_time"],
+                        "end_time": chunk["end_time"],
+                        "duration": chunk["duration"],
+                        "filename": chunk["filename"]
+                    }
+                }
+                for chunk in chunks
+            ),
+            language,
+            prompt,
+            progress_callback
+        )
+    
+    def _transcribe_chunks(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        language: str = "ja",
+        prompt: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int, str], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """チャンクを並列に文字起こしし、チャンク順の結果リストを返す
+        
+        送信は共有レートリミッターで制御し、失敗したチャンクだけを指数バックオフで再試行する。
+        チャンクは並列数の2倍までしか先読みしないため、イテレーターを渡せば
+        文字起こしが終わったチャンクの音声データから順に手放される。
+        progress_callback は呼び出し元のスレッドでチャンクが完了するたびに呼ばれる
+        （総数が分からない間は、見込みの総数または投入済みの数を渡す）。
+        
+        Args:
+            chunks: {"data", "filename", "chunk_info"} の列（"total_chunks" に見込みの総数を付けてもよい）
+        """
+        limiter = get_rate_limiter()
+        
+        def transcribe(index: int, chunk: Dict[str, Any]) -> Dict[str, Any]:
+            # 文字起こし済みのチャンクは送信しない（レートリミッターの枠も使わない）
+            cached = self._get_cached_transcription(chunk["data"], language, prompt)
+            if cached is not None:
+                cached["attempts"] = 0
+                return cached
+            for attempt in range(self.CHUNK_MAX_RETRIES + 1):
+                limiter.acquire()
+                result = self._transcribe_single_audio(
+                    chunk["data"], chunk["filename"], language, prompt, retries=attempt
+                )
+                if result["success"] or attempt == self.CHUNK_MAX_RETRIES:
+                    break
+                wait = self.CHUNK_RETRY_DELAY * (2 ** attempt)
+                logger.warning(
+                    f"Chunk {index+1} transcription failed, retrying in {wait:.0f}s "
+                    f"({attempt + 1}/{self.CHUNK_MAX_RETRIES}): {result.get('error')}"
+                )
+                time.sleep(wait)
+            result["attempts"] = attempt + 1
+            return result
+        
+        results: Dict[int, Dict[str, Any]] = {}
+        pending: Dict[Any, Any] = {}
+        remaining = iter(chunks)
+        max_pending = self.transcription_workers * 2
+        submitted = 0
+        total = 0
+        completed = 0
+        exhausted = False
+        
+        with ThreadPoolExecutor(max_workers=self.transcription_workers, thread_name_prefix="whisper") as executor:
+            while True:
+                while not exhausted and len(pending) < max_pending:
+                    chunk = next(remaining, None)
+                    if chunk is None:
+                        exhausted = True
+                        break
+                    # 利用記録のセッション・機能の帰属をワーカースレッドに引き継ぐ
+                    future = executor.submit(contextvars.copy_context().run, transcribe, submitted, chunk)
+                    pending[future] = (submitted, chunk["chunk_info"])
+                    submitted += 1
+                    total = max(total, submitted, chunk.get("total_chunks") or 0)
+                    if submitted == 1 and progress_callback:
+                        progress_callback(0, total, "文字起こし中")
+                chunk = None  # 投入したチャンクの音声データはワーカーだけが持つ
+                if not pending:
+                    break
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, chunk_info = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"success": False, "error": f"音声ファイルの文字起こしに失敗しました: {str(e)}"}
+                    result["chunk_info"] = chunk_info
+                    results[index] = result
+                    completed += 1
+                    if exhausted:
+                        total = submitted
+                    
+                    if result["success"]:
+                        logger.info(f"Chunk {index+1}/{total} transcribed successfully")
+                        status = f"チャンク {index+1} の文字起こしが完了"
+                    else:
+                        logger.warning(f"Chunk {index+1}/{total} transcription failed: {result.get('error', 'Unknown error')}")
+                        status = f"チャンク {index+1} の文字起こしに失敗"
+                    if progress_callback:
+                        progress_callback(completed, total, status)
+        
+        return [results[index] for index in range(submitted)]
+    
     def _simple_time_based_split(
         self, 
         file_data: bytes, 
         filename: str,
         language: str = "ja",
-        prompt: Optional[str] = None
+        prompt: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int, str], None]] = None
     ) -> Dict[str, Any]:
-        """簡易的な時間ベース分割（ffmpeg不要）"""
+        """フレーム境界での簡易分割（ffmpeg不要）
+        
+        MP3・AAC(ADTS)・WAV はフレーム（WAVはサンプル）の途中で切らないように分割する。
+        それ以外の形式はバイト位置で切ると無効なファイルになるため分割しない。
+        """
         try:
-            logger.info("Using simple time-based splitting (ffmpeg not available)")
-            
-            # ファイルサイズから分割数を推定
-            file_size_mb = len(file_data) / (1024 * 1024)
-            max_chunk_size_mb = 20  # 20MB以下
-            estimated_chunks = max(1, int(file_size_mb / max_chunk_size_mb))
-            
-            if estimated_chunks == 1:
-                # 分割不要
-                return self._transcribe_single_audio(file_data, filename, language, prompt)
-            
-            # バイト単位で均等分割
-            chunk_size = len(file_data) // estimated_chunks
-            chunks = []
-            
-            for i in range(estimated_chunks):
-                start_byte = i * chunk_size
-                end_byte = start_byte + chunk_size if i < estimated_chunks - 1 else len(file_data)
-                
-                chunk_data = file_data[start_byte:end_byte]
-                chunk_filename = f"{filename.rsplit('.', 1)[0]}_chunk_{i+1:02d}.{filename.split('.')[-1]}"
-                
-                # 各チャンクを文字起こし
-                chunk_result = self._transcribe_single_audio(
-                    chunk_data, 
-                    chunk_filename, 
-                    language, 
-                    prompt
-                )
-                
-                chunk_result["chunk_info"] = {
-                    "index": i,
-                    "start_byte": start_byte,
-                    "end_byte": end_byte,
-                    "filename": chunk_filename,
-                    "method": "byte_split"
-                }
-                
-                chunks.append(chunk_result)
-                logger.info(f"Simple chunk {i+1}/{estimated_chunks} processed")
+            logger.info("Using frame-based splitting (ffmpeg not available)")
             
-            # 結果を簡易マージ
-            successful_chunks = [c for c in chunks if c.get("success", False)]
-            if not successful_chunks:
+            max_chunk_size = 20 * 1024 * 1024  # 20MB以下
+            chunks = split_on_frames(file_data, filename, max_chunk_size)
+            if chunks is None:
                 return {
                     "success": False,
-                    "error": "すべてのチャンクの処理に失敗しました"
+                    "error": "この形式の音声はffmpegなしでは分割できません。ffmpegをインストールするか、MP3またはWAVに変換してください。"
                 }
             
-            # テキストを結合
-            combined_text = " ".join([c.get("text", "") for c in successful_chunks])
+            if len(chunks) == 1:
+                # 分割不要
+                return self._transcribe_single_audio(file_data, filename, language, prompt)
+            logger.info(f"Audio split on frame boundaries into {len(chunks)} chunks")
             
-            return {
-                "success": True,
-                "text": combined_text,
-                "language": successful_chunks[0].get("language", "ja"),
-                "processing_method": "simple_byte_split",
-                "chunks_processed": len(successful_chunks),
-                "total_chunks": len(chunks),
-                "chunk_details": chunks,
-                "note": "ffmpegが利用できないため、簡易的なバイト分割を使用しました"
-            }
+            # 各チャンクを並列に文字起こし（結果はチャンク順）
+            chunk_results = self.transcribe_split_chunks(chunks, language, prompt, progress_callback)
+            
+            # チャンクの開始時刻でマージ（フレーム境界で切っているため重複はない）
+            merged_result = self.splitter.merge_transcriptions(chunk_results)
+            if merged_result["success"]:
+                merged_result["processing_method"] = "frame_split"
+                merged_result["chunk_details"] = chunk_results
+                merged_result["note"] = "ffmpegが利用できないため、フレーム境界での簡易分割を使用しました"
+                if self.transcription_cache is not None and merged_result["merge_info"]["failed_chunks"] == 0:
+                    self.transcription_cache.set(file_data, language, prompt, merged_result)
+            return merged_result
             
         except Exception as e:
             logger.error(f"Simple time-based splitting error: {e}")
@@ -636,19 +967,27 @@ class AudioService:
         transcribed_text: str,
         meeting_title: str = "",
         participants: Optional[List[str]] = None,
-        model: str = "gpt-4o-mini",
+        model: Optional[str] = None,
         custom_prompt: Optional[str] = None,
-        prompt_template: str = "standard"
+        prompt_template: str = "standard",
+        segments: Optional[List[Dict[str, Any]]] = None,
+        map_reduce: Optional[bool] = None
     ) -> Dict[str, Any]:
         """文字起こしテキストから議事録を生成
         
+        長い文字起こし（MINUTES_SINGLE_PASS_MAX_TOKENS 超、またはコンテキストウィンドウに収まらない場合）は
+        map-reduce で生成する: 区間ごとの要約を並列に作り（segments があれば区間の時刻付き）、
+        要約を指定のテンプレートに渡して同じJSON形式の議事録にまとめる。
+        
         Args:
             transcribed_text: 文字起こしされたテキスト
             meeting_title: 会議タイトル
             participants: 参加者リスト
-            model: 使用するGPTモデル（デフォルト: gpt-4o-mini）
+            model: 使用するGPTモデル（省略時はモデルルーターが入力長に応じて選択）
             custom_prompt: カスタムプロンプト（指定時はこれを優先）
             prompt_template: プロンプトテンプレート名（デフォルト: standard）
+            segments: 文字起こしのセグメント（start / end / text）。区間の時刻を要約に含める
+            map_reduce: True / False で方式を固定（省略時は長さで判定）
         """
         try:
             # 入力テキストの検証
@@ -659,100 +998,46 @@ class AudioService:
                 }
             
             # モデルの検証
-            if model not in self.AVAILABLE_MODELS:
+            if model is not None and model not in self.AVAILABLE_MODELS:
                 logger.warning(f"Unknown model {model}, falling back to gpt-4o-mini")
                 model = "gpt-4o-mini"
             
-            logger.info(f"Creating meeting minutes using model: {model}")
-            
-            # プロンプトの決定（カスタムプロンプト優先）
-            if custom_prompt and custom_prompt.strip():
-                # カスタムプロンプトを使用
-                try:
-                    prompt = custom_prompt.format(transcription_text=transcribed_text)
-                    logger.info("Using custom prompt for meeting minutes")
-                except KeyError as e:
-                    logger.warning(f"Custom prompt format error: {e}")
-                    # フォールバック処理
-                    prompt = custom_prompt + f"\n\n【文字起こしデータ】\n{transcribed_text}"
-            else:
-                # テンプレートプロンプトを使用
-                if prompt_template in self.PROMPT_TEMPLATES:
-                    template = self.PROMPT_TEMPLATES[prompt_template]
-                    try:
-                        prompt = template["prompt"].format(transcription_text=transcribed_text)
-                        logger.info(f"Using template prompt: {template['name']}")
-                    except KeyError as e:
-                        logger.warning(f"Template prompt format error: {e}")
-                        # フォールバック処理
-                        prompt = template["prompt"] + f"\n\n【文字起こしデータ】\n{transcribed_text}"
-                else:
-                    # フォールバック: 従来のプロンプト
-                    prompt = self._create_minutes_prompt(transcribed_text, meeting_title, participants)
-                    logger.info("Using legacy prompt format")
-            
-            # OpenAI APIで議事録を生成
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "あなたは会議の議事録作成の専門家です。音声から文字起こしされたテキストを基に、整理された議事録をJSON形式で作成してください。"
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=2000,
-                temperature=0.3,
-                response_format={"type": "json_object"},
-                # プライバシー保護
-                extra_headers={
-                    "X-OpenAI-Skip-Training": "true"
-                }
+            prompt = self._build_minutes_prompt(
+                transcribed_text, meeting_title, participants, custom_prompt, prompt_template
             )
             
-            logger.info("プライバシー保護: OpenAI学習無効化ヘッダー送信完了 (議事録生成)")
-            
-            # 使用量とコストの計算
-            usage = response.usage
-            model_info = self.AVAILABLE_MODELS[model]
-            
-            if usage:
-                input_cost = (usage.prompt_tokens / 1_000_000) * model_info["input_cost_per_1m"]
-                output_cost = (usage.completion_tokens / 1_000_000) * model_info["output_cost_per_1m"]
-                total_cost = input_cost + output_cost
-                
-                cost_info = {
-                    "model_used": model,
-                    "input_tokens": usage.prompt_tokens,
-                    "output_tokens": usage.completion_tokens,
-                    "total_tokens": usage.total_tokens,
-                    "estimated_cost_usd": round(total_cost, 4),
-                    "cost_breakdown": {
-                        "input_cost": round(input_cost, 4),
-                        "output_cost": round(output_cost, 4)
-                    }
-                }
-                logger.info(f"Cost info: ${total_cost:.4f} USD ({usage.total_tokens} tokens)")
-            else:
-                cost_info = {
-                    "model_used": model,
-                    "estimated_cost_usd": "unavailable"
-                }
+            max_output_tokens = 2000
+            if model is None:
+                model = select_model("minutes", input_tokens=count_tokens(prompt) + 100)
+                if model not in self.AVAILABLE_MODELS:
+                    model = "gpt-4o-mini"
+            logger.info(f"Creating meeting minutes using model: {model}")
             
-            # レスポンスをJSONとしてパース
-            content = response.choices[0].message.content
-            if content is None:
-                raise Exception("OpenAI APIからの応答が空です")
+            # コンテキストウィンドウに収まるか事前に確認（収まらない場合は map-reduce で生成する）
+            estimated_input_tokens = count_tokens(prompt, model) + 100  # システムメッセージ分
+            context_window = get_context_window(model)
+            logger.info(f"Minutes input: {estimated_input_tokens} tokens (context window: {context_window})")
+            if map_reduce is None:
+                single_pass_max = int(os.getenv("MINUTES_SINGLE_PASS_MAX_TOKENS", self.DEFAULT_SINGLE_PASS_MAX_TOKENS))
+                map_reduce = (
+                    estimated_input_tokens > single_pass_max
+                    or estimated_input_tokens + max_output_tokens > context_window
+                )
+            if map_reduce:
+                return self._create_minutes_map_reduce(
+                    transcribed_text, meeting_title, participants, model,
+                    custom_prompt, prompt_template, segments, max_output_tokens
+                )
             
-            minutes_data = json.loads(content)
+            costs = _MinutesCost(self.AVAILABLE_MODELS[model])
+            minutes_data = self._request_minutes_json(
+                model, self.MINUTES_SYSTEM_MESSAGE, prompt, max_output_tokens, costs
+            )
             
             return {
                 "success": True,
                 "minutes": minutes_data,
-                "cost_info": cost_info
+                "cost_info": costs.summary(model, estimated_input_tokens)
             }
             
         except Exception as e:
@@ -762,6 +1047,237 @@ class AudioService:
                 "error": f"議事録作成中にエラーが発生しました: {str(e)}"
             }
     
+    def _build_minutes_prompt(
+        self,
+        transcribed_text: str,
+        meeting_title: str,
+        participants: Optional[List[str]],
+        custom_prompt: Optional[str],
+        prompt_template: str
+    ) -> str:
+        """議事録のプロンプトを決定（カスタムプロンプト優先）"""
+        if custom_prompt and custom_prompt.strip():
+            # カスタムプロンプトを使用
+            try:
+                prompt = custom_prompt.format(transcription_text=transcribed_text)
+                logger.info("Using custom prompt for meeting minutes")
+            except KeyError as e:
+                logger.warning(f"Custom prompt format error: {e}")
+                # フォールバック処理
+                prompt = custom_prompt + f"\n\n【文字起こしデータ】\n{transcribed_text}"
+        else:
+            # テンプレートプロンプトを使用
+            if prompt_template in self.PROMPT_TEMPLATES:
+                template = self.PROMPT_TEMPLATES[prompt_template]
+                try:
+                    prompt = template["prompt"].format(transcription_text=transcribed_text)
+                    logger.info(f"Using template prompt: {template['name']}")
+                except KeyError as e:
+                    logger.warning(f"Template prompt format error: {e}")
+                    # フォールバック処理
+                    prompt = template["prompt"] + f"\n\n【文字起こしデータ】\n{transcribed_text}"
+            else:
+                # フォールバック: 従来のプロンプト
+                prompt = self._create_minutes_prompt(transcribed_text, meeting_title, participants)
+                logger.info("Using legacy prompt format")
+        return prompt
+    
+    def _request_minutes_json(
+        self,
+        model: str,
+        system_message: str,
+        prompt: str,
+        max_output_tokens: int,
+        costs: "_MinutesCost"
+    ) -> Dict[str, Any]:
+        """JSON形式の応答を1回リクエストし、使用量を costs に加算"""
+        response = tracked_chat_completion(
+            self.client,
+            feature="minutes",
+            model=model,
+            messages=[
+                {
+                    "role": "system", 
+                    "content": system_message
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            max_tokens=max_output_tokens,
+            temperature=0.3,
+            response_format={"type": "json_object"},
+            # プライバシー保護
+            extra_headers={
+                "X-OpenAI-Skip-Training": "true"
+            }
+        )
+        
+        logger.info("プライバシー保護: OpenAI学習無効化ヘッダー送信完了 (議事録生成)")
+        costs.add(response.usage)
+        
+        # レスポンスをJSONとしてパース
+        content = response.choices[0].message.content
+        if content is None:
+            raise Exception("OpenAI APIからの応答が空です")
+        
+        return json.loads(content)
+    
+    def _create_minutes_map_reduce(
+        self,
+        transcribed_text: str,
+        meeting_title: str,
+        participants: Optional[List[str]],
+        model: str,
+        custom_prompt: Optional[str],
+        prompt_template: str,
+        segments: Optional[List[Dict[str, Any]]],
+        max_output_tokens: int
+    ) -> Dict[str, Any]:
+        """区間ごとの要約（map）を並列に作り、議事録にまとめる（reduce）
+        
+        要約をまとめた入力がまだ長い場合は、要約同士をさらに要約してから議事録にする。
+        所要時間は会議全体ではなく、最も長い区間と段数で決まる。
+        """
+        section_tokens = int(os.getenv("MINUTES_SECTION_TOKENS", self.DEFAULT_SECTION_TOKENS))
+        sections = self._minutes_sections(transcribed_text, segments, model, section_tokens)
+        logger.info(f"Creating meeting minutes with map-reduce: {len(sections)} sections")
+        
+        costs = _MinutesCost(self.AVAILABLE_MODELS[model])
+        summaries = self._summarize_sections(sections, model, costs)
+        
+        # 要約の合計が1区間に収まるまで、要約同士をまとめる
+        levels = 1
+        while count_tokens(self._format_section_summaries(summaries), model) > section_tokens and len(summaries) > 1:
+            groups = []
+            for summary in summaries:
+                if groups and count_tokens(self._format_section_summaries(groups[-1] + [summary]), model) <= section_tokens:
+                    groups[-1].append(summary)
+                else:
+                    groups.append([summary])
+            if len(groups) == len(summaries):
+                break  # これ以上まとめられない
+            summaries = self._summarize_sections(
+                [
+                    {
+                        "start": group[0].get("start"),
+                        "end": group[-1].get("end"),
+                        "text": self._format_section_summaries(group)
+                    }
+                    for group in groups
+                ],
+                model,
+                costs
+            )
+            levels += 1
+        
+        reduce_input = (
+            "（この会議は長いため、録音を区間ごとに要約したものを以下に示します。"
+            "[開始-終了] は録音上の時刻です。全区間を通して1つの議事録にまとめてください。）\n\n"
+            + self._format_section_summaries(summaries)
+        )
+        prompt = self._build_minutes_prompt(
+            reduce_input, meeting_title, participants, custom_prompt, prompt_template
+        )
+        estimated_input_tokens = count_tokens(prompt, model) + 100
+        minutes_data = self._request_minutes_json(
+            model, self.MINUTES_SYSTEM_MESSAGE, prompt, max_output_tokens, costs
+        )
+        
+        cost_info = costs.summary(model, estimated_input_tokens)
+        cost_info.update({
+            "mode": "map_reduce",
+            "sections": len(sections),
+            "reduce_levels": levels
+        })
+        return {
+            "success": True,
+            "minutes": minutes_data,
+            "cost_info": cost_info,
+            "section_summaries": summaries
+        }
+    
+    def _minutes_sections(
+        self,
+        transcribed_text: str,
+        segments: Optional[List[Dict[str, Any]]],
+        model: str,
+        section_tokens: int
+    ) -> List[Dict[str, Any]]:
+        """文字起こしを区間に分ける（セグメントがあれば時刻付き）
+        
+        Returns:
+            {"start", "end", "text"} のリスト（時刻が分からない場合は start / end が None）
+        """
+        if segments:
+            sections = []
+            current: List[str] = []
+            current_tokens = 0
+            section_start = None
+            section_end = None
+            for segment in segments:
+                text = (segment.get("text") or "").strip()
+                if not text:
+                    continue
+                line = f"[{_format_timestamp(segment.get('start'))}] {text}"
+                line_tokens = count_tokens(line, model)
+                if current and current_tokens + line_tokens > section_tokens:
+                    sections.append({"start": section_start, "end": section_end, "text": "\n".join(current)})
+                    current, current_tokens, section_start = [], 0, None
+                if section_start is None:
+                    section_start = segment.get("start")
+                current.append(line)
+                current_tokens += line_tokens
+                section_end = segment.get("end")
+            if current:
+                sections.append({"start": section_start, "end": section_end, "text": "\n".join(current)})
+            if sections:
+                return sections
+        
+        chunker = TextChunker(model=model, max_tokens=section_tokens)
+        return [{"start": None, "end": None, "text": chunk.text} for chunk in chunker.chunk(transcribed_text)]
+    
+    def _summarize_sections(
+        self,
+        sections: List[Dict[str, Any]],
+        model: str,
+        costs: "_MinutesCost"
+    ) -> List[Dict[str, Any]]:
+        """区間を並列に要約し、区間順の要約リストを返す（失敗した区間があれば例外）"""
+        def summarize(section: Dict[str, Any]) -> Dict[str, Any]:
+            prompt = self.SECTION_SUMMARY_PROMPT.format(
+                time_range=_format_time_range(section.get("start"), section.get("end")),
+                section_text=section["text"]
+            )
+            summary = self._request_minutes_json(
+                model, self.SECTION_SYSTEM_MESSAGE, prompt, self.SECTION_MAX_OUTPUT_TOKENS, costs
+            )
+            summary["start"] = section.get("start")
+            summary["end"] = section.get("end")
+            return summary
+        
+        workers = max(1, min(int(os.getenv("MINUTES_MAP_WORKERS", self.DEFAULT_MINUTES_WORKERS)), len(sections)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="minutes") as executor:
+            # 利用記録のセッション・機能の帰属をワーカースレッドに引き継ぐ
+            futures = [
+                executor.submit(contextvars.copy_context().run, summarize, section)
+                for section in sections
+            ]
+            return [future.result() for future in futures]
+    
+    @staticmethod
+    def _format_section_summaries(summaries: List[Dict[str, Any]]) -> str:
+        """区間の要約を reduce 用のテキストに整形"""
+        blocks = []
+        for summary in summaries:
+            body = {key: value for key, value in summary.items() if key not in ("start", "end")}
+            blocks.append(
+                f"[{_format_time_range(summary.get('start'), summary.get('end'))}]\n"
+                + json.dumps(body, ensure_ascii=False)
+            )
+        return "\n\n".join(blocks)
+    
     def _create_minutes_prompt(
         self, 
         transcribed_text: str, 
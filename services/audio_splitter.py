@@ -2,20 +2,117 @@
 """
 音声ファイル分割ツール
 大きな音声ファイルを小さなチャンクに分割してWhisper APIの制限に対応
+
+ffmpeg・ffprobe がある場合は、一時ファイルに書き出した元ファイルから ffmpeg で区間ごとに
+切り出す（可能な限りストリームコピー、できない形式はMP3に再エンコード）。
+音声全体をPCMに展開しないため、長時間の録音でもメモリ使用量は一定。
+ffmpeg がない場合は pydub で読み込んで分割する。
+
+送信前の変換（transcode_for_speech）では、Whisper が内部で使う 16kHz モノラルに
+ダウンミックス・リサンプリングし、低ビットレートのMP3にする。音声認識に使われない
+情報だけを落とすため認識精度はほぼ変わらず、サイズは 128kbps ステレオの約1/4
+（32kbps の場合、1時間で約14MB）になり、多くの録音が分割なしで送信できる。
+
+分割位置は、目標の境界の前後にある無音区間を探して選ぶ（NumPy がある場合）。
+境界付近だけを低いサンプリングレートのモノラルにデコードし、フレームごとのエネルギーから
+無音を検出する。無音で切れた境界は重複なし、見つからなかった境界は従来どおり重複を付ける。
 """
 
+import json
 import os
+import shutil
+import subprocess
 import tempfile
+import time
 import math
-from typing import List, Dict, Any, Optional
-from pydub import AudioSegment
-from pydub.utils import make_chunks
+from collections import deque
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple, Union
 import logging
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+try:
+    from pydub import AudioSegment
+    PYDUB_AVAILABLE = True
+except ImportError:
+    AudioSegment = None
+    PYDUB_AVAILABLE = False
+
 # ロギング設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def find_silence_split(
+    samples: "np.ndarray",
+    sample_rate: int,
+    target_seconds: float,
+    frame_seconds: float = 0.03,
+    min_silence_seconds: float = 0.3,
+    margin_db: float = 6.0,
+    max_silence_db: float = -35.0
+) -> Optional[float]:
+    """エネルギーベースのVADで、目標位置に最も近い無音区間の中央を返す
+    
+    Args:
+        samples: モノラルの音声（-1.0〜1.0 に正規化済み）
+        target_seconds: 目標の分割位置（samples の先頭からの秒数）
+        margin_db: 区間内の静かなフレーム（下位10%）から何dBまでを無音とみなすか
+        max_silence_db: 無音とみなす上限（dBFS）。常に音が鳴っている区間で誤検出しないため
+    
+    Returns:
+        分割位置（samples の先頭からの秒数）。min_silence_seconds 以上の無音がなければ None
+    """
+    frame_size = max(1, int(sample_rate * frame_seconds))
+    frame_count = len(samples) // frame_size
+    if frame_count < 3:
+        return None
+    
+    frames = samples[:frame_count * frame_size].reshape(frame_count, frame_size).astype(np.float64)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    levels = 20 * np.log10(np.maximum(rms, 1e-10))
+    threshold = min(float(np.percentile(levels, 10)) + margin_db, max_silence_db)
+    silent = levels <= threshold
+    
+    # 無音フレームが連続する区間（開始・終了フレーム）
+    padded = np.concatenate(([False], silent, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    starts, ends = edges[0::2], edges[1::2]
+    long_enough = (ends - starts) >= math.ceil(min_silence_seconds / frame_seconds)
+    if not long_enough.any():
+        return None
+    
+    frame_duration = frame_size / sample_rate
+    centers = (starts[long_enough] + ends[long_enough]) / 2 * frame_duration
+    return float(centers[np.argmin(np.abs(centers - target_seconds))])
+
+
+class _SourceFile:
+    """ffmpeg に渡す入力ファイル（データの場合は一時ファイルに1回だけ書き出し、終了時に削除）"""
+    
+    def __init__(self, file_data: Union[bytes, str], filename: str):
+        self.file_data = file_data
+        self.suffix = f".{filename.split('.')[-1]}"
+        self.temp_path: Optional[str] = None
+    
+    def __enter__(self) -> str:
+        if isinstance(self.file_data, str):
+            return self.file_data
+        fd, self.temp_path = tempfile.mkstemp(suffix=self.suffix)
+        with os.fdopen(fd, "wb") as f:
+            f.write(self.file_data)
+        return self.temp_path
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self.temp_path and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+        return False
+
+
 class AudioSplitter:
     """音声ファイル分割クラス"""
     
@@ -28,12 +125,126 @@ class AudioSplitter:
     # 分割時の重複時間（秒） - 音声の途切れを防ぐため
     OVERLAP_SECONDS = 2
     
+    # ストリームコピーで切り出す形式（入力の拡張子 → 出力の拡張子）
+    STREAM_COPY_FORMATS = {
+        "mp3": "mp3", "mpga": "mp3", "mpeg": "mp3",
+        "m4a": "m4a", "mp4": "m4a",
+        "wav": "wav", "webm": "webm"
+    }
+    # 音声認識用の変換設定（16kHz モノラル・低ビットレートのMP3）
+    SPEECH_SAMPLE_RATE = 16000
+    DEFAULT_SPEECH_BITRATE = "32k"
+    # 変換してもこの割合より小さくならない場合は元のデータを使う
+    TRANSCODE_MAX_RATIO = 0.9
+    # ffmpeg 1回あたりの制限時間（秒）
+    FFMPEG_TIMEOUT = 600
+    
+    # 無音検出（目標の境界の前後何秒を探すか・解析用のサンプリングレート）
+    DEFAULT_SILENCE_SEARCH_SECONDS = 30.0
+    VAD_SAMPLE_RATE = 8000
+    
     def __init__(self):
         """分割ツールの初期化"""
-        logger.info("AudioSplitter initialized")
+        self.ffmpeg_path = shutil.which("ffmpeg")
+        self.ffprobe_path = shutil.which("ffprobe")
+        self.vad_enabled = (
+            NUMPY_AVAILABLE and os.getenv("AUDIO_VAD_ENABLED", "true").lower() not in ("0", "false", "no")
+        )
+        self.silence_search_seconds = float(
+            os.getenv("AUDIO_VAD_SEARCH_SECONDS", self.DEFAULT_SILENCE_SEARCH_SECONDS)
+        )
+        self.speech_bitrate = os.getenv("AUDIO_SPEECH_BITRATE", self.DEFAULT_SPEECH_BITRATE)
+        logger.info(
+            f"AudioSplitter initialized (ffmpeg: {'available' if self.ffmpeg_available else 'not found'}, "
+            f"VAD: {'on' if self.vad_enabled else 'off'})"
+        )
+    
+    @property
+    def ffmpeg_available(self) -> bool:
+        return bool(self.ffmpeg_path and self.ffprobe_path)
     
-    def get_audio_info(self, file_data: bytes, filename: str) -> Dict[str, Any]:
-        """音声ファイルの情報を取得"""
+    @property
+    def speech_encode_args(self) -> List[str]:
+        """音声認識用の ffmpeg エンコード設定（ストリームコピーできないチャンクの再エンコードにも使う）"""
+        return [
+            "-c:a", "libmp3lame", "-b:a", self.speech_bitrate,
+            "-ac", "1", "-ar", str(self.SPEECH_SAMPLE_RATE)
+        ]
+    
+    def transcode_for_speech(self, file_data: Union[bytes, str], filename: str) -> Optional[Dict[str, Any]]:
+        """送信前に 16kHz モノラル・低ビットレートのMP3に変換
+        
+        Returns:
+            {"data", "filename", "original_size_mb", "size_mb", "ratio", "seconds", "method"}。
+            変換できない場合、または十分に小さくならない場合は None
+        """
+        started_at = time.time()
+        try:
+            with _SourceFile(file_data, filename) as source_path:
+                original_size = os.path.getsize(source_path)
+                if self.ffmpeg_available:
+                    data = self._transcode_with_ffmpeg(source_path)
+                    method = "ffmpeg"
+                elif PYDUB_AVAILABLE:
+                    audio = AudioSegment.from_file(source_path)
+                    audio = audio.set_channels(1).set_frame_rate(self.SPEECH_SAMPLE_RATE)
+                    with tempfile.NamedTemporaryFile(suffix=".mp3") as output:
+                        audio.export(output.name, format="mp3", bitrate=self.speech_bitrate)
+                        output.seek(0)
+                        data = output.read()
+                    method = "pydub"
+                else:
+                    return None
+        except Exception as e:
+            logger.warning(f"Speech transcoding failed: {e}")
+            return None
+        
+        ratio = len(data) / original_size if original_size else 1.0
+        info = {
+            "data": data,
+            "filename": f"{filename.rsplit('.', 1)[0]}_speech.mp3",
+            "original_size_mb": original_size / (1024 * 1024),
+            "size_mb": len(data) / (1024 * 1024),
+            "ratio": ratio,
+            "seconds": time.time() - started_at,
+            "method": method
+        }
+        logger.info(
+            f"Transcoded for speech ({method}, {self.SPEECH_SAMPLE_RATE}Hz mono {self.speech_bitrate}): "
+            f"{info['original_size_mb']:.2f}MB -> {info['size_mb']:.2f}MB ({ratio:.0%}, {info['seconds']:.1f}s)"
+        )
+        if not data or ratio > self.TRANSCODE_MAX_RATIO:
+            return None
+        return info
+    
+    def _transcode_with_ffmpeg(self, source_path: str) -> bytes:
+        with tempfile.TemporaryDirectory() as work_dir:
+            output_path = os.path.join(work_dir, "speech.mp3")
+            command = [
+                self.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+                "-i", source_path, "-vn", "-map", "0:a:0", *self.speech_encode_args, output_path
+            ]
+            completed = subprocess.run(command, capture_output=True, timeout=self.FFMPEG_TIMEOUT)
+            if completed.returncode != 0 or not os.path.exists(output_path):
+                raise Exception(completed.stderr.decode("utf-8", errors="replace").strip())
+            with open(output_path, "rb") as f:
+                return f.read()
+    
+    def get_audio_info(self, file_data: Union[bytes, str], filename: str) -> Dict[str, Any]:
+        """音声ファイルの情報を取得
+        
+        Args:
+            file_data: 音声データ、または音声ファイルのパス
+        """
+        if self.ffmpeg_available:
+            with _SourceFile(file_data, filename) as source_path:
+                return self._probe_audio(source_path, filename)
+        
+        if not PYDUB_AVAILABLE:
+            raise Exception("音声ファイルの情報取得に失敗しました: ffmpeg・pydub のいずれも利用できません")
+        if isinstance(file_data, str):
+            with open(file_data, "rb") as f:
+                file_data = f.read()
         try:
             with tempfile.NamedTemporaryFile(suffix=f".{filename.split('.')[-1]}") as temp_file:
                 temp_file.write(file_data)
@@ -83,17 +294,366 @@ class AudioSplitter:
             "chunk_duration_seconds": base_chunk_duration,
             "chunk_duration_with_overlap": chunk_duration_with_overlap,
             "estimated_chunk_size_mb": estimated_chunk_size_mb,
-            "overlap_seconds": self.OVERLAP_SECONDS
+            "overlap_seconds": self.OVERLAP_SECONDS,
+            "max_chunk_seconds": self._max_chunk_seconds(audio_info)
         }
     
+    def _max_chunk_seconds(self, audio_info: Dict[str, Any]) -> Optional[float]:
+        """元の音声の平均ビットレートで MAX_FILE_SIZE（5%の余裕を残す）に収まる最大の長さ（秒）"""
+        file_size = audio_info["file_size_mb"] * 1024 * 1024
+        if file_size <= 0 or audio_info["duration_seconds"] <= 0:
+            return None
+        return audio_info["duration_seconds"] * self.MAX_FILE_SIZE * 0.95 / file_size
+    
+    def _probe_audio(self, source_path: str, filename: str) -> Dict[str, Any]:
+        """ffprobe で音声ファイルの情報を取得（デコードしない）"""
+        command = [
+            self.ffprobe_path, "-v", "error",
+            "-select_streams", "a:0",
+            "-show_entries", "format=duration,bit_rate:stream=codec_name,channels,sample_rate",
+            "-of", "json", source_path
+        ]
+        try:
+            completed = subprocess.run(command, capture_output=True, timeout=60, check=True)
+            probe = json.loads(completed.stdout or b"{}")
+            stream = (probe.get("streams") or [{}])[0]
+            duration_seconds = float(probe.get("format", {}).get("duration") or 0.0)
+        except (subprocess.SubprocessError, ValueError) as e:
+            logger.error(f"Audio info extraction error: {e}")
+            raise Exception(f"音声ファイルの情報取得に失敗しました: {str(e)}")
+        
+        file_size = os.path.getsize(source_path)
+        return {
+            "duration_seconds": duration_seconds,
+            "duration_minutes": duration_seconds / 60.0,
+            "file_size_mb": file_size / (1024 * 1024),
+            "channels": int(stream.get("channels") or 0),
+            "frame_rate": int(stream.get("sample_rate") or 0),
+            "codec": stream.get("codec_name"),
+            "bit_rate": int(probe.get("format", {}).get("bit_rate") or 0),
+            "format": filename.split('.')[-1].lower()
+        }
+    
+    def _resolve_strategy(
+        self,
+        audio_info: Dict[str, Any],
+        chunk_duration_minutes: Optional[float]
+    ) -> Dict[str, Any]:
+        """分割戦略（分割時間の指定があればそれに従う）"""
+        if chunk_duration_minutes is None:
+            return self.calculate_split_strategy(audio_info)
+        
+        chunk_duration_seconds = chunk_duration_minutes * 60
+        chunks_needed = math.ceil(audio_info["duration_seconds"] / chunk_duration_seconds)
+        return {
+            "needs_splitting": chunks_needed > 1,
+            "chunks_needed": chunks_needed,
+            "chunk_duration_seconds": chunk_duration_seconds,
+            "overlap_seconds": self.OVERLAP_SECONDS,
+            "max_chunk_seconds": self._max_chunk_seconds(audio_info)
+        }
+    
+    def _plan_chunks(
+        self,
+        strategy: Dict[str, Any],
+        total_seconds: float,
+        load_window: Optional[Callable[[float, float], Optional["np.ndarray"]]] = None
+    ) -> List[Dict[str, Any]]:
+        """チャンクの区間を決める
+        
+        目標の境界（chunk_duration_seconds の倍数）の前後 silence_search_seconds 以内で無音を探し、
+        見つかればそこで重複なしに切る。見つからない境界は目標位置で切り、overlap_seconds だけ重ねる。
+        探索範囲は、前後の境界がともに外側へずれてもチャンクが max_chunk_seconds を超えない幅に抑える。
+        
+        Args:
+            load_window: (開始秒, 長さ秒) を受け取り、VAD_SAMPLE_RATE のモノラル音声（正規化済み）を返す。
+                None の場合や VAD が無効の場合は無音を探さない
+        
+        Returns:
+            チャンクごとの {"start_time", "end_time", "has_overlap", "split_on_silence"}
+        """
+        chunk_seconds = strategy["chunk_duration_seconds"]
+        overlap_seconds = strategy["overlap_seconds"]
+        chunks_needed = strategy["chunks_needed"]
+        # 隣の境界の探索範囲と重ならないように、チャンクの長さの1/4までに抑える。
+        # さらに両端が外側へずれても上限に収まるよう、上限までの余裕の半分までにする
+        max_chunk_seconds = strategy.get("max_chunk_seconds") or chunk_seconds + overlap_seconds
+        search_seconds = min(
+            self.silence_search_seconds,
+            chunk_seconds / 4,
+            (max_chunk_seconds - chunk_seconds - overlap_seconds) / 2
+        )
+        use_vad = self.vad_enabled and load_window is not None and search_seconds > 0
+        
+        boundaries: List[Tuple[float, bool]] = []
+        for i in range(1, chunks_needed):
+            target = i * chunk_seconds
+            split_time = None
+            if use_vad:
+                window_start = max(0.0, target - search_seconds)
+                window_end = min(total_seconds, target + search_seconds)
+                try:
+                    samples = load_window(window_start, window_end - window_start)
+                    if samples is not None:
+                        offset = find_silence_split(samples, self.VAD_SAMPLE_RATE, target - window_start)
+                        if offset is not None:
+                            split_time = window_start + offset
+                except Exception as e:
+                    logger.warning(f"Silence detection failed near {target:.1f}s: {e}")
+            if split_time is not None:
+                boundaries.append((split_time, True))
+            else:
+                boundaries.append((target, False))
+        
+        plans = []
+        for i in range(chunks_needed):
+            start_time = boundaries[i - 1][0] if i > 0 else 0.0
+            overlap_before = i > 0 and not boundaries[i - 1][1]
+            # 最後のチャンクは末尾まで（重複なし）
+            if i == chunks_needed - 1:
+                end_time = total_seconds
+                split_on_silence = False
+                overlap_after = False
+            else:
+                split_time, split_on_silence = boundaries[i]
+                overlap_after = not split_on_silence
+                end_time = min(split_time + (0 if split_on_silence else overlap_seconds), total_seconds)
+            plans.append({
+                "start_time": start_time,
+                "end_time": end_time,
+                "has_overlap": overlap_before or overlap_after,
+                "split_on_silence": split_on_silence
+            })
+        
+        if use_vad:
+            silent_count = sum(1 for _, on_silence in boundaries if on_silence)
+            logger.info(f"Split points on silence: {silent_count}/{len(boundaries)}")
+        return plans
+    
+    def _resplit_plan(self, plan: Dict[str, Any], size_bytes: int, overlap_seconds: float) -> Optional[List[Dict[str, Any]]]:
+        """MAX_FILE_SIZE を超えたチャンクの区間を RECOMMENDED_MAX_SIZE 以下の見込みで等分する
+        
+        分けた境界は overlap_seconds だけ重ねる。これ以上分けられないほど短い場合は None。
+        """
+        start_time, end_time = plan["start_time"], plan["end_time"]
+        if end_time - start_time <= overlap_seconds * 4:
+            return None
+        parts = math.ceil(size_bytes / self.RECOMMENDED_MAX_SIZE)
+        step = (end_time - start_time) / parts
+        pieces = []
+        for k in range(parts):
+            last = k == parts - 1
+            pieces.append({
+                "start_time": start_time + k * step,
+                "end_time": end_time if last else min(start_time + (k + 1) * step + overlap_seconds, end_time),
+                "has_overlap": True,
+                "split_on_silence": plan["split_on_silence"] if last else False
+            })
+        return pieces
+    
+    def _decode_window(self, source_path: str, start_time: float, duration: float) -> Optional["np.ndarray"]:
+        """ffmpeg で区間だけを VAD_SAMPLE_RATE のモノラルPCMにデコード（無音検出用）"""
+        command = [
+            self.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin",
+            "-ss", f"{start_time:.3f}", "-t", f"{duration:.3f}", "-i", source_path,
+            "-vn", "-map", "0:a:0", "-ac", "1", "-ar", str(self.VAD_SAMPLE_RATE), "-f", "s16le", "-"
+        ]
+        completed = subprocess.run(command, capture_output=True, timeout=self.FFMPEG_TIMEOUT)
+        if completed.returncode != 0 or not completed.stdout:
+            return None
+        pcm = completed.stdout[:len(completed.stdout) // 2 * 2]
+        return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    
+    def _pydub_window(self, audio, start_time: float, duration: float) -> Optional["np.ndarray"]:
+        """pydub で読み込んだ音声から区間を取り出し、モノラルにして VAD_SAMPLE_RATE 付近に間引く"""
+        segment = audio[int(start_time * 1000):int((start_time + duration) * 1000)].set_channels(1)
+        if len(segment) == 0:
+            return None
+        samples = np.array(segment.get_array_of_samples(), dtype=np.float32)
+        samples /= float(1 << (8 * segment.sample_width - 1))
+        step = max(1, segment.frame_rate // self.VAD_SAMPLE_RATE)
+        if segment.frame_rate // step != self.VAD_SAMPLE_RATE:
+            # 整数倍で間引けないレートは線形補間で揃える
+            positions = np.arange(0, len(samples), segment.frame_rate / self.VAD_SAMPLE_RATE)
+            return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+        return samples[::step]
+    
     def split_audio_file(
         self, 
-        file_data: bytes, 
+        file_data: Union[bytes, str], 
+        filename: str,
+        chunk_duration_minutes: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """音声ファイルを分割し、すべてのチャンクをリストで返す
+        
+        チャンクを保持せずに順に処理する場合は iter_chunks を使う。
+        """
+        return list(self.iter_chunks(file_data, filename, chunk_duration_minutes))
+    
+    def iter_chunks(
+        self,
+        file_data: Union[bytes, str],
+        filename: str,
+        chunk_duration_minutes: Optional[float] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """音声ファイルを分割したチャンクを順に返す
+        
+        ffmpeg がある場合は iter_audio_chunks で切り出しながら返す（チャンクは元の圧縮形式のまま）。
+        ffmpeg がない場合は pydub で全体を分割してから返す。
+        """
+        if self.ffmpeg_available:
+            return self.iter_audio_chunks(file_data, filename, chunk_duration_minutes)
+        return iter(self._split_with_pydub(file_data, filename, chunk_duration_minutes))
+    
+    def iter_audio_chunks(
+        self,
+        file_data: Union[bytes, str],
+        filename: str,
+        chunk_duration_minutes: Optional[float] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """ffmpeg で区間ごとに切り出したチャンクを順に返す
+        
+        元ファイルを一時ファイルに1回だけ書き出し（パスを渡した場合はそのまま使う）、
+        チャンクごとに ffmpeg を実行する。入力側でシークしてストリームコピーするため
+        デコードは行わず、メモリに載るのは返したチャンク1つ分だけ。
+        
+        Args:
+            file_data: 音声データ、または音声ファイルのパス
+        
+        Yields:
+            split_audio_file と同じ形式のチャンク情報（"method" に stream_copy / reencode、
+            "total_chunks" にその時点で見込まれる総チャンク数）
+        """
+        if not self.ffmpeg_available:
+            raise Exception("ffmpeg が利用できないため音声を切り出せません")
+        
+        logger.info(f"Starting ffmpeg audio splitting for file: {filename}")
+        with _SourceFile(file_data, filename) as source_path, tempfile.TemporaryDirectory() as work_dir:
+            audio_info = self._probe_audio(source_path, filename)
+            logger.info(f"Audio info: {audio_info}")
+            strategy = self._resolve_strategy(audio_info, chunk_duration_minutes)
+            logger.info(f"Split strategy: {strategy}")
+            
+            if not strategy["needs_splitting"]:
+                with open(source_path, "rb") as f:
+                    data = f.read()
+                yield {
+                    "chunk_index": 0,
+                    "start_time": 0,
+                    "end_time": audio_info["duration_seconds"],
+                    "duration": audio_info["duration_seconds"],
+                    "data": data,
+                    "filename": filename,
+                    "size_mb": audio_info["file_size_mb"]
+                }
+                return
+            
+            base_name = filename.rsplit('.', 1)[0]
+            pending = deque(self._plan_chunks(
+                strategy,
+                audio_info["duration_seconds"],
+                lambda start, duration: self._decode_window(source_path, start, duration)
+            ))
+            allow_copy = True
+            i = 0
+            
+            while pending:
+                plan = pending.popleft()
+                start_time = plan["start_time"]
+                end_time = plan["end_time"]
+                
+                output_path, method = self._cut_chunk(
+                    source_path, audio_info["format"], work_dir, i, start_time, end_time - start_time, allow_copy
+                )
+                # ストリームコピーできなかった形式は以降のチャンクも再エンコードする
+                allow_copy = method == "stream_copy"
+                size_bytes = os.path.getsize(output_path)
+                pieces = self._resplit_plan(plan, size_bytes, strategy["overlap_seconds"]) if size_bytes > self.MAX_FILE_SIZE else None
+                if pieces:
+                    # ビットレートの偏りで上限を超えた区間は分け直して切り出す
+                    logger.warning(f"Chunk {i+1} is {size_bytes / (1024 * 1024):.2f}MB; re-splitting into {len(pieces)} parts")
+                    os.remove(output_path)
+                    pending.extendleft(reversed(pieces))
+                    continue
+                with open(output_path, "rb") as f:
+                    chunk_data = f.read()
+                os.remove(output_path)
+                
+                chunk_info = {
+                    "chunk_index": i,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "duration": end_time - start_time,
+                    "data": chunk_data,
+                    "filename": f"{base_name}_chunk_{i+1:02d}.{output_path.rsplit('.', 1)[-1]}",
+                    "size_mb": len(chunk_data) / (1024 * 1024),
+                    "has_overlap": plan["has_overlap"],
+                    "split_on_silence": plan["split_on_silence"],
+                    "method": method,
+                    "total_chunks": i + 1 + len(pending)
+                }
+                if len(chunk_data) > self.MAX_FILE_SIZE:
+                    logger.warning(f"Chunk {i+1} exceeds the Whisper size limit ({chunk_info['size_mb']:.2f}MB)")
+                logger.info(f"Created chunk {i+1}: {chunk_info['filename']} ({chunk_info['size_mb']:.2f}MB, {method})")
+                i += 1
+                yield chunk_info
+    
+    def _cut_chunk(
+        self,
+        source_path: str,
+        source_format: str,
+        work_dir: str,
+        index: int,
+        start_time: float,
+        duration: float,
+        allow_copy: bool = True
+    ) -> Tuple[str, str]:
+        """ffmpeg で1区間を切り出す（ストリームコピーに失敗した場合は再エンコード）
+        
+        Returns:
+            (出力ファイルのパス, 方法)
+        """
+        attempts = []
+        copy_format = self.STREAM_COPY_FORMATS.get(source_format)
+        if copy_format and allow_copy:
+            attempts.append(("stream_copy", copy_format, ["-c:a", "copy"]))
+        attempts.append(("reencode", "mp3", self.speech_encode_args))
+        
+        last_error = ""
+        for method, extension, codec_args in attempts:
+            output_path = os.path.join(work_dir, f"chunk_{index:03d}.{extension}")
+            command = [
+                self.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+                # 入力側でシーク（区間の外は読み飛ばす）
+                "-ss", f"{start_time:.3f}", "-t", f"{duration:.3f}", "-i", source_path,
+                "-vn", "-map", "0:a:0", *codec_args, output_path
+            ]
+            try:
+                completed = subprocess.run(command, capture_output=True, timeout=self.FFMPEG_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                last_error = f"ffmpeg timed out after {self.FFMPEG_TIMEOUT}s"
+                continue
+            if completed.returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+                return output_path, method
+            last_error = completed.stderr.decode("utf-8", errors="replace").strip()
+            logger.warning(f"ffmpeg {method} failed for chunk {index+1}: {last_error}")
+        
+        raise Exception(f"音声ファイルの分割に失敗しました: {last_error}")
+    
+    def _split_with_pydub(
+        self, 
+        file_data: Union[bytes, str], 
         filename: str,
         chunk_duration_minutes: Optional[float] = None
     ) -> List[Dict[str, Any]]:
-        """音声ファイルを分割"""
+        """pydub で音声全体を読み込んで分割（ffmpeg がない場合）"""
         try:
+            if not PYDUB_AVAILABLE:
+                raise Exception("ffmpeg・pydub のいずれも利用できません")
+            if isinstance(file_data, str):
+                with open(file_data, "rb") as f:
+                    file_data = f.read()
+            
             logger.info(f"Starting audio splitting for file: {filename}")
             
             # 音声情報を取得
@@ -101,17 +661,7 @@ class AudioSplitter:
             logger.info(f"Audio info: {audio_info}")
             
             # 分割戦略を計算
-            if chunk_duration_minutes is None:
-                strategy = self.calculate_split_strategy(audio_info)
-            else:
-                chunk_duration_seconds = chunk_duration_minutes * 60
-                chunks_needed = math.ceil(audio_info["duration_seconds"] / chunk_duration_seconds)
-                strategy = {
-                    "needs_splitting": chunks_needed > 1,
-                    "chunks_needed": chunks_needed,
-                    "chunk_duration_seconds": chunk_duration_seconds,
-                    "overlap_seconds": self.OVERLAP_SECONDS
-                }
+            strategy = self._resolve_strategy(audio_info, chunk_duration_minutes)
             
             logger.info(f"Split strategy: {strategy}")
             
@@ -134,25 +684,32 @@ class AudioSplitter:
                 audio = AudioSegment.from_file(temp_file.name)
                 
                 chunks = []
-                chunk_duration_ms = int(strategy["chunk_duration_seconds"] * 1000)
-                overlap_ms = int(strategy["overlap_seconds"] * 1000)
+                pending = deque(self._plan_chunks(
+                    strategy,
+                    len(audio) / 1000.0,
+                    lambda start, duration: self._pydub_window(audio, start, duration)
+                ))
                 
-                for i in range(strategy["chunks_needed"]):
-                    start_ms = i * chunk_duration_ms
-                    end_ms = min((i + 1) * chunk_duration_ms + overlap_ms, len(audio))
+                while pending:
+                    plan = pending.popleft()
+                    i = len(chunks)
+                    start_ms = int(plan["start_time"] * 1000)
+                    end_ms = min(int(plan["end_time"] * 1000), len(audio))
                     
-                    # 最後のチャンクの場合は重複を減らす
-                    if i == strategy["chunks_needed"] - 1:
-                        end_ms = len(audio)
-                    
-                    chunk_audio = audio[start_ms:end_ms]
+                    chunk_audio = audio[start_ms:end_ms].set_channels(1).set_frame_rate(self.SPEECH_SAMPLE_RATE)
                     
                     # チャンクをMP3形式で出力
                     with tempfile.NamedTemporaryFile(suffix=".mp3") as chunk_temp:
-                        chunk_audio.export(chunk_temp.name, format="mp3", bitrate="128k")
+                        chunk_audio.export(chunk_temp.name, format="mp3", bitrate=self.speech_bitrate)
                         chunk_temp.seek(0)
                         chunk_data = chunk_temp.read()
                     
+                    pieces = self._resplit_plan(plan, len(chunk_data), strategy["overlap_seconds"]) if len(chunk_data) > self.MAX_FILE_SIZE else None
+                    if pieces:
+                        logger.warning(f"Chunk {i+1} is {len(chunk_data) / (1024 * 1024):.2f}MB; re-splitting into {len(pieces)} parts")
+                        pending.extendleft(reversed(pieces))
+                        continue
+                    
                     chunk_info = {
                         "chunk_index": i,
                         "start_time": start_ms / 1000.0,
@@ -161,11 +718,12 @@ class AudioSplitter:
                         "data": chunk_data,
                         "filename": f"{filename.rsplit('.', 1)[0]}_chunk_{i+1:02d}.mp3",
                         "size_mb": len(chunk_data) / (1024 * 1024),
-                        "has_overlap": i > 0 or i < strategy["chunks_needed"] - 1
+                        "has_overlap": plan["has_overlap"],
+                        "split_on_silence": plan["split_on_silence"]
                     }
                     
                     chunks.append(chunk_info)
-                    logger.info(f"Created chunk {i+1}/{strategy['chunks_needed']}: {chunk_info['filename']} ({chunk_info['size_mb']:.2f}MB)")
+                    logger.info(f"Created chunk {i+1}: {chunk_info['filename']} ({chunk_info['size_mb']:.2f}MB)")
                 
                 return chunks
                 
@@ -174,7 +732,16 @@ class AudioSplitter:
             raise Exception(f"音声ファイルの分割に失敗しました: {str(e)}")
     
     def merge_transcriptions(self, chunk_results: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """分割された音声の文字起こし結果をマージ"""
+        """分割された音声の文字起こし結果をマージ
+        
+        各チャンクの開始位置（chunk_info の start_time）で Whisper のセグメントを元の音声の時刻に直し、
+        隣り合うチャンクの重複区間はその中央で分ける（中央より前は前のチャンク、以降は次のチャンクの
+        セグメントを採用）。セグメントの中点で判定するため、重複区間の発話は1回だけ残り、
+        結果のセグメントは時刻順に並ぶ。計算量はセグメント数に対して線形。
+        
+        Args:
+            chunk_results: チャンク順の文字起こし結果（AudioService.transcribe_split_chunks の戻り値）
+        """
         try:
             if not chunk_results:
                 raise ValueError("マージする結果がありません")
@@ -188,45 +755,68 @@ class AudioSplitter:
                     "error": "すべてのチャンクの文字起こしに失敗しました"
                 }
             
-            # テキストをマージ
-            merged_text = ""
-            total_duration = 0
-            all_segments = []
-            current_time_offset = 0
+            # 各チャンクの元の音声上の区間（開始位置が分からない場合は直前のチャンクの終わりから）
+            spans = []
+            previous_end = 0.0
+            for result in successful_results:
+                chunk_info = result.get("chunk_info") or {}
+                start = chunk_info.get("start_time")
+                start = previous_end if start is None else float(start)
+                end = chunk_info.get("end_time")
+                if end is None:
+                    end = start + float(result.get("duration") or 0.0)
+                spans.append((start, float(end)))
+                previous_end = float(end)
+            
+            # 隣り合うチャンクの境界（重複がある場合はその中央）
+            boundaries = []
+            for (_, previous_end), (next_start, _) in zip(spans, spans[1:]):
+                boundaries.append((next_start + previous_end) / 2 if next_start < previous_end else next_start)
             
+            text_parts = []
+            all_segments = []
+            dropped_segments = 0
+            last_end = 0.0
             for i, result in enumerate(successful_results):
-                chunk_text = result.get("text", "")
-                chunk_duration = result.get("duration", 0)
-                chunk_segments = result.get("segments", [])
+                offset = spans[i][0]
+                lower = boundaries[i - 1] if i > 0 else float("-inf")
+                upper = boundaries[i] if i < len(boundaries) else float("inf")
+                chunk_segments = result.get("segments") or []
                 
-                # 重複除去のための処理（簡易版）
-                if i > 0 and merged_text and chunk_text:
-                    # 前のチャンクの最後の文と現在のチャンクの最初の文を比較
-                    last_sentences = merged_text.strip().split('。')[-2:]  # 最後の2文
-                    first_sentences = chunk_text.strip().split('。')[:2]   # 最初の2文
-                    
-                    # 重複している可能性がある場合は調整
-                    if len(last_sentences) > 0 and len(first_sentences) > 0:
-                        if last_sentences[-1] in chunk_text[:100]:  # 簡易的な重複チェック
-                            # 重複部分をスキップ
-                            sentences = chunk_text.split('。')
-                            if len(sentences) > 1:
-                                chunk_text = '。'.join(sentences[1:])
-                
-                merged_text += (" " if merged_text else "") + chunk_text
-                total_duration += chunk_duration
+                if not chunk_segments:
+                    # セグメントがない結果はテキストをそのまま使う（重複は取り除けない）
+                    text_parts.append(result.get("text", "").strip())
+                    continue
                 
-                # セグメント情報もマージ（時間オフセット調整）
-                if chunk_segments:
-                    for segment in chunk_segments:
-                        adjusted_segment = segment.copy()
-                        if 'start' in adjusted_segment:
-                            adjusted_segment['start'] += current_time_offset
-                        if 'end' in adjusted_segment:
-                            adjusted_segment['end'] += current_time_offset
-                        all_segments.append(adjusted_segment)
+                kept_text = []
+                for segment in chunk_segments:
+                    seg_start = offset + float(segment.get("start") or 0.0)
+                    seg_end = offset + float(segment.get("end") or segment.get("start") or 0.0)
+                    midpoint = (seg_start + seg_end) / 2
+                    if not lower <= midpoint < upper:
+                        dropped_segments += 1
+                        continue
+                    
+                    # 境界付近で前のセグメントと重なる場合は開始を詰めて時刻順を保つ
+                    seg_start = max(seg_start, last_end)
+                    seg_end = max(seg_end, seg_start)
+                    last_end = seg_end
+                    
+                    adjusted_segment = dict(segment)
+                    adjusted_segment["id"] = len(all_segments)
+                    adjusted_segment["start"] = seg_start
+                    adjusted_segment["end"] = seg_end
+                    adjusted_segment["chunk_index"] = i
+                    all_segments.append(adjusted_segment)
+                    kept_text.append(segment.get("text", ""))
                 
-                current_time_offset += chunk_duration
+                text_parts.append("".join(kept_text).strip())
+            
+            merged_text = " ".join(part for part in text_parts if part)
+            total_duration = max(
+                spans[-1][0] + float(successful_results[-1].get("duration") or 0.0),
+                last_end
+            )
             
             # 言語の決定（最も多く出現した言語）
             languages = [result.get("language", "ja") for result in successful_results]
@@ -243,7 +833,9 @@ class AudioSplitter:
                 "merge_info": {
                     "successful_chunks": len(successful_results),
                     "failed_chunks": len(chunk_results) - len(successful_results),
-                    "chunk_languages": languages
+                    "chunk_languages": languages,
+                    "chunk_boundaries": boundaries,
+                    "dropped_overlap_segments": dropped_segments
                 }
             }
             
@@ -272,6 +864,62 @@ def test_audio_splitter():
         strategy = splitter.calculate_split_strategy(test_audio_info)
         print(f"✅ Split strategy calculated: {strategy}")
         
+        # 境界が探索範囲の両端（前は前方・後ろは後方）の無音にずれても上限を超えない
+        if NUMPY_AVAILABLE:
+            splitter.vad_enabled, splitter.silence_search_seconds = True, 300.0
+            rng = np.random.default_rng(0)
+            
+            def edge_silence(start: float, duration: float) -> "np.ndarray":
+                samples = rng.uniform(-0.5, 0.5, int(duration * splitter.VAD_SAMPLE_RATE)).astype(np.float32)
+                silent = slice(0, splitter.VAD_SAMPLE_RATE) if int(start // strategy["chunk_duration_seconds"]) % 2 else slice(-splitter.VAD_SAMPLE_RATE, None)
+                samples[silent] = 0.0
+                return samples
+            
+            plans = splitter._plan_chunks(strategy, test_audio_info["duration_seconds"], edge_silence)
+            longest = max(plan["end_time"] - plan["start_time"] for plan in plans)
+            assert longest <= strategy["max_chunk_seconds"], (longest, strategy["max_chunk_seconds"])
+            print(f"✅ Silence search keeps chunks within {strategy['max_chunk_seconds']:.0f}s (longest {longest:.0f}s)")
+        
+        pieces = splitter._resplit_plan(
+            {"start_time": 0.0, "end_time": 900.0, "split_on_silence": True}, 30 * 1024 * 1024, 2
+        )
+        assert len(pieces) == 2 and pieces[0]["end_time"] == 452.0 and pieces[1]["start_time"] == 450.0
+        assert pieces[1]["split_on_silence"] and not pieces[0]["split_on_silence"]
+        
+        # 重複のあるチャンクのマージ（5秒ごとの発話 s0〜s19、100秒を [0, 52] と [50, 100] に分割）
+        def synthetic_result(start: float, end: float) -> Dict[str, Any]:
+            segments = [
+                {"start": max(t, start) - start, "end": min(t + 5, end) - start, "text": f"s{t // 5}。"}
+                for t in range(0, 100, 5) if t < end and t + 5 > start
+            ]
+            return {
+                "success": True,
+                "text": "".join(segment["text"] for segment in segments),
+                "language": "ja",
+                "duration": end - start,
+                "segments": segments,
+                "chunk_info": {"start_time": start, "end_time": end}
+            }
+        
+        expected_text = "".join(f"s{n}。" for n in range(20))
+        merged = splitter.merge_transcriptions([synthetic_result(0, 52), synthetic_result(50, 100)])
+        assert merged["success"]
+        assert merged["text"].replace(" ", "") == expected_text, merged["text"]
+        assert [segment["text"] for segment in merged["segments"]] == [f"s{n}。" for n in range(20)]
+        starts = [segment["start"] for segment in merged["segments"]]
+        assert starts == sorted(starts) and starts[10] == 50
+        assert merged["duration"] == 100
+        
+        # 無音で切った（重複のない）チャンクと、途中のチャンクの失敗
+        merged = splitter.merge_transcriptions([
+            synthetic_result(0, 35),
+            {"success": False, "error": "timeout", "chunk_info": {"start_time": 35, "end_time": 70}},
+            synthetic_result(70, 100)
+        ])
+        assert [segment["start"] for segment in merged["segments"]][-6:] == [70, 75, 80, 85, 90, 95]
+        assert merged["merge_info"]["failed_chunks"] == 1
+        print("✅ Overlapping transcriptions merged by timestamp")
+        
         return True
     except Exception as e:
         print(f"❌ AudioSplitter test failed: {e}")
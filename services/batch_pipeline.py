@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+"""
+OpenAI Batch APIを使った一括処理パイプライン
+大量の問題生成・問題検証をJSONLジョブとして投入し、完了後に結果をDBへ取り込む
+
+使用例:
+    python -m services.batch_pipeline generate --category 基本情報技術者 --count 200
+    python -m services.batch_pipeline verify --limit 500
+    python -m services.batch_pipeline collect --wait
+"""
+
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from sqlmodel import Session
+
+from database.operations import QuestionService, ChoiceService, BatchJobService
+from models.batch_job import BatchJob
+from services.enhanced_openai_service import EnhancedOpenAIService
+from services.openai_client import create_openai_client
+from services.usage_ledger import record_chat_response
+
+
+class BatchPipeline:
+    """問題生成・検証のBatchジョブを管理するパイプライン"""
+
+    ENDPOINT = "/v1/chat/completions"
+    COMPLETION_WINDOW = "24h"
+
+    # OpenAI側のバッチ状態
+    TERMINAL_FAILED_STATUSES = ("failed", "expired", "cancelled")
+
+    # 生成リクエストごとに順に割り当てる出題の観点
+    # （同じ本文を count 回送ると似た問題ばかりが返るため、リクエストごとに本文を変える）
+    GENERATION_ASPECTS = (
+        "基本的な用語・定義",
+        "仕組み・原理",
+        "実務での適用場面",
+        "よくある誤解・誤り",
+        "類似する概念との違い",
+        "手順・プロセス",
+        "計算・数値の読み取り",
+        "トラブルの原因と対処",
+        "設計・選定の判断",
+        "セキュリティ・リスク",
+        "具体的な事例・シナリオ",
+        "ベストプラクティス"
+    )
+
+    def __init__(
+        self,
+        session: Session,
+        model: str = "gpt-4o-mini",
+        base_url: Optional[str] = None,
+        job_dir: Optional[str] = None
+    ):
+        self.session = session
+        self.question_service = QuestionService(session)
+        self.choice_service = ChoiceService(session)
+        self.job_service = BatchJobService(session)
+
+        # プロンプト作成・応答解析は対話型と同じ実装を使う
+        self.openai_service = EnhancedOpenAIService(model=model)
+        self.model = self.openai_service.model
+
+        if base_url:
+            self.client = create_openai_client(api_key=self.openai_service.api_key, base_url=base_url)
+        else:
+            self.client = self.openai_service.client
+
+        self.job_dir = job_dir or os.getenv(
+            "BATCH_JOB_DIR", os.path.join(tempfile.gettempdir(), "study_app_batch")
+        )
+        os.makedirs(self.job_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # ジョブ投入
+    # ------------------------------------------------------------------
+
+    def submit_generation(
+        self,
+        category: str,
+        count: int,
+        difficulty: str = "medium",
+        topic: Optional[str] = None,
+        allow_multiple_correct: bool = False
+    ) -> BatchJob:
+        """問題生成ジョブを投入"""
+        prompt = self.openai_service._create_enhanced_prompt(
+            category=category,
+            difficulty=difficulty,
+            topic=topic,
+            question_type="multiple_choice",
+            language="japanese",
+            allow_multiple_correct=allow_multiple_correct
+        )
+
+        token = uuid.uuid4().hex[:8]
+        requests = []
+        for n in range(count):
+            aspect = self.GENERATION_ASPECTS[n % len(self.GENERATION_ASPECTS)]
+            variation = (
+                f"\n**出題の観点:** {aspect}\n"
+                f"（同じ条件で{count}問を別々に作成しています。これは{n + 1}問目です。"
+                f"ほかの問題と題材・問い方が重ならないようにしてください）\n"
+            )
+            requests.append({
+                "custom_id": f"gen-{token}-{n}",
+                "method": "POST",
+                "url": self.ENDPOINT,
+                "body": {
+                    "model": self.model,
+                    "messages": [
+                        {"role": "system", "content": self.openai_service.GENERATION_SYSTEM_MESSAGE},
+                        {"role": "user", "content": prompt + variation}
+                    ],
+                    "max_tokens": 1500,
+                    "temperature": 0.7,
+                    # 同じ観点が繰り返される場合もサンプリングを変える
+                    "seed": n,
+                    "response_format": {"type": "json_object"}
+                }
+            })
+
+        params = {
+            "category": category,
+            "difficulty": difficulty,
+            "topic": topic,
+            "allow_multiple_correct": allow_multiple_correct
+        }
+        return self._submit("generation", requests, params)
+
+    def submit_verification(
+        self,
+        question_ids: Optional[List[int]] = None,
+        limit: Optional[int] = None
+    ) -> BatchJob:
+        """問題検証ジョブを投入（未指定の場合は全問題）"""
+        if question_ids is None:
+            questions = self.question_service.get_all_questions()
+        else:
+            questions = [self.question_service.get_question_by_id(qid) for qid in question_ids]
+            questions = [q for q in questions if q]
+
+        if limit:
+            questions = questions[:limit]
+
+        token = uuid.uuid4().hex[:8]
+        requests = []
+        target_ids = []
+        for question in questions:
+            choices = self.choice_service.get_choices_by_question(question.id)
+            question_data = {
+                "id": question.id,
+                "title": question.title,
+                "content": question.content,
+                "category": question.category,
+                "difficulty": question.difficulty,
+                "explanation": question.explanation
+            }
+            choices_data = [{"content": c.content, "is_correct": c.is_correct} for c in choices]
+
+            requests.append({
+                "custom_id": f"verify-{token}-q{question.id}",
+                "method": "POST",
+                "url": self.ENDPOINT,
+                "body": {
+                    "model": self.model,
+                    "messages": [
+                        {"role": "system", "content": self.openai_service.VERIFICATION_SYSTEM_MESSAGE},
+                        {
+                            "role": "user",
+                            "content": self.openai_service._create_verification_prompt(question_data, choices_data)
+                        }
+                    ],
+                    "temperature": 0.1,
+                    "max_tokens": 1000
+                }
+            })
+            target_ids.append(question.id)
+
+        return self._submit("verification", requests, {"question_count": len(target_ids)}, target_ids)
+
+    def _submit(
+        self,
+        job_type: str,
+        requests: List[Dict[str, Any]],
+        params: Dict[str, Any],
+        question_ids: Optional[List[int]] = None
+    ) -> BatchJob:
+        """JSONLを書き出してアップロードし、バッチを作成"""
+        if not requests:
+            raise ValueError("投入するリクエストがありません")
+
+        custom_ids = [r["custom_id"] for r in requests]
+        job = self.job_service.create_job(
+            job_type=job_type,
+            model=self.model,
+            custom_ids=custom_ids,
+            params=json.dumps(params, ensure_ascii=False),
+            question_ids=question_ids
+        )
+
+        input_path = os.path.join(self.job_dir, f"batch_job_{job.id}_{job_type}.jsonl")
+        with open(input_path, "w", encoding="utf-8") as f:
+            for request in requests:
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+        print(f"📝 ジョブファイル作成: {input_path} ({len(requests)}件)")
+
+        try:
+            with open(input_path, "rb") as f:
+                input_file = self.client.files.create(file=f, purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=input_file.id,
+                endpoint=self.ENDPOINT,
+                completion_window=self.COMPLETION_WINDOW,
+                metadata={"job_id": str(job.id), "job_type": job_type}
+            )
+        except Exception as e:
+            print(f"❌ バッチ投入エラー: {e}")
+            self.job_service.update_job(job, status="failed", input_path=input_path)
+            raise
+
+        job = self.job_service.update_job(
+            job,
+            status="submitted",
+            input_path=input_path,
+            input_file_id=input_file.id,
+            batch_id=batch.id
+        )
+        print(f"🚀 バッチ投入完了: job={job.id}, batch={batch.id}")
+        return job
+
+    # ------------------------------------------------------------------
+    # 状態確認
+    # ------------------------------------------------------------------
+
+    def refresh(self, job: BatchJob) -> BatchJob:
+        """OpenAI側のバッチ状態をジョブに反映"""
+        if job.status != "submitted" or not job.batch_id:
+            return job
+
+        batch = self.client.batches.retrieve(job.batch_id)
+        if batch.status == "completed":
+            job = self.job_service.update_job(
+                job,
+                status="completed",
+                output_file_id=batch.output_file_id,
+                error_file_id=batch.error_file_id
+            )
+        elif batch.status in self.TERMINAL_FAILED_STATUSES:
+            print(f"❌ バッチが終了しました: {batch.status}")
+            job = self.job_service.update_job(job, status="failed", error_file_id=batch.error_file_id)
+        return job
+
+    def wait(self, job: BatchJob, poll_interval: float = 30.0, timeout: Optional[float] = None) -> BatchJob:
+        """バッチの完了を待機"""
+        start_time = time.time()
+        while True:
+            job = self.refresh(job)
+            if job.status != "submitted":
+                return job
+            if timeout is not None and time.time() - start_time > timeout:
+                print(f"⏰ 待機タイムアウト: job={job.id}")
+                return job
+            time.sleep(poll_interval)
+
+    # ------------------------------------------------------------------
+    # 結果取り込み
+    # ------------------------------------------------------------------
+
+    def ingest(self, job: BatchJob) -> Dict[str, int]:
+        """完了したバッチの結果をDBへ取り込む
+
+        custom_idごとに取り込み状態を記録するため、途中で失敗しても
+        再実行時には未処理の結果だけが取り込まれる。
+        """
+        stats = {"ingested": 0, "failed": 0, "skipped": 0}
+        if job.status != "completed":
+            print(f"WARN: 取り込み対象外のジョブ状態です: {job.status}")
+            return stats
+
+        params = json.loads(job.params) if job.params else {}
+
+        for line in self._read_file_lines(job.output_file_id) + self._read_file_lines(job.error_file_id):
+            record = json.loads(line)
+            item = self.job_service.get_item_by_custom_id(record.get("custom_id", ""))
+            if item is None or item.job_id != job.id:
+                continue
+            if item.status == "ingested":
+                stats["skipped"] += 1
+                continue
+
+            response = record.get("response") or {}
+            body = response.get("body") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                error = record.get("error") or body.get("error")
+                self.job_service.mark_item(item, "failed", error=json.dumps(error, ensure_ascii=False))
+                stats["failed"] += 1
+                continue
+
+            try:
+                # 利用量は初めて取り込むときだけ記録する（失敗した項目の再取り込みでは記録済み）
+                if item.status == "pending":
+                    record_chat_response(body, job.model, feature=job.job_type, batch=True)
+                content = body["choices"][0]["message"]["content"]
+                if job.job_type == "generation":
+                    question_id = self._ingest_generated_question(content, params)
+                    self.job_service.mark_item(item, "ingested", question_id=question_id)
+                else:
+                    result = self.openai_service._parse_verification_result(content.strip())
+                    self.job_service.mark_item(item, "ingested", result=json.dumps(result, ensure_ascii=False))
+                stats["ingested"] += 1
+            except Exception as e:
+                print(f"❌ 取り込みエラー ({item.custom_id}): {e}")
+                self.job_service.mark_item(item, "failed", error=str(e))
+                stats["failed"] += 1
+
+        ingested_total = self.job_service.count_items(job.id, "ingested")
+        failed_total = self.job_service.count_items(job.id, "failed")
+        fields = {"ingested_count": ingested_total, "failed_count": failed_total}
+        if ingested_total + failed_total >= job.request_count:
+            fields["status"] = "ingested"
+        self.job_service.update_job(job, **fields)
+
+        print(f"📥 取り込み完了: job={job.id}, 追加{stats['ingested']}件, 失敗{stats['failed']}件, スキップ{stats['skipped']}件")
+        return stats
+
+    def _ingest_generated_question(self, content: str, params: Dict[str, Any]) -> int:
+        """生成結果を解析して問題と選択肢を保存"""
+        question_data = json.loads(content)
+        generated = self.openai_service._parse_question_response(
+            question_data, params.get("category", "一般"), params.get("difficulty", "medium")
+        )
+        if not generated:
+            raise ValueError("問題データの形式が不正です")
+
+        creation_result = self.question_service.create_question_with_duplicate_check(
+            title=generated.title,
+            content=generated.content,
+            category=generated.category,
+            explanation=generated.explanation,
+            difficulty=generated.difficulty
+        )
+        if not creation_result["success"]:
+            raise ValueError(creation_result["message"])
+
+        question = creation_result["question"]
+        for i, choice in enumerate(generated.choices):
+            self.choice_service.create_choice(
+                question_id=question.id,
+                content=choice.content,
+                is_correct=choice.is_correct,
+                order_num=i + 1
+            )
+        return question.id
+
+    def _read_file_lines(self, file_id: Optional[str]) -> List[str]:
+        """出力ファイルの内容を行単位で取得"""
+        if not file_id:
+            return []
+        response = self.client.files.content(file_id)
+        return [line for line in response.text.splitlines() if line.strip()]
+
+    def collect(self, wait: bool = False, poll_interval: float = 30.0) -> List[Dict[str, Any]]:
+        """未取り込みのジョブをすべて確認し、完了分を取り込む"""
+        results = []
+        for job in self.job_service.get_open_jobs():
+            job = self.wait(job, poll_interval) if wait else self.refresh(job)
+            stats = self.ingest(job) if job.status == "completed" else None
+            results.append({"job_id": job.id, "status": job.status, "stats": stats})
+        return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    from database.connection import get_session_context
+
+    parser = argparse.ArgumentParser(description="問題生成・検証のBatch処理")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--base-url", default=None, help="OpenAI互換エンドポイント（テスト用）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    gen_parser = subparsers.add_parser("generate", help="問題生成ジョブを投入")
+    gen_parser.add_argument("--category", required=True)
+    gen_parser.add_argument("--count", type=int, default=10)
+    gen_parser.add_argument("--difficulty", default="medium", choices=["easy", "medium", "hard"])
+    gen_parser.add_argument("--topic", default=None)
+    gen_parser.add_argument("--allow-multiple-correct", action="store_true")
+
+    verify_parser = subparsers.add_parser("verify", help="問題検証ジョブを投入")
+    verify_parser.add_argument("--ids", type=int, nargs="*", default=None)
+    verify_parser.add_argument("--limit", type=int, default=None)
+
+    collect_parser = subparsers.add_parser("collect", help="完了したジョブの結果を取り込む")
+    collect_parser.add_argument("--wait", action="store_true")
+    collect_parser.add_argument("--poll-interval", type=float, default=30.0)
+
+    subparsers.add_parser("status", help="最近のジョブ一覧を表示")
+
+    args = parser.parse_args(argv)
+
+    with get_session_context() as session:
+        if args.command == "status":
+            for job in BatchJobService(session).get_recent_jobs():
+                print(
+                    f"#{job.id} {job.job_type:<12} {job.status:<10} "
+                    f"{job.ingested_count}/{job.request_count} (失敗{job.failed_count}) "
+                    f"{job.created_at:%Y-%m-%d %H:%M}"
+                )
+            return 0
+
+        pipeline = BatchPipeline(session, model=args.model, base_url=args.base_url)
+
+        if args.command == "generate":
+            job = pipeline.submit_generation(
+                category=args.category,
+                count=args.count,
+                difficulty=args.difficulty,
+                topic=args.topic,
+                allow_multiple_correct=args.allow_multiple_correct
+            )
+            print(f"ジョブ #{job.id} を投入しました")
+        elif args.command == "verify":
+            job = pipeline.submit_verification(question_ids=args.ids, limit=args.limit)
+            print(f"ジョブ #{job.id} を投入しました")
+        elif args.command == "collect":
+            for result in pipeline.collect(wait=args.wait, poll_interval=args.poll_interval):
+                print(f"ジョブ #{result['job_id']}: {result['status']} {result['stats'] or ''}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
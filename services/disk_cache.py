@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+ローカルディスク上のサイズ上限付きLRUキャッシュ
+PDF抽出結果などをコンテンツのハッシュをキーに保存する
+
+保存先は環境変数 APP_CACHE_DIR（既定: 一時ディレクトリ/study_quiz_cache）。
+最終アクセス時刻はファイルの更新時刻で管理し、合計サイズが上限を超えたら古い順に削除する。
+"""
+
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, IO, Iterator, Optional
+
+
+def get_cache_root() -> str:
+    return os.getenv("APP_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "study_quiz_cache")
+
+
+class DiskLRUCache:
+    """ファイル単位のLRUキャッシュ
+
+    Args:
+        name: キャッシュ名（サブディレクトリ名）
+        max_bytes: 合計サイズの上限
+        suffix: エントリファイルの拡張子
+    """
+
+    def __init__(self, name: str, max_bytes: int, suffix: str = ".json", directory: Optional[str] = None):
+        self.directory = os.path.join(directory or get_cache_root(), name)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get_path(self, key: str) -> Optional[str]:
+        """エントリのファイルパスを返し、アクセス時刻を更新（なければ None）"""
+        path = self._path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_json(self, key: str) -> Optional[Any]:
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"WARN: キャッシュの読み込みに失敗したため削除します ({key}): {e}")
+            self.delete(key)
+            return None
+
+    def set_json(self, key: str, value: Any) -> None:
+        with self.writer(key) as f:
+            json.dump(value, f, ensure_ascii=False)
+
+    @contextmanager
+    def writer(self, key: str) -> Iterator[IO[str]]:
+        """エントリを書き込むファイルを開く
+
+        ブロックが正常に終了した場合のみエントリとして確定する（例外・中断時は破棄）。
+        """
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                yield f
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        self._evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        for entry in self._entries():
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def _entries(self):
+        try:
+            return [
+                entry for entry in os.scandir(self.directory)
+                if entry.is_file() and entry.name.endswith(self.suffix)
+            ]
+        except FileNotFoundError:
+            return []
+
+    def stats(self) -> Dict[str, int]:
+        entries = self._entries()
+        return {
+            "entries": len(entries),
+            "bytes": sum(entry.stat().st_size for entry in entries),
+            "max_bytes": self.max_bytes
+        }
+
+    def _evict(self) -> None:
+        """合計サイズが上限を超えていれば、最終アクセスが古いものから削除"""
+        with self._lock:
+            files = []
+            for entry in self._entries():
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
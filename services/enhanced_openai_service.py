@@ -5,14 +5,22 @@ Enhanced OpenAI service with better error handling and rate limiting
 
 import os
 import openai
-from openai import OpenAI
 import time
 import json
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any, Callable
 from dataclasses import dataclass, asdict
 from dotenv import load_dotenv
 import backoff
 
+from services.openai_client import create_openai_client, get_openai_base_url, get_openai_host_port
+from services.streaming_json import IncrementalQuestionParser, StreamingJSONError
+from services.model_router import fallback_model, select_model
+from services.rate_limiter import RateLimitTimeout, get_rate_limiter
+from services.resilience import (
+    CircuitOpenError, get_circuit_breaker, get_circuit_states, is_availability_error, is_hedging_enabled
+)
+from services.usage_ledger import record_usage, tracked_chat_completion
+
 # Load environment variables
 load_dotenv()
 
@@ -66,11 +74,26 @@ class EnhancedOpenAIService:
         }
     }
     
-    def __init__(self, model: str = "gpt-3.5-turbo", model_name: str = None):
+    # 問題生成用のシステムメッセージ
+    GENERATION_SYSTEM_MESSAGE = "あなたは資格試験問題作成の専門家です。正確で教育的な問題を作成してください。"
+    
+    # 問題検証用のシステムメッセージ
+    VERIFICATION_SYSTEM_MESSAGE = "あなたはクイズ問題の品質管理専門家です。問題を客観的に評価し、JSON形式で結果を返してください。"
+    
+    def __init__(self, model: Optional[str] = None, model_name: str = None, task: Optional[str] = None):
+        """
+        Args:
+            model / model_name: 使用するモデル（省略時は task に応じてルーターが選択）
+            task: タスク種別（generation, verification, pdf_generation 等）。
+                  指定するとモデルが遅い・制限中のときに代替モデルへ切り替える
+        """
         print("Initializing EnhancedOpenAIService...")
         
         # Use model_name if provided, otherwise use model parameter
         selected_model = model_name if model_name is not None else model
+        self.task = task
+        if selected_model is None:
+            selected_model = select_model(task) if task else "gpt-3.5-turbo"
         
         # Check API key
         self.api_key = os.getenv("OPENAI_API_KEY")
@@ -90,19 +113,23 @@ class EnhancedOpenAIService:
         
         # Initialize OpenAI client with enhanced connection settings
         try:
-            self.client = OpenAI(
+            self.base_url = get_openai_base_url()
+            self.client = create_openai_client(
                 api_key=self.api_key,
+                base_url=self.base_url,  # OPENAI_BASE_URL で切り替え可能
                 timeout=60.0,  # 60秒のタイムアウト
-                max_retries=3,  # 内蔵リトライ機能
-                base_url="https://api.openai.com/v1"  # 明示的なエンドポイント
+                # SDKの内蔵リトライは使わない。再試行はこのクラスのループ（max_retries）が行い、
+                # 1回ごとの失敗をサーキットブレーカーに数える（SDK内の再試行はブレーカーから見えない）
+                max_retries=0
             )
-            print("OpenAI client initialized successfully")
+            print(f"OpenAI client initialized successfully ({self.base_url})")
         except Exception as e:
             print(f"ERROR: Failed to initialize OpenAI client: {e}")
             raise ConnectionError(f"Failed to initialize OpenAI client: {e}")
         
         self.max_retries = 5  # リトライ回数を増加
         self.retry_delay = 2.0  # 初期遅延を増加
+        self.hedge_requests = is_hedging_enabled()  # 生成・検証でヘッジリクエストを使うか
     
     def generate_question(
         self,
@@ -111,7 +138,9 @@ class EnhancedOpenAIService:
         topic: Optional[str] = None,
         question_type: str = "multiple_choice",
         language: str = "japanese",
-        allow_multiple_correct: bool = False
+        allow_multiple_correct: bool = False,
+        stream: bool = False,
+        partial_callback: Optional[Callable[[str, Any], None]] = None
     ) -> Optional[GeneratedQuestion]:
         """
         Generate a question with enhanced options and error handling
@@ -123,6 +152,8 @@ class EnhancedOpenAIService:
             question_type: 問題タイプ
             language: 言語
             allow_multiple_correct: 複数の正解を許可するかどうか
+            stream: ストリーミングで生成し、構造不正を途中で検出するかどうか
+            partial_callback: フィールド確定ごとに呼ばれるコールバック (field, value)
         """
         
         prompt = self._create_enhanced_prompt(
@@ -134,14 +165,23 @@ class EnhancedOpenAIService:
             allow_multiple_correct=allow_multiple_correct
         )
         
+        if stream or partial_callback:
+            return self._generate_question_streaming(
+                prompt, category, difficulty, allow_multiple_correct, partial_callback
+            )
+        
         for attempt in range(self.max_retries):
             try:
-                response = self.client.chat.completions.create(
+                response = tracked_chat_completion(
+                    self.client,
+                    feature="generation",
+                    retries=attempt,
+                    hedge=self.hedge_requests,
                     model=self.model,
                     messages=[
                         {
                             "role": "system", 
-                            "content": "あなたは資格試験問題作成の専門家です。正確で教育的な問題を作成してください。"
+                            "content": self.GENERATION_SYSTEM_MESSAGE
                         },
                         {"role": "user", "content": prompt}
                     ],
@@ -178,7 +218,15 @@ class EnhancedOpenAIService:
                 
                 return self._parse_question_response(question_data, category, difficulty)
                 
+            except CircuitOpenError as e:
+                print(f"⛔ {e}")
+                if self._switch_to_fallback_model():
+                    continue
+                return None
+                
             except openai.RateLimitError as e:
+                if attempt < self.max_retries - 1 and self._switch_to_fallback_model():
+                    continue
                 if attempt < self.max_retries - 1:
                     wait_time = self.retry_delay * (2 ** attempt)  # Exponential backoff
                     print(f"Rate limit exceeded. Waiting {wait_time}s before retry {attempt + 1}/{self.max_retries}")
@@ -214,6 +262,159 @@ class EnhancedOpenAIService:
         
         return None
     
+    def _generate_question_streaming(
+        self,
+        prompt: str,
+        category: str,
+        difficulty: str,
+        allow_multiple_correct: bool = False,
+        partial_callback: Optional[Callable[[str, Any], None]] = None
+    ) -> Optional[GeneratedQuestion]:
+        """
+        ストリーミングで問題を生成
+        
+        応答をインクリメンタルに解析し、構造が不正と分かった時点で
+        ストリームを中断して再試行する（無駄なトークン生成を削減）
+        """
+        for attempt in range(self.max_retries):
+            stream = None
+            parser = IncrementalQuestionParser(
+                expected_choices=4,
+                allow_multiple_correct=allow_multiple_correct,
+                on_field=partial_callback
+            )
+            breaker = get_circuit_breaker("chat", self.model)
+            started_at = time.time()
+            usage = None
+            try:
+                breaker.before_call()
+                get_rate_limiter().acquire(len(prompt) // 2 + 1500)
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {
+                            "role": "system", 
+                            "content": self.GENERATION_SYSTEM_MESSAGE
+                        },
+                        {"role": "user", "content": prompt}
+                    ],
+                    max_tokens=1500,
+                    temperature=0.7,
+                    response_format={"type": "json_object"},
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    # プライバシー保護: データの学習を無効化
+                    extra_headers={
+                        "X-OpenAI-Skip-Training": "true"
+                    }
+                )
+                
+                for chunk in stream:
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parser.feed(delta)
+                
+                breaker.record_success()
+                question_data = parser.finish()
+                # 解析に失敗した場合は except 側でエラーとして1回だけ記録する
+                self._record_stream_usage(usage, parser.buffer, prompt, started_at, attempt)
+                print(f"🤖 Streaming response completed: {len(parser.buffer)} characters")
+                
+                result = self._parse_question_response(question_data, category, difficulty)
+                if result:
+                    return result
+                print(f"❌ Streamed question rejected on attempt {attempt + 1}, retrying")
+                
+            except StreamingJSONError as e:
+                # 構造不正はモデル出力の問題なのでサーキットの失敗には数えない
+                breaker.record_success()
+                print(f"❌ Stream aborted on attempt {attempt + 1} after {len(parser.buffer)} characters: {e}")
+                if stream is not None:
+                    try:
+                        stream.close()
+                    except Exception:
+                        pass
+                # 中断したストリームは usage チャンクが届かないため受信分から見積もる
+                self._record_stream_usage(usage, parser.buffer, prompt, started_at, attempt, error=str(e))
+                continue
+                
+            except CircuitOpenError as e:
+                print(f"⛔ {e}")
+                if self._switch_to_fallback_model():
+                    continue
+                return None
+                
+            except openai.RateLimitError as e:
+                breaker.record_success()
+                if attempt < self.max_retries - 1 and self._switch_to_fallback_model():
+                    continue
+                if attempt < self.max_retries - 1:
+                    wait_time = self.retry_delay * (2 ** attempt)  # Exponential backoff
+                    print(f"Rate limit exceeded. Waiting {wait_time}s before retry {attempt + 1}/{self.max_retries}")
+                    time.sleep(wait_time)
+                    continue
+                else:
+                    print(f"Rate limit exceeded after {self.max_retries} attempts: {e}")
+                    return None
+                    
+            except Exception as e:
+                if is_availability_error(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                print(f"Streaming error on attempt {attempt + 1}: {type(e).__name__}: {e}")
+                if attempt < self.max_retries - 1:
+                    time.sleep(self.retry_delay)
+                    continue
+                else:
+                    return None
+        
+        return None
+    
+    def _switch_to_fallback_model(self) -> bool:
+        """タスク指定時、ルーターの代替モデルに切り替える（切り替えたら True）"""
+        if not self.task:
+            return False
+        fallback = fallback_model(self.task, self.model)
+        if fallback is None or fallback not in self.AVAILABLE_MODELS:
+            return False
+        print(f"🔀 モデルを切り替えます: {self.model} → {fallback}")
+        self.model = fallback
+        return True
+    
+    def _record_stream_usage(
+        self,
+        usage: Any,
+        received_text: str,
+        prompt: str,
+        started_at: float,
+        retries: int,
+        error: Optional[str] = None
+    ) -> None:
+        """ストリーミング生成の利用量を記録"""
+        if usage is not None:
+            prompt_tokens = usage.prompt_tokens
+            completion_tokens = usage.completion_tokens
+        else:
+            # おおよその見積もり（日本語は2文字≒1トークン）
+            prompt_tokens = (len(prompt) + len(self.GENERATION_SYSTEM_MESSAGE)) // 2
+            completion_tokens = len(received_text) // 2
+        
+        record_usage(
+            model=self.model,
+            feature="generation",
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency_ms=int((time.time() - started_at) * 1000),
+            retries=retries,
+            success=error is None,
+            error=error
+        )
+    
     def _create_enhanced_prompt(
         self,
         category: str,
@@ -358,10 +559,11 @@ class EnhancedOpenAIService:
             print(f"   API Key: {self.api_key[:10]}...{self.api_key[-4:]}")
             
             # まずネットワーク接続をテスト
-            print("🌐 Testing network connectivity to api.openai.com...")
+            host, port = get_openai_host_port(self.base_url)
+            print(f"🌐 Testing network connectivity to {host}:{port}...")
             try:
                 import socket
-                socket.create_connection(("api.openai.com", 443), timeout=10)
+                socket.create_connection((host, port), timeout=10)
                 print("✅ Network connectivity OK")
             except Exception as network_error:
                 print(f"❌ Network connectivity failed: {network_error}")
@@ -374,7 +576,9 @@ class EnhancedOpenAIService:
             
             # Test with a simple request
             print("🤖 Sending test request to OpenAI API...")
-            response = self.client.chat.completions.create(
+            response = tracked_chat_completion(
+                self.client,
+                feature="connection_test",
                 model=self.model,
                 messages=[{"role": "user", "content": "Test connection - respond with 'OK'"}],
                 max_tokens=10,
@@ -453,27 +657,68 @@ class EnhancedOpenAIService:
                 "model": self.model
             }
     
-    def get_usage_info(self) -> Dict:
-        """Get API usage information (placeholder for future implementation)"""
-        return {
+    def get_usage_info(self, days: int = 30) -> Dict:
+        """Get API usage information from the usage ledger"""
+        info = {
             "model": self.model,
             "max_retries": self.max_retries,
-            "retry_delay": self.retry_delay
+            "retry_delay": self.retry_delay,
+            "hedge_requests": self.hedge_requests,
+            "circuits": get_circuit_states()
         }
+        try:
+            from database.connection import get_session_context
+            from database.operations import LLMUsageService
+            
+            with get_session_context() as session:
+                info["usage"] = LLMUsageService(session).get_summary(days=days)
+        except Exception as e:
+            print(f"WARN: 利用状況の取得に失敗しました: {e}")
+            info["usage"] = None
+        return info
     
     def call_openai_api(
         self,
         prompt: str,
         max_tokens: int = 1500,
         temperature: float = 0.7,
-        system_message: str = "あなたは資格試験問題作成の専門家です。正確で教育的な問題を作成してください。"
+        system_message: str = "あなたは資格試験問題作成の専門家です。正確で教育的な問題を作成してください。",
+        feature: Optional[str] = None,
+        timeout: Optional[float] = None
     ) -> Optional[str]:
         """
         汎用的なOpenAI API呼び出しメソッド
+        
+        Args:
+            feature: 利用記録の機能名（省略時は usage_context の指定に従う）
+            timeout: リトライを含めた全体の制限時間（秒）。各リクエストは残り時間で打ち切られ、
+                     超えた場合は None を返す
         """
+        deadline = time.monotonic() + timeout if timeout else None
+        
+        def sleep_before_retry(wait_time: float) -> bool:
+            """リトライ前に待つ（制限時間の残りを超えて待たない。残りがなければ False）"""
+            if deadline is not None:
+                wait_time = min(wait_time, deadline - time.monotonic())
+                if wait_time <= 0:
+                    return False
+            time.sleep(wait_time)
+            return True
+        
         for attempt in range(self.max_retries):
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    print(f"WARN: OpenAI API呼び出しが制限時間（{timeout:.0f}秒）を超えました")
+                    return None
             try:
-                response = self.client.chat.completions.create(
+                response = tracked_chat_completion(
+                    self.client,
+                    feature=feature,
+                    retries=attempt,
+                    # レート制限の待機（429後の一時停止を含む）とリクエストを残り時間で打ち切る
+                    time_limit=remaining,
                     model=self.model,
                     messages=[
                         {"role": "system", "content": system_message},
@@ -492,12 +737,25 @@ class EnhancedOpenAIService:
                 
                 return response.choices[0].message.content
                 
+            except RateLimitTimeout as e:
+                print(f"WARN: {e}")
+                return None
+                
+            except CircuitOpenError as e:
+                print(f"⛔ {e}")
+                if self._switch_to_fallback_model():
+                    continue
+                return None
+                
             except openai.RateLimitError as e:
+                if attempt < self.max_retries - 1 and self._switch_to_fallback_model():
+                    continue
                 if attempt < self.max_retries - 1:
                     wait_time = self.retry_delay * (2 ** attempt)  # Exponential backoff
                     print(f"Rate limit exceeded. Waiting {wait_time}s before retry {attempt + 1}/{self.max_retries}")
-                    time.sleep(wait_time)
-                    continue
+                    if sleep_before_retry(wait_time):
+                        continue
+                    return None
                 else:
                     print(f"Rate limit exceeded after {self.max_retries} attempts: {e}")
                     return None
@@ -507,8 +765,9 @@ class EnhancedOpenAIService:
                 print(f"   エラータイプ: {type(e).__name__}")
                 print(f"   エラー詳細: {str(e)}")
                 if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
-                    continue
+                    if sleep_before_retry(self.retry_delay):
+                        continue
+                    return None
                 else:
                     print(f"ERROR: OpenAI API error after {self.max_retries} attempts: {e}")
                     return None
@@ -517,8 +776,9 @@ class EnhancedOpenAIService:
                 print(f"ERROR: JSON decode error on attempt {attempt + 1}: {e}")
                 print(f"   JSON解析失敗の可能性があります")
                 if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
-                    continue
+                    if sleep_before_retry(self.retry_delay):
+                        continue
+                    return None
                 else:
                     return None
                     
@@ -528,23 +788,21 @@ class EnhancedOpenAIService:
                 import traceback
                 print(f"   スタックトレース: {traceback.format_exc()}")
                 if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
-                    continue
+                    if sleep_before_retry(self.retry_delay):
+                        continue
+                    return None
                 else:
                     return None
         
         return None
 
-    @backoff.on_exception(
-        backoff.expo,
-        (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError),
-        max_tries=3,
-        factor=2
-    )
     def verify_question_quality(self, question_data: dict, choices_data: list) -> dict:
         """
         問題の品質・整合性をOpenAI APIで検証
         
+        一時的なエラー（429・タイムアウト・接続エラー）は _request_verification で再試行し、
+        再試行しても失敗した場合だけエラー結果（is_valid=None）を返す。
+        
         Args:
             question_data: 問題データ (id, title, content, explanation等)
             choices_data: 選択肢データ (list of {content, is_correct})
@@ -561,21 +819,82 @@ class EnhancedOpenAIService:
         try:
             print(f"🔍 問題検証開始: ID {question_data.get('id', 'unknown')}")
             
-            # 選択肢情報の整理
-            choices_text = []
-            correct_choices = []
+            verification_prompt = self._create_verification_prompt(question_data, choices_data)
             
-            for i, choice in enumerate(choices_data):
-                letter = chr(65 + i)  # A, B, C, D...
-                choices_text.append(f"{letter}. {choice['content']}")
-                if choice['is_correct']:
-                    correct_choices.append(f"{letter}")
-            
-            choices_str = "\n".join(choices_text)
-            correct_str = "、".join(correct_choices) if correct_choices else "なし"
+            # API呼び出し
+            result_text = self._request_verification(verification_prompt)
+            print(f"📝 検証結果取得: {len(result_text)} 文字")
             
-            # 検証用プロンプト
-            verification_prompt = f"""
+            return self._parse_verification_result(result_text)
+                
+        except openai.RateLimitError as e:
+            print(f"⚠️ Rate limit error in verification: {e}")
+            return {
+                'is_valid': None,
+                'score': None,
+                'issues': ['API利用制限に達しました'],
+                'recommendation': '後で再試行',
+                'details': 'OpenAI APIの利用制限により検証できませんでした。しばらく待ってから再試行してください。'
+            }
+        except Exception as e:
+            print(f"❌ Verification error: {e}")
+            return {
+                'is_valid': None,
+                'score': None,
+                'issues': [f'検証エラー: {str(e)}'],
+                'recommendation': '手動確認推奨',
+                'details': f'問題の検証中にエラーが発生しました: {str(e)}'
+            }
+    
+    @backoff.on_exception(
+        backoff.expo,
+        (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError),
+        max_tries=3,
+        factor=2
+    )
+    def _request_verification(self, verification_prompt: str) -> str:
+        """検証リクエストを送信し応答テキストを返す
+        
+        SDKの再試行は無効（max_retries=0）のため、一時的なエラーはここで再試行する。
+        例外を捕捉すると backoff が働かないため、最後の例外はそのまま呼び出し元へ送出する。
+        """
+        response = tracked_chat_completion(
+            self.client,
+            feature="verification",
+            hedge=self.hedge_requests,
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": self.VERIFICATION_SYSTEM_MESSAGE
+                },
+                {
+                    "role": "user", 
+                    "content": verification_prompt
+                }
+            ],
+            temperature=0.1,  # 一貫性のため低温度
+            max_tokens=1000
+        )
+        return response.choices[0].message.content.strip()
+    
+    def _create_verification_prompt(self, question_data: dict, choices_data: list) -> str:
+        """問題検証用のプロンプトを作成"""
+        # 選択肢情報の整理
+        choices_text = []
+        correct_choices = []
+        
+        for i, choice in enumerate(choices_data):
+            letter = chr(65 + i)  # A, B, C, D...
+            choices_text.append(f"{letter}. {choice['content']}")
+            if choice['is_correct']:
+                correct_choices.append(f"{letter}")
+        
+        choices_str = "\n".join(choices_text)
+        correct_str = "、".join(correct_choices) if correct_choices else "なし"
+        
+        # 検証用プロンプト
+        return f"""
 あなたはクイズ問題の品質管理専門家です。以下の問題を客観的に評価してください。
 
 問題ID: {question_data.get('id', '不明')}
@@ -611,82 +930,44 @@ class EnhancedOpenAIService:
     "details": "詳細な説明"
 }}
 """
-
-            # API呼び出し
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "あなたはクイズ問題の品質管理専門家です。問題を客観的に評価し、JSON形式で結果を返してください。"
-                    },
-                    {
-                        "role": "user", 
-                        "content": verification_prompt
-                    }
-                ],
-                temperature=0.1,  # 一貫性のため低温度
-                max_tokens=1000
-            )
+    
+    def _parse_verification_result(self, result_text: str) -> dict:
+        """検証結果テキストをパースして正規化"""
+        try:
+            # JSON部分を抽出（```json ブロックがある場合）
+            if "```json" in result_text:
+                json_start = result_text.find("```json") + 7
+                json_end = result_text.find("```", json_start)
+                result_text = result_text[json_start:json_end].strip()
+            elif "```" in result_text:
+                json_start = result_text.find("```") + 3
+                json_end = result_text.rfind("```")
+                result_text = result_text[json_start:json_end].strip()
             
-            result_text = response.choices[0].message.content.strip()
-            print(f"📝 検証結果取得: {len(result_text)} 文字")
+            result = json.loads(result_text)
             
-            # JSON形式の結果をパース
-            try:
-                # JSON部分を抽出（```json ブロックがある場合）
-                if "```json" in result_text:
-                    json_start = result_text.find("```json") + 7
-                    json_end = result_text.find("```", json_start)
-                    result_text = result_text[json_start:json_end].strip()
-                elif "```" in result_text:
-                    json_start = result_text.find("```") + 3
-                    json_end = result_text.rfind("```")
-                    result_text = result_text[json_start:json_end].strip()
-                
-                result = json.loads(result_text)
-                
-                # 結果の検証と補完
-                if not isinstance(result, dict):
-                    raise ValueError("結果がdict形式ではありません")
-                
-                # 必須フィールドの確認と補完
-                result.setdefault('is_valid', True)
-                result.setdefault('score', 5)
-                result.setdefault('issues', [])
-                result.setdefault('recommendation', '判定不明')
-                result.setdefault('details', '詳細な評価結果が取得できませんでした')
-                
-                # スコアの正規化
-                if not isinstance(result['score'], int) or result['score'] < 1 or result['score'] > 10:
-                    result['score'] = 5
-                
-                print(f"✅ 検証完了: スコア {result['score']}/10, 有効性: {result['is_valid']}")
-                return result
-                
-            except json.JSONDecodeError as e:
-                print(f"⚠️ JSON解析エラー: {e}")
-                # フォールバック: テキスト解析
-                return self._parse_verification_fallback(result_text)
-                
-        except openai.RateLimitError as e:
-            print(f"⚠️ Rate limit error in verification: {e}")
-            return {
-                'is_valid': None,
-                'score': None,
-                'issues': ['API利用制限に達しました'],
-                'recommendation': '後で再試行',
-                'details': 'OpenAI APIの利用制限により検証できませんでした。しばらく待ってから再試行してください。'
-            }
-        except Exception as e:
-            print(f"❌ Verification error: {e}")
-            return {
-                'is_valid': None,
-                'score': None,
-                'issues': [f'検証エラー: {str(e)}'],
-                'recommendation': '手動確認推奨',
-                'details': f'問題の検証中にエラーが発生しました: {str(e)}'
-            }
+            # 結果の検証と補完
+            if not isinstance(result, dict):
+                raise ValueError("結果がdict形式ではありません")
+            
+            # 必須フィールドの確認と補完
+            result.setdefault('is_valid', True)
+            result.setdefault('score', 5)
+            result.setdefault('issues', [])
+            result.setdefault('recommendation', '判定不明')
+            result.setdefault('details', '詳細な評価結果が取得できませんでした')
+            
+            # スコアの正規化
+            if not isinstance(result['score'], int) or result['score'] < 1 or result['score'] > 10:
+                result['score'] = 5
+            
+            print(f"✅ 検証完了: スコア {result['score']}/10, 有効性: {result['is_valid']}")
+            return result
+            
+        except json.JSONDecodeError as e:
+            print(f"⚠️ JSON解析エラー: {e}")
+            # フォールバック: テキスト解析
+            return self._parse_verification_fallback(result_text)
     
     def _parse_verification_fallback(self, text: str) -> dict:
         """JSON解析に失敗した場合のフォールバック解析"""
@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+"""
+PDF問題生成のステージ型パイプライン
+チャンク投入 → LLM呼び出し（並列） → 検証・重複除外 → DB一括保存 の各ステージを
+上限付きキューでつなぎ、API応答を待つ間にも前のチャンクの検証と保存を進める
+
+キューが一杯になると上流のステージは待つ（バックプレッシャー）ため、
+LLMの応答だけが先行して未保存の問題がメモリに溜まることはない。
+DB保存は呼び出し元のスレッドで行う（セッションとStreamlitの表示はスレッド間で共有できないため）。
+取り込みジョブへのチャンクの登録（prepare）と保存・完了の記録（on_saved / on_chunk_done）も
+呼び出し元のスレッドで行い、チャンクの完了は そのチャンクの問題をすべて保存した後に通知する。
+
+設定（環境変数）:
+    PDF_GENERATION_WORKERS: LLM呼び出しの並列数（既定: 4）
+    PDF_GENERATION_QUEUE_SIZE: ステージ間キューの上限（既定: 並列数 × 2）
+    PDF_GENERATION_DB_BATCH: 1回のコミットで保存する問題数（既定: 10）
+"""
+
+import contextvars
+import os
+import queue
+from collections import deque
+import threading
+import time
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from services.enhanced_openai_service import EnhancedOpenAIService
+
+# QuestionService.check_duplicate_before_creation と同じ基準（完全一致または類似度0.9以上）
+DUPLICATE_SIMILARITY = 0.9
+# 書き込み待ちの問題を一括保存するまでの最大待ち時間（秒）
+DB_FLUSH_INTERVAL = 0.5
+# 進捗表示の更新間隔（秒）
+PROGRESS_INTERVAL = 1.0
+
+# ステージの終了を下流に伝える目印
+_DONE = object()
+
+
+@dataclass
+class StageMetrics:
+    """ステージごとの処理件数と処理時間"""
+    name: str
+    workers: int = 1
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    started_at: float = field(default_factory=time.monotonic)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, seconds: float, items: int = 1, failed: int = 0) -> None:
+        with self._lock:
+            self.processed += items
+            self.failed += failed
+            self.busy_seconds += seconds
+
+    @property
+    def throughput(self) -> float:
+        """1秒あたりの処理件数"""
+        elapsed = time.monotonic() - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def utilization(self) -> float:
+        """ワーカーが処理中だった時間の割合（1.0 で常に処理中）"""
+        elapsed = time.monotonic() - self.started_at
+        return min(1.0, self.busy_seconds / (elapsed * self.workers)) if elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "throughput": round(self.throughput, 3),
+            "utilization": round(self.utilization, 3)
+        }
+
+
+def get_generation_workers() -> int:
+    return max(1, int(os.getenv("PDF_GENERATION_WORKERS", "4")))
+
+
+def validate_question_data(question_data: Dict) -> Optional[str]:
+    """生成された問題データの形式を確認（問題なければ None、あれば理由）"""
+    if not isinstance(question_data, dict):
+        return "問題データが辞書ではありません"
+    if not str(question_data.get("content") or "").strip():
+        return "問題文がありません"
+    choices = question_data.get("choices")
+    if not isinstance(choices, list) or len(choices) < 2:
+        return "選択肢が2つ未満です"
+    if any(not isinstance(c, dict) or not str(c.get("text") or "").strip() for c in choices):
+        return "空の選択肢があります"
+    if not any(c.get("is_correct") for c in choices):
+        return "正解の選択肢がありません"
+    return None
+
+
+class QuestionGenerationPipeline:
+    """チャンクから問題を生成して保存するパイプライン
+
+    使用例:
+        pipeline = QuestionGenerationPipeline(generator, options, llm_workers=4)
+        question_ids = pipeline.run([(chunk_text, 3), ...], num_questions=10)
+        print(pipeline.metrics)
+    """
+
+    def __init__(
+        self,
+        generator,
+        options: Dict[str, Any],
+        llm_workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        enable_duplicate_check: bool = True
+    ):
+        """
+        Args:
+            generator: PDFQuestionGenerator（_request_questions とセッションを使う）
+            options: difficulty, category, model, include_explanation, allow_multiple_correct
+        """
+        self.generator = generator
+        self.options = options
+        self.llm_workers = llm_workers or get_generation_workers()
+        self.queue_size = queue_size or int(os.getenv("PDF_GENERATION_QUEUE_SIZE", "0")) or self.llm_workers * 2
+        self.batch_size = batch_size or int(os.getenv("PDF_GENERATION_DB_BATCH", "10"))
+        self.enable_duplicate_check = enable_duplicate_check
+
+        self.stages = {
+            "chunk": StageMetrics("chunk"),
+            "llm": StageMetrics("llm", workers=self.llm_workers),
+            "validate": StageMetrics("validate"),
+            "db": StageMetrics("db")
+        }
+        self.rejected: Dict[str, int] = {"invalid": 0, "duplicate": 0}
+
+        # チャンク投入ステージ → 呼び出し元（prepare） → LLM呼び出し
+        self._raw_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        self._chunk_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        self._parsed_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        self._valid_queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size * 5)
+        self._stop = threading.Event()
+        self._known: List[Tuple[str, str]] = []
+        self._feed_complete = False
+        # すべてのチャンクを最後まで読み込み、prepare まで済ませたか
+        self.tasks_exhausted = False
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """ステージごとの処理件数・スループット・稼働率と、キューの滞留数"""
+        return {
+            "stages": {name: stage.to_dict() for name, stage in self.stages.items()},
+            "queues": {
+                "raw": self._raw_queue.qsize(),
+                "chunk": self._chunk_queue.qsize(),
+                "parsed": self._parsed_queue.qsize(),
+                "valid": self._valid_queue.qsize()
+            },
+            "rejected": dict(self.rejected)
+        }
+
+    def _put(self, target: "queue.Queue", item) -> bool:
+        """キューに追加（一杯なら空くまで待つ。停止した場合は捨てて False）"""
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source: "queue.Queue", timeout: Optional[float] = None):
+        """キューから取得（停止した場合は _DONE、timeout を過ぎた場合は None）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return None
+        return _DONE
+
+    # ステージ1: チャンク投入
+    def _feed_chunks(self, tasks: Iterable[Tuple[str, int]]) -> None:
+        try:
+            started = time.monotonic()
+            for index, (text, num_questions) in enumerate(tasks):
+                self.stages["chunk"].record(time.monotonic() - started)
+                if num_questions > 0 and not self._put(self._raw_queue, (index, text, num_questions)):
+                    return
+                started = time.monotonic()
+            self._feed_complete = True
+        except Exception as e:
+            print(f"ERROR: チャンクの読み込みでエラー: {e}")
+        finally:
+            self._put(self._raw_queue, _DONE)
+
+    # ステージ2: LLM呼び出し（並列）
+    def _call_llm(self, openai_service: EnhancedOpenAIService) -> None:
+        try:
+            while True:
+                item = self._get(self._chunk_queue)
+                if item is _DONE:
+                    return
+                index, text, num_questions, key = item
+                started = time.monotonic()
+                error = None
+                try:
+                    questions = self.generator._request_questions(
+                        text, num_questions, openai_service=openai_service, **self.options
+                    )
+                except Exception as e:
+                    print(f"チャンク{index+1}の問題生成でエラー: {e}")
+                    questions, error = [], str(e)
+                self.stages["llm"].record(time.monotonic() - started, failed=0 if questions else 1)
+                # 問題がなくてもチャンクの完了（失敗）を下流に伝える
+                if not self._put(self._parsed_queue, (index, key, questions or [], error)):
+                    return
+        finally:
+            self._put(self._parsed_queue, _DONE)
+
+    # ステージ3: 検証・重複除外
+    def _validate(self) -> None:
+        finished_workers = 0
+        try:
+            while finished_workers < self.llm_workers:
+                item = self._get(self._parsed_queue)
+                if item is _DONE:
+                    if self._stop.is_set():
+                        return
+                    finished_workers += 1
+                    continue
+                index, key, questions, error = item
+                for question_data in questions:
+                    started = time.monotonic()
+                    accepted = self._accept(index, question_data)
+                    self.stages["validate"].record(time.monotonic() - started, failed=0 if accepted else 1)
+                    if accepted and not self._put(self._valid_queue, ("question", index, key, question_data)):
+                        return
+                if not self._put(self._valid_queue, ("chunk_done", index, key, error)):
+                    return
+        finally:
+            self._put(self._valid_queue, _DONE)
+
+    def _accept(self, index: int, question_data: Dict) -> bool:
+        problem = validate_question_data(question_data)
+        if problem:
+            self.rejected["invalid"] += 1
+            print(f"チャンク{index+1}の問題を除外: {problem}")
+            return False
+
+        title = str(question_data.get("title") or "無題").strip().lower()
+        content = str(question_data["content"]).strip().lower()
+        if self.enable_duplicate_check and self._is_duplicate(title, content):
+            self.rejected["duplicate"] += 1
+            print(f"類似問題が既に存在するためスキップ: {question_data.get('title', '無題')}")
+            return False
+        self._known.append((title, content))
+        return True
+
+    def _is_duplicate(self, title: str, content: str) -> bool:
+        for known_title, known_content in self._known:
+            if title == known_title and content == known_content:
+                return True
+            if max(
+                SequenceMatcher(None, title, known_title).ratio(),
+                SequenceMatcher(None, content, known_content).ratio()
+            ) >= DUPLICATE_SIMILARITY:
+                return True
+        return False
+
+    def _load_existing_questions(self, category: str) -> None:
+        """重複チェック用に同カテゴリの既存問題を読み込む（以降はメモリ上で比較）"""
+        from database.operations import QuestionService
+
+        existing = QuestionService(self.generator.session).get_questions_by_category(category)
+        self._known = [(q.title.strip().lower(), q.content.strip().lower()) for q in existing]
+
+    # ステージ4: DB一括保存（呼び出し元のスレッド）
+    def _write_batch(self, batch: List[Tuple[int, Any, Dict]]) -> List[Tuple[int, Any, int]]:
+        """(チャンク番号, キー, 問題データ) をまとめて保存し、保存できた (チャンク番号, キー, 問題ID) を返す"""
+        from database.operations import QuestionService
+
+        started = time.monotonic()
+        items = [
+            {
+                "title": question_data.get("title", "無題"),
+                "content": question_data["content"],
+                "category": self.options["category"],
+                "difficulty": self.options["difficulty"],
+                "explanation": question_data.get("explanation", ""),
+                "choices": [
+                    {"content": choice["text"], "is_correct": bool(choice.get("is_correct"))}
+                    for choice in question_data["choices"]
+                ]
+            }
+            for _, _, question_data in batch
+        ]
+        question_ids = QuestionService(self.generator.session).create_questions_with_choices(items)
+        saved = [
+            (index, key, question_id)
+            for (index, key, _), question_id in zip(batch, question_ids)
+            if question_id
+        ]
+        self.stages["db"].record(time.monotonic() - started, items=len(saved), failed=len(items) - len(saved))
+        return saved
+
+    def _progress_message(self, saved: int, num_questions: int) -> str:
+        llm, validate, db = self.stages["llm"], self.stages["validate"], self.stages["db"]
+        return (
+            f"{saved}/{num_questions}問保存 | "
+            f"LLM {llm.processed}件 ({llm.throughput * 60:.1f}件/分, 待ち{self._chunk_queue.qsize()}) | "
+            f"検証 {validate.processed}問 (除外{validate.failed}) | "
+            f"DB {db.throughput * 60:.1f}問/分"
+        )
+
+    def run(
+        self,
+        tasks: Iterable[Tuple[str, int]],
+        num_questions: int,
+        progress_callback: Optional[Callable[[str, float], None]] = None,
+        question_callback: Optional[Callable[[int], None]] = None,
+        prepare: Optional[Callable[[int, str, int], Tuple[str, int, Any, List[int]]]] = None,
+        on_saved: Optional[Callable[[Any, int], None]] = None,
+        on_chunk_done: Optional[Callable[[Any, int, Optional[str]], None]] = None
+    ) -> List[int]:
+        """パイプラインを実行し、保存した問題IDを返す（num_questions に達したら残りは処理しない）
+
+        tasks は別スレッドで順に読み込むため、ページを読みながらチャンクを返すジェネレーターでもよい。
+
+        Args:
+            tasks: (チャンクのテキスト, 生成する問題数) の列（問題数が0のチャンクは飛ばす）
+            prepare: LLMに送る前に (チャンク番号, テキスト, 問題数) を受け取り、
+                (テキスト, 生成する問題数, キー, 保存済みの問題ID) を返す。保存済みの問題IDは
+                結果に含め、生成する問題数が0ならLLMに送らない（取り込みジョブの再利用など）
+            on_saved: 問題を保存するたびに (キー, 問題ID) を受け取る
+            on_chunk_done: チャンクの問題をすべて保存または除外した後に
+                (キー, 新たに保存した問題数, エラー) を受け取る
+        """
+        if self.enable_duplicate_check:
+            self._load_existing_questions(self.options["category"])
+
+        # 代替モデルへの切り替えはサービスの model を書き換えるため、サービスはワーカーごとに作る
+        # （作成時のエラーは呼び出し元に送出する）。レート制限は共有リミッターで行う
+        openai_services = [
+            EnhancedOpenAIService(model_name=self.options["model"], task="pdf_generation")
+            for _ in range(self.llm_workers)
+        ]
+        threads = [threading.Thread(target=self._feed_chunks, args=(tasks,), daemon=True, name="pdf-gen-chunk")]
+        # 利用記録のセッション・機能の帰属をワーカースレッドに引き継ぐ
+        threads += [
+            threading.Thread(
+                target=contextvars.copy_context().run, args=(self._call_llm, openai_service),
+                daemon=True, name=f"pdf-gen-llm-{i}"
+            )
+            for i, openai_service in enumerate(openai_services)
+        ]
+        threads.append(threading.Thread(target=self._validate, daemon=True, name="pdf-gen-validate"))
+        for stage in self.stages.values():
+            stage.started_at = time.monotonic()
+        for thread in threads:
+            thread.start()
+
+        saved_ids: List[int] = []
+        chunk_saved: Dict[int, int] = {}
+        # LLMに送り、まだ完了を通知していないチャンク（チャンク番号 → キー）
+        open_chunks: Dict[int, Any] = {}
+        batch: List[Tuple[int, Any, Dict]] = []
+        batch_started = 0.0
+        # LLMキューが空くのを待っているチャンク（呼び出し元のスレッドは待たずにDB保存を進める）
+        outbox: deque = deque()
+        feeding = True
+
+        def dispatch() -> None:
+            """読み込まれたチャンクを prepare してLLMキューへ送る（キューが一杯なら次の周回で）"""
+            nonlocal feeding
+            while len(saved_ids) < num_questions:
+                if not outbox:
+                    if not feeding:
+                        return
+                    try:
+                        raw = self._raw_queue.get_nowait()
+                    except queue.Empty:
+                        return
+                    if raw is _DONE:
+                        feeding = False
+                        self.tasks_exhausted = self._feed_complete
+                        outbox.extend([_DONE] * self.llm_workers)
+                        continue
+                    index, text, count = raw
+                    key, reused = None, []
+                    if prepare:
+                        text, count, key, reused = prepare(index, text, count)
+                    saved_ids.extend(reused)
+                    if question_callback:
+                        for question_id in reused:
+                            question_callback(question_id)
+                    if count > 0:
+                        open_chunks[index] = key
+                        outbox.append((index, text, count, key))
+                    continue
+                try:
+                    self._chunk_queue.put_nowait(outbox[0])
+                except queue.Full:
+                    return
+                outbox.popleft()
+
+        def flush() -> None:
+            nonlocal batch
+            room = num_questions - len(saved_ids)
+            written = self._write_batch(batch[:room]) if room > 0 else []
+            batch = []
+            for index, key, question_id in written:
+                saved_ids.append(question_id)
+                chunk_saved[index] = chunk_saved.get(index, 0) + 1
+                if on_saved:
+                    on_saved(key, question_id)
+                if question_callback:
+                    question_callback(question_id)
+
+        last_progress = 0.0
+        finished = False
+        try:
+            while not finished and len(saved_ids) < num_questions:
+                dispatch()
+                if len(saved_ids) >= num_questions:
+                    break
+                item = self._get(self._valid_queue, timeout=0.05)
+                chunk_done = None
+                if item is _DONE:
+                    finished = True
+                elif item is not None:
+                    kind, index, key, payload = item
+                    if kind == "question":
+                        if not batch:
+                            batch_started = time.monotonic()
+                        batch.append((index, key, payload))
+                    else:
+                        chunk_done = (index, key, payload)
+
+                # バッチが埋まるか、一定時間たつか、チャンクが終わったら保存
+                room = num_questions - len(saved_ids)
+                if batch and (
+                    finished or chunk_done is not None or len(batch) >= min(self.batch_size, room)
+                    or time.monotonic() - batch_started >= DB_FLUSH_INTERVAL
+                ):
+                    flush()
+                if chunk_done is not None:
+                    index, key, error = chunk_done
+                    open_chunks.pop(index, None)
+                    if on_chunk_done:
+                        on_chunk_done(key, chunk_saved.get(index, 0), error)
+
+                if progress_callback and (finished or time.monotonic() - last_progress >= PROGRESS_INTERVAL):
+                    last_progress = time.monotonic()
+                    progress_callback(
+                        self._progress_message(len(saved_ids), num_questions),
+                        0.2 + 0.75 * min(len(saved_ids) / num_questions, 1.0)
+                    )
+        finally:
+            # 目標数に達した・中断された場合は上流を止める（実行中のAPI呼び出しの結果は捨てる）
+            self._stop.set()
+            for thread in threads:
+                thread.join(timeout=0.5)
+
+        # 目標数に達して残りを捨てたチャンクも、保存した問題があれば完了として通知する
+        if on_chunk_done and len(saved_ids) >= num_questions:
+            for index, key in open_chunks.items():
+                if chunk_saved.get(index):
+                    on_chunk_done(key, chunk_saved[index], None)
+
+        print(f"INFO: 問題生成パイプライン: {len(saved_ids)}問保存 {self.metrics}")
+        return saved_ids
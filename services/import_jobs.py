@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+再開可能なPDF取り込みジョブ
+チャンクの一覧・チャンクごとの状態・保存した問題ID・エラーをDBに記録し、
+ブラウザの再読み込みやコンテナの再起動で中断しても、同じ取り込み元・同じ条件で
+再実行すれば完了済みのチャンクを再利用して最初の未完了チャンクから続ける
+
+完了済みのチャンクはAPIを呼ばずに保存済みの問題IDを返す。処理中に中断したチャンクは、
+保存済みの問題数を差し引いて残りだけを作る。
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from database.operations import ImportJobService
+from models.import_job import ImportJob, ImportJobChunk
+
+
+def compute_source_hash(text: str) -> str:
+    """テキストの取り込み元を識別するハッシュ（PDFの場合は compute_pdf_hash を使う）"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def encode_params(params: Dict[str, Any]) -> str:
+    """取り込み条件をJSONに（キー順を固定して比較できるようにする）"""
+    return json.dumps(params, ensure_ascii=False, sort_keys=True)
+
+
+class ImportJobTracker:
+    """取り込みジョブの進捗をチャンク単位で保存する
+
+    使用例:
+        tracker = ImportJobTracker.start(session, "pdf_generation", pdf_hash, params)
+        for i, text in enumerate(chunks):
+            chunk = tracker.chunk(i, text)
+            if tracker.is_completed(chunk):
+                question_ids.extend(tracker.question_ids(chunk))
+                continue
+            tracker.begin(chunk)
+            ... 問題を保存するたびに tracker.record_question(chunk, question_id)
+            tracker.complete(chunk)  # 失敗時は tracker.fail(chunk, error)
+        tracker.finish(all_chunks_listed=True)
+    """
+
+    def __init__(self, session, job: ImportJob, resumed: bool = False):
+        self.service = ImportJobService(session)
+        self.job = job
+        self.resumed = resumed
+        self.reused_chunks = 0
+        self._chunks: Dict[int, ImportJobChunk] = {
+            chunk.chunk_index: chunk for chunk in self.service.get_chunks(job.id)
+        }
+
+    @classmethod
+    def start(
+        cls,
+        session,
+        job_type: str,
+        source_hash: str,
+        params: Dict[str, Any],
+        source_name: Optional[str] = None,
+        category: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> "ImportJobTracker":
+        """同じ取り込み元・同じ条件の未完了ジョブがあれば再開し、なければ作成"""
+        service = ImportJobService(session)
+        encoded = encode_params(params)
+        job = service.find_resumable_job(job_type, source_hash, encoded)
+        if job is not None:
+            job = service.update_job(job, status="running", error=None)
+            print(
+                f"INFO: 取り込みジョブ #{job.id} を再開します "
+                f"(完了済み {job.completed_chunks}/{job.chunk_count} チャンク, {job.question_count}問)"
+            )
+            return cls(session, job, resumed=True)
+
+        job = service.create_job(
+            job_type=job_type,
+            source_hash=source_hash,
+            source_name=source_name,
+            params=encoded,
+            category=category,
+            model=model
+        )
+        print(f"INFO: 取り込みジョブ #{job.id} を作成しました ({job_type})")
+        return cls(session, job)
+
+    @classmethod
+    def resume(cls, session, job_id: int) -> Optional["ImportJobTracker"]:
+        """ジョブIDから再開（チャンクの一覧が保存済みの場合のみ元ファイルなしで処理できる）"""
+        service = ImportJobService(session)
+        job = service.get_job(job_id)
+        if job is None or job.status not in ImportJobService.RESUMABLE_STATUSES:
+            return None
+        job = service.update_job(job, status="running", error=None)
+        return cls(session, job, resumed=True)
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return json.loads(self.job.params) if self.job.params else {}
+
+    def stored_chunks(self) -> List[ImportJobChunk]:
+        return [self._chunks[index] for index in sorted(self._chunks)]
+
+    def chunk(self, chunk_index: int, text: str, target_questions: Optional[int] = None) -> ImportJobChunk:
+        """チャンクを取得（未保存なら保存）。保存済みの場合は前回のテキストと目標数を使う"""
+        chunk = self._chunks.get(chunk_index)
+        if chunk is None:
+            chunk = self.service.add_chunk(self.job, chunk_index, text, target_questions)
+            self._chunks[chunk_index] = chunk
+        elif chunk.text != text:
+            print(f"WARN: チャンク{chunk_index + 1}の内容が前回と異なります（前回の内容で処理を続けます）")
+        return chunk
+
+    @staticmethod
+    def is_completed(chunk: ImportJobChunk) -> bool:
+        return chunk.status == "completed"
+
+    @staticmethod
+    def question_ids(chunk: ImportJobChunk) -> List[int]:
+        return json.loads(chunk.question_ids) if chunk.question_ids else []
+
+    def reuse(self, chunk: ImportJobChunk) -> List[int]:
+        """完了済みのチャンクの問題IDを返す（APIは呼ばない）"""
+        self.reused_chunks += 1
+        return self.question_ids(chunk)
+
+    def begin(self, chunk: ImportJobChunk) -> None:
+        self.service.start_chunk(chunk)
+
+    def record_question(self, chunk: ImportJobChunk, question_id: int) -> None:
+        self.service.add_chunk_question(chunk, question_id)
+
+    def complete(self, chunk: ImportJobChunk) -> None:
+        self.service.finish_chunk(chunk, "completed")
+
+    def fail(self, chunk: ImportJobChunk, error: str) -> None:
+        self.service.finish_chunk(chunk, "failed", error=error[:1000])
+
+    def finish(self, all_chunks_listed: bool, target_reached: bool = False) -> ImportJob:
+        """ジョブを締める
+
+        Args:
+            all_chunks_listed: 取り込み元を最後まで読み、チャンクの一覧がすべて保存されたか
+            target_reached: 目標の問題数に達したか（残りのチャンクは処理しない）
+        """
+        if all_chunks_listed and not self.job.chunks_complete:
+            self.job = self.service.update_job(self.job, chunks_complete=True)
+        job = self.service.refresh_counts(self.job)
+
+        if target_reached or (job.chunks_complete and job.completed_chunks == job.chunk_count):
+            status = "completed"
+        else:
+            status = "failed"
+        self.job = self.service.update_job(job, status=status)
+        print(
+            f"INFO: 取り込みジョブ #{job.id}: {status} "
+            f"(完了 {job.completed_chunks}/{job.chunk_count} チャンク, 失敗 {job.failed_chunks}, "
+            f"{job.question_count}問, 再利用 {self.reused_chunks} チャンク)"
+        )
+        return self.job
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+タスク別のモデル選択
+タスクごとに候補モデルと予算（p95レイテンシ・エラー率・1回あたりコスト）を定義し、
+稼働中のレイテンシ・エラー・レート制限の状況から使うモデルを選ぶ
+
+予算は環境変数 MODEL_ROUTES_FILE で指定したJSONで上書きできる:
+    {"pdf_extraction": {"candidates": ["gpt-4o", "gpt-4o-mini"], "max_p95_latency_ms": 45000}}
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional
+
+from services.resilience import CircuitBreaker, get_circuit_breaker, get_latency_tracker, is_rate_limited
+from services.text_chunker import get_context_window
+from services.usage_ledger import estimate_cost
+
+
+@dataclass
+class TaskRoute:
+    """タスクの候補モデル（優先順）と予算"""
+    candidates: List[str]
+    max_p95_latency_ms: Optional[int] = None
+    max_error_rate: float = 0.3
+    max_cost_per_call_usd: Optional[float] = None
+    typical_input_tokens: int = 1000
+    typical_output_tokens: int = 1000
+
+
+@dataclass
+class RouteDecision:
+    """モデル選択の記録"""
+    task: str
+    model: str
+    reason: str
+    rejected: Dict[str, str] = field(default_factory=dict)
+    decided_at: datetime = field(default_factory=datetime.now)
+
+
+DEFAULT_ROUTES: Dict[str, TaskRoute] = {
+    "generation": TaskRoute(
+        candidates=["gpt-4o-mini", "gpt-3.5-turbo"],
+        max_p95_latency_ms=20000,
+        typical_input_tokens=800,
+        typical_output_tokens=1500
+    ),
+    "verification": TaskRoute(
+        candidates=["gpt-4o-mini", "gpt-3.5-turbo"],
+        max_p95_latency_ms=15000,
+        typical_input_tokens=800,
+        typical_output_tokens=1000
+    ),
+    "pdf_generation": TaskRoute(
+        candidates=["gpt-4o-mini", "gpt-3.5-turbo"],
+        max_p95_latency_ms=60000,
+        typical_input_tokens=3000,
+        typical_output_tokens=2750
+    ),
+    "pdf_extraction": TaskRoute(
+        candidates=["gpt-4o", "gpt-4o-mini"],
+        max_p95_latency_ms=60000,
+        max_cost_per_call_usd=0.05,
+        typical_input_tokens=3400,
+        typical_output_tokens=3300
+    ),
+    "minutes": TaskRoute(
+        candidates=["gpt-4o-mini", "gpt-4o"],
+        max_p95_latency_ms=90000,
+        typical_input_tokens=20000,
+        typical_output_tokens=2000
+    ),
+}
+
+
+class ModelRouter:
+    """タスク別のモデルルーター"""
+
+    def __init__(self, routes: Optional[Dict[str, TaskRoute]] = None, endpoint: str = "chat"):
+        self.routes = dict(routes or DEFAULT_ROUTES)
+        self.endpoint = endpoint
+        self._decisions: Deque[RouteDecision] = deque(maxlen=100)
+        self._lock = threading.Lock()
+
+    def get_route(self, task: str) -> TaskRoute:
+        return self.routes.get(task) or TaskRoute(candidates=["gpt-4o-mini"])
+
+    def _check(self, model: str, route: TaskRoute, input_tokens: Optional[int]) -> Optional[str]:
+        """予算外なら理由を返す（問題なければ None）"""
+        input_tokens = input_tokens or route.typical_input_tokens
+        if input_tokens + route.typical_output_tokens > get_context_window(model):
+            return "コンテキスト超過"
+
+        if get_circuit_breaker(self.endpoint, model).state == CircuitBreaker.OPEN:
+            return "サーキット開"
+        if is_rate_limited(self.endpoint, model):
+            return "レート制限中"
+
+        error_rate = get_circuit_breaker(self.endpoint, model).error_rate()
+        if error_rate is not None and error_rate > route.max_error_rate:
+            return f"エラー率{error_rate:.0%}"
+
+        p95 = get_latency_tracker(self.endpoint, model).percentile(0.95)
+        if route.max_p95_latency_ms and p95 is not None and p95 * 1000 > route.max_p95_latency_ms:
+            return f"p95 {p95 * 1000:.0f}ms"
+
+        cost = estimate_cost(model, input_tokens, route.typical_output_tokens)
+        if route.max_cost_per_call_usd is not None and cost > route.max_cost_per_call_usd:
+            return f"コスト${cost:.4f}"
+
+        return None
+
+    def _record(self, decision: RouteDecision) -> None:
+        with self._lock:
+            self._decisions.append(decision)
+        rejected = ", ".join(f"{model}: {reason}" for model, reason in decision.rejected.items())
+        print(f"INFO: モデル選択 [{decision.task}] → {decision.model} ({decision.reason})"
+              + (f" 除外: {rejected}" if rejected else ""))
+
+    def select(self, task: str, input_tokens: Optional[int] = None, exclude: Iterable[str] = ()) -> Optional[str]:
+        """タスクに使うモデルを選ぶ
+
+        候補を優先順に確認し、予算内の最初のモデルを返す。すべて予算外の場合は
+        サーキットが開いておらずレート制限中でもないモデルのうち最も速いものを返し、
+        それもなければ None を返す。
+        """
+        route = self.get_route(task)
+        excluded = set(exclude)
+        rejected: Dict[str, str] = {}
+
+        for model in route.candidates:
+            if model in excluded:
+                continue
+            reason = self._check(model, route, input_tokens)
+            if reason is None:
+                first_choice = model == route.candidates[0]
+                self._record(RouteDecision(task, model, "第一候補" if first_choice else "代替", rejected))
+                return model
+            rejected[model] = reason
+
+        usable = [
+            model for model, reason in rejected.items()
+            if reason not in ("サーキット開", "レート制限中", "コンテキスト超過")
+        ]
+        if not usable:
+            self._record(RouteDecision(task, "-", "利用可能なモデルなし", rejected))
+            return None
+
+        def p95_of(model: str) -> float:
+            p95 = get_latency_tracker(self.endpoint, model).percentile(0.95)
+            return p95 if p95 is not None else 0.0
+
+        model = min(usable, key=p95_of)
+        self._record(RouteDecision(task, model, "全候補が予算外のため最速のモデル", rejected))
+        return model
+
+    def get_recent_decisions(self, limit: int = 20) -> List[RouteDecision]:
+        with self._lock:
+            return list(self._decisions)[-limit:][::-1]
+
+
+def load_routes(path: Optional[str] = None) -> Dict[str, TaskRoute]:
+    """既定の予算にJSONファイルの設定を重ねる"""
+    routes = dict(DEFAULT_ROUTES)
+    path = path or os.getenv("MODEL_ROUTES_FILE")
+    if not path:
+        return routes
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+        allowed = {f.name for f in fields(TaskRoute)}
+        for task, options in overrides.items():
+            base = routes.get(task)
+            values = {f.name: getattr(base, f.name) for f in fields(TaskRoute)} if base else {}
+            values.update({key: value for key, value in options.items() if key in allowed})
+            routes[task] = TaskRoute(**values)
+        print(f"INFO: モデルルーティング設定を読み込みました: {path}")
+    except Exception as e:
+        print(f"WARN: モデルルーティング設定の読み込みに失敗しました: {e}")
+    return routes
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """共有モデルルーターを取得"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter(load_routes())
+        return _router
+
+
+def select_model(task: str, input_tokens: Optional[int] = None) -> str:
+    """タスクに使うモデルを選ぶ（候補がすべて使えない場合は第一候補）"""
+    router = get_model_router()
+    return router.select(task, input_tokens) or router.get_route(task).candidates[0]
+
+
+def fallback_model(task: str, current_model: str, input_tokens: Optional[int] = None) -> Optional[str]:
+    """現在のモデルが遅い・制限中の場合の代替モデル（なければ None）"""
+    return get_model_router().select(task, input_tokens, exclude=[current_model])
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+OpenAIクライアントの共通生成処理
+OPENAI_BASE_URL を設定すると、すべてのサービスがローカルのスタンドインサーバーなど
+OpenAI互換エンドポイントに接続する
+"""
+
+import os
+from typing import Optional, Tuple
+from urllib.parse import urlparse
+
+from openai import OpenAI
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+
+def get_openai_base_url() -> str:
+    """接続先のベースURLを取得（環境変数 OPENAI_BASE_URL で上書き可能）"""
+    return os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL
+
+
+def get_openai_host_port(base_url: Optional[str] = None) -> Tuple[str, int]:
+    """ベースURLから接続確認用のホストとポートを取得"""
+    parsed = urlparse(base_url or get_openai_base_url())
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    return parsed.hostname or "api.openai.com", port
+
+
+def create_openai_client(
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    **kwargs
+) -> OpenAI:
+    """OpenAIクライアントを作成
+
+    Args:
+        api_key: APIキー（省略時は OPENAI_API_KEY）
+        base_url: 接続先（省略時は OPENAI_BASE_URL または公式エンドポイント）
+        **kwargs: timeout, max_retries などクライアントへの追加引数
+    """
+    return OpenAI(
+        api_key=api_key or os.getenv("OPENAI_API_KEY"),
+        base_url=base_url or get_openai_base_url(),
+        **kwargs
+    )
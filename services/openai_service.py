@@ -6,7 +6,8 @@ OpenAI API service for question generation
 import os
 import json
 from typing import Dict, List, Optional
-from openai import OpenAI
+from services.openai_client import create_openai_client
+from services.usage_ledger import tracked_chat_completion
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
@@ -34,7 +35,7 @@ class OpenAIService:
     """OpenAI API service for question generation"""
     
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = create_openai_client()
         self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
         self.max_tokens = int(os.getenv("MAX_TOKENS", "1500"))
     
@@ -60,7 +61,9 @@ class OpenAIService:
         prompt = self._create_prompt(category, difficulty, topic)
         
         try:
-            response = self.client.chat.completions.create(
+            response = tracked_chat_completion(
+                self.client,
+                feature="generation",
                 model=self.model,
                 messages=[
                     {
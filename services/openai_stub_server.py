@@ -0,0 +1,707 @@
+# -*- coding: utf-8 -*-
+"""
+OpenAI APIのローカルスタンドインサーバー
+実際のAPIを呼ばずにパイプラインの検証・負荷試験を行うための簡易サーバー（標準ライブラリのみ）
+
+対応エンドポイント:
+    POST /v1/chat/completions          (JSONモード・ストリーミング対応)
+    POST /v1/audio/transcriptions      (text / json / verbose_json)
+    POST /v1/files, GET /v1/files/{id}, GET /v1/files/{id}/content
+    POST /v1/batches, GET /v1/batches/{id}
+
+使用例:
+    python services/openai_stub_server.py --port 8787 --latency 0.5 --rate-limit-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8787/v1 streamlit run app.py
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# ストリーミング時に1チャンクあたりに送る文字数
+STREAM_CHUNK_CHARS = 16
+
+
+def request_key(endpoint: str, payload: Dict[str, Any]) -> str:
+    """リクエスト内容からフィクスチャ照合用のキーを作成"""
+    if endpoint == "/v1/audio/transcriptions":
+        material = {
+            "endpoint": endpoint,
+            "model": payload.get("model"),
+            "prompt": payload.get("prompt"),
+            "language": payload.get("language"),
+            "file_sha256": payload.get("file_sha256")
+        }
+    else:
+        material = {
+            "endpoint": endpoint,
+            "model": payload.get("model"),
+            "messages": payload.get("messages"),
+            "response_format": payload.get("response_format")
+        }
+    raw = json.dumps(material, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _wants_json(body: Dict[str, Any], all_text: str) -> bool:
+    response_format = body.get("response_format") or {}
+    return response_format.get("type") in ("json_object", "json_schema") or "JSON" in all_text
+
+
+def fake_chat_content(body: Dict[str, Any]) -> str:
+    """リクエスト内容から決定的な応答テキストを作成"""
+    messages = body.get("messages", [])
+    all_text = "\n".join(str(m.get("content", "")) for m in messages)
+    seed = uuid.uuid5(uuid.NAMESPACE_OID, all_text).hex[:8]
+
+    if "品質管理" in all_text:
+        content = {
+            "is_valid": True,
+            "score": 8,
+            "issues": [],
+            "recommendation": "問題なし",
+            "details": "スタンドインサーバーによる検証結果です"
+        }
+    elif "議事録" in all_text:
+        return f"# 議事録\n\n## 概要\nスタンドインサーバーが作成した議事録です（{seed}）\n\n## 決定事項\n- なし\n"
+    elif _wants_json(body, all_text):
+        # 問題生成・問題抽出はいずれもこの形式を受け付ける
+        content = {
+            "title": f"スタンドイン問題 {seed}",
+            "content": f"スタンドインサーバーが生成した問題文です（{seed}）",
+            "explanation": "選択肢Aが正解です。",
+            "choices": [
+                {"content": f"選択肢A-{seed}", "is_correct": True},
+                {"content": f"選択肢B-{seed}", "is_correct": False},
+                {"content": f"選択肢C-{seed}", "is_correct": False},
+                {"content": f"選択肢D-{seed}", "is_correct": False}
+            ]
+        }
+    else:
+        return "OK"
+
+    return json.dumps(content, ensure_ascii=False)
+
+
+def _usage(prompt_text: str, completion_text: str) -> Dict[str, int]:
+    # 日本語を想定したおおよそのトークン数（2文字≒1トークン）
+    prompt_tokens = max(1, len(prompt_text) // 2)
+    completion_tokens = max(1, len(completion_text) // 2)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+def fake_chat_completion(body: Dict[str, Any], content: Optional[str] = None) -> Dict[str, Any]:
+    """チャット補完のレスポンスを作成"""
+    if content is None:
+        content = fake_chat_content(body)
+    prompt_text = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o-mini"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": _usage(prompt_text, content)
+    }
+
+
+def fake_chat_chunks(body: Dict[str, Any], content: Optional[str] = None) -> List[Dict[str, Any]]:
+    """ストリーミング用のチャンク列を作成"""
+    if content is None:
+        content = fake_chat_content(body)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+    model = body.get("model", "gpt-4o-mini")
+
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+
+    chunks = [chunk({"role": "assistant", "content": ""})]
+    for i in range(0, len(content), STREAM_CHUNK_CHARS):
+        chunks.append(chunk({"content": content[i:i + STREAM_CHUNK_CHARS]}))
+    chunks.append(chunk({}, "stop"))
+
+    if (body.get("stream_options") or {}).get("include_usage"):
+        prompt_text = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        chunks.append({
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [],
+            "usage": _usage(prompt_text, content)
+        })
+    return chunks
+
+
+def fake_transcription(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """音声ファイルの内容から決定的な文字起こし結果を作成"""
+    size = fields.get("file_size", 0)
+    seed = (fields.get("file_sha256") or "")[:8]
+    # 16kbpsを想定したおおよその長さ
+    duration = round(max(1.0, size / 2000.0), 2)
+    text = f"これはスタンドインサーバーによる文字起こしです。ファイル{seed}の内容です。"
+
+    segment_count = max(1, int(duration // 30) + 1)
+    segment_length = duration / segment_count
+    segments = [
+        {
+            "id": i,
+            "start": round(i * segment_length, 2),
+            "end": round((i + 1) * segment_length, 2),
+            "text": text
+        }
+        for i in range(segment_count)
+    ]
+
+    return {
+        "text": " ".join(s["text"] for s in segments),
+        "language": fields.get("language") or "ja",
+        "duration": duration,
+        "segments": segments
+    }
+
+
+class OpenAIStubState:
+    """スタンドインサーバーの状態と挙動設定
+
+    Args:
+        batch_delay: バッチ完了までの秒数
+        latency: 各リクエストの基本遅延（秒）
+        latency_jitter: 遅延に加えるランダム幅（秒）
+        error_rate: 500エラーを返す確率
+        rate_limit_rate: 429エラーを返す確率
+        seed: 乱数シード（遅延・エラー注入を再現可能にする）
+        fixtures_path: 記録済みレスポンスのJSONLファイル
+        record_upstream: 指定時は未記録のリクエストをこのURLへ転送し、結果を fixtures_path に記録
+        upstream_api_key: 転送時に使うAPIキー
+    """
+
+    def __init__(
+        self,
+        batch_delay: float = 0.0,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: Optional[int] = None,
+        fixtures_path: Optional[str] = None,
+        record_upstream: Optional[str] = None,
+        upstream_api_key: Optional[str] = None
+    ):
+        self.batch_delay = batch_delay
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.random = random.Random(seed)
+        self.fixtures_path = fixtures_path
+        self.record_upstream = record_upstream.rstrip("/") if record_upstream else None
+        self.upstream_api_key = upstream_api_key
+
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.fixtures: Dict[str, Dict[str, Any]] = {}
+        self.request_log: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+
+        if fixtures_path:
+            self.load_fixtures(fixtures_path)
+
+    # ------------------------------------------------------------------
+    # 遅延・エラー注入
+    # ------------------------------------------------------------------
+
+    def next_fault(self) -> Tuple[float, Optional[int]]:
+        """次のリクエストの遅延と注入するステータスコードを決定"""
+        with self.lock:
+            delay = self.latency + (self.random.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0)
+            roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            return delay, 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, 500
+        return delay, None
+
+    def log_request(self, endpoint: str, status: int, elapsed: float) -> None:
+        with self.lock:
+            self.request_log.append({"endpoint": endpoint, "status": status, "elapsed": elapsed})
+
+    # ------------------------------------------------------------------
+    # フィクスチャ
+    # ------------------------------------------------------------------
+
+    def load_fixtures(self, path: str) -> int:
+        """記録済みレスポンスを読み込む（ファイルがなければ空）"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.fixtures[record["key"]] = record
+        except FileNotFoundError:
+            pass
+        print(f"INFO: {len(self.fixtures)}件のフィクスチャを読み込みました")
+        return len(self.fixtures)
+
+    def find_fixture(self, endpoint: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return self.fixtures.get(request_key(endpoint, payload))
+
+    def record_fixture(self, endpoint: str, payload: Dict[str, Any], response: Any) -> None:
+        record = {
+            "key": request_key(endpoint, payload),
+            "endpoint": endpoint,
+            "model": payload.get("model"),
+            "response": response,
+            "recorded_at": int(time.time())
+        }
+        with self.lock:
+            self.fixtures[record["key"]] = record
+            if self.fixtures_path:
+                with open(self.fixtures_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def forward_upstream(self, path: str, body: bytes, content_type: str) -> Tuple[int, bytes]:
+        """記録モード: 実際のAPIへ転送"""
+        request = urllib.request.Request(
+            self.record_upstream + path[len("/v1"):],
+            data=body,
+            headers={
+                "Content-Type": content_type,
+                "Authorization": f"Bearer {self.upstream_api_key}"
+            }
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=300) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    # ------------------------------------------------------------------
+    # ファイル・バッチ
+    # ------------------------------------------------------------------
+
+    def add_file(self, data: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        file_obj = {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed"
+        }
+        with self.lock:
+            self.files[file_id] = {"meta": file_obj, "data": data}
+        return file_obj
+
+    def create_batch(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        batch_id = f"batch_{uuid.uuid4().hex[:24]}"
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "errors": None,
+            "input_file_id": body.get("input_file_id"),
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "completed_at": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": body.get("metadata")
+        }
+        with self.lock:
+            if batch["input_file_id"] not in self.files:
+                raise KeyError(f"input file not found: {batch['input_file_id']}")
+            self.batches[batch_id] = {"batch": batch, "started": time.time()}
+        return batch
+
+    def get_batch(self, batch_id: str) -> Dict[str, Any]:
+        with self.lock:
+            entry = self.batches[batch_id]
+            batch = entry["batch"]
+            if batch["status"] == "in_progress" and time.time() - entry["started"] >= self.batch_delay:
+                self._complete_batch(batch)
+            return batch
+
+    def _complete_batch(self, batch: Dict[str, Any]) -> None:
+        """入力JSONLを処理して出力ファイルを作成（ロック取得済み前提）"""
+        input_data = self.files[batch["input_file_id"]]["data"].decode("utf-8")
+        output_lines: List[str] = []
+
+        for n, line in enumerate(input_data.splitlines()):
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            body = request.get("body", {})
+            fixture = self.fixtures.get(request_key("/v1/chat/completions", body))
+            output_lines.append(json.dumps({
+                "id": f"batch_req_{n}",
+                "custom_id": request["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "request_id": uuid.uuid4().hex,
+                    "body": fixture["response"] if fixture else fake_chat_completion(body)
+                },
+                "error": None
+            }, ensure_ascii=False))
+
+        output = ("\n".join(output_lines) + "\n").encode("utf-8")
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        self.files[file_id] = {
+            "meta": {
+                "id": file_id,
+                "object": "file",
+                "bytes": len(output),
+                "created_at": int(time.time()),
+                "filename": f"{batch['id']}_output.jsonl",
+                "purpose": "batch_output",
+                "status": "processed"
+            },
+            "data": output
+        }
+
+        batch["status"] = "completed"
+        batch["output_file_id"] = file_id
+        batch["completed_at"] = int(time.time())
+        batch["request_counts"] = {
+            "total": len(output_lines),
+            "completed": len(output_lines),
+            "failed": 0
+        }
+
+
+class OpenAIStubHandler(BaseHTTPRequestHandler):
+    """OpenAI互換エンドポイントのリクエストハンドラー"""
+
+    server_version = "OpenAIStub/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # テスト出力を汚さないようにアクセスログは出さない
+        pass
+
+    @property
+    def state(self) -> OpenAIStubState:
+        return self.server.state
+
+    def _send_bytes(self, status: int, data: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send_bytes(status, data, "application/json", headers)
+
+    def _send_error(self, status: int, message: str, error_type: str = "invalid_request_error",
+                    headers: Optional[Dict[str, str]] = None) -> None:
+        self._send_json(status, {"error": {"message": message, "type": error_type, "code": None}}, headers)
+
+    def _send_stream(self, chunks: List[Dict[str, Any]]) -> None:
+        """Server-Sent Events形式でチャンクを送信"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        # チャンク間の遅延（基本遅延をチャンク数で按分）
+        interval = self.state.latency / max(len(chunks), 1) if self.state.latency else 0.0
+        for chunk in chunks:
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if interval:
+                time.sleep(interval)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    @staticmethod
+    def _is_stream_request(body: bytes) -> bool:
+        try:
+            return bool(json.loads(body.decode("utf-8")).get("stream"))
+        except (ValueError, AttributeError):
+            return False
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _parse_multipart(self, body: bytes) -> Optional[Dict[str, Any]]:
+        """multipart/form-dataをフィールドの辞書に変換（ファイルは bytes）"""
+        content_type = self.headers.get("Content-Type", "")
+        message = BytesParser(policy=default_policy).parsebytes(
+            b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+        )
+        if not message.is_multipart():
+            return None
+
+        fields: Dict[str, Any] = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if part.get_filename() is not None:
+                fields[name] = part.get_payload(decode=True)
+                fields[f"{name}_filename"] = part.get_filename()
+            else:
+                fields[name] = part.get_content().strip()
+        return fields
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+
+        match = re.fullmatch(r"/v1/files/([^/]+)/content", path)
+        if match:
+            entry = self.state.files.get(match.group(1))
+            if not entry:
+                return self._send_error(404, "file not found")
+            return self._send_bytes(200, entry["data"], "application/octet-stream")
+
+        match = re.fullmatch(r"/v1/files/([^/]+)", path)
+        if match:
+            entry = self.state.files.get(match.group(1))
+            if not entry:
+                return self._send_error(404, "file not found")
+            return self._send_json(200, entry["meta"])
+
+        match = re.fullmatch(r"/v1/batches/([^/]+)", path)
+        if match:
+            try:
+                return self._send_json(200, self.state.get_batch(match.group(1)))
+            except KeyError:
+                return self._send_error(404, "batch not found")
+
+        if path == "/v1/models":
+            return self._send_json(200, {"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model"}]})
+
+        return self._send_error(404, f"unknown endpoint: {path}")
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        body = self._read_body()
+        start_time = time.time()
+        status = 200
+
+        try:
+            if path in ("/v1/chat/completions", "/v1/audio/transcriptions"):
+                delay, fault = self.state.next_fault()
+                # ストリーミング時の遅延はチャンク間に按分する
+                if delay and not (path == "/v1/chat/completions" and self._is_stream_request(body)):
+                    time.sleep(delay)
+                if fault == 429:
+                    status = 429
+                    return self._send_error(
+                        429, "Rate limit reached (injected by stand-in server)",
+                        "rate_limit_exceeded", {"Retry-After": "1"}
+                    )
+                if fault == 500:
+                    status = 500
+                    return self._send_error(500, "Internal server error (injected by stand-in server)", "server_error")
+
+            if path == "/v1/files":
+                return self._handle_file_upload(body)
+            if path == "/v1/audio/transcriptions":
+                return self._handle_transcription(body)
+
+            try:
+                payload = json.loads(body.decode("utf-8")) if body else {}
+            except json.JSONDecodeError:
+                status = 400
+                return self._send_error(400, "invalid JSON body")
+
+            if path == "/v1/batches":
+                try:
+                    return self._send_json(200, self.state.create_batch(payload))
+                except KeyError as e:
+                    status = 400
+                    return self._send_error(400, str(e))
+
+            if path == "/v1/chat/completions":
+                return self._handle_chat(payload, body)
+
+            status = 404
+            return self._send_error(404, f"unknown endpoint: {path}")
+        finally:
+            self.state.log_request(path, status, time.time() - start_time)
+
+    def _handle_chat(self, payload: Dict[str, Any], raw_body: bytes) -> None:
+        endpoint = "/v1/chat/completions"
+        fixture = self.state.find_fixture(endpoint, payload)
+
+        if fixture is None and self.state.record_upstream:
+            # 記録はストリーミングなしで取得し、再生時にチャンク化する
+            upstream_payload = dict(payload)
+            upstream_payload.pop("stream", None)
+            upstream_payload.pop("stream_options", None)
+            status, data = self.state.forward_upstream(
+                endpoint, json.dumps(upstream_payload).encode("utf-8"), "application/json"
+            )
+            if status != 200:
+                return self._send_bytes(status, data, "application/json")
+            fixture = {"response": json.loads(data)}
+            self.state.record_fixture(endpoint, payload, fixture["response"])
+
+        content = None
+        if fixture is not None:
+            content = fixture["response"]["choices"][0]["message"]["content"]
+
+        if payload.get("stream"):
+            return self._send_stream(fake_chat_chunks(payload, content))
+        if fixture is not None:
+            return self._send_json(200, fixture["response"])
+        return self._send_json(200, fake_chat_completion(payload))
+
+    def _handle_transcription(self, body: bytes) -> None:
+        fields = self._parse_multipart(body)
+        if fields is None or "file" not in fields:
+            return self._send_error(400, "file field is required")
+
+        file_data = fields.pop("file")
+        fields["file_size"] = len(file_data)
+        fields["file_sha256"] = hashlib.sha256(file_data).hexdigest()
+        endpoint = "/v1/audio/transcriptions"
+
+        fixture = self.state.find_fixture(endpoint, fields)
+        if fixture is not None:
+            result = fixture["response"]
+        elif self.state.record_upstream:
+            status, data = self.state.forward_upstream(endpoint, body, self.headers.get("Content-Type", ""))
+            if status != 200:
+                return self._send_bytes(status, data, "application/json")
+            if fields.get("response_format") == "text":
+                result = {"text": data.decode("utf-8")}
+            else:
+                result = json.loads(data)
+            self.state.record_fixture(endpoint, fields, result)
+        else:
+            result = fake_transcription(fields)
+
+        response_format = fields.get("response_format", "json")
+        if response_format == "text":
+            return self._send_bytes(200, result["text"].encode("utf-8"), "text/plain; charset=utf-8")
+        if response_format == "verbose_json":
+            return self._send_json(200, {"task": "transcribe", **result})
+        return self._send_json(200, {"text": result["text"]})
+
+    def _handle_file_upload(self, body: bytes) -> None:
+        """multipart/form-dataのファイルアップロードを処理"""
+        fields = self._parse_multipart(body)
+        if fields is None:
+            return self._send_error(400, "multipart/form-data required")
+        if "file" not in fields:
+            return self._send_error(400, "file field is required")
+
+        return self._send_json(200, self.state.add_file(
+            fields["file"], fields.get("file_filename") or "upload.jsonl", fields.get("purpose", "batch")
+        ))
+
+
+class OpenAIStubServer:
+    """バックグラウンドスレッドで動くスタンドインサーバー
+
+    使用例:
+        with OpenAIStubServer(latency=0.2, rate_limit_rate=0.1, seed=42) as stub:
+            os.environ["OPENAI_BASE_URL"] = stub.base_url
+            service = EnhancedOpenAIService()
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **state_options):
+        self.httpd = ThreadingHTTPServer((host, port), OpenAIStubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = OpenAIStubState(**state_options)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def state(self) -> OpenAIStubState:
+        return self.httpd.state
+
+    def start(self) -> "OpenAIStubServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "OpenAIStubServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="OpenAI API スタンドインサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--batch-delay", type=float, default=0.0, help="バッチ完了までの秒数")
+    parser.add_argument("--latency", type=float, default=0.0, help="各リクエストの基本遅延（秒）")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="遅延のランダム幅（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500エラーを返す確率")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="429エラーを返す確率")
+    parser.add_argument("--seed", type=int, default=None, help="乱数シード")
+    parser.add_argument("--fixtures", default=None, help="フィクスチャJSONLのパス")
+    parser.add_argument("--record", default=None, metavar="UPSTREAM_URL",
+                        help="未記録のリクエストを転送して --fixtures に記録する（例: https://api.openai.com/v1）")
+    args = parser.parse_args()
+
+    server = OpenAIStubServer(
+        args.host,
+        args.port,
+        batch_delay=args.batch_delay,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+        fixtures_path=args.fixtures,
+        record_upstream=args.record,
+        upstream_api_key=os.getenv("OPENAI_API_KEY")
+    )
+    print(f"OpenAI stand-in server listening on {server.base_url}")
+    print(f"  export OPENAI_BASE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -3,18 +3,51 @@
 PDFから既存の問題・選択肢・正解・解説をそのまま抽出する
 """
 
-from typing import List, Dict, Optional, Tuple
+from typing import Any, Iterator, List, Dict, Optional, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import contextvars
 import json
+import os
 import re
+import threading
+import time
 from services.enhanced_openai_service import EnhancedOpenAIService
+from services.process_pool import create_process_pool
+from services.text_chunker import TextChunker, count_tokens, input_token_budget
 from database.operations import QuestionService, ChoiceService
 
 
 class PastQuestionExtractor:
     """過去問抽出クラス"""
     
-    def __init__(self, model_name="gpt-4o"):  # より強力なモデルに変更
-        self.openai_service = EnhancedOpenAIService(model_name=model_name)
+    # 1問あたりの入力トークン上限（これを超える場合は分割して抽出）
+    MAX_QUESTION_INPUT_TOKENS = 3000
+    # 抽出プロンプトの指示文部分のおおよそのトークン数
+    EXTRACTION_PROMPT_OVERHEAD_TOKENS = 400
+    # 抽出結果の最小応答トークン数
+    MIN_EXTRACTION_OUTPUT_TOKENS = 1200
+    # 並列に実行するAPI抽出の数（環境変数 PAST_QUESTION_WORKERS）
+    DEFAULT_MAX_WORKERS = 8
+    # 1問あたりのAPI抽出の制限時間（秒。環境変数 PAST_QUESTION_TIMEOUT）
+    DEFAULT_API_TIMEOUT = 30.0
+    
+    def __init__(self, model_name=None, max_workers: Optional[int] = None, api_timeout: Optional[float] = None):
+        # model_name 省略時はモデルルーターが選択（既定は gpt-4o）
+        self.openai_service = EnhancedOpenAIService(model_name=model_name, task="pdf_extraction")
+        self.max_workers = max_workers or int(os.getenv("PAST_QUESTION_WORKERS", self.DEFAULT_MAX_WORKERS))
+        self.api_timeout = api_timeout or float(os.getenv("PAST_QUESTION_TIMEOUT", self.DEFAULT_API_TIMEOUT))
+        self.fallback_workers = max(1, int(os.getenv("PAST_QUESTION_FALLBACK_WORKERS", "0")) or os.cpu_count() or 1)
+        self.model_name = self.openai_service.model
+        self.max_input_tokens = input_token_budget(
+            self.model_name,
+            max_output_tokens=self._output_tokens_for(self.MAX_QUESTION_INPUT_TOKENS),
+            prompt_overhead_tokens=self.EXTRACTION_PROMPT_OVERHEAD_TOKENS,
+            cap=self.MAX_QUESTION_INPUT_TOKENS
+        )
+    
+    def _output_tokens_for(self, input_tokens: int) -> int:
+        """抽出結果は入力とほぼ同じ長さになるため、入力に応じて応答トークン数を決める"""
+        return min(4096, max(self.MIN_EXTRACTION_OUTPUT_TOKENS, input_tokens + 300))
     
     def extract_past_questions_from_pdf(
         self,
@@ -24,9 +57,18 @@ class PastQuestionExtractor:
         progress_callback=None,
         enable_duplicate_check: bool = False,  # 一時的に無効化
         similarity_threshold: float = 0.5,     # より緩い閾値
-        duplicate_action: str = "save_with_warning"  # 重複でも保存
+        duplicate_action: str = "save_with_warning",  # 重複でも保存
+        source_hash: Optional[str] = None,
+        source_name: Optional[str] = None
     ) -> List[int]:
-        """PDFテキストから過去問を抽出（改善版）"""        
+        """PDFテキストから過去問を抽出（改善版）
+        
+        各問題のAPI抽出は並列に実行し（_extract_concurrently）、完了した順にDBへ保存する。
+        
+        source_hash を指定すると取り込みジョブとして問題ごとの進捗をDBに記録し、
+        中断後に同じテキスト・同じ条件で実行すると抽出済みの問題を再利用して続きから処理する。
+        （テキストの場合は services.import_jobs.compute_source_hash でハッシュを作る）
+        """
         if progress_callback:
             progress_callback("過去問PDFを分析中...", 0.1)
         
@@ -34,110 +76,232 @@ class PastQuestionExtractor:
         questions = self._split_into_questions(text)
         print(f"INFO: 分割結果: {len(questions)}問を検出")
         for i, q in enumerate(questions[:3]):  # 最初の3問のプレビュー
-            print(f"   問題{i+1}プレビュー: {q[:100]}...")        
+            print(f"   問題{i+1}プレビュー: {q[:100]}...")
         if progress_callback:
             progress_callback(f"{len(questions)}問の問題を検出しました", 0.2)
         
         generated_question_ids = []
         successful_extractions = 0
         failed_extractions = 0
-          # 処理する問題数を制限
+        # 処理する問題数を制限
         actual_max_questions = min(len(questions), max_questions)
         
-        for i, question_text in enumerate(questions[:actual_max_questions]):
-            if progress_callback:
-                progress = 0.2 + (0.7 * (i + 1) / actual_max_questions)
-                progress_callback(f"問題 {i+1}/{actual_max_questions} を処理中...", progress)
-                
-            try:
-                print(f"INFO: 問題{i+1}を処理中... (長さ: {len(question_text)}文字)")
-                
-                # テキストが非常に長い場合は最初の1500文字のみ使用
-                if len(question_text) > 1500:
-                    truncated_text = question_text[:1500]
-                    print(f"WARN: テキストを1500文字に切り詰めました")
-                else:
-                    truncated_text = question_text
-                
-                # デバッグ: 問題テキストの最初の200文字を表示
-                preview_text = truncated_text[:200].replace('\n', ' ')
-                print(f"   テキストプレビュー: {preview_text}...")
-                
-                # OpenAI APIで構造化抽出（タイムアウト付き）
-                extracted_data = None
-                try:
-                    import time
-                    start_time = time.time()
-                    extracted_data = self._extract_question_structure(truncated_text)
-                    elapsed = time.time() - start_time
-                    print(f"TIME: API処理時間: {elapsed:.2f}秒")
-                    
-                    # 30秒以上かかった場合は異常とみなす
-                    if elapsed > 30:
-                        print(f"WARN: API処理時間が異常に長いです: {elapsed:.2f}秒")
-                        extracted_data = None
-                        
-                except Exception as api_error:
-                    print(f"WARN: API呼び出しエラー: {api_error}")
-                    extracted_data = None
-                print(f"INFO: API応答結果: {'成功' if extracted_data else '失敗'}")
-                  # API失敗の場合は即座にフォールバックを使用
-                if not extracted_data:
-                    print(f"INFO: フォールバック抽出を実行します (問題{i+1})")
-                    extracted_data = self._fallback_extraction(truncated_text)
-                    
-                    # フォールバックも失敗した場合、ログに詳細を記録
-                    if not extracted_data:
-                        print(f"ERROR: フォールバック抽出も失敗しました (問題{i+1})")
-                        print(f"   テキストプレビュー: {truncated_text[:200]}...")
-                        failed_extractions += 1
-                        continue
-
-                    if extracted_data:
-                        print(f"OK: 問題{i+1}: 抽出成功")
+        job_session = None
+        tracker = None
+        if source_hash:
+            from database.connection import get_database_session
+            from services.import_jobs import ImportJobTracker
+            job_session = get_database_session()
+            tracker = ImportJobTracker.start(
+                job_session,
+                "past_question_extraction",
+                source_hash,
+                params={
+                    "category": category,
+                    "max_questions": max_questions,
+                    "enable_duplicate_check": enable_duplicate_check,
+                    "similarity_threshold": similarity_threshold,
+                    "duplicate_action": duplicate_action
+                },
+                source_name=source_name,
+                category=category,
+                model=self.model_name
+            )
+        
+        try:
+            # (問題番号, 問題ID)。並列処理では完了順に保存されるため最後に問題番号順に並べる
+            saved_questions = []
+            pending = []
+            for i, question_text in enumerate(questions[:actual_max_questions]):
+                job_chunk = None
+                if tracker is not None:
+                    job_chunk = tracker.chunk(i, question_text, 1)
+                    if tracker.is_completed(job_chunk):
+                        # 抽出済みの問題はAPIを呼ばずに再利用
+                        saved_questions.extend((i + 1, question_id) for question_id in tracker.reuse(job_chunk))
                         successful_extractions += 1
-                        # データベースに保存
-                        print(f"DEBUG: extracted_data内容: {extracted_data} (type: {type(extracted_data)})")
-                        if extracted_data:
-                            question_id = self._save_extracted_question(
-                                extracted_data, 
-                                category,
-                                question_number=i+1,
-                                enable_duplicate_check=enable_duplicate_check,
-                                similarity_threshold=similarity_threshold,
-                                duplicate_action=duplicate_action
-                            )
-                            if question_id and question_id != "SKIPPED_DUPLICATE":
-                                generated_question_ids.append(question_id)
-                                print(f"SAVED: 問題{i+1}: DB保存成功 (ID: {question_id})")
-                            elif question_id == "SKIPPED_DUPLICATE":
-                                print(f"SKIPPED: 問題{i+1}: 重複のためスキップ")
-                            else:
-                                print(f"ERROR: 問題{i+1}: DB保存失敗。バリデーション・重複・DBエラーのいずれか。詳細は直前のログを参照")
-                        else:
-                            print(f"DEBUG: extracted_dataが偽値と判定されました: {extracted_data} (type: {type(extracted_data)})")
-                            print(f"ERROR: 問題{i+1}: 抽出失敗 - データが不正またはAPI応答なし")
-                            failed_extractions += 1
+                        continue
+                    tracker.begin(job_chunk)
+                    question_text = job_chunk.text
+                pending.append((i + 1, question_text, job_chunk))
+            
+            processed = actual_max_questions - len(pending)
+            for question_number, extracted_data, job_chunk in self._extract_concurrently(pending):
+                processed += 1
+                if progress_callback:
+                    progress = 0.2 + (0.7 * processed / actual_max_questions)
+                    progress_callback(f"問題 {processed}/{actual_max_questions} を処理しました", progress)
+                
+                extracted, question_id, error = self._save_result(
+                    extracted_data,
+                    question_number,
+                    category,
+                    enable_duplicate_check,
+                    similarity_threshold,
+                    duplicate_action
+                )
+                if extracted:
+                    successful_extractions += 1
                 else:
-                    print(f"ERROR: 問題{i+1}: 抽出失敗 - データが不正またはAPI応答なし")
                     failed_extractions += 1
-                        
-            except Exception as e:
-                print(f"ERROR: 問題{i+1}の処理でエラー: {e}")
-                import traceback
-                print(f"   詳細: {traceback.format_exc()}")
-                failed_extractions += 1
-                continue
+                if question_id:
+                    saved_questions.append((question_number, question_id))
+                
+                if job_chunk is not None:
+                    if question_id:
+                        tracker.record_question(job_chunk, question_id)
+                    if error:
+                        tracker.fail(job_chunk, error)
+                    else:
+                        tracker.complete(job_chunk)
+            
+            generated_question_ids = [question_id for _, question_id in sorted(saved_questions)]
+            if tracker is not None:
+                tracker.finish(all_chunks_listed=True)
+        finally:
+            if job_session is not None:
+                job_session.close()
         
         # 結果サマリー
         print(f"\nSTATS: 抽出結果サマリー:")
         print(f"   OK: 成功: {successful_extractions}問")
         print(f"   ERROR: 失敗: {failed_extractions}問")
-        print(f"   SAVED: DB保存: {len(generated_question_ids)}問")        
+        print(f"   SAVED: DB保存: {len(generated_question_ids)}問")
         if progress_callback:
             progress_callback(f"過去問抽出完了: {successful_extractions}問成功", 1.0)
         
         return generated_question_ids
+    
+    def _extract_concurrently(self, items: List[Tuple[int, str, Any]]) -> Iterator[Tuple[int, Optional[Dict], Any]]:
+        """問題の構造化抽出を並列に実行し、完了した順に (問題番号, 抽出結果, 付随データ) を返す
+        
+        API抽出はスレッドプールで max_workers 件ずつ実行し、各リクエストは api_timeout 秒で打ち切る。
+        正規表現のフォールバックはプロセスプールで全問を先行して実行しておき、
+        API抽出が失敗・タイムアウトした時点で結果を使う（API抽出が成功した問題の分は取り消す）。
+        
+        Args:
+            items: (問題番号, 問題テキスト, 付随データ) のリスト
+        """
+        if not items:
+            return
+        
+        fallback_pool = self._create_fallback_pool()
+        fallback_futures: Dict[int, Future] = {}
+        if fallback_pool is not None:
+            fallback_futures = {
+                number: fallback_pool.submit(_fallback_in_worker, text) for number, text, _ in items
+            }
+        
+        # 代替モデルへの切り替えはサービスの model を書き換えるため、サービスはワーカースレッドごとに持つ
+        worker_state = threading.local()
+        try:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(items)),
+                thread_name_prefix="past-question"
+            ) as executor:
+                # 利用記録のセッション・機能の帰属をワーカースレッドに引き継ぐ
+                futures = {
+                    executor.submit(
+                        contextvars.copy_context().run,
+                        self._extract_in_worker, worker_state, text
+                    ): (number, text, extra)
+                    for number, text, extra in items
+                }
+                for future in as_completed(futures):
+                    number, text, extra = futures[future]
+                    try:
+                        extracted_data = future.result()
+                    except Exception as e:
+                        print(f"WARN: API呼び出しエラー (問題{number}): {e}")
+                        extracted_data = None
+                    
+                    fallback_future = fallback_futures.pop(number, None)
+                    if extracted_data:
+                        print(f"INFO: 問題{number}: API抽出成功")
+                        if fallback_future is not None:
+                            fallback_future.cancel()
+                    else:
+                        print(f"INFO: フォールバック抽出の結果を使用します (問題{number})")
+                        extracted_data = self._fallback_result(fallback_future, text)
+                        if not extracted_data:
+                            print(f"ERROR: フォールバック抽出も失敗しました (問題{number})")
+                            print(f"   テキストプレビュー: {text[:200]}...")
+                    yield number, extracted_data, extra
+        finally:
+            if fallback_pool is not None:
+                fallback_pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _extract_in_worker(self, worker_state: threading.local, text: str) -> Optional[Dict]:
+        """ワーカースレッドでのAPI抽出（サービスはスレッドごとに一度だけ作る）"""
+        openai_service = getattr(worker_state, "openai_service", None)
+        if openai_service is None:
+            openai_service = worker_state.openai_service = EnhancedOpenAIService(
+                model_name=self.model_name, task="pdf_extraction"
+            )
+        return self._extract_question_structure(text, self.api_timeout, False, openai_service)
+    
+    def _create_fallback_pool(self) -> Optional[ProcessPoolExecutor]:
+        """フォールバック抽出用のプロセスプール（作成できない場合は None で、必要な問題だけその場で実行）"""
+        try:
+            # 問題文は submit の引数で渡す（親プロセスの状態は引き継がない）
+            return create_process_pool(self.fallback_workers)
+        except Exception as e:
+            print(f"WARN: フォールバック抽出のプロセスプールを作成できません: {e}")
+            return None
+    
+    def _fallback_result(self, future: Optional[Future], text: str) -> Optional[Dict]:
+        """先行実行したフォールバック抽出の結果（プールが使えない場合はその場で実行）"""
+        if future is not None:
+            try:
+                return future.result()
+            except Exception as e:
+                print(f"WARN: フォールバック抽出のワーカーでエラー: {e}")
+        return self._fallback_extraction(text)
+    
+    def _save_result(
+        self,
+        extracted_data: Optional[Dict],
+        question_number: int,
+        category: str,
+        enable_duplicate_check: bool,
+        similarity_threshold: float,
+        duplicate_action: str
+    ) -> Tuple[bool, Optional[int], Optional[str]]:
+        """抽出結果を保存
+        
+        Returns:
+            (抽出できたか, 保存した問題ID, エラー内容)
+            重複のためスキップした場合は (True, None, None)
+        """
+        i = question_number - 1
+        if not extracted_data:
+            return False, None, "抽出失敗 - データが不正またはAPI応答なし"
+        
+        try:
+            print(f"OK: 問題{i+1}: 抽出成功")
+            # データベースに保存
+            question_id = self._save_extracted_question(
+                extracted_data,
+                category,
+                question_number=i+1,
+                enable_duplicate_check=enable_duplicate_check,
+                similarity_threshold=similarity_threshold,
+                duplicate_action=duplicate_action
+            )
+            if question_id and question_id != "SKIPPED_DUPLICATE":
+                print(f"SAVED: 問題{i+1}: DB保存成功 (ID: {question_id})")
+                return True, question_id, None
+            if question_id == "SKIPPED_DUPLICATE":
+                print(f"SKIPPED: 問題{i+1}: 重複のためスキップ")
+                return True, None, None
+            print(f"ERROR: 問題{i+1}: DB保存失敗。バリデーション・重複・DBエラーのいずれか。詳細は直前のログを参照")
+            return True, None, "DB保存失敗"
+            
+        except Exception as e:
+            print(f"ERROR: 問題{i+1}の処理でエラー: {e}")
+            import traceback
+            print(f"   詳細: {traceback.format_exc()}")
+            return False, None, str(e)
 
     def _split_into_questions(self, text: str) -> List[str]:
         """テキストを問題単位に分割（改善版）"""
@@ -166,13 +330,9 @@ class PastQuestionExtractor:
                     end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
                     question_chunk = text[start:end].strip()
                     
-                    # チャンクサイズを制限（500-3000文字が理想）
-                    if 500 <= len(question_chunk) <= 3000:
+                    # 短すぎる断片は除外（長い問題は抽出時に分割するため切り詰めない）
+                    if len(question_chunk) >= 500:
                         questions.append(question_chunk)
-                    elif len(question_chunk) > 3000:
-                        # 長すぎる場合は最初の2500文字のみ使用
-                        questions.append(question_chunk[:2500] + "...")
-                        print(f"WARN: 問題が長すぎるため切り詰めました: {len(question_chunk)}文字 → 2500文字")
                 
                 if len(questions) > len(best_questions):
                     best_questions = questions
@@ -187,7 +347,7 @@ class PastQuestionExtractor:
                 # より緩い条件で段落を問題として認識
                 if (len(p) > 300 and  # 最小文字数を増加
                     any(marker in p for marker in ['?', '？', '①', '②', '③', 'A.', 'B.', 'C.']) and
-                    len(p) < 3000):  # 最大文字数制限
+                    count_tokens(p, self.model_name) <= self.max_input_tokens * 2):  # 複数問の連結を除外
                     best_questions.append(p)
             
             print(f"INFO: 段落分割で {len(best_questions)}問を検出")
@@ -201,13 +361,14 @@ class PastQuestionExtractor:
             
             has_sufficient_choices = choice_count >= 3  # 最低3つの選択肢
             has_content = len(q.strip()) > 200  # 最低200文字
-            not_too_long = len(q) < 4000  # 最大4000文字
+            token_count = count_tokens(q, self.model_name)
+            not_too_long = token_count <= self.max_input_tokens * 2  # 複数問が連結したものを除外
             
             if has_sufficient_choices and has_content and not_too_long:
                 filtered_questions.append(q)
-                print(f"OK: 問題{i+1}: 選択肢{choice_count}個, {len(q)}文字 - 品質基準クリア")
+                print(f"OK: 問題{i+1}: 選択肢{choice_count}個, {len(q)}文字/{token_count}トークン - 品質基準クリア")
             else:
-                print(f"SKIP: 問題{i+1}: 選択肢{choice_count}個, {len(q)}文字 - 品質基準不足")
+                print(f"SKIP: 問題{i+1}: 選択肢{choice_count}個, {len(q)}文字/{token_count}トークン - 品質基準不足")
         
         print(f"RESULT: 最終分割結果: {len(filtered_questions)}問 (パターン: {best_pattern})")
         
@@ -298,14 +459,48 @@ class PastQuestionExtractor:
         
         return filtered_questions
 
-    def _extract_question_structure(self, question_text: str) -> Optional[Dict]:
-        """OpenAI APIで問題構造を抽出（エラーハンドリング強化版）"""
+    def _extract_question_structure(
+        self,
+        question_text: str,
+        timeout: Optional[float] = None,
+        use_fallback: bool = True,
+        openai_service: Optional[EnhancedOpenAIService] = None
+    ) -> Optional[Dict]:
+        """OpenAI APIで問題構造を抽出（エラーハンドリング強化版）
+        
+        Args:
+            timeout: API呼び出しの制限時間（秒）。レート制限の待機を含め、超えた時点で打ち切る
+            use_fallback: API抽出に失敗した場合に正規表現のフォールバックを実行するか
+                          （False の場合は None を返す。並列抽出ではフォールバックを別途先行実行する）
+            openai_service: 使用するサービス（省略時は self.openai_service。ワーカースレッドは専用のものを渡す）
+        """
+        openai_service = openai_service or self.openai_service
+        def fallback():
+            return self._fallback_extraction(question_text) if use_fallback else None
         
-        # 入力テキストが長すぎる場合は切り詰める（トークン制限対策）
-        max_input_length = 1200  # より小さく設定
-        if len(question_text) > max_input_length:
-            question_text = question_text[:max_input_length]
-            print(f"WARN: 入力テキストを{max_input_length}文字に切り詰めました")
+        # 入力がトークン予算を超える場合は切り詰めずに分割し、順に抽出を試す
+        input_tokens = count_tokens(question_text, self.model_name)
+        if input_tokens > self.max_input_tokens:
+            chunker = TextChunker(
+                model=self.model_name,
+                max_tokens=self.max_input_tokens,
+                overlap_tokens=self.max_input_tokens // 10
+            )
+            chunks = chunker.split_text(question_text)
+            print(f"INFO: 入力が{input_tokens}トークンのため{len(chunks)}分割して抽出します")
+            # 制限時間は分割した全体で共有する（各部分には残り時間を渡す）
+            deadline = time.monotonic() + timeout if timeout else None
+            for chunk in chunks:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        print(f"WARN: 分割した問題の抽出が制限時間（{timeout:.0f}秒）を超えました")
+                        break
+                result = self._extract_question_structure(chunk, remaining, use_fallback, openai_service)
+                if result:
+                    return result
+            return None
         
         # テキスト品質の事前チェック
         has_choices = any(pattern in question_text for pattern in ['①', '②', '③', 'A.', 'B.', 'C.', '1.', '2.', '3.'])
@@ -318,7 +513,7 @@ class PastQuestionExtractor:
         
         if not has_choices:
             print("WARN: 選択肢が検出されないため、フォールバックを使用します")
-            return self._fallback_extraction(question_text)
+            return fallback()
           # シンプルで確実なプロンプト（1問のみ）
         prompt = f"""以下のテキストから1つの完全な問題を抽出してください。
 
@@ -350,32 +545,28 @@ JSON形式で回答（例）:
             print(f"   プロンプト長: {len(prompt)} 文字")
             
             # タイムアウト設定付きAPI呼び出し
-            import time
             start_time = time.time()
             
-            response = self.openai_service.call_openai_api(
+            response = openai_service.call_openai_api(
                 prompt,
-                max_tokens=1200,  # より少なく設定
+                max_tokens=self._output_tokens_for(input_tokens),
                 temperature=0.0,   # 完全に決定的に
-                system_message="あなたは過去問を正確に抽出する専門家です。JSONのみで回答してください。"
+                system_message="あなたは過去問を正確に抽出する専門家です。JSONのみで回答してください。",
+                feature="pdf_extraction",
+                timeout=timeout
             )
             
             elapsed_time = time.time() - start_time
             print(f"TIME: API処理時間: {elapsed_time:.2f}秒")
             
-            # タイムアウトチェック
-            if elapsed_time > 25:  # 25秒以上は異常
-                print(f"WARN: API処理時間が異常に長いです: {elapsed_time:.2f}秒")
-                return self._fallback_extraction(question_text)
-            
             # レスポンスの基本チェック
             if not response:
                 print("ERROR: OpenAI APIからのレスポンスが空です")
-                return self._fallback_extraction(question_text)
+                return fallback()
             
             if len(response.strip()) < 50:  # 非常に短いレスポンスは異常
                 print(f"WARN: レスポンスが短すぎます: {len(response)}文字")
-                return self._fallback_extraction(question_text)
+                return fallback()
             
             print(f"OK: OpenAI API Response受信: {len(response)}文字")
             print(f"INFO: 応答の最初の200文字: {response[:200]}...")
@@ -407,12 +598,12 @@ JSON形式で回答（例）:
                         data = data[0]
                     else:
                         print("WARN: List形式のレスポンスが不正")
-                        return self._fallback_extraction(question_text)
+                        return fallback()
                 
                 # dictでない場合の処理
                 if not isinstance(data, dict):
                     print(f"WARN: 予期しないデータ型: {type(data).__name__}")
-                    return self._fallback_extraction(question_text)
+                    return fallback()
                 
                 print(f"INFO: データフィールド: {list(data.keys())}")
                 
@@ -422,13 +613,13 @@ JSON形式で回答（例）:
                 
                 if missing_fields:
                     print(f"WARN: 必須フィールド不足: {missing_fields}")
-                    return self._fallback_extraction(question_text)
+                    return fallback()
                 
                 # 選択肢の検証
                 choices = data.get('choices', [])
                 if not isinstance(choices, list) or len(choices) < 2:
                     print(f"WARN: 選択肢不足: {len(choices)}個")
-                    return self._fallback_extraction(question_text)
+                    return fallback()
                 
                 # 正解数の確認（複数正解も許可）
                 correct_count = sum(1 for choice in choices if choice.get('is_correct'))
@@ -446,17 +637,21 @@ JSON形式で回答（例）:
                 print(f"ERROR: JSON解析失敗: {e}")
                 print(f"応答内容: {cleaned_response[:200]}...")
                 print("INFO: フォールバック抽出を試行します")
-                return self._fallback_extraction(question_text)
+                return fallback()
             
         except Exception as e:
             print(f"ERROR: OpenAI API エラー: {e}")
             print(f"   エラータイプ: {type(e).__name__}")
-            return self._fallback_extraction(question_text)
+            return fallback()
         
         return None
 
-    def _fallback_extraction(self, text: str) -> Optional[Dict]:
-        """OpenAI API失敗時のフォールバック抽出（強化版）"""
+    @staticmethod
+    def _fallback_extraction(text: str) -> Optional[Dict]:
+        """OpenAI API失敗時のフォールバック抽出（強化版）
+        
+        正規表現のみで処理するため、並列抽出ではプロセスプールで先行実行する
+        """
         
         try:
             print("INFO: フォールバック抽出を開始します...")
@@ -822,3 +1017,8 @@ JSON形式で回答（例）:
             print(f"データベース保存エラー: {e}")
         
         return None
+
+
+def _fallback_in_worker(text: str) -> Optional[Dict]:
+    """プロセスプールで実行するフォールバック抽出"""
+    return PastQuestionExtractor._fallback_extraction(text)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+PDF抽出結果のキャッシュ
+PDFのSHA-256をキーに、ページごとのテキスト・使用エンジン・品質スコア・見出し位置を保存し、
+同じPDFを再度アップロードしたときの抽出処理を省略する
+
+エントリはJSON Lines形式（ヘッダー行 → ページ行 → サマリー行）で、
+書き込み・読み込みともにページ単位で行うため文書全体をメモリに載せない。
+上限サイズは環境変数 PDF_CACHE_MAX_MB（既定: 500MB）。
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from services.disk_cache import DiskLRUCache
+
+# エントリ形式のバージョン（形式や抽出される内容を変えたら上げる）
+# 2: 空のページをOCRで読み取るようになった（OCR前のエントリは空のページを含むため無効にする）
+PDF_CACHE_VERSION = 2
+
+
+def compute_pdf_hash(file_bytes) -> str:
+    """PDFデータ（bytes・memoryview・mmap）のSHA-256"""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+class PDFTextCache:
+    """PDF抽出結果のキャッシュ"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("PDF_CACHE_MAX_MB", "500")) * 1024 * 1024)
+        self.cache = DiskLRUCache("pdf_text", max_bytes=max_bytes, suffix=".jsonl")
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """PDF_CACHE_ENABLED=false で無効化"""
+        return os.getenv("PDF_CACHE_ENABLED", "true").lower() not in ("false", "0", "no")
+
+    def iter_entry(self, pdf_hash: str) -> Optional[Iterator[Dict[str, Any]]]:
+        """キャッシュ済みのエントリを行ごとに返す（なければ None）
+
+        最初にヘッダー（type=header）、続いてページ（type=page）、最後にサマリー（type=summary）。
+        """
+        path = self.cache.get_path(pdf_hash)
+        if path is None:
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+        except (OSError, ValueError):
+            header = None
+        if not header or header.get("version") != PDF_CACHE_VERSION:
+            self.cache.delete(pdf_hash)
+            return None
+
+        def read_lines():
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+        return read_lines()
+
+    def writer(self, pdf_hash: str) -> "PDFCacheWriter":
+        return PDFCacheWriter(self.cache, pdf_hash)
+
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats()
+
+
+class PDFCacheWriter:
+    """キャッシュエントリをページ単位で書き込む
+
+    使用例:
+        with cache.writer(pdf_hash) as writer:
+            writer.write_header(engine="pdfplumber", scores=scores, num_pages=n)
+            for page in pages:
+                writer.write_page(page_number, text, engine, quality)
+            writer.write_summary(fallback_pages=[...], sections=[...])
+
+    with ブロックが例外（ジェネレーターの中断を含む）で終わった場合と discard() した場合は保存しない。
+    """
+
+    def __init__(self, cache: DiskLRUCache, pdf_hash: str):
+        self._context = cache.writer(pdf_hash)
+        self._file = None
+
+    def __enter__(self) -> "PDFCacheWriter":
+        self._file = self._context.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._context.__exit__(exc_type, exc, tb)
+
+    def discard(self) -> None:
+        """書き込んだ内容を保存せずに破棄（with ブロックの外で開いた場合に使う）"""
+        reason = RuntimeError("discarded")
+        self._context.__exit__(type(reason), reason, None)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def write_header(self, engine: str, scores: Dict[str, float], num_pages: int) -> None:
+        self._write({
+            "type": "header",
+            "version": PDF_CACHE_VERSION,
+            "engine": engine,
+            "scores": scores,
+            "num_pages": num_pages,
+            "created_at": datetime.now().isoformat()
+        })
+
+    def write_page(self, page_number: int, text: str, engine: str, quality: float) -> None:
+        self._write({
+            "type": "page",
+            "page_number": page_number,
+            "text": text,
+            "engine": engine,
+            "quality": quality
+        })
+
+    def write_summary(self, fallback_pages: List[int], sections: List[Dict[str, Any]]) -> None:
+        self._write({"type": "summary", "fallback_pages": fallback_pages, "sections": sections})
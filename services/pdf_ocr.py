@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+画像ベースのPDFページのOCR
+テキストレイヤーのないページだけを画像化し、Tesseract（jpn+eng）でプロセスプールを使って並列に読み取る
+
+結果はページの内容（コンテンツストリームと画像データ）のSHA-256をキーにキャッシュするため、
+抽出が途中で中断された場合や、同じスキャンページを含む別のPDFでは読み取りを省略できる。
+
+設定（環境変数）:
+    PDF_OCR_ENABLED: false で無効化（既定: true）
+    PDF_OCR_LANG: Tesseractの言語（既定: jpn+eng）
+    PDF_OCR_DPI: 画像化の解像度（既定: 300）
+    PDF_OCR_WORKERS: ワーカープロセス数（既定: CPUコア数）
+    PDF_OCR_CACHE_MAX_MB: キャッシュの上限（既定: 200MB）
+"""
+
+import hashlib
+import itertools
+import os
+from collections import deque
+from dataclasses import replace
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Deque, Dict, Iterator, Optional, Set, Tuple
+
+from services.disk_cache import DiskLRUCache
+from services.process_pool import SharedFile, create_process_pool, open_shared_file
+
+# OCRライブラリのインポート（オプション）
+try:
+    import pytesseract
+    PYTESSERACT_AVAILABLE = True
+except ImportError:
+    pytesseract = None
+    PYTESSERACT_AVAILABLE = False
+
+try:
+    from pdf2image import convert_from_bytes, convert_from_path
+    PDF2IMAGE_AVAILABLE = True
+except ImportError:
+    convert_from_bytes = None
+    convert_from_path = None
+    PDF2IMAGE_AVAILABLE = False
+
+# OCR結果として扱うエンジン名（PageText.engine）
+OCR_ENGINE = "ocr"
+# OCRワーカープロセスの上限（ページ画像を展開するため1プロセスあたりのメモリが大きい）
+MAX_OCR_WORKERS = 4
+
+
+def is_ocr_enabled() -> bool:
+    """PDF_OCR_ENABLED=false で無効化"""
+    return os.getenv("PDF_OCR_ENABLED", "true").lower() not in ("false", "0", "no")
+
+
+@lru_cache(maxsize=1)
+def is_ocr_available() -> bool:
+    """pytesseract と Tesseract本体が使えるか"""
+    if not PYTESSERACT_AVAILABLE:
+        return False
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception as e:
+        print(f"WARN: Tesseractが見つからないためOCRを使用できません: {e}")
+        return False
+
+
+@lru_cache(maxsize=1)
+def get_ocr_lang() -> str:
+    """使用する言語（インストールされていない言語は除く）"""
+    requested = os.getenv("PDF_OCR_LANG", "jpn+eng")
+    try:
+        installed = set(pytesseract.get_languages(config=""))
+    except Exception:
+        return requested
+    langs = [lang for lang in requested.split("+") if lang in installed]
+    if len(langs) < len(requested.split("+")):
+        print(f"WARN: Tesseractの言語データが不足しています（要求: {requested}, 利用可能: {sorted(installed)}）")
+    return "+".join(langs) or "eng"
+
+
+def get_ocr_workers() -> int:
+    """OCRのプロセス数（PDF_OCR_WORKERS、既定はCPU数。いずれも MAX_OCR_WORKERS まで）"""
+    requested = int(os.getenv("PDF_OCR_WORKERS", "0")) or os.cpu_count() or 1
+    return max(1, min(requested, MAX_OCR_WORKERS))
+
+
+def compute_page_hash(reader, page_number: int) -> Optional[str]:
+    """ページの内容のハッシュ（コンテンツストリーム + 画像データ）
+
+    Args:
+        reader: PyPDF2.PdfReader
+        page_number: 0始まりのページ番号
+
+    Returns:
+        SHA-256（取得できない場合は None）
+    """
+    try:
+        page = reader.pages[page_number]
+        digest = hashlib.sha256()
+        contents = page.get_contents()
+        if contents is not None:
+            digest.update(contents.get_data())
+        xobjects = page.get("/Resources", {}).get("/XObject", {})
+        for name in sorted(xobjects):
+            # 画像は復号せず、埋め込まれたままのデータをハッシュする
+            digest.update(getattr(xobjects[name].get_object(), "_data", b""))
+        return digest.hexdigest()
+    except Exception as e:
+        print(f"WARN: ページ {page_number + 1} のハッシュ計算に失敗: {e}")
+        return None
+
+
+def _render_page(
+    documents: Dict[str, object],
+    file_bytes,
+    page_number: int,
+    dpi: int,
+    file_path: Optional[str] = None
+):
+    """ページを画像化（pdfplumber で失敗した場合は pdf2image。file_path があればファイルから読ませる）"""
+    import pdfplumber
+    from services.pdf_processor import open_pdf_stream
+
+    try:
+        if "pdfplumber" not in documents:
+            documents["pdfplumber"] = pdfplumber.open(open_pdf_stream(file_bytes))
+        return documents["pdfplumber"].pages[page_number].to_image(resolution=dpi).original
+    except Exception:
+        if not PDF2IMAGE_AVAILABLE:
+            raise
+        if file_path is not None:
+            images = convert_from_path(file_path, dpi=dpi, first_page=page_number + 1, last_page=page_number + 1)
+            return images[0]
+        images = convert_from_bytes(bytes(file_bytes), dpi=dpi, first_page=page_number + 1, last_page=page_number + 1)
+        return images[0]
+
+
+def ocr_page(
+    documents: Dict[str, object],
+    file_bytes,
+    page_number: int,
+    dpi: int,
+    lang: str,
+    file_path: Optional[str] = None
+) -> str:
+    """1ページを画像化してOCR"""
+    try:
+        image = _render_page(documents, file_bytes, page_number, dpi, file_path)
+        return pytesseract.image_to_string(image.convert("L"), lang=lang).strip()
+    except Exception as e:
+        print(f"WARN: ページ {page_number + 1} のOCRに失敗: {e}")
+        return ""
+
+
+# ワーカープロセスが開いたPDF（トークン → (共有ファイルのパス, 読み取り専用の mmap)）
+# services.pdf_processor と同じく SharedFile のパスだけを受け取る
+_shared_ocr_data: Dict[int, Tuple[str, object]] = {}
+_shared_ocr_tokens = itertools.count(1)
+# ワーカーごとに開いた文書
+_worker_documents: Dict[int, Dict[str, object]] = {}
+
+
+def _init_ocr_worker(token: int, path: str) -> None:
+    # Tesseract内部のスレッドはプロセス数と競合するため1つに制限
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    _shared_ocr_data[token] = (path, open_shared_file(path))
+
+
+def _ocr_page_in_worker(token: int, page_number: int, dpi: int, lang: str) -> str:
+    documents = _worker_documents.setdefault(token, {})
+    path, file_bytes = _shared_ocr_data[token]
+    return ocr_page(documents, file_bytes, page_number, dpi, lang, file_path=path)
+
+
+class PageOCRStage:
+    """ページの流れの中でテキストのないページをOCRで補う
+
+    テキストのあるページはそのまま通し、空のページはプロセスプールに投入する。
+    ページ順は保ったまま、OCR待ちの間も後続ページの抽出とOCRの投入を続ける
+    （先読みは max_pending ページまで）。
+    """
+
+    def __init__(
+        self,
+        file_bytes,
+        workers: Optional[int] = None,
+        dpi: Optional[int] = None,
+        lang: Optional[str] = None,
+        cache: Optional[DiskLRUCache] = None,
+        max_pending: Optional[int] = None,
+        shared_file: Optional[SharedFile] = None
+    ):
+        """
+        Args:
+            shared_file: ワーカーに渡すPDFの共有ファイル（省略時はOCRを始めるときに作り、終了時に削除する）
+        """
+        self.file_bytes = file_bytes
+        self._owns_shared_file = shared_file is None
+        self.shared_file = shared_file or SharedFile(file_bytes, suffix=".pdf")
+        self.workers = workers or get_ocr_workers()
+        self.dpi = dpi or int(os.getenv("PDF_OCR_DPI", "300"))
+        self.lang = lang  # None の場合は最初のOCR時に決める
+        if cache is None:
+            max_bytes = int(float(os.getenv("PDF_OCR_CACHE_MAX_MB", "200")) * 1024 * 1024)
+            cache = DiskLRUCache("pdf_ocr", max_bytes=max_bytes)
+        self.cache = cache
+        self.max_pending = max_pending or self.workers * 4
+        self.stats = {"ocr_pages": 0, "cached_pages": 0, "empty_pages": 0}
+        # OCRを実行できなかった（Tesseractがない・失敗した）ページ番号。空のまま返すため再試行の対象
+        self.unresolved_pages: Set[int] = set()
+
+        self._reader = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._token = next(_shared_ocr_tokens)
+
+    def _page_hash(self, page_index: int) -> Optional[str]:
+        if self._reader is None:
+            import PyPDF2
+            from services.pdf_processor import open_pdf_stream
+            try:
+                self._reader = PyPDF2.PdfReader(open_pdf_stream(self.file_bytes))
+            except Exception as e:
+                print(f"WARN: ページハッシュの計算に失敗: {e}")
+                return None
+        return compute_page_hash(self._reader, page_index)
+
+    def _cache_key(self, page_hash: str) -> str:
+        return hashlib.sha256(f"{page_hash}:{self.lang}:{self.dpi}".encode()).hexdigest()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = create_process_pool(
+                self.workers,
+                initializer=_init_ocr_worker,
+                initargs=(self._token, self.shared_file.path)
+            )
+            print(f"INFO: OCRを開始します（{self.workers}プロセス, {self.lang}, {self.dpi}dpi）")
+        return self._executor
+
+    def process(self, pages: Iterator) -> Iterator:
+        """PageText の流れを受け取り、空のページをOCR結果で置き換えて返す"""
+        pending: Deque[Tuple[object, Optional[Future], Optional[str]]] = deque()
+        try:
+            for page in pages:
+                if page.text.strip():
+                    pending.append((page, None, None))
+                else:
+                    pending.append(self._submit(page))
+                # 先頭が確定していれば返す（先読みが上限を超えたら待つ）
+                while pending and (
+                    pending[0][1] is None or pending[0][1].done() or len(pending) > self.max_pending
+                ):
+                    yield self._resolve(pending.popleft())
+            while pending:
+                yield self._resolve(pending.popleft())
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._owns_shared_file:
+                self.shared_file.close()
+            if self.stats["ocr_pages"] or self.stats["cached_pages"]:
+                print(
+                    f"INFO: OCR完了: {self.stats['ocr_pages']}ページ読み取り, "
+                    f"{self.stats['cached_pages']}ページはキャッシュ, 読み取れず{self.stats['empty_pages']}ページ"
+                )
+
+    def _submit(self, page) -> Tuple[object, Optional[Future], Optional[str]]:
+        if not is_ocr_available():
+            self.unresolved_pages.add(page.page_number)
+            return page, None, None
+        if self.lang is None:
+            self.lang = get_ocr_lang()
+
+        page_index = page.page_number - 1
+        page_hash = self._page_hash(page_index)
+        if page_hash is not None:
+            cached = self.cache.get_json(self._cache_key(page_hash))
+            if cached and cached.get("text"):
+                self.stats["cached_pages"] += 1
+                return replace(page, text=cached["text"], engine=OCR_ENGINE), None, None
+
+        try:
+            executor = self._get_executor()
+        except OSError as e:
+            # 共有ファイルを書き出せない（ディスク不足など）
+            print(f"WARN: OCRを開始できません: {e}")
+            self.unresolved_pages.add(page.page_number)
+            return page, None, None
+        future = executor.submit(_ocr_page_in_worker, self._token, page_index, self.dpi, self.lang)
+        return page, future, page_hash
+
+    def _resolve(self, item: Tuple[object, Optional[Future], Optional[str]]):
+        page, future, page_hash = item
+        if future is None:
+            return page
+
+        try:
+            text = future.result()
+        except Exception as e:
+            print(f"WARN: ページ {page.page_number} のOCRに失敗: {e}")
+            self.unresolved_pages.add(page.page_number)
+            return page
+        if not text:
+            self.stats["empty_pages"] += 1
+            return page
+
+        self.stats["ocr_pages"] += 1
+        if page_hash is not None:
+            try:
+                self.cache.set_json(self._cache_key(page_hash), {
+                    "text": text,
+                    "lang": self.lang,
+                    "dpi": self.dpi,
+                    "created_at": datetime.now().isoformat()
+                })
+            except OSError as e:
+                print(f"WARN: OCR結果をキャッシュできません: {e}")
+        return replace(page, text=text, engine=OCR_ENGINE)
@@ -4,13 +4,180 @@ PDFからテキストを抽出し、問題生成用に処理する
 """
 
 import io
-import tempfile
+import itertools
+import mmap
 import os
-from typing import List, Dict, Optional, Tuple
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Dict, Iterator, Optional, Tuple, Union
 import PyPDF2
 import pdfplumber
 import streamlit as st
 
+from services.pdf_cache import PDFTextCache, compute_pdf_hash
+from services.pdf_ocr import OCR_ENGINE, PageOCRStage, is_ocr_available, is_ocr_enabled
+from services.process_pool import SharedFile, create_process_pool, open_shared_file
+from services.text_chunker import TextChunker, count_tokens, find_headings
+
+# 抽出エンジン
+PDF_ENGINES = ("pypdf2", "pdfplumber")
+# エンジン選択に使うサンプルページ数
+ENGINE_SAMPLE_PAGES = 5
+# これ未満のページ数ならプロセスプールを使わない（起動コストの方が大きい）
+PARALLEL_MIN_PAGES = 12
+# 抽出ワーカープロセスの上限
+MAX_EXTRACTION_WORKERS = 8
+
+# PDFデータ: bytes / アップロードバッファの memoryview / 大きなファイルの mmap
+PDFData = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+
+class _BufferStream(io.RawIOBase):
+    """メモリ上のPDFデータをコピーせずに読むための読み取り専用ストリーム"""
+    
+    def __init__(self, data: PDFData):
+        self._view = memoryview(data)
+        self._position = 0
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), len(self._view) - self._position)
+        if size <= 0:
+            return 0
+        buffer[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(0, offset)
+        return self._position
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def close(self) -> None:
+        self._view.release()
+        super().close()
+
+
+def open_pdf_stream(data: PDFData) -> io.BufferedReader:
+    """PDFデータをファイルとして開く（データは複製しない）"""
+    return io.BufferedReader(_BufferStream(data), buffer_size=64 * 1024)
+
+
+def get_upload_buffer(uploaded_file) -> PDFData:
+    """アップロードファイルのデータをコピーせずに参照する
+    
+    メモリ上のファイル（Streamlitの UploadedFile など）はバッファの memoryview を、
+    ディスクに書き出された SpooledTemporaryFile などは mmap を返す。
+    """
+    source = getattr(uploaded_file, "_file", uploaded_file)  # SpooledTemporaryFile の実体
+    if hasattr(source, "getbuffer"):
+        return source.getbuffer()
+    try:
+        return mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        uploaded_file.seek(0)
+        return uploaded_file.read()
+
+
+def release_upload_buffer(data: PDFData) -> None:
+    """get_upload_buffer で取得したバッファを解放"""
+    try:
+        if isinstance(data, memoryview):
+            data.release()
+        elif isinstance(data, mmap.mmap):
+            data.close()
+    except BufferError:
+        # PDFリーダーがまだ参照している場合はGCに任せる
+        pass
+
+
+def _has_pdf_header(data: PDFData) -> bool:
+    return bytes(data[:5]) == b'%PDF-'
+
+
+def _extract_page(documents: Dict[str, object], file_bytes: PDFData, engine: str, page_number: int) -> str:
+    """1ページのテキストを抽出（文書はエンジンごとに一度だけ開く）"""
+    try:
+        if engine not in documents:
+            if engine == "pypdf2":
+                documents[engine] = PyPDF2.PdfReader(open_pdf_stream(file_bytes))
+            else:
+                documents[engine] = pdfplumber.open(open_pdf_stream(file_bytes))
+        return documents[engine].pages[page_number].extract_text() or ""
+    except Exception as e:
+        print(f"WARN: ページ {page_number + 1} の抽出に失敗 ({engine}): {e}")
+        return ""
+
+
+def iter_extract_pages(
+    file_bytes: PDFData,
+    engine: str,
+    page_numbers: List[int],
+    fallback: bool = True
+) -> Iterator[Tuple[int, str, str]]:
+    """指定ページのテキストを順に抽出し (ページ番号, テキスト, 使用エンジン) を返す
+
+    fallback=True の場合、空になったページはもう一方のエンジンで再試行する。
+    """
+    other_engine = "pdfplumber" if engine == "pypdf2" else "pypdf2"
+    documents: Dict[str, object] = {}
+    try:
+        for page_number in page_numbers:
+            text = _extract_page(documents, file_bytes, engine, page_number)
+            used_engine = engine
+            if fallback and not text.strip():
+                fallback_text = _extract_page(documents, file_bytes, other_engine, page_number)
+                if fallback_text.strip():
+                    text, used_engine = fallback_text, other_engine
+            yield page_number, text, used_engine
+    finally:
+        plumber_document = documents.get("pdfplumber")
+        if plumber_document is not None:
+            plumber_document.close()
+
+
+def extract_pages(
+    file_bytes: PDFData,
+    engine: str,
+    page_numbers: List[int],
+    fallback: bool = True
+) -> List[Tuple[int, str, str]]:
+    """iter_extract_pages のリスト版"""
+    return list(iter_extract_pages(file_bytes, engine, page_numbers, fallback))
+
+
+# ワーカープロセスが開いたPDFデータ（トークン → 読み取り専用の mmap）
+_shared_pdf_data: Dict[int, PDFData] = {}
+_shared_pdf_tokens = itertools.count(1)
+
+
+def _init_page_worker(token: int, path: str) -> None:
+    """ワーカーの起動時に一度だけ共有ファイル（services.process_pool.SharedFile）を開く"""
+    _shared_pdf_data[token] = open_shared_file(path)
+
+
+def _extract_pages_in_worker(token: int, engine: str, page_numbers: List[int]) -> List[Tuple[int, str, str]]:
+    return extract_pages(_shared_pdf_data[token], engine, page_numbers)
+
+
+@dataclass
+class PageText:
+    """抽出されたページのテキスト"""
+    page_number: int  # 1始まり
+    text: str
+    engine: str
+
 
 class PDFProcessor:
     """PDF処理クラス"""
@@ -18,6 +185,7 @@ class PDFProcessor:
     def __init__(self):
         self.max_file_size = 50 * 1024 * 1024  # 50MB (Railway Hobby Plan対応)
         self.allowed_extensions = ['.pdf']
+        self.last_extraction: Dict[str, any] = {}  # 直近の extract_text_auto の詳細
     
     def validate_file(self, uploaded_file) -> Tuple[bool, str]:
         """アップロードファイルの検証"""
@@ -34,7 +202,7 @@ class PDFProcessor:
             return False, f"サポートされていないファイル形式です。PDF形式のみ対応しています"        
         return True, "OK"
     
-    def extract_text_pypdf2(self, file_bytes: bytes) -> str:
+    def extract_text_pypdf2(self, file_bytes: PDFData) -> str:
         """PyPDF2を使用してテキストを抽出"""
         try:
             if not file_bytes or len(file_bytes) < 10:
@@ -42,12 +210,11 @@ class PDFProcessor:
                 return ""
             
             # PDFヘッダーチェック
-            if not file_bytes.startswith(b'%PDF-'):
+            if not _has_pdf_header(file_bytes):
                 st.error("❌ 有効なPDFファイルではありません")
                 return ""
             
-            pdf_file = io.BytesIO(file_bytes)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            pdf_reader = PyPDF2.PdfReader(open_pdf_stream(file_bytes))
             
             # 基本的なPDF検証
             if not pdf_reader.pages:
@@ -59,28 +226,22 @@ class PDFProcessor:
                 st.error("❌ 暗号化されたPDFは対応していません")
                 return ""
             
-            text = ""
             num_pages = len(pdf_reader.pages)
             
-            # ページ数制限
             if num_pages > 100:
                 st.warning(f"⚠️ ページ数が多いPDFです ({num_pages}ページ)。処理に時間がかかる場合があります。")
-                # 最初の50ページのみ処理
-                pages_to_process = pdf_reader.pages[:50]
-                st.info("📄 最初の50ページのみ処理します")
-            else:
-                pages_to_process = pdf_reader.pages
             
-            for i, page in enumerate(pages_to_process):
+            page_texts = []
+            for i, page in enumerate(pdf_reader.pages):
                 try:
                     page_text = page.extract_text()
                     if page_text:
-                        text += page_text + "\n"
+                        page_texts.append(page_text + "\n")
                 except Exception as page_error:
                     st.warning(f"⚠️ ページ {i+1} の処理中にエラー: {page_error}")
                     continue
             
-            extracted_text = text.strip()
+            extracted_text = "".join(page_texts).strip()
             
             if not extracted_text:
                 st.error("❌ テキストを抽出できませんでした（画像ベースのPDFの可能性があります）")
@@ -91,31 +252,20 @@ class PDFProcessor:
         except Exception as e:
             st.error(f"❌ PyPDF2でのテキスト抽出に失敗: {e}")
             return ""
-    def extract_text_pdfplumber(self, file_bytes: bytes) -> str:
+    def extract_text_pdfplumber(self, file_bytes: PDFData) -> str:
         """pdfplumberを使用してテキストを抽出（より高精度）"""
-        tmp_file_path = None
         try:
             if not file_bytes or len(file_bytes) < 10:
                 st.error("❌ 無効なPDFデータです")
                 return ""
             
             # PDFヘッダーチェック
-            if not file_bytes.startswith(b'%PDF-'):
+            if not _has_pdf_header(file_bytes):
                 st.error("❌ 有効なPDFファイルではありません")
                 return ""
             
-            # 一時ファイル作成
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                tmp_file.write(file_bytes)
-                tmp_file_path = tmp_file.name
-            
-            # ファイルが正常に作成されたか確認
-            if not os.path.exists(tmp_file_path):
-                st.error("❌ 一時ファイルの作成に失敗しました")
-                return ""
-            
-            text = ""
-            with pdfplumber.open(tmp_file_path) as pdf:
+            # 一時ファイルを作らずメモリ上のデータを直接開く
+            with pdfplumber.open(open_pdf_stream(file_bytes)) as pdf:
                 # PDFの基本情報チェック
                 if not pdf.pages:
                     st.error("❌ PDFにページが見つかりません")
@@ -123,25 +273,20 @@ class PDFProcessor:
                 
                 num_pages = len(pdf.pages)
                 
-                # ページ数制限
                 if num_pages > 100:
                     st.warning(f"⚠️ ページ数が多いPDFです ({num_pages}ページ)。処理に時間がかかる場合があります。")
-                    # 最初の50ページのみ処理
-                    pages_to_process = pdf.pages[:50]
-                    st.info("📄 最初の50ページのみ処理します")
-                else:
-                    pages_to_process = pdf.pages
                 
-                for i, page in enumerate(pages_to_process):
+                page_texts = []
+                for i, page in enumerate(pdf.pages):
                     try:
                         page_text = page.extract_text()
                         if page_text:
-                            text += page_text + "\n"
+                            page_texts.append(page_text + "\n")
                     except Exception as page_error:
                         st.warning(f"⚠️ ページ {i+1} の処理中にエラー: {page_error}")
                         continue
             
-            extracted_text = text.strip()
+            extracted_text = "".join(page_texts).strip()
             
             if not extracted_text:
                 st.error("❌ テキストを抽出できませんでした（画像ベースのPDFの可能性があります）")
@@ -152,59 +297,318 @@ class PDFProcessor:
         except Exception as e:
             st.error(f"❌ pdfplumberでのテキスト抽出に失敗: {e}")
             return ""
-        finally:
-            # 一時ファイルの確実な削除
-            if tmp_file_path and os.path.exists(tmp_file_path):
-                try:
-                    os.unlink(tmp_file_path)
-                except Exception as cleanup_error:
-                    st.warning(f"⚠️ 一時ファイルの削除に失敗: {cleanup_error}")
     
-    def extract_text_auto(self, file_bytes: bytes) -> str:
-        """自動選択でテキストを抽出（複数方法を試行して最適な結果を選択）"""
-        results = {}
+    def extract_text_auto(self, file_bytes: PDFData) -> str:
+        """自動選択でテキストを抽出（全ページ）
+        
+        エンジンの選択と並列抽出は iter_pages を参照。抽出の詳細は self.last_extraction に保存する。
+        """
+        text = "".join(page.text + "\n" for page in self.iter_pages(file_bytes) if page.text).strip()
+        if not text and self.last_extraction:
+            if is_ocr_enabled() and not is_ocr_available():
+                st.error("❌ テキストを抽出できませんでした（画像ベースのPDFの可能性があります。OCRには pytesseract と Tesseract（jpn）が必要です）")
+            else:
+                st.error("❌ テキストを抽出できませんでした（画像ベースのPDFの可能性があります）")
+        return text
+    
+    def get_page_count(self, file_bytes: PDFData) -> int:
+        """PDFのページ数を取得（無効なPDFの場合は0）"""
+        return self._validate_pdf_bytes(file_bytes)
+    
+    def iter_pages(
+        self,
+        file_bytes: PDFData,
+        engine: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Iterator[PageText]:
+        """ページのテキストを抽出しながら順に返す（ページ数の上限なし）
+        
+        数ページのサンプルで両エンジンを評価し、勝った方のエンジンだけで残りのページを
+        プロセスプールで並列に抽出する。テキストが空になったページはもう一方のエンジンで再試行し、
+        それでも空のページ（スキャン画像など）はOCRで読み取る（services.pdf_ocr）。
+        先読みするページ数には上限があるため、文書全体のテキストを保持せずに後段へ流せる。
+        
+        エンジン自動選択時は結果をPDFのSHA-256で PDFTextCache に保存し、
+        同じPDFでは抽出を行わずキャッシュから返す。
+        """
+        self.last_extraction = {}
+        cache = PDFTextCache() if use_cache and engine is None and PDFTextCache.is_enabled() else None
+        pdf_hash = compute_pdf_hash(file_bytes) if cache else None
+        if cache:
+            entry = cache.iter_entry(pdf_hash)
+            if entry is not None:
+                yield from self._iter_cached_pages(entry, pdf_hash)
+                return
+        
+        num_pages = self._validate_pdf_bytes(file_bytes)
+        if not num_pages:
+            return
+        if num_pages > 100:
+            st.info(f"📄 {num_pages}ページを順次処理します")
+        
+        page_numbers = list(range(num_pages))
+        sample_pages: Dict[int, Tuple[str, str]] = {}
+        scores: Dict[str, float] = {}
+        if engine is None:
+            engine, scores, sample_pages = self._choose_engine(file_bytes, page_numbers)
+        
+        self.last_extraction = {
+            "engine": engine,
+            "scores": scores,
+            "num_pages": num_pages,
+            "processed_pages": 0,
+            "fallback_pages": [],
+            "ocr_pages": [],
+            "unreadable_pages": [],
+            "sections": [],
+            "cached": False,
+            "pdf_hash": pdf_hash
+        }
+        
+        pages = self._iter_extracted_pages(file_bytes, engine, page_numbers, sample_pages)
+        if cache is None:
+            yield from pages
+        else:
+            yield from self._iter_and_cache(pages, cache, pdf_hash)
+        
+        if self.last_extraction["fallback_pages"]:
+            print(f"INFO: もう一方のエンジンで補完したページ: {self.last_extraction['fallback_pages']}")
+        if self.last_extraction["ocr_pages"]:
+            print(f"INFO: OCRで読み取ったページ: {len(self.last_extraction['ocr_pages'])}ページ")
+    
+    def _iter_extracted_pages(
+        self,
+        file_bytes: PDFData,
+        engine: str,
+        page_numbers: List[int],
+        sample_pages: Dict[int, Tuple[str, str]]
+    ) -> Iterator[PageText]:
+        """サンプル済みのページと並列抽出したページをページ順に返す（テキストのないページはOCR）
+        
+        OCRが無効・使用できない・失敗したために空のままのページは last_extraction["unreadable_pages"] に記録する。
+        抽出とOCRのプロセスプールは同じ一時ファイル（SharedFile）からPDFを読む。
+        """
+        with SharedFile(file_bytes, suffix=".pdf") as shared_file:
+            pages = self._iter_text_layer(file_bytes, engine, page_numbers, sample_pages, shared_file)
+            ocr_stage = PageOCRStage(file_bytes, shared_file=shared_file) if is_ocr_enabled() else None
+            if ocr_stage is not None:
+                pages = ocr_stage.process(pages)
+            
+            for page in pages:
+                self.last_extraction["processed_pages"] += 1
+                if page.engine == OCR_ENGINE:
+                    self.last_extraction["ocr_pages"].append(page.page_number)
+                elif page.engine != engine:
+                    self.last_extraction["fallback_pages"].append(page.page_number)
+                if not page.text.strip() and (ocr_stage is None or page.page_number in ocr_stage.unresolved_pages):
+                    self.last_extraction["unreadable_pages"].append(page.page_number)
+                for offset, title in find_headings(page.text):
+                    self.last_extraction["sections"].append(
+                        {"page_number": page.page_number, "offset": offset, "title": title}
+                    )
+                yield page
+    
+    def _iter_text_layer(
+        self,
+        file_bytes: PDFData,
+        engine: str,
+        page_numbers: List[int],
+        sample_pages: Dict[int, Tuple[str, str]],
+        shared_file: SharedFile
+    ) -> Iterator[PageText]:
+        """テキストレイヤーから抽出したページをページ順に返す"""
+        remaining = [page_number for page_number in page_numbers if page_number not in sample_pages]
+        extracted = self._iter_pages_parallel(file_bytes, engine, remaining, shared_file)
+        next_extracted = next(extracted, None)
+        for page_number in page_numbers:
+            if page_number in sample_pages:
+                text, used_engine = sample_pages.pop(page_number)
+            else:
+                _, text, used_engine = next_extracted
+                next_extracted = next(extracted, None)
+            yield PageText(page_number + 1, text, used_engine)
+    
+    def _iter_and_cache(self, pages: Iterator[PageText], cache: PDFTextCache, pdf_hash: str) -> Iterator[PageText]:
+        """ページを返しながらキャッシュに書き込む（最後まで読まれた場合のみ保存）"""
+        writer = cache.writer(pdf_hash)
+        try:
+            writer.__enter__()
+            writer.write_header(self.last_extraction["engine"], self.last_extraction["scores"], self.last_extraction["num_pages"])
+        except OSError as e:
+            print(f"WARN: PDFキャッシュに書き込めません: {e}")
+            yield from pages
+            return
         
-        # PyPDF2で試行
+        write_error = None
         try:
-            pypdf2_text = self.extract_text_pypdf2(file_bytes)
-            results['pypdf2'] = {
-                'text': pypdf2_text,
-                'length': len(pypdf2_text),
-                'quality': self._assess_text_quality(pypdf2_text)
-            }
-        except Exception as e:
-            results['pypdf2'] = {'text': '', 'length': 0, 'quality': 0, 'error': str(e)}
+            for page in pages:
+                if write_error is None:
+                    try:
+                        writer.write_page(page.page_number, page.text, page.engine, self._assess_text_quality(page.text))
+                    except OSError as e:
+                        write_error = e
+                yield page
+            if write_error is None:
+                writer.write_summary(self.last_extraction["fallback_pages"], self.last_extraction["sections"])
+        except BaseException as e:
+            # 途中で中断された場合はエントリを破棄
+            writer.__exit__(type(e), e, e.__traceback__)
+            raise
         
-        # pdfplumberで試行
+        if write_error is not None:
+            print(f"WARN: PDFキャッシュへの書き込みに失敗しました: {write_error}")
+            writer.__exit__(type(write_error), write_error, write_error.__traceback__)
+            return
+        if self.last_extraction["unreadable_pages"]:
+            # OCRできるようになった後に読み直せるよう、空のページを含む結果は保存しない
+            print(f"INFO: OCRできなかったページがあるためキャッシュしません: {self.last_extraction['unreadable_pages'][:10]}")
+            writer.discard()
+            return
         try:
-            pdfplumber_text = self.extract_text_pdfplumber(file_bytes)
-            results['pdfplumber'] = {
-                'text': pdfplumber_text,
-                'length': len(pdfplumber_text),
-                'quality': self._assess_text_quality(pdfplumber_text)
-            }
+            writer.__exit__(None, None, None)
+            print(f"INFO: PDF抽出結果をキャッシュしました ({pdf_hash[:12]})")
+        except OSError as e:
+            print(f"WARN: PDFキャッシュの保存に失敗しました: {e}")
+    
+    def _iter_cached_pages(self, entry: Iterator[Dict], pdf_hash: str) -> Iterator[PageText]:
+        """キャッシュ済みのページを返す"""
+        for record in entry:
+            record_type = record.get("type")
+            if record_type == "header":
+                self.last_extraction = {
+                    "engine": record["engine"],
+                    "scores": record.get("scores", {}),
+                    "num_pages": record["num_pages"],
+                    "processed_pages": 0,
+                    "fallback_pages": [],
+                    "ocr_pages": [],
+                    "unreadable_pages": [],
+                    "sections": [],
+                    "cached": True,
+                    "pdf_hash": pdf_hash
+                }
+                print(f"INFO: PDF抽出結果をキャッシュから読み込みます ({pdf_hash[:12]}, {record['num_pages']}ページ)")
+            elif record_type == "page":
+                self.last_extraction["processed_pages"] += 1
+                if record["engine"] == OCR_ENGINE:
+                    self.last_extraction["ocr_pages"].append(record["page_number"])
+                yield PageText(record["page_number"], record["text"], record["engine"])
+            elif record_type == "summary":
+                self.last_extraction["fallback_pages"] = record.get("fallback_pages", [])
+                self.last_extraction["sections"] = record.get("sections", [])
+    
+    def _choose_engine(
+        self,
+        file_bytes: PDFData,
+        page_numbers: List[int]
+    ) -> Tuple[str, Dict[str, float], Dict[int, Tuple[str, str]]]:
+        """サンプルページで両エンジンを評価し、(エンジン, スコア, サンプルページの結果) を返す"""
+        sample = self._sample_pages(page_numbers)
+        sample_results = {engine: extract_pages(file_bytes, engine, sample, fallback=False) for engine in PDF_ENGINES}
+        scores = {
+            engine: self._score_text("\n".join(text for _, text, _ in results))
+            for engine, results in sample_results.items()
+        }
+        engine = max(PDF_ENGINES, key=lambda name: scores[name])
+        other_engine = "pdfplumber" if engine == "pypdf2" else "pypdf2"
+        print(f"INFO: PDF抽出エンジン: {engine} (サンプル{len(sample)}ページのスコア: {scores})")
+        
+        # サンプルページは評価時の結果を再利用（空ならもう一方の結果を使う）
+        other_texts = {page_number: text for page_number, text, _ in sample_results[other_engine]}
+        sample_pages = {}
+        for page_number, text, _ in sample_results[engine]:
+            if not text.strip() and other_texts.get(page_number, "").strip():
+                sample_pages[page_number] = (other_texts[page_number], other_engine)
+            else:
+                sample_pages[page_number] = (text, engine)
+        return engine, scores, sample_pages
+    
+    def _validate_pdf_bytes(self, file_bytes: PDFData) -> int:
+        """PDFデータを検証してページ数を返す（無効な場合は0）"""
+        if not file_bytes or len(file_bytes) < 10:
+            st.error("❌ 無効なPDFデータです")
+            return 0
+        
+        # PDFヘッダーチェック
+        if not _has_pdf_header(file_bytes):
+            st.error("❌ 有効なPDFファイルではありません")
+            return 0
+        
+        try:
+            pdf_reader = PyPDF2.PdfReader(open_pdf_stream(file_bytes))
+            if pdf_reader.is_encrypted:
+                st.error("❌ 暗号化されたPDFは対応していません")
+                return 0
+            num_pages = len(pdf_reader.pages)
         except Exception as e:
-            results['pdfplumber'] = {'text': '', 'length': 0, 'quality': 0, 'error': str(e)}
+            st.error(f"❌ PDFの読み込みに失敗: {e}")
+            return 0
         
-        # 最適な結果を選択
-        best_method = None
-        best_score = 0
+        if not num_pages:
+            st.error("❌ PDFにページが見つかりません")
+        return num_pages
+    
+    @staticmethod
+    def _sample_pages(page_numbers: List[int], sample_size: int = ENGINE_SAMPLE_PAGES) -> List[int]:
+        """文書全体から均等にサンプルページを選ぶ"""
+        if len(page_numbers) <= sample_size:
+            return list(page_numbers)
+        step = len(page_numbers) / sample_size
+        return sorted({page_numbers[int(i * step)] for i in range(sample_size)})
+    
+    def _score_text(self, text: str) -> float:
+        """抽出結果のスコア: 品質 * 0.7 + 長さ正規化 * 0.3"""
+        length_score = min(len(text) / 1000, 1.0)  # 1000文字で正規化
+        return round(self._assess_text_quality(text) * 0.7 + length_score * 0.3, 3)
+    
+    def _iter_pages_parallel(
+        self,
+        file_bytes: PDFData,
+        engine: str,
+        page_numbers: List[int],
+        shared_file: SharedFile
+    ) -> Iterator[Tuple[int, str, str]]:
+        """ページをプロセスプールで並列に抽出し、ページ順に返す
         
-        for method, result in results.items():
-            if 'error' not in result:
-                # スコア計算: 品質 * 0.7 + 長さ正規化 * 0.3
-                length_score = min(result['length'] / 1000, 1.0)  # 1000文字で正規化
-                total_score = result['quality'] * 0.7 + length_score * 0.3
-                
-                if total_score > best_score:
-                    best_score = total_score
-                    best_method = method
+        実行中のバッチはワーカー数の2倍までに抑え、消費された分だけ次のバッチを投入する。
+        ページ数が少なければ同じプロセスで処理する。
+        ワーカーは forkserver / spawn で起動し（services.process_pool）、
+        PDFデータは送らずに shared_file のパスだけを渡して各ワーカーが mmap する。
+        """
+        workers = min(os.cpu_count() or 1, MAX_EXTRACTION_WORKERS)
+        if len(page_numbers) < PARALLEL_MIN_PAGES or workers <= 1:
+            yield from iter_extract_pages(file_bytes, engine, page_numbers)
+            return
         
-        if best_method:
-            return results[best_method]['text']
-        else:
-            # 両方失敗した場合、エラーメッセージを含む空文字列を返す
-            return ""
+        # 最初のページを早く返せるよう、バッチは小さめにする
+        batch_size = max(1, min(8, -(-len(page_numbers) // (workers * 4))))
+        batches = iter([page_numbers[i:i + batch_size] for i in range(0, len(page_numbers), batch_size)])
+        
+        token = next(_shared_pdf_tokens)
+        yielded = 0
+        executor = None
+        try:
+            executor = create_process_pool(workers, initializer=_init_page_worker, initargs=(token, shared_file.path))
+            pending = deque()
+            for batch in batches:
+                pending.append(executor.submit(_extract_pages_in_worker, token, engine, batch))
+                if len(pending) >= workers * 2:
+                    break
+            
+            while pending:
+                batch_results = pending.popleft().result()
+                next_batch = next(batches, None)
+                if next_batch is not None:
+                    pending.append(executor.submit(_extract_pages_in_worker, token, engine, next_batch))
+                for result in batch_results:
+                    yield result
+                    yielded += 1
+        except Exception as e:
+            print(f"WARN: 並列抽出に失敗したため逐次処理に切り替えます: {e}")
+            yield from iter_extract_pages(file_bytes, engine, page_numbers[yielded:])
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
     
     def _assess_text_quality(self, text: str) -> float:
         """テキストの品質を評価（0.0-1.0）"""
@@ -235,18 +639,12 @@ class PDFProcessor:
         return min(quality_score, 1.0)
     
     def extract_text(self, uploaded_file) -> str:
-        """PDFからテキストを抽出（複数方法を試行）"""
-        file_bytes = uploaded_file.read()
-        
-        # まずpdfplumberで試行（より高精度）
-        text = self.extract_text_pdfplumber(file_bytes)
-        
-        # pdfplumberで失敗した場合、PyPDF2で試行
-        if not text or len(text.strip()) < 100:
-            st.warning("pdfplumberでの抽出が不十分です。PyPDF2で再試行します...")
-            text = self.extract_text_pypdf2(file_bytes)
-        
-        return text
+        """PDFからテキストを抽出（エンジンを自動選択）"""
+        file_bytes = get_upload_buffer(uploaded_file)
+        try:
+            return self.extract_text_auto(file_bytes)
+        finally:
+            release_upload_buffer(file_bytes)
     
     def preprocess_text(self, text: str) -> str:
         """テキストの前処理"""
@@ -269,30 +667,16 @@ class PDFProcessor:
         
         return '\n'.join(cleaned_lines)
     
-    def split_into_chunks(self, text: str, chunk_size: int = 3000) -> List[str]:
-        """長いテキストをチャンクに分割"""
-        if len(text) <= chunk_size:
-            return [text]
-        
-        chunks = []
-        words = text.split()
-        current_chunk = []
-        current_length = 0
-        
-        for word in words:
-            word_length = len(word) + 1  # +1 for space
-            if current_length + word_length > chunk_size and current_chunk:
-                chunks.append(' '.join(current_chunk))
-                current_chunk = [word]
-                current_length = word_length
-            else:
-                current_chunk.append(word)
-                current_length += word_length
-        
-        if current_chunk:
-            chunks.append(' '.join(current_chunk))
-        
-        return chunks
+    def split_into_chunks(
+        self,
+        text: str,
+        max_tokens: int = 2500,
+        model: str = "gpt-4o-mini",
+        overlap_tokens: int = 0
+    ) -> List[str]:
+        """長いテキストを見出し・文の境界でトークン数ベースのチャンクに分割"""
+        chunker = TextChunker(model=model, max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+        return chunker.split_text(text)
     
     def get_text_info(self, text: str) -> Dict[str, any]:
         """テキストの情報を取得"""
@@ -301,7 +685,8 @@ class PDFProcessor:
                 'char_count': 0,
                 'word_count': 0,
                 'line_count': 0,
-                'estimated_pages': 0
+                'estimated_pages': 0,
+                'token_count': 0
             }
         
         char_count = len(text)
@@ -313,7 +698,8 @@ class PDFProcessor:
             'char_count': char_count,
             'word_count': word_count,
             'line_count': line_count,
-            'estimated_pages': estimated_pages
+            'estimated_pages': estimated_pages,
+            'token_count': count_tokens(text)
         }
 
 
@@ -369,7 +755,7 @@ def create_pdf_upload_section():
                     with col1:
                         st.metric("文字数", f"{text_info['char_count']:,}")
                     with col2:
-                        st.metric("単語数", f"{text_info['word_count']:,}")
+                        st.metric("トークン数", f"{text_info['token_count']:,}")
                     with col3:
                         st.metric("行数", f"{text_info['line_count']:,}")
                     with col4:
@@ -17,8 +17,355 @@ class ExtractedQuestion:
     choices: List[Dict[str, any]]  # [{"content": str, "is_correct": bool}]
     explanation: str
     difficulty: str = "medium"
+
+
+# 行の判定に使う正規表現（モジュール読み込み時に一度だけコンパイル）
+# 全角の数字・英字・括弧は _HALFWIDTH で半角にしてから照合する（1文字ずつの変換なので位置は変わらない）
+_HALFWIDTH = str.maketrans(
+    "０１２３４５６７８９ＡＢＣＤＥＦＱ（），",
+    "0123456789ABCDEFQ(),"
+)
+
+# 問題の見出し: 問1 / 問題1 / 第1問 / Q1
+_HEADER_RE = re.compile(
+    r'^(?:問題?\s*(?P<mon>\d+)|第\s*(?P<dai>\d+)\s*問|Q\s*(?P<q>\d+))[、,.．:：)\s]*(?P<text>.*)$'
+)
+# 行頭の番号: 1. / 1．（問題番号にも選択肢にもなりうる）
+_NUMBERED_RE = re.compile(r'^(?P<number>\d{1,3})[.．](?!\d)\s*(?P<text>.*)$')
+# 選択肢: (1) / ① / ア. / A.
+_CHOICE_TYPES = ("number", "circle", "katakana", "alphabet")
+_CHOICE_RE = re.compile(
+    r'^(?:\((?P<number>[1-6])\)|(?P<circle>[①-⑥])|(?P<katakana>[ア-オ])[.．:：)\s]|(?P<alphabet>[A-F])[.．:：)\s])'
+    r'\s*(?P<text>.*)$'
+)
+# 1行に並んだ選択肢: (1) xx (2) yy / ① xx ② yy
+_INLINE_CHOICE_RES = {
+    "number": re.compile(r'\(([1-6])\)'),
+    "circle": re.compile(r'[①-⑥]'),
+}
+# 正解・解説の行
+_ANSWER_RE = re.compile(
+    r'^(?:【(?:正解|正答|解答|答え)】|\[(?:正解|正答|解答|答え)\]|(?:正解|正答|解答|答え)(?:\s*[：:]|\s|$))\s*(?P<text>.*)$'
+)
+_EXPLANATION_RE = re.compile(
+    r'^(?:【(?:解答解説|解説|説明)】|\[(?:解答解説|解説|説明)\]|(?:解答解説|解説|説明)(?:\s*[：:]|\s|$))\s*(?P<text>.*)$'
+)
+_INLINE_EXPLANATION_RE = re.compile(r'(?:【(?:解答解説|解説)】|(?:解答解説|解説)\s*[：:])\s*(?P<text>.+)$')
+# 正解の値: ア / A、C
+_ANSWER_LETTERS = r'([1-6ア-オA-F①-⑥](?:\s*[、・,と]\s*[1-6ア-オA-F①-⑥])*)(?![A-Za-z0-9])'
+_ANSWER_LETTERS_RE = re.compile(r'^' + _ANSWER_LETTERS)
+_ANSWER_VALUE_RE = re.compile(r'(?:正解|答え|解答|正答)(?:】|\s*[：:])\s*' + _ANSWER_LETTERS)
+_BRACKET_ANSWER_RE = re.compile(r'\[([1-6ア-オA-F①-⑥])\]|（([1-6ア-オA-F①-⑥])）')
+
+_CIRCLE_DIGITS = {'①': '1', '②': '2', '③': '3', '④': '4', '⑤': '5', '⑥': '6'}
+_FIRST_MARKERS = {'1', '①', 'ア', 'A'}
+_STEM_KEYWORDS = ('か。', '？', '?', 'どれか', '選べ', '選びなさい')
+
+# 見出しのない問題で問題文として使う直前の行数
+HEADERLESS_STEM_LINES = 3
+
+
+def _looks_like_stem(line: str) -> bool:
+    return len(line) > 10 and any(keyword in line for keyword in _STEM_KEYWORDS)
+
+
+def _join_wrapped(head: str, tail: str) -> str:
+    """PDFで折り返された行をつなぐ（英数字どうしの場合のみ空白を入れる）"""
+    if not head:
+        return tail
+    separator = " " if head[-1].isascii() and tail[:1].isascii() else ""
+    return head + separator + tail
+
+
+def _split_inline_choices(normalized: str, line: str) -> Tuple[str, List[Tuple[str, str, str]]]:
+    """1行に並んだ選択肢を分割（1から順に2つ以上並んでいる場合のみ）
+
+    Returns:
+        (選択肢より前の文字列, [(記号, 種類, 本文), ...])
+    """
+    for marker_type, pattern in _INLINE_CHOICE_RES.items():
+        matches = list(pattern.finditer(normalized))
+        if len(matches) < 2:
+            continue
+        markers = [m.group(1) if m.lastindex else m.group(0) for m in matches]
+        if [_CIRCLE_DIGITS.get(marker, marker) for marker in markers] != [str(i + 1) for i in range(len(markers))]:
+            continue
+        choices = []
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(line)
+            choices.append((markers[i], marker_type, line[match.end():end].strip()))
+        return line[:matches[0].start()].strip(), choices
+    return line, []
+
+
+def _parse_answer_letters(text: str) -> Optional[str]:
+    """正解の行の本文から正解の記号を取り出す（「ア」「A、C」など）"""
+    match = _ANSWER_LETTERS_RE.match(text.translate(_HALFWIDTH).strip().lstrip("([【「"))
+    return match.group(1) if match else None
+
+
+def _find_correct_answer(text: str) -> Optional[str]:
+    """本文中の「正解：ア」「[ア]」などから正解を特定"""
+    match = _ANSWER_VALUE_RE.search(text.translate(_HALFWIDTH))
+    if match:
+        return match.group(1).strip()
+
+    # 単一正解パターン: [ア] / （ア）
+    match = _BRACKET_ANSWER_RE.search(text)
+    if match:
+        return (match.group(1) or match.group(2)).translate(_HALFWIDTH)
+
+    return None
+
+
+def _is_correct_match(letter: str, letter_type: str, correct_answer: str) -> bool:
+    """選択肢と正解の一致判定"""
+
+    correct_answer = correct_answer.strip()
+
+    if letter_type == 'alphabet':
+        return correct_answer.upper() == letter.upper()
+    if letter_type == 'katakana':
+        return correct_answer == letter
+    if letter_type in ('number', 'number_dot'):
+        return correct_answer == letter or _CIRCLE_DIGITS.get(correct_answer) == letter
+    if letter_type == 'circle':
+        return correct_answer == letter or correct_answer == _CIRCLE_DIGITS.get(letter)
+    return False
+
+
+def _mark_correct_choices(choices: List[Dict], choice_letters: List[Tuple[str, str]], correct_answer: str) -> None:
+    """正解の選択肢をマーク（複数正解対応）"""
+
+    correct_answers = [
+        answer.strip() for answer in re.split(r'[、・,と]', correct_answer) if answer.strip()
+    ]
+    for correct in correct_answers:
+        for i, (letter, letter_type) in enumerate(choice_letters):
+            if _is_correct_match(letter, letter_type, correct):
+                choices[i]["is_correct"] = True
+                break
+
+
+class _QuestionDraft:
+    """組み立て中の問題"""
+
+    def __init__(self, title: Optional[str] = None):
+        self.title = title
+        self.state = "stem"  # stem → choices → answer / explanation
+        self.stem: List[str] = []
+        self.choices: List[List[str]] = []  # [記号, 種類, 本文]
+        self.answer: List[str] = []  # 正解の行の本文
+        self.explanation: List[str] = []
+        self.tail: List[str] = []  # 選択肢の後のラベルなしの行（正解の検索にのみ使う）
+
+
+class QuestionSegmenter:
+    """テキストを1回走査して問題を切り出す
+
+    各行を見出し・選択肢・正解・解説・本文のいずれかに分類し、その場で問題を組み立てる。
+    ページ単位で feed() を呼べば、PDF全体を1つの文字列にまとめずに処理できる。
+
+    使用例:
+        segmenter = QuestionSegmenter()
+        for page_text in pages:
+            segmenter.feed(page_text)
+        questions = segmenter.finish()
+    """
+
+    def __init__(self):
+        self.questions: List[ExtractedQuestion] = []
+        self._draft = _QuestionDraft()
+        self._untitled_count = 0
+
+    def feed(self, text: str) -> None:
+        for line in text.splitlines():
+            self.feed_line(line)
+
+    def feed_line(self, line: str) -> None:
+        line = line.strip()
+        if not line:
+            return
+        normalized = line.translate(_HALFWIDTH)
+        draft = self._draft
+
+        match = _HEADER_RE.match(normalized)
+        if match:
+            number = match.group("mon") or match.group("dai")
+            title = f"問{number}" if number else f"Q{match.group('q')}"
+            self._start(title, line[match.start("text"):])
+            return
+
+        match = _NUMBERED_RE.match(normalized)
+        if match:
+            number = int(match.group("number"))
+            text = line[match.start("text"):]
+            if self._expects_numbered_choice(number):
+                self._add_choice(str(number), "number_dot", text)
+            else:
+                self._start(f"問題{number}", text)
+            return
+
+        match = _EXPLANATION_RE.match(normalized)
+        if match:
+            draft.state = "explanation"
+            self._add_explanation(line[match.start("text"):])
+            return
+
+        match = _ANSWER_RE.match(normalized)
+        if match:
+            draft.answer.append(line[match.start("text"):])
+            inline = _INLINE_EXPLANATION_RE.search(line)
+            if inline:
+                draft.state = "explanation"
+                self._add_explanation(inline.group("text"))
+            else:
+                draft.state = "answer"
+            return
+
+        match = _CHOICE_RE.match(normalized)
+        if match:
+            marker_type = next(name for name in _CHOICE_TYPES if match.group(name))
+            if draft.state == "answer" and draft.tail and match.group(marker_type) in _FIRST_MARKERS:
+                # 正解の行の後、問題文らしい行に続いて選択肢が始まったら見出しのない次の問題
+                self._start_from_tail()
+                draft = self._draft
+        if match and draft.state in ("stem", "choices"):
+            inline = []
+            if marker_type in _INLINE_CHOICE_RES:
+                prefix, inline = _split_inline_choices(normalized, line)
+            if len(inline) < 2:
+                inline = [(match.group(marker_type), marker_type, line[match.start("text"):])]
+            for marker, inline_type, text in inline:
+                self._add_choice(marker, inline_type, text)
+            return
+
+        self._add_text(line, normalized)
+
+    def finish(self) -> List[ExtractedQuestion]:
+        """最後の問題を確定して、切り出した問題をすべて返す"""
+        self._close()
+        self._draft = _QuestionDraft()
+        return self.questions
+
+    def _start(self, title: Optional[str], text: str) -> None:
+        self._close()
+        self._draft = _QuestionDraft(title)
+        if text.strip():
+            self._add_text(text.strip(), text.strip().translate(_HALFWIDTH))
+
+    def _start_from_tail(self) -> None:
+        """選択肢の後に続いていた行を問題文として、見出しのない次の問題を始める"""
+        stem = self._draft.tail
+        self._draft.tail = []
+        self._start(None, "")
+        self._draft.stem = stem
     
-    
+    def _expects_numbered_choice(self, number: int) -> bool:
+        """「1.」形式の行を選択肢とみなすか（問題文の後で、番号が連続している場合）"""
+        draft = self._draft
+        if draft.state not in ("stem", "choices") or not draft.stem:
+            return False
+        if not draft.choices:
+            return number == 1
+        marker, marker_type, _ = draft.choices[-1]
+        if marker_type != "number_dot":
+            # 記述の列挙の後に「1.」から始まる選択肢
+            return number == 1 and len(draft.choices) >= 2 and not draft.tail
+        return number == int(marker) + 1
+
+    def _add_choice(self, marker: str, marker_type: str, text: str) -> None:
+        draft = self._draft
+        if draft.state == "choices" and len(draft.choices) >= 2 and marker in _FIRST_MARKERS:
+            if marker_type == draft.choices[-1][1]:
+                # 同じ記号が最初から始まり直したら、見出しのない次の問題
+                self._start_from_tail()
+                draft = self._draft
+            elif not draft.tail:
+                # 別の記号が続く場合、それまでの行は記述の列挙（ア〜エの記述 → (1)〜(4) の組み合わせなど）
+                draft.stem.extend(f"{row[0]} {row[2]}" for row in draft.choices)
+                draft.choices = []
+
+        draft.state = "choices"
+        draft.choices.append([marker, marker_type, text.strip()])
+
+    def _add_explanation(self, text: str) -> None:
+        if text.strip():
+            self._draft.explanation.append(text.strip())
+
+    def _add_text(self, line: str, normalized: str) -> None:
+        draft = self._draft
+        if draft.state == "stem":
+            prefix, inline = _split_inline_choices(normalized, line)
+            if inline:
+                if prefix:
+                    draft.stem.append(prefix)
+                for marker, marker_type, text in inline:
+                    self._add_choice(marker, marker_type, text)
+            else:
+                draft.stem.append(line)
+            return
+
+        if draft.state == "choices" and draft.choices and not draft.choices[-1][2]:
+            # 記号だけの行の次の行が選択肢の本文
+            draft.choices[-1][2] = line
+        elif draft.title is None and _looks_like_stem(line):
+            # 見出しのない文書では、問題文らしい行で次の問題に移る
+            self._start(None, line)
+        elif draft.state == "explanation":
+            draft.explanation.append(line)
+        else:
+            draft.tail.append(line)
+
+    def _close(self) -> None:
+        question = self._build(self._draft)
+        if question:
+            self.questions.append(question)
+
+    def _build(self, draft: _QuestionDraft) -> Optional[ExtractedQuestion]:
+        stem_lines = draft.stem if draft.title else draft.stem[-HEADERLESS_STEM_LINES:]
+        content = "\n".join(stem_lines).strip()
+        choice_rows = [row for row in draft.choices if row[2]]
+        if not content or len(choice_rows) < 2:
+            return None
+
+        choices = [{"content": text, "is_correct": False} for _, _, text in choice_rows]
+        choice_letters = [(marker, marker_type) for marker, marker_type, _ in choice_rows]
+
+        correct_answer = next(filter(None, map(_parse_answer_letters, draft.answer)), None)
+        if not correct_answer:
+            correct_answer = _find_correct_answer(" ".join(draft.stem + draft.tail + draft.explanation))
+        if correct_answer:
+            _mark_correct_choices(choices, choice_letters, correct_answer)
+        if not any(choice["is_correct"] for choice in choices):
+            # 正解が特定できない場合は最初の選択肢を正解にする
+            choices[0]["is_correct"] = True
+
+        explanation = ""
+        for line in draft.explanation:
+            explanation = _join_wrapped(explanation, line)
+
+        title = draft.title
+        if not title:
+            self._untitled_count += 1
+            title = f"問題 {self._untitled_count}"
+
+        return ExtractedQuestion(
+            title=title,
+            content=content,
+            choices=choices,
+            explanation=explanation,
+            difficulty="medium"
+        )
+
+
+def parse_questions(text: str) -> List[ExtractedQuestion]:
+    """テキストから問題を切り出す（1回の走査）"""
+    segmenter = QuestionSegmenter()
+    segmenter.feed(text)
+    return segmenter.finish()
+
+
 class PDFQuestionExtractor:
     """PDF問題抽出クラス"""
     
@@ -82,301 +429,16 @@ class PDFQuestionExtractor:
         return saved_question_ids
     
     def _extract_questions(self, text: str) -> List[ExtractedQuestion]:
-        """テキストから問題を抽出"""
-        
-        questions = []
+        """テキストから問題を抽出（見出し・選択肢・正解・解説を1回の走査で判定）"""
         
-        # 複数の抽出パターンを試行
-        patterns = [
-            self._extract_pattern_mixed,  # 混在パターン（新追加）
-            self._extract_pattern1,  # 問題番号形式（問1、問2、等）
-            self._extract_pattern2,  # Qxx形式（Q1、Q2、等）
-            self._extract_pattern3,  # 番号形式（1.、2.、等）
-            self._extract_pattern4,  # 全般的なパターン
-        ]
-        
-        for pattern_func in patterns:
-            try:
-                extracted = pattern_func(text)
-                if extracted:
-                    questions.extend(extracted)
-                    print(f"✅ パターン '{pattern_func.__name__}' で {len(extracted)} 個の問題を抽出")
-            except Exception as e:
-                print(f"⚠️ パターン '{pattern_func.__name__}' でエラー: {e}")
-                continue
+        questions = parse_questions(text)
         
-        # 重複を除去
+        # 同じ問題が問題編と解答編に出てくる場合などの重複を除去
         unique_questions = self._remove_duplicates(questions)
         print(f"📊 抽出結果: {len(questions)} 個 → 重複除去後 {len(unique_questions)} 個")
         
         return unique_questions
     
-    def _extract_pattern1(self, text: str) -> List[ExtractedQuestion]:
-        """問1、問2形式の問題を抽出"""
-        
-        questions = []
-        
-        # 問題の区切りパターン
-        question_pattern = r'問\s*(\d+)[.．、\s]*([^問]+?)(?=問\s*\d+|$)'
-        matches = re.findall(question_pattern, text, re.DOTALL | re.MULTILINE)
-        
-        for match in matches:
-            question_num, question_content = match
-            
-            try:
-                extracted = self._parse_question_content(question_content, f"問{question_num}")
-                if extracted:
-                    questions.append(extracted)
-            except Exception as e:
-                print(f"問{question_num}の解析エラー: {e}")
-                continue
-        
-        return questions
-    
-    def _extract_pattern2(self, text: str) -> List[ExtractedQuestion]:
-        """Q1、Q2形式の問題を抽出"""
-        
-        questions = []
-        
-        # Q形式のパターン
-        question_pattern = r'Q\s*(\d+)[.．\s]*([^Q]+?)(?=Q\s*\d+|$)'
-        matches = re.findall(question_pattern, text, re.DOTALL | re.MULTILINE)
-        
-        for match in matches:
-            question_num, question_content = match
-            
-            try:
-                extracted = self._parse_question_content(question_content, f"Q{question_num}")
-                if extracted:
-                    questions.append(extracted)
-            except Exception as e:
-                print(f"Q{question_num}の解析エラー: {e}")
-                continue
-        
-        return questions
-    
-    def _extract_pattern3(self, text: str) -> List[ExtractedQuestion]:
-        """1.、2.形式の問題を抽出"""
-        
-        questions = []
-        
-        # 番号形式のパターン
-        question_pattern = r'(\d+)[.．\s]+([^0-9]+?)(?=\d+[.．]|$)'
-        matches = re.findall(question_pattern, text, re.DOTALL | re.MULTILINE)
-        
-        for match in matches:
-            question_num, question_content = match
-            
-            # 短すぎる場合はスキップ
-            if len(question_content.strip()) < 50:
-                continue
-            
-            try:
-                extracted = self._parse_question_content(question_content, f"問題{question_num}")
-                if extracted:
-                    questions.append(extracted)
-            except Exception as e:
-                print(f"問題{question_num}の解析エラー: {e}")
-                continue
-        
-        return questions
-    
-    def _extract_pattern4(self, text: str) -> List[ExtractedQuestion]:
-        """一般的なパターンで問題を抽出"""
-        
-        questions = []
-        
-        # 選択肢パターンを含む段落を問題として抽出
-        # (1)(2)(3)(4) または ア、イ、ウ、エ または A、B、C、D パターン
-        choice_patterns = [
-            r'\([1-4]\)',  # (1)(2)(3)(4)
-            r'[ア-エ]',     # ア、イ、ウ、エ
-            r'[A-D]',      # A、B、C、D
-            r'[①-④]',      # ①②③④
-        ]
-        
-        for pattern in choice_patterns:
-            # このパターンの選択肢を含む段落を抽出
-            paragraphs = text.split('\n\n')
-            
-            for i, paragraph in enumerate(paragraphs):
-                if len(re.findall(pattern, paragraph)) >= 3:  # 3つ以上の選択肢がある
-                    try:
-                        extracted = self._parse_question_content(paragraph, f"問題{i+1}")
-                        if extracted and len(extracted.choices) >= 3:
-                            questions.append(extracted)
-                    except Exception as e:
-                        continue
-        
-        return questions
-    
-    def _parse_question_content(self, content: str, title: str) -> Optional[ExtractedQuestion]:
-        """問題内容を解析して構造化"""
-        
-        content = content.strip()
-        
-        # 問題文と選択肢を分離
-        question_text, choices, explanation = self._separate_question_parts(content)
-        
-        if not question_text or len(choices) < 2:
-            return None
-        
-        return ExtractedQuestion(
-            title=title,
-            content=question_text,
-            choices=choices,
-            explanation=explanation,
-            difficulty="medium"
-        )
-    
-    def _separate_question_parts(self, content: str) -> Tuple[str, List[Dict], str]:
-        """問題内容を問題文、選択肢、解説に分離"""
-        
-        # 選択肢のパターンを検索
-        choice_patterns = [
-            (r'\(([1-4])\)\s*([^\n\r\(]+)', 'number'),  # (1) 選択肢
-            (r'([ア-エ])[.．\s]*([^\n\r]+)', 'katakana'),  # ア. 選択肢
-            (r'([A-D])[.．\s]*([^\n\r]+)', 'alphabet'),   # A. 選択肢
-            (r'([①-④])\s*([^\n\r]+)', 'circle_number'),  # ① 選択肢
-        ]
-        
-        choices = []
-        question_text = content
-        explanation = ""
-        
-        for pattern, pattern_type in choice_patterns:
-            matches = re.findall(pattern, content)
-            if len(matches) >= 2:  # 2つ以上の選択肢が見つかった
-                choices = []
-                for match in matches:
-                    choice_text = match[1].strip()
-                    if choice_text:
-                        choices.append({
-                            "content": choice_text,
-                            "is_correct": False  # 初期値、後で正解を特定
-                        })
-                
-                # 問題文から選択肢部分を除去
-                choice_section_start = content.find(matches[0][0])
-                if choice_section_start > 0:
-                    question_text = content[:choice_section_start].strip()
-                
-                break
-        
-        # 正解を特定
-        if choices:
-            correct_answer = self._find_correct_answer(content)
-            if correct_answer:
-                self._mark_correct_choice(choices, correct_answer, pattern_type if 'pattern_type' in locals() else 'number')
-        
-        # 解説を抽出
-        explanation = self._extract_explanation(content)
-        
-        return question_text, choices, explanation
-    
-    def _find_correct_answer(self, content: str) -> Optional[str]:
-        """正解を特定（複数正解にも対応）"""
-        
-        # 複数正解パターン
-        multiple_correct_patterns = [
-            r'正解[：:]\s*([1-6ア-オA-F①-⑥、・,\s]+)',
-            r'答え[：:]\s*([1-6ア-オA-F①-⑥、・,\s]+)',
-            r'解答[：:]\s*([1-6ア-オA-F①-⑥、・,\s]+)',
-            r'正答[：:]\s*([1-6ア-オA-F①-⑥、・,\s]+)',
-        ]
-        
-        for pattern in multiple_correct_patterns:
-            match = re.search(pattern, content)
-            if match:
-                answer_text = match.group(1)
-                # 複数の正解が含まれているかチェック
-                if any(separator in answer_text for separator in ['、', '・', ',', 'と']):
-                    return answer_text  # 複数正解として返す
-                else:
-                    return answer_text.strip()  # 単一正解
-        
-        # 単一正解パターン（従来通り）
-        single_correct_patterns = [
-            r'\[([1-6ア-オA-F①-⑥])\]',
-            r'（([1-6ア-オA-F①-⑥])）',
-        ]
-        
-        for pattern in single_correct_patterns:
-            match = re.search(pattern, content)
-            if match:
-                return match.group(1)
-        
-        return None
-    
-    def _mark_correct_choice(self, choices: List[Dict], correct_answer: str, pattern_type: str):
-        """正解の選択肢をマーク（複数正解対応）"""
-        
-        # 複数正解の場合を処理
-        if any(separator in correct_answer for separator in ['、', '・', ',', 'と']):
-            # 複数正解を分割
-            separators = ['、', '・', ',', 'と']
-            correct_answers = [correct_answer]
-            
-            for sep in separators:
-                temp = []
-                for ans in correct_answers:
-                    temp.extend(ans.split(sep))
-                correct_answers = temp
-            
-            # 各正解をクリーンアップ
-            correct_answers = [ans.strip() for ans in correct_answers if ans.strip()]
-            
-            # 各正解について選択肢をマーク
-            for correct in correct_answers:
-                correct_index = self._get_choice_index(correct, pattern_type)
-                if correct_index is not None and 0 <= correct_index < len(choices):
-                    choices[correct_index]["is_correct"] = True
-        else:
-            # 単一正解の場合
-            correct_index = self._get_choice_index(correct_answer, pattern_type)
-            if correct_index is not None and 0 <= correct_index < len(choices):
-                choices[correct_index]["is_correct"] = True
-            else:
-                # 正解が特定できない場合は最初の選択肢を正解にする
-                if choices:
-                    choices[0]["is_correct"] = True
-    
-    def _get_choice_index(self, correct_answer: str, pattern_type: str) -> Optional[int]:
-        """正解文字から選択肢インデックスを取得"""
-        
-        if pattern_type == 'number':
-            try:
-                return int(correct_answer) - 1
-            except:
-                return None
-        elif pattern_type == 'katakana':
-            katakana_map = {'ア': 0, 'イ': 1, 'ウ': 2, 'エ': 3, 'オ': 4}
-            return katakana_map.get(correct_answer)
-        elif pattern_type == 'alphabet':
-            alphabet_map = {'A': 0, 'B': 1, 'C': 2, 'D': 3, 'E': 4, 'F': 5}
-            return alphabet_map.get(correct_answer.upper())
-        elif pattern_type == 'circle_number':
-            circle_map = {'①': 0, '②': 1, '③': 2, '④': 3, '⑤': 4, '⑥': 5}
-            return circle_map.get(correct_answer)
-        
-        return None
-    
-    def _extract_explanation(self, content: str) -> str:
-        """解説を抽出"""
-        
-        explanation_patterns = [
-            r'解説[：:\s]*([^問Q\n\r]+)',
-            r'説明[：:\s]*([^問Q\n\r]+)',
-            r'解答解説[：:\s]*([^問Q\n\r]+)',
-        ]
-        
-        for pattern in explanation_patterns:
-            match = re.search(pattern, content, re.DOTALL)
-            if match:
-                return match.group(1).strip()
-        
-        return ""
-    
     def _remove_duplicates(self, questions: List[ExtractedQuestion]) -> List[ExtractedQuestion]:
         """重複する問題を除去（改善版）"""
         
@@ -458,220 +520,133 @@ class PDFQuestionExtractor:
         except Exception as e:
             print(f"DB保存エラー: {e}")
             return None
-    
-    def _extract_pattern_mixed(self, text: str) -> List[ExtractedQuestion]:
-        """混在パターンで問題を抽出（PDFから抽出された複雑なテキスト用）"""
-        
-        questions = []
-        
-        # 選択肢を含む段落を検出してそれぞれを問題として処理
-        lines = text.split('\n')
-        current_question = []
-        question_count = 0
-        
-        # 選択肢のパターンを定義（より柔軟に）
-        choice_patterns = [
-            r'^[A-F][.．\s]',  # A. B. C. D. E. F.
-            r'^[ア-オ][.．\s]',  # ア. イ. ウ. エ. オ.
-            r'^\([1-6]\)',      # (1) (2) (3) (4) (5) (6)
-            r'^[①-⑥]',         # ① ② ③ ④ ⑤ ⑥
-        ]
-        
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line:
-                continue
-            
-            # 選択肢のパターンを検出
-            is_choice = any(re.match(pattern, line) for pattern in choice_patterns)
-            
-            if is_choice:
-                current_question.append(line)
-            else:
-                # 選択肢以外の行
-                if current_question:  # 既に選択肢が蓄積されている場合
-                    # 現在の問題を処理
-                    if len(current_question) >= 3:  # 3つ以上の選択肢がある
-                        question_text = self._find_question_text(lines, i - len(current_question) - 5, i - len(current_question))
-                        if question_text:
-                            try:
-                                # 解説用の後続行を拡張（正解・解説を含む可能性）
-                                explanation_candidates = lines[i:i+20]  # より多くの行を含める
-                                extracted = self._create_question_from_parts(
-                                    question_text, 
-                                    current_question, 
-                                    f"問題 {question_count + 1}",
-                                    explanation_candidates  
-                                )
-                                if extracted:
-                                    questions.append(extracted)
-                                    question_count += 1
-                            except Exception as e:
-                                print(f"問題解析エラー: {e}")
-                    
-                    current_question = []
-                else:
-                    # 新しい問題の開始の可能性
-                    if len(line) > 20 and ('か。' in line or '？' in line or 'どれか' in line):
-                        # 問題文らしい行を検出
-                        pass
-        
-        # 最後の問題を処理
-        if current_question and len(current_question) >= 3:
-            question_text = self._find_question_text(lines, len(lines) - len(current_question) - 5, len(lines) - len(current_question))
-            if question_text:
-                try:
-                    extracted = self._create_question_from_parts(
-                        question_text, 
-                        current_question, 
-                        f"問題 {question_count + 1}",
-                        []
-                    )
-                    if extracted:
-                        questions.append(extracted)
-                except Exception as e:
-                    print(f"最後の問題解析エラー: {e}")
-        
-        return questions
-    
-    def _find_question_text(self, lines: List[str], start_idx: int, end_idx: int) -> str:
-        """指定範囲から問題文を検索（解説も含む）"""
-        
-        start_idx = max(0, start_idx)
-        end_idx = min(len(lines), end_idx)
-        
-        question_candidates = []
-        
-        # 問題文候補を検索
-        for i in range(start_idx, end_idx):
-            line = lines[i].strip()
-            if len(line) > 20 and any(keyword in line for keyword in ['か。', '？', 'どれか', '正しい', '適切', '説明', '選べ']):
-                question_candidates.append(line)
-        
-        if question_candidates:
-            return question_candidates[-1]  # 最後（最も近い）候補を選択
-        
-        # 候補がない場合は、前の行から適当な長さの文を探す
-        for i in range(end_idx - 1, start_idx - 1, -1):
-            line = lines[i].strip()
-            if len(line) > 15:
-                return line
-        
-        return ""
-    
-    def _create_question_from_parts(self, question_text: str, choice_lines: List[str], title: str, explanation_lines: List[str]) -> Optional[ExtractedQuestion]:
-        """問題文、選択肢、解説から問題オブジェクトを作成"""
-        
-        if not question_text or len(choice_lines) < 2:
-            return None
-        
-        # 選択肢を解析
-        choices = []
-        choice_letters = []
-        
-        for line in choice_lines:
-            line = line.strip()
-            
-            # 選択肢のパターンマッチング
-            for pattern, letter_type in [
-                (r'^([A-F])[.．\s]+(.+)', 'alphabet'),
-                (r'^([ア-オ])[.．\s]+(.+)', 'katakana'),
-                (r'^\(([1-6])\)\s*(.+)', 'number'),
-                (r'^([①-⑥])\s*(.+)', 'circle'),
-            ]:
-                match = re.match(pattern, line)
-                if match:
-                    letter = match.group(1)
-                    content = match.group(2).strip()
-                    if content:
-                        choices.append({
-                            "content": content,
-                            "is_correct": False
-                        })
-                        choice_letters.append((letter, letter_type))
-                    break
-        
-        if len(choices) < 2:
-            return None
-        
-        # 解説を抽出
-        explanation = ""
-        explanation_text = ""
-        if explanation_lines:
-            explanation_text = ' '.join(line.strip() for line in explanation_lines[:10])  # より多くの行を確認
-            explanation = self._extract_explanation(explanation_text)
-        
-        # 正解を特定（解説部分も含めて検索）
-        all_text = question_text + ' ' + ' '.join(choice_lines) + ' ' + explanation_text
-        correct_answer = self._find_correct_answer(all_text)
-        
-        if correct_answer and choice_letters:
-            self._mark_correct_choice_advanced(choices, choice_letters, correct_answer)
-        else:
-            # 正解が特定できない場合でも、問題テキスト内に正解情報があるかチェック
-            question_correct = self._find_correct_answer(question_text)
-            if question_correct and choice_letters:
-                self._mark_correct_choice_advanced(choices, choice_letters, question_correct)
-            elif choices:
-                # それでも見つからない場合は最初の選択肢を正解にする
-                choices[0]["is_correct"] = True
-        
-        return ExtractedQuestion(
-            title=title,
-            content=question_text,
-            choices=choices,
-            explanation=explanation,
-            difficulty="medium"
+
+
+# 形式の異なる問題を並べたサンプル（test / ベンチマーク用）
+SAMPLE_CORPUS = """問1 次のうち、OSI参照モデルでトランスポート層に該当するプロトコルはどれか。
+ア. IP
+イ. TCP
+ウ. HTTP
+エ. Ethernet
+正解：イ
+解説：TCPはトランスポート層のプロトコルである。
+IPはネットワーク層に該当する。
+
+問2 関係データベースの正規化について正しい記述を2つ選べ。
+ア. 第1正規形では繰返し項目を排除する
+イ. 正規化すると必ず検索が速くなる
+ウ. 第3正規形では推移的関数従属を排除する
+エ. 正規化はデータ量を増やすために行う
+正解：ア、ウ
+
+Q3. Which HTTP status code means "Not Found"?
+A. 200
+B. 301
+C. 404
+D. 500
+答え: C
+
+1. 次の記述のうち、スタックの説明として適切なものはどれか。 (1) 先入れ先出し (2) 後入れ先出し (3) 優先度順 (4) ランダム
+[2]
+
+2. 次の記述ア〜ウのうち、正しいものの組み合わせはどれか。
+ア 二分探索の計算量はO(log n)である
+イ バブルソートの計算量はO(n)である
+ウ ハッシュ表の探索は平均O(1)である
+(1) ア・イ
+(2) ア・ウ
+(3) イ・ウ
+正答 (2)
+
+次のうち、公開鍵暗号方式はどれか。
+① AES
+② RSA
+③ DES
+④ RC4
+正解：②
+次のうち、ハッシュ関数はどれか。
+① SHA-256
+② RSA
+③ ECDSA
+解答：①
+"""
+
+
+def benchmark_extraction(texts: List[str], repeat: int = 1) -> Dict[str, float]:
+    """問題切り出しの精度の目安と処理速度を計測
+
+    Returns:
+        questions: 切り出した問題数
+        answered_ratio: 正解の記載を見つけられた問題の割合（最初の選択肢への既定値を除く）
+        explained_ratio: 解説を取り出せた問題の割合
+        chars_per_sec: 1秒あたりの処理文字数
+    """
+    import time
+
+    total_chars = sum(len(text) for text in texts) * repeat
+    started = time.perf_counter()
+    for _ in range(repeat):
+        results = [parse_questions(text) for text in texts]
+    elapsed = max(time.perf_counter() - started, 1e-9)
+
+    questions = [question for result in results for question in result]
+    answered = sum(
+        1 for question in questions
+        if not (question.choices[0]["is_correct"] and sum(c["is_correct"] for c in question.choices) == 1)
+        or question.explanation
+    )
+    return {
+        "questions": len(questions),
+        "answered_ratio": answered / len(questions) if questions else 0.0,
+        "explained_ratio": sum(1 for q in questions if q.explanation) / len(questions) if questions else 0.0,
+        "chars_per_sec": total_chars / elapsed
+    }
+
+
+def test_pdf_question_extractor():
+    """問題切り出しのテスト"""
+    print("=== PDF Question Extractor Test ===")
+
+    questions = parse_questions(SAMPLE_CORPUS)
+    for question in questions:
+        correct = [i for i, choice in enumerate(question.choices) if choice["is_correct"]]
+        print(f"{question.title}: 選択肢{len(question.choices)}個 正解{correct} 解説{len(question.explanation)}文字")
+
+    assert [q.title for q in questions] == ["問1", "問2", "Q3", "問題1", "問題2", "問題 1", "問題 2"], [q.title for q in questions]
+    correct_indices = [[i for i, c in enumerate(q.choices) if c["is_correct"]] for q in questions]
+    assert correct_indices == [[1], [0, 2], [2], [1], [1], [1], [0]], correct_indices
+    assert questions[0].explanation.startswith("TCPはトランスポート層") and "ネットワーク層" in questions[0].explanation
+    assert questions[3].choices[1]["content"] == "後入れ先出し"
+    assert "ア 二分探索" in questions[4].content and len(questions[4].choices) == 3
+    assert questions[6].content == "次のうち、ハッシュ関数はどれか。"
+
+    stats = benchmark_extraction([SAMPLE_CORPUS * 200])
+    print(f"ベンチマーク: {stats['questions']}問 {stats['chars_per_sec'] / 1_000_000:.2f}M文字/秒")
+    print("✅ PDF question extractor test completed")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="PDF抽出テキストからの問題切り出しベンチマーク")
+    parser.add_argument("files", nargs="*", help="PDFから抽出したテキストファイル（省略時はサンプル）")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if not args.files:
+        test_pdf_question_extractor()
+        return 0
+
+    for path in args.files:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        stats = benchmark_extraction([text], repeat=args.repeat)
+        print(
+            f"{path}: {stats['questions']}問 正解記載{stats['answered_ratio']:.0%} "
+            f"解説{stats['explained_ratio']:.0%} {stats['chars_per_sec'] / 1_000_000:.2f}M文字/秒"
         )
-    
-    def _mark_correct_choice_advanced(self, choices: List[Dict], choice_letters: List[Tuple[str, str]], correct_answer: str):
-        """高度な正解マーキング（複数正解対応）"""
-        
-        # 複数正解の場合を処理
-        if any(separator in correct_answer for separator in ['、', '・', ',', 'と']):
-            # 複数正解を分割
-            separators = ['、', '・', ',', 'と']
-            correct_answers = [correct_answer]
-            
-            for sep in separators:
-                temp = []
-                for ans in correct_answers:
-                    temp.extend(ans.split(sep))
-                correct_answers = temp
-            
-            # 各正解をクリーンアップ
-            correct_answers = [ans.strip() for ans in correct_answers if ans.strip()]
-            
-            # 各正解について選択肢をマーク
-            for correct in correct_answers:
-                for i, (letter, letter_type) in enumerate(choice_letters):
-                    if self._is_correct_match(letter, letter_type, correct) and i < len(choices):
-                        choices[i]["is_correct"] = True
-        else:
-            # 単一正解の場合
-            for i, (letter, letter_type) in enumerate(choice_letters):
-                if self._is_correct_match(letter, letter_type, correct_answer) and i < len(choices):
-                    choices[i]["is_correct"] = True
-                    break
-    
-    def _is_correct_match(self, letter: str, letter_type: str, correct_answer: str) -> bool:
-        """選択肢と正解の一致判定"""
-        
-        correct_answer = correct_answer.strip()
-        
-        if letter_type == 'alphabet' and correct_answer.upper() == letter.upper():
-            return True
-        elif letter_type == 'katakana' and correct_answer == letter:
-            return True
-        elif letter_type == 'number' and correct_answer == letter:
-            return True
-        elif letter_type == 'circle':
-            circle_map = {'①': '1', '②': '2', '③': '3', '④': '4', '⑤': '5', '⑥': '6'}
-            if correct_answer == circle_map.get(letter):
-                return True
-            # 逆マッピングも試す
-            reverse_circle_map = {'1': '①', '2': '②', '3': '③', '4': '④', '5': '⑤', '6': '⑥'}
-            if correct_answer == letter or reverse_circle_map.get(correct_answer) == letter:
-                return True
-        
-        return False
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
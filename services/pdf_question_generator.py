@@ -3,18 +3,35 @@ PDF問題生成サービス
 PDFテキストから複数選択問題を生成する
 """
 
-from typing import List, Dict, Optional
+from typing import Callable, Iterable, List, Dict, Optional
 import json
-import re
 from services.enhanced_openai_service import EnhancedOpenAIService
+from services.text_chunker import TextChunker, count_tokens, input_token_budget
+
+
+# 1チャンクあたりの目標トークン数（生成品質と呼び出し回数のバランス）
+DEFAULT_CHUNK_TOKENS = 2500
+# 問題1問あたりに見込む応答トークン数
+TOKENS_PER_GENERATED_QUESTION = 450
+# プロンプトの指示文部分のおおよそのトークン数
+GENERATION_PROMPT_OVERHEAD_TOKENS = 600
+# 総ページ数が分からない場合に1チャンクから生成する問題数
+STREAM_QUESTIONS_PER_CHUNK = 3
+# 取り込みジョブの種類（services.import_jobs）
+GENERATION_JOB_TYPE = "pdf_generation"
 
 
 class PDFQuestionGenerator:
     """PDF問題生成クラス"""
     
-    def __init__(self, session, model_name="gpt-4o-mini"):
+    def __init__(self, session, model_name=None):
         self.session = session
-        self.openai_service = EnhancedOpenAIService(model_name=model_name)
+        # model_name 省略時はモデルルーターが選択
+        self.openai_service = EnhancedOpenAIService(model_name=model_name, task="pdf_generation")
+        # 直近の取り込みジョブの情報（job_id, resumed, reused_chunks など）
+        self.last_job_info = None
+        # 直近のパイプライン実行のステージごとの指標
+        self.last_pipeline_metrics = None
     
     def generate_questions_from_pdf(
         self,
@@ -22,126 +39,307 @@ class PDFQuestionGenerator:
         num_questions: int = 5,
         difficulty: str = "medium",
         category: str = "PDF教材",
-        model: str = "gpt-4o-mini",
+        model: Optional[str] = None,
         include_explanation: bool = True,
         progress_callback=None,
         enable_duplicate_check: bool = True,
         similarity_threshold: float = 0.7,
         max_retry_attempts: int = 3,
-        allow_multiple_correct: bool = False
+        allow_multiple_correct: bool = False,
+        question_callback: Optional[Callable[[int], None]] = None,
+        max_workers: Optional[int] = None
     ) -> List[int]:
-        """PDFテキストから問題を生成"""
+        """PDFテキストから問題を生成
         
+        チャンク投入・LLM呼び出し（max_workers 並列）・検証と重複除外・DB一括保存を
+        パイプラインで並行して進める（services.generation_pipeline）。
+        各ステージの処理件数とスループットは progress_callback のメッセージと
+        self.last_pipeline_metrics で確認できる。
+        """
         if progress_callback:
             progress_callback("PDFテキストを分析中...", 0.1)
         
+        model = model or self.openai_service.model
+        
         # テキストをチャンクに分割
-        chunks = self._split_text_into_chunks(text, max_chunk_size=3000)
+        chunks = self._split_text_into_chunks(text, model=model)
+        
+        if not chunks:
+            print("WARN: 問題を生成できるテキストがありません")
+            return []
         
         if progress_callback:
             progress_callback(f"テキストを{len(chunks)}個のセクションに分割しました", 0.2)
         
-        generated_question_ids = []
-        questions_per_chunk = max(1, num_questions // len(chunks))
+        # 問題数を前のチャンクから順に均等に割り振る（チャンク数より少なければ後半は生成しない）
+        per_chunk, extra = divmod(num_questions, len(chunks))
+        tasks = [(chunk, per_chunk + (1 if i < extra else 0)) for i, chunk in enumerate(chunks)]
         
-        for i, chunk in enumerate(chunks):
-            if len(generated_question_ids) >= num_questions:
-                break
-            
-            if progress_callback:
-                progress = 0.2 + (0.7 * (i + 1) / len(chunks))
-                progress_callback(f"セクション {i+1}/{len(chunks)} から問題生成中...", progress)
-            
-            # このチャンクから生成する問題数を決定
-            remaining_questions = num_questions - len(generated_question_ids)
-            remaining_chunks = len(chunks) - i
-            current_questions = min(questions_per_chunk, remaining_questions, 
-                                   max(1, remaining_questions // remaining_chunks))
-            
-            try:
-                chunk_questions = self._generate_questions_from_chunk(
-                    chunk, current_questions, difficulty, category, model, include_explanation,
-                    enable_duplicate_check, similarity_threshold, max_retry_attempts, allow_multiple_correct
-                )
-                generated_question_ids.extend(chunk_questions)
-            except Exception as e:
-                print(f"チャンク{i+1}の問題生成でエラー: {e}")
-                continue
+        pipeline = self._create_pipeline(
+            dict(
+                difficulty=difficulty,
+                category=category,
+                model=model,
+                include_explanation=include_explanation,
+                enable_duplicate_check=enable_duplicate_check,
+                allow_multiple_correct=allow_multiple_correct
+            ),
+            max_workers
+        )
+        generated_question_ids = pipeline.run(
+            tasks, num_questions, progress_callback=progress_callback, question_callback=question_callback
+        )
+        self.last_pipeline_metrics = pipeline.metrics
         
         if progress_callback:
             progress_callback("問題生成完了！", 1.0)
         
         return generated_question_ids[:num_questions]  # 指定数に制限
     
-    def _split_text_into_chunks(self, text: str, max_chunk_size: int = 3000) -> List[str]:
-        """テキストを意味のあるチャンクに分割"""
-        
-        # セクション分割（見出しや段落で分割）
-        sections = self._split_by_sections(text)
-        
-        chunks = []
-        current_chunk = ""
-        
-        for section in sections:
-            # セクションが大きすぎる場合は文で分割
-            if len(section) > max_chunk_size:
-                sentences = self._split_by_sentences(section)
-                for sentence in sentences:
-                    if len(current_chunk) + len(sentence) > max_chunk_size and current_chunk:
-                        chunks.append(current_chunk.strip())
-                        current_chunk = sentence
-                    else:
-                        current_chunk += " " + sentence
-            else:
-                if len(current_chunk) + len(section) > max_chunk_size and current_chunk:
-                    chunks.append(current_chunk.strip())
-                    current_chunk = section
+    def generate_questions_from_pages(
+        self,
+        pages: Iterable[str],
+        num_questions: int = 5,
+        total_pages: Optional[int] = None,
+        difficulty: str = "medium",
+        category: str = "PDF教材",
+        model: Optional[str] = None,
+        include_explanation: bool = True,
+        progress_callback=None,
+        enable_duplicate_check: bool = True,
+        similarity_threshold: float = 0.7,
+        max_retry_attempts: int = 3,
+        allow_multiple_correct: bool = False,
+        question_callback: Optional[Callable[[int], None]] = None,
+        source_hash: Optional[str] = None,
+        source_name: Optional[str] = None,
+        max_workers: Optional[int] = None
+    ) -> List[int]:
+        """ページのテキストを読み込みながら問題を生成
+        
+        チャンクが確定するたびにパイプライン（services.generation_pipeline）へ送るため、
+        文書全体をメモリに載せず、後半のページを読み込む間にも前のチャンクの問題生成と保存が進む。
+        total_pages を指定すると読み込み済みページ数から全体のチャンク数を見積もり、
+        問題が文書全体に分散するよう各チャンクの問題数を決める。
+        
+        source_hash を指定すると取り込みジョブとしてチャンクごとの進捗をDBに記録し、
+        同じPDF・同じ条件で中断したジョブがあれば完了済みのチャンクを再利用して続きから生成する。
+        
+        Args:
+            pages: ページごとのテキスト（PDFProcessor.iter_pages など）
+            total_pages: 総ページ数（分かる場合）
+            question_callback: 問題が保存されるたびに問題IDを受け取るコールバック
+            source_hash: 取り込み元のハッシュ（compute_pdf_hash）
+            source_name: 取り込み元の表示名（ファイル名など）
+        """
+        model = model or self.openai_service.model
+        chunker = self._create_chunker(model)
+        generation_options = dict(
+            difficulty=difficulty,
+            category=category,
+            model=model,
+            include_explanation=include_explanation,
+            enable_duplicate_check=enable_duplicate_check,
+            similarity_threshold=similarity_threshold,
+            max_retry_attempts=max_retry_attempts,
+            allow_multiple_correct=allow_multiple_correct
+        )
+        
+        tracker = None
+        self.last_job_info = None
+        if source_hash:
+            from services.import_jobs import ImportJobTracker
+            tracker = ImportJobTracker.start(
+                self.session,
+                GENERATION_JOB_TYPE,
+                source_hash,
+                params=dict(generation_options, num_questions=num_questions, total_pages=total_pages),
+                source_name=source_name,
+                category=category,
+                model=model
+            )
+        
+        pages_read = 0
+        more_chunks = False
+        
+        def counted_pages():
+            nonlocal pages_read
+            for page in pages:
+                pages_read += 1
+                yield page
+        
+        def tasks():
+            # パイプラインのチャンク投入スレッドで実行される
+            nonlocal more_chunks
+            assigned = 0
+            for i, chunk in enumerate(chunker.chunk_stream(counted_pages())):
+                remaining_questions = num_questions - assigned
+                if remaining_questions <= 0:
+                    more_chunks = True
+                    return
+                if total_pages:
+                    # これまでのページ数あたりのチャンク数から全体を見積もり、累計の目標数に合わせる
+                    estimated_chunks = max(i + 1, round((i + 1) * total_pages / max(pages_read, 1)))
+                    target = -(-num_questions * (i + 1) // estimated_chunks)
+                    current_questions = min(remaining_questions, max(0, target - assigned))
                 else:
-                    current_chunk += "\n\n" + section
+                    current_questions = min(remaining_questions, STREAM_QUESTIONS_PER_CHUNK)
+                assigned += current_questions
+                yield chunk.text, current_questions
+        
+        if progress_callback:
+            progress_callback("PDFを読み込み中...", 0.05)
         
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        pipeline = self._create_pipeline(generation_options, max_workers)
+        hooks = {}
+        if tracker is not None:
+            hooks = self._tracker_hooks(
+                tracker, lambda index, text, count: tracker.chunk(index, text, count)
+            )
+        generated_question_ids = pipeline.run(
+            tasks(), num_questions,
+            progress_callback=progress_callback, question_callback=question_callback, **hooks
+        )
+        self.last_pipeline_metrics = pipeline.metrics
+        
+        if tracker is not None:
+            all_chunks_listed = pipeline.tasks_exhausted and not more_chunks
+            self._finish_job(tracker, all_chunks_listed, len(generated_question_ids) >= num_questions)
+        
+        if progress_callback:
+            progress_callback("問題生成完了！", 1.0)
         
-        return [chunk for chunk in chunks if len(chunk.strip()) > 100]
+        print(f"ストリーミング生成: {pages_read}ページから{len(generated_question_ids)}問を生成")
+        return generated_question_ids[:num_questions]
     
-    def _split_by_sections(self, text: str) -> List[str]:
-        """セクションで分割"""
-        # 見出しパターンを検出
-        section_patterns = [
-            r'\n\s*[第\d]+[章節条項]\s*[^\n]*\n',  # 第1章、第1節など
-            r'\n\s*\d+\.\s*[^\n]*\n',  # 1. タイトル
-            r'\n\s*[A-Z]+\.\s*[^\n]*\n',  # A. タイトル
-            r'\n\s*【[^】]+】\s*\n',  # 【タイトル】
-            r'\n\s*■[^\n]*\n',  # ■タイトル
-            r'\n\s*#+\s*[^\n]*\n'  # Markdown見出し
-        ]
-        
-        # まず、見出しで分割を試行
-        for pattern in section_patterns:
-            matches = list(re.finditer(pattern, text))
-            if len(matches) > 1:
-                sections = []
-                last_end = 0
-                for match in matches:
-                    if last_end < match.start():
-                        sections.append(text[last_end:match.start()].strip())
-                    last_end = match.end()
-                if last_end < len(text):
-                    sections.append(text[last_end:].strip())
-                return [s for s in sections if len(s.strip()) > 50]
-        
-        # 見出しが見つからない場合は段落で分割
-        paragraphs = text.split('\n\n')
-        return [p.strip() for p in paragraphs if len(p.strip()) > 50]
+    def resume_import_job(
+        self,
+        job_id: int,
+        progress_callback=None,
+        question_callback: Optional[Callable[[int], None]] = None
+    ) -> List[int]:
+        """保存済みのチャンクから中断したジョブを再開（元のPDFは不要）
+        
+        PDFを最後まで読み終えてチャンクの一覧がすべて保存されたジョブのみ対象。
+        それ以外のジョブは同じPDFを同じ条件で再度取り込むと続きから再開される。
+        """
+        from services.import_jobs import ImportJobTracker
+        
+        self.last_job_info = None
+        tracker = ImportJobTracker.resume(self.session, job_id)
+        if tracker is None or tracker.job.job_type != GENERATION_JOB_TYPE:
+            raise ValueError(f"再開できるジョブが見つかりません: #{job_id}")
+        if not tracker.job.chunks_complete:
+            raise ValueError("チャンクの一覧が保存されていないため、同じPDFを再度アップロードして再開してください")
+        
+        params = tracker.params
+        num_questions = params.pop("num_questions")
+        params.pop("total_pages", None)
+        
+        chunks = tracker.stored_chunks()
+        # 完了済みのチャンクも prepare で保存済みの問題を引き継ぐため、問題数は1以上にしておく
+        tasks = [(job_chunk.text, job_chunk.target_questions or STREAM_QUESTIONS_PER_CHUNK) for job_chunk in chunks]
+        pipeline = self._create_pipeline(params)
+        generated_question_ids = pipeline.run(
+            tasks, num_questions,
+            progress_callback=progress_callback, question_callback=question_callback,
+            **self._tracker_hooks(tracker, lambda index, text, count: chunks[index])
+        )
+        self.last_pipeline_metrics = pipeline.metrics
+        
+        self._finish_job(tracker, True, len(generated_question_ids) >= num_questions)
+        
+        if progress_callback:
+            progress_callback("問題生成完了！", 1.0)
+        return generated_question_ids[:num_questions]
+    
+    def _create_pipeline(self, generation_options: Dict, max_workers: Optional[int] = None):
+        """生成条件からパイプラインを作成（類似度の閾値・再試行回数はパイプラインでは使わない）"""
+        from services.generation_pipeline import QuestionGenerationPipeline
+        
+        return QuestionGenerationPipeline(
+            self,
+            options={
+                key: generation_options[key]
+                for key in ("difficulty", "category", "model", "include_explanation", "allow_multiple_correct")
+            },
+            llm_workers=max_workers,
+            enable_duplicate_check=generation_options.get("enable_duplicate_check", True)
+        )
+    
+    def _tracker_hooks(self, tracker, lookup: Callable) -> Dict[str, Callable]:
+        """取り込みジョブにチャンクごとの進捗を記録するパイプラインのフック
+        
+        lookup は (チャンク番号, テキスト, 問題数) からジョブのチャンクを返す。
+        完了済みのチャンクは保存済みの問題IDを再利用し、中断したチャンクは保存済みの問題を
+        引き継いで目標数に足りない分だけ生成する。1問も生成できなかったチャンクは失敗として記録し、
+        次回の再開時に再試行する。
+        """
+        def prepare(index: int, text: str, count: int):
+            job_chunk = lookup(index, text, count)
+            if tracker.is_completed(job_chunk):
+                return job_chunk.text, 0, job_chunk, tracker.reuse(job_chunk)
+            
+            saved_ids = tracker.question_ids(job_chunk)
+            remaining = (job_chunk.target_questions or STREAM_QUESTIONS_PER_CHUNK) - len(saved_ids)
+            tracker.begin(job_chunk)
+            if remaining <= 0:
+                tracker.complete(job_chunk)
+            return job_chunk.text, max(remaining, 0), job_chunk, saved_ids
+        
+        def on_chunk_done(job_chunk, saved_count: int, error: Optional[str]) -> None:
+            if error:
+                tracker.fail(job_chunk, error)
+            elif saved_count:
+                tracker.complete(job_chunk)
+            else:
+                tracker.fail(job_chunk, "問題を生成できませんでした")
+        
+        return {
+            "prepare": prepare,
+            "on_saved": tracker.record_question,
+            "on_chunk_done": on_chunk_done
+        }
+    
+    def _finish_job(self, tracker, all_chunks_listed: bool, target_reached: bool) -> None:
+        job = tracker.finish(all_chunks_listed, target_reached)
+        self.last_job_info = {
+            "job_id": job.id,
+            "status": job.status,
+            "resumed": tracker.resumed,
+            "reused_chunks": tracker.reused_chunks,
+            "failed_chunks": job.failed_chunks
+        }
     
-    def _split_by_sentences(self, text: str) -> List[str]:
-        """文で分割"""
-        # 日本語と英語の文末を検出
-        sentence_endings = r'[。！？\.\!\?]\s*'
-        sentences = re.split(sentence_endings, text)
-        return [s.strip() for s in sentences if len(s.strip()) > 10]
+    def _create_chunker(self, model: str = "gpt-4o-mini", max_chunk_tokens: int = DEFAULT_CHUNK_TOKENS) -> TextChunker:
+        """問題生成プロンプトに収まるトークン予算のチャンカーを作成"""
+        budget = input_token_budget(
+            model,
+            max_output_tokens=self._max_output_tokens(5),
+            prompt_overhead_tokens=GENERATION_PROMPT_OVERHEAD_TOKENS,
+            cap=max_chunk_tokens
+        )
+        return TextChunker(model=model, max_tokens=budget, overlap_tokens=budget // 20, min_chunk_tokens=50)
+    
+    def _split_text_into_chunks(
+        self,
+        text: str,
+        model: str = "gpt-4o-mini",
+        max_chunk_tokens: int = DEFAULT_CHUNK_TOKENS
+    ) -> List[str]:
+        """テキストを見出し・文の境界を保ったままトークン予算内のチャンクに分割"""
+        chunker = self._create_chunker(model, max_chunk_tokens)
+        chunks = chunker.chunk(text)
+        
+        print(f"テキスト分割: {count_tokens(text, model)}トークン → {len(chunks)}チャンク (上限{chunker.max_tokens}トークン)")
+        return [chunk.text for chunk in chunks]
+    
+    @staticmethod
+    def _max_output_tokens(num_questions: int) -> int:
+        """生成する問題数に応じた応答トークン数"""
+        return min(4096, 500 + TOKENS_PER_GENERATED_QUESTION * num_questions)
 
-    def _generate_questions_from_chunk(
+    def _request_questions(
         self,
         chunk: str,
         num_questions: int,
@@ -149,15 +347,19 @@ class PDFQuestionGenerator:
         category: str,
         model: str = "gpt-4o-mini",
         include_explanation: bool = True,
-        enable_duplicate_check: bool = True,
-        similarity_threshold: float = 0.7,
-        max_retry_attempts: int = 3,
-        allow_multiple_correct: bool = False
-    ) -> List[int]:
-        """チャンクから問題を生成"""
+        allow_multiple_correct: bool = False,
+        openai_service: Optional[EnhancedOpenAIService] = None
+    ) -> List[Dict]:
+        """チャンクから問題を生成するようAPIに依頼し、問題データのリストを返す（DBには保存しない）
+        
+        Args:
+            openai_service: 使用するサービス（省略時は model で初期化）。代替モデルへの切り替えで
+                model が書き換わるため、スレッド間では共有しない
+        """
         
         # 指定されたモデルでOpenAIサービスを初期化
-        openai_service = EnhancedOpenAIService(model_name=model)
+        if openai_service is None:
+            openai_service = EnhancedOpenAIService(model_name=model, task="pdf_generation")
         
         # 解説を含めるかどうかでプロンプトを調整
         explanation_instruction = "詳細な解説を含める" if include_explanation else "解説は不要"
@@ -203,10 +405,11 @@ JSONのみを出力し、他の文字は含めないでください。
 
         try:
             # OpenAI APIで問題生成
-            response = openai_service.generate_completion(
-                prompt=prompt,
-                max_tokens=2000,
-                temperature=0.7
+            response = openai_service.call_openai_api(
+                prompt,
+                max_tokens=self._max_output_tokens(num_questions),
+                temperature=0.7,
+                feature="pdf_generation"
             )
             
             # JSONパース
@@ -225,19 +428,7 @@ JSONのみを出力し、他の文字は含めないでください。
             print(f"APIレスポンス（最初の200文字）: {cleaned_response[:200]}...")
             
             questions_data = json.loads(cleaned_response)
-            
-            # 問題をDBに保存
-            question_ids = []
-            for q_data in questions_data.get('questions', []):
-                question_id = self._save_question_to_db(
-                    q_data, category, difficulty,
-                    enable_duplicate_check, True,  # enable_content_validation=True
-                    similarity_threshold, max_retry_attempts
-                )
-                if question_id:
-                    question_ids.append(question_id)
-            
-            return question_ids
+            return questions_data.get('questions', [])
             
         except json.JSONDecodeError as e:
             print(f"JSON解析エラー: {e}")
@@ -246,60 +437,4 @@ JSONのみを出力し、他の文字は含めないでください。
         except Exception as e:
             print(f"問題生成でエラーが発生しました: {e}")
             print(f"レスポンス: {response[:200] if response else 'None'}...")
-            return []
-
-    def _save_question_to_db(
-        self,
-        question_data: Dict,
-        category: str,
-        difficulty: str,
-        enable_duplicate_check: bool,
-        enable_content_validation: bool,
-        similarity_threshold: float,
-        max_retry_attempts: int
-    ) -> Optional[int]:
-        """問題をデータベースに保存"""
-        
-        try:
-            from database.operations import QuestionService, ChoiceService
-            
-            question_service = QuestionService(self.session)
-            choice_service = ChoiceService(self.session)
-              # 重複チェック
-            if enable_duplicate_check:
-                duplicate_check = question_service.check_duplicate_before_creation(
-                    title=question_data.get('title', '無題'),
-                    content=question_data['content'],
-                    category=category,
-                    similarity_threshold=similarity_threshold
-                )
-                if duplicate_check["is_duplicate"]:
-                    print(f"類似問題が既に存在するためスキップ: {question_data.get('title', '無題')} (類似度: {duplicate_check['highest_similarity']:.2f})")
-                    return None
-              # 問題を保存
-            question = question_service.create_question(
-                title=question_data.get('title', '無題'),
-                content=question_data['content'],
-                category=category,
-                difficulty=difficulty,
-                explanation=question_data.get('explanation', '')
-            )
-            
-            if not question:
-                return None
-            
-            question_id = question.id
-            
-            # 選択肢を保存
-            for order, choice in enumerate(question_data['choices']):
-                choice_service.create_choice(
-                    question_id=question_id,
-                    content=choice['text'],
-                    is_correct=choice['is_correct'],
-                    order_num=order + 1
-                )
-            return question_id
-        
-        except Exception as e:
-            print(f"DB保存エラー: {e}")
-            return None
\ No newline at end of file
+            return []
\ No newline at end of file
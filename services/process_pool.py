@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+プロセスプールの作成
+Streamlit のサーバーは複数のスレッドで動くため、fork でワーカーを起動すると
+他のスレッドが保持していたロック（ログ・DB接続・HTTPクライアントなど）が
+保持されたまま子プロセスに複製され、デッドロックすることがある。
+ワーカーは forkserver（使えない環境では spawn）で起動し、必要なデータは
+initializer や submit の引数で明示的に渡す（親プロセスのグローバル変数は引き継がれない）。
+
+forkserver のサーバープロセスにはワーカーが使うモジュールを先に読み込ませておき、
+プールを作るたびにワーカーが import し直す起動コストを省く。
+
+大きなデータ（PDFなど）は引数で送るとワーカーごとに複製されるため、SharedFile で
+一時ファイルに一度だけ書き出し、ワーカーには パスを渡して読み取り専用で mmap させる。
+"""
+
+import mmap
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+# forkserver のサーバープロセスで先に読み込むモジュール（ワーカー関数の定義元）
+FORKSERVER_PRELOAD = ["services.pdf_processor", "services.pdf_ocr", "services.past_question_extractor"]
+
+
+def get_process_context():
+    """fork を使わない起動方式のコンテキスト（forkserver、なければ spawn）"""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # サーバーの起動前にだけ有効（読み込みに失敗したモジュールはワーカーが import する）
+        context.set_forkserver_preload(FORKSERVER_PRELOAD)
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def create_process_pool(
+    max_workers: int,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: Tuple[Any, ...] = ()
+) -> ProcessPoolExecutor:
+    """forkserver / spawn で起動するプロセスプール
+
+    Args:
+        initializer: ワーカーの起動時に一度だけ呼ぶ関数（モジュールのトップレベルに定義すること）
+        initargs: initializer の引数（ワーカーごとに pickle して送られる）
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=get_process_context(),
+        initializer=initializer,
+        initargs=initargs
+    )
+
+
+class SharedFile:
+    """ワーカープロセスと共有する読み取り専用の一時ファイル
+
+    データは最初に path を参照したときに一度だけ書き出す（プールを使わなければ書き出さない）。
+    ワーカーは open_shared_file で mmap するため、ワーカー数に関係なく
+    メモリ上に複製は作られない（OSのページキャッシュを共有する）。
+    """
+
+    def __init__(self, data, suffix: str = ""):
+        self._data = data
+        self._suffix = suffix
+        self._path: Optional[str] = None
+
+    @property
+    def path(self) -> str:
+        if self._path is None:
+            f = tempfile.NamedTemporaryFile(prefix="shared-", suffix=self._suffix, delete=False)
+            try:
+                with f:
+                    f.write(self._data)  # バッファをそのまま書き出す（コピーを作らない）
+            except BaseException:
+                # 書きかけのファイルは残さない
+                os.unlink(f.name)
+                raise
+            self._path = f.name
+        return self._path
+
+    def close(self) -> None:
+        """一時ファイルを削除（mmap 済みのワーカーは削除後も読める）"""
+        if self._path is not None:
+            try:
+                os.unlink(self._path)
+            except OSError as e:
+                print(f"WARN: 一時ファイルを削除できません: {e}")
+            self._path = None
+
+    def __enter__(self) -> "SharedFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def open_shared_file(path: str) -> mmap.mmap:
+    """ワーカー側で SharedFile を読み取り専用で開く"""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
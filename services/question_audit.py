@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+問題バンク全体のAI品質監査
+全問題（または前回監査以降に変更された問題）を並列に検証し、
+問題文・選択肢のハッシュをキーに結果を question_audit テーブルへ保存する
+
+使用例:
+    python -m services.question_audit --workers 16
+"""
+
+import contextvars
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from database.connection import get_session_context
+from database.operations import QuestionService, ChoiceService, QuestionAuditService
+from services.enhanced_openai_service import EnhancedOpenAIService
+
+
+def compute_content_hash(question: Dict[str, Any], choices: List[Dict[str, Any]]) -> str:
+    """問題と選択肢の内容からハッシュを計算（内容が変わらなければ同じ値）"""
+    payload = {
+        "title": (question.get("title") or "").strip(),
+        "content": (question.get("content") or "").strip(),
+        "explanation": (question.get("explanation") or "").strip(),
+        "category": question.get("category") or "",
+        "difficulty": question.get("difficulty") or "",
+        "choices": [[(c.get("content") or "").strip(), bool(c.get("is_correct"))] for c in choices]
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class QuestionAuditJob:
+    """問題品質監査ジョブ
+
+    結果は1問ごとに保存されるため、中断しても再実行すれば
+    未監査・変更済みの問題だけが処理される。
+    """
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        max_workers: int = 8,
+        only_changed: bool = True,
+        category: Optional[str] = None,
+        limit: Optional[int] = None
+    ):
+        self.model = model
+        self.max_workers = max_workers
+        self.only_changed = only_changed
+        self.category = category
+        self.limit = limit
+
+        self._cancel_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.status: Dict[str, Any] = {
+            "state": "pending",  # pending, running, completed, cancelled, failed
+            "total": 0,
+            "skipped": 0,
+            "completed": 0,
+            "failed": 0,
+            "started_at": None,
+            "finished_at": None,
+            "error": None
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.status)
+
+    def _update_status(self, **fields) -> None:
+        with self._lock:
+            self.status.update(fields)
+
+    def _increment(self, key: str) -> None:
+        with self._lock:
+            self.status[key] += 1
+
+    def cancel(self) -> None:
+        """実行中のジョブを中断（処理中のリクエストは完了を待つ）"""
+        self._cancel_event.set()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start_background(self) -> "QuestionAuditJob":
+        """バックグラウンドスレッドで実行"""
+        self._thread = threading.Thread(target=self.run, daemon=True, name="question-audit")
+        self._thread.start()
+        return self
+
+    def _load_targets(self) -> List[Dict[str, Any]]:
+        """監査対象の問題を読み込み、未変更のものを除外"""
+        with get_session_context() as session:
+            question_service = QuestionService(session)
+            if self.category:
+                questions = question_service.get_questions_by_category(self.category)
+            else:
+                questions = question_service.get_all_questions()
+
+            choices_map = ChoiceService(session).get_choices_for_questions([q.id for q in questions])
+            latest_hashes = QuestionAuditService(session).get_latest_hashes() if self.only_changed else {}
+
+            targets = []
+            skipped = 0
+            for question in questions:
+                question_data = {
+                    "id": question.id,
+                    "title": question.title,
+                    "content": question.content,
+                    "category": question.category,
+                    "difficulty": question.difficulty,
+                    "explanation": question.explanation
+                }
+                choices_data = [
+                    {"content": c.content, "is_correct": c.is_correct}
+                    for c in choices_map.get(question.id, [])
+                ]
+                content_hash = compute_content_hash(question_data, choices_data)
+                if latest_hashes.get(question.id) == content_hash:
+                    skipped += 1
+                    continue
+                targets.append({
+                    "question": question_data,
+                    "choices": choices_data,
+                    "content_hash": content_hash
+                })
+
+        if self.limit:
+            targets = targets[:self.limit]
+        self._update_status(total=len(targets), skipped=skipped)
+        return targets
+
+    def _create_openai_service(self) -> EnhancedOpenAIService:
+        openai_service = EnhancedOpenAIService(model=self.model, task="verification")
+        # 一括処理ではテールレイテンシより費用を優先する
+        openai_service.hedge_requests = False
+        return openai_service
+
+    def _verify(self, worker_state: threading.local, target: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """1問を検証し (結果, 検証したモデル) を返す"""
+        if self._cancel_event.is_set():
+            return {"cancelled": True}, None
+        # 代替モデルへの切り替えはサービスの model を書き換えるため、サービスはワーカースレッドごとに持つ
+        openai_service = getattr(worker_state, "openai_service", None)
+        if openai_service is None:
+            openai_service = worker_state.openai_service = self._create_openai_service()
+        result = openai_service.verify_question_quality(target["question"], target["choices"])
+        return result, openai_service.model
+
+    def run(self, progress_callback: Optional[Callable[[str, float], None]] = None) -> Dict[str, Any]:
+        """監査を実行（呼び出し元スレッドで完了まで待つ）"""
+        self._update_status(state="running", started_at=datetime.now())
+        start_time = time.time()
+
+        try:
+            targets = self._load_targets()
+            status = self.get_status()
+            print(f"INFO: 監査対象 {status['total']}問 (未変更でスキップ {status['skipped']}問)")
+
+            if not targets:
+                self._update_status(state="completed", finished_at=datetime.now())
+                return self.get_status()
+
+            # レート制限は共有リミッターで行う
+            worker_state = threading.local()
+
+            with get_session_context() as session, ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                audit_service = QuestionAuditService(session)
+                # 利用記録のセッション・機能の帰属をワーカースレッドに引き継ぐ
+                futures = {
+                    executor.submit(contextvars.copy_context().run, self._verify, worker_state, target): target
+                    for target in targets
+                }
+
+                for future in as_completed(futures):
+                    target = futures[future]
+                    question_id = target["question"]["id"]
+                    try:
+                        result, model = future.result()
+                        if result.get("cancelled"):
+                            continue
+                        if result.get("is_valid") is None:
+                            # API エラー。保存しないので次回の実行で再試行される
+                            self._increment("failed")
+                            print(f"WARN: 問題{question_id}の監査に失敗: {result.get('issues')}")
+                        else:
+                            audit_service.save_audit(question_id, target["content_hash"], model, result)
+                            self._increment("completed")
+                    except Exception as e:
+                        self._increment("failed")
+                        print(f"ERROR: 問題{question_id}の監査でエラー: {e}")
+
+                    if progress_callback:
+                        status = self.get_status()
+                        done = status["completed"] + status["failed"]
+                        progress_callback(f"監査中... {done}/{status['total']}", done / status["total"])
+
+            final_state = "cancelled" if self._cancel_event.is_set() else "completed"
+            self._update_status(state=final_state, finished_at=datetime.now())
+
+        except Exception as e:
+            print(f"ERROR: 監査ジョブエラー: {e}")
+            self._update_status(state="failed", error=str(e), finished_at=datetime.now())
+
+        status = self.get_status()
+        print(
+            f"RESULT: 監査{status['state']}: 完了{status['completed']}問, 失敗{status['failed']}問, "
+            f"スキップ{status['skipped']}問 ({time.time() - start_time:.1f}秒)"
+        )
+        return status
+
+
+# Streamlitの再実行をまたいで実行中のジョブを参照するためのプロセス内レジストリ
+_active_job: Optional[QuestionAuditJob] = None
+_active_job_lock = threading.Lock()
+
+
+def start_audit_job(**options) -> QuestionAuditJob:
+    """監査ジョブをバックグラウンドで開始（実行中のジョブがあればそれを返す）"""
+    global _active_job
+    with _active_job_lock:
+        if _active_job is not None and _active_job.is_running():
+            return _active_job
+        _active_job = QuestionAuditJob(**options).start_background()
+        return _active_job
+
+
+def get_active_audit_job() -> Optional[QuestionAuditJob]:
+    """直近の監査ジョブを取得"""
+    return _active_job
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="問題バンクのAI品質監査")
+    parser.add_argument("--model", default=None, help="省略時はモデルルーターが選択")
+    parser.add_argument("--workers", type=int, default=8, help="並列数")
+    parser.add_argument("--all", action="store_true", help="未変更の問題も再監査する")
+    parser.add_argument("--category", default=None)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    job = QuestionAuditJob(
+        model=args.model,
+        max_workers=args.workers,
+        only_changed=not args.all,
+        category=args.category,
+        limit=args.limit
+    )
+    status = job.run(progress_callback=lambda message, progress: print(f"\r{message}", end="", flush=True))
+    print()
+    return 0 if status["state"] == "completed" else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -13,14 +13,14 @@ import time
 class EnhancedQuestionGenerator:
     """Enhanced service for generating and managing AI-generated questions"""
     
-    def __init__(self, session: Session, model: str = "gpt-3.5-turbo"):
+    def __init__(self, session: Session, model: Optional[str] = None):
         print(f"🔧 QuestionGenerator initializing with model: {model}")
         self.session = session
         self.question_service = QuestionService(session)
         self.choice_service = ChoiceService(session)
         try:
             print(f"🤖 Creating EnhancedOpenAIService with model: {model}")
-            self.openai_service = EnhancedOpenAIService(model=model)
+            self.openai_service = EnhancedOpenAIService(model=model, task="generation")
             print(f"✅ OpenAI service created successfully with model: {self.openai_service.model}")
         except Exception as e:
             print(f"Warning: OpenAI service initialization failed: {e}")
@@ -36,7 +36,8 @@ class EnhancedQuestionGenerator:
         enable_content_validation: bool = True,
         similarity_threshold: float = 0.8,
         max_retry_attempts: int = 3,
-        allow_multiple_correct: bool = False
+        allow_multiple_correct: bool = False,
+        partial_callback: Optional[callable] = None
     ) -> Optional[int]:
         """
         Generate a question using OpenAI and save to database with progress callback, duplicate checking and content validation
@@ -51,6 +52,7 @@ class EnhancedQuestionGenerator:
             similarity_threshold: 類似度閾値
             max_retry_attempts: 重複時の最大再試行回数
             allow_multiple_correct: 複数正解を許可するか
+            partial_callback: ストリーミング生成中のフィールド確定コールバック (field, value)
         
         Returns:
             Question ID if successful, None if failed
@@ -76,7 +78,9 @@ class EnhancedQuestionGenerator:
                 category=category,
                 difficulty=difficulty,
                 topic=topic,
-                allow_multiple_correct=allow_multiple_correct
+                allow_multiple_correct=allow_multiple_correct,
+                stream=partial_callback is not None,
+                partial_callback=partial_callback
             )
             
             if not generated_question:
@@ -231,7 +235,8 @@ class EnhancedQuestionGenerator:
         enable_content_validation: bool = True,
         similarity_threshold: float = 0.8,
         max_retry_attempts: int = 3,
-        allow_multiple_correct: bool = False
+        allow_multiple_correct: bool = False,
+        partial_callback: Optional[callable] = None
     ) -> List[int]:
         """
         Generate multiple questions and save to database with progress tracking, duplicate checking and content validation
@@ -272,7 +277,8 @@ class EnhancedQuestionGenerator:
                 enable_content_validation=enable_content_validation,
                 similarity_threshold=similarity_threshold,
                 max_retry_attempts=max_retry_attempts,
-                allow_multiple_correct=allow_multiple_correct
+                allow_multiple_correct=allow_multiple_correct,
+                partial_callback=partial_callback
             )
             
             if question_id:
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+OpenAI API呼び出しの共有レート制限
+プロセス内のすべてのスレッド・サービスで同じトークンバケットを共有し、
+並列実行時もリクエスト数/分・トークン数/分の上限を超えないようにする
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+
+class RateLimitTimeout(TimeoutError):
+    """レートリミッターの待機が制限時間を超えた（リクエストは送信していない）"""
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット
+
+    Args:
+        rate_per_minute: 1分あたりの補充量
+        capacity: バケットの最大量（省略時は rate_per_minute）
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.available = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        self.available = min(self.capacity, self.available + elapsed * self.rate_per_second)
+        self.updated_at = now
+
+    def acquire(self, amount: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """指定量が使えるまで待機して消費する（timeout 秒を超えたら False）"""
+        # バケット容量を超える要求は容量分として扱う（永久に待たないように）
+        amount = min(amount, self.capacity)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.available >= amount:
+                    self.available -= amount
+                    return True
+                wait = max(
+                    self.paused_until - now,
+                    (amount - self.available) / self.rate_per_second if self.rate_per_second else 1.0
+                )
+
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(min(max(wait, 0.01), 1.0))
+
+    def pause(self, seconds: float) -> None:
+        """429を受けた場合などに全スレッドの送信を一時停止"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class APIRateLimiter:
+    """リクエスト数とトークン数の2つのバケットを組み合わせた制限"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, estimated_tokens: int = 0, timeout: Optional[float] = None) -> bool:
+        """リクエスト数・トークン数の両方が使えるまで待機（timeout は2つの待機の合計）"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        if not self.requests.acquire(1, timeout):
+            return False
+        if estimated_tokens:
+            remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+            if not self.tokens.acquire(estimated_tokens, remaining):
+                return False
+        return True
+
+    def pause(self, seconds: float) -> None:
+        self.requests.pause(seconds)
+        self.tokens.pause(seconds)
+
+
+_limiters: Dict[str, APIRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str = "openai") -> APIRateLimiter:
+    """共有レートリミッターを取得
+
+    上限は環境変数 OPENAI_REQUESTS_PER_MINUTE / OPENAI_TOKENS_PER_MINUTE で設定する。
+    """
+    with _limiters_lock:
+        if name not in _limiters:
+            _limiters[name] = APIRateLimiter(
+                requests_per_minute=float(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500")),
+                tokens_per_minute=float(os.getenv("OPENAI_TOKENS_PER_MINUTE", "200000"))
+            )
+        return _limiters[name]
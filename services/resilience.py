@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+OpenAI呼び出しの耐障害化
+(エンドポイント, モデル) ごとのサーキットブレーカーと、
+p95レイテンシを超えたら2本目を送るヘッジリクエストを提供する
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+
+class CircuitOpenError(Exception):
+    """サーキットが開いているため呼び出しを行わなかった"""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} のサーキットが開いています（約{retry_after:.0f}秒後に再試行）")
+
+
+def is_availability_error(error: Exception) -> bool:
+    """サーキットの失敗として数えるエラーか（5xx・接続エラー・タイムアウト）
+
+    400系（認証・パラメータ不正・429）は呼び出し側の問題なので数えない。
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code >= 500
+    names = {cls.__name__ for cls in type(error).__mro__}
+    return bool(names & {"APIConnectionError", "APITimeoutError", "TimeoutError", "ConnectionError"})
+
+
+class CircuitBreaker:
+    """エラー率ベースのサーキットブレーカー
+
+    closed: 通常どおり呼び出す。直近 window_seconds のエラー率が
+            failure_threshold 以上（かつ min_requests 件以上）で open へ
+    open: open_seconds の間は呼び出さずに CircuitOpenError を送出
+    half_open: 試行呼び出しを half_open_max_calls 件だけ通し、
+               成功すれば closed、失敗すれば再び open へ
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: float = 0.5,
+        min_requests: int = 5,
+        window_seconds: float = 60.0,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._results: Deque[Tuple[float, bool]] = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._update_state(time.monotonic())
+            return self._state
+
+    def error_rate(self) -> Optional[float]:
+        """直近 window_seconds のエラー率（記録がなければ None）"""
+        with self._lock:
+            self._update_state(time.monotonic())
+            if not self._results:
+                return None
+            return sum(1 for _, ok in self._results if not ok) / len(self._results)
+
+    def _update_state(self, now: float) -> None:
+        if self._state == self.OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+        while self._results and now - self._results[0][0] > self.window_seconds:
+            self._results.popleft()
+
+    def _open(self, now: float) -> None:
+        self._state = self.OPEN
+        self._opened_at = now
+        self._results.clear()
+        print(f"WARN: サーキットを開きました: {self.name} ({self.open_seconds:.0f}秒間は呼び出しを停止)")
+
+    def before_call(self) -> None:
+        """呼び出し可能か確認（不可なら CircuitOpenError）"""
+        with self._lock:
+            now = time.monotonic()
+            self._update_state(now)
+            if self._state == self.OPEN:
+                raise CircuitOpenError(self.name, self.open_seconds - (now - self._opened_at))
+            if self._state == self.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    raise CircuitOpenError(self.name, 1.0)
+                self._half_open_calls += 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.HALF_OPEN:
+                print(f"INFO: サーキットを閉じました: {self.name}")
+                self._state = self.CLOSED
+                self._results.clear()
+            self._results.append((now, True))
+            self._update_state(now)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.HALF_OPEN:
+                self._open(now)
+                return
+            self._results.append((now, False))
+            self._update_state(now)
+            failures = sum(1 for _, ok in self._results if not ok)
+            if len(self._results) >= self.min_requests and failures / len(self._results) >= self.failure_threshold:
+                self._open(now)
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """ブレーカー経由で関数を呼び出す"""
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if is_availability_error(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+
+class LatencyTracker:
+    """直近の成功レイテンシからパーセンタイルを計算"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float = 0.95) -> Optional[float]:
+        """サンプルが min_samples 未満なら None"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_trackers: Dict[Tuple[str, str], LatencyTracker] = {}
+_rate_limited_until: Dict[Tuple[str, str], float] = {}
+_registry_lock = threading.Lock()
+
+# ヘッジ用のリクエストを実行するスレッドプール（負けた方はバックグラウンドで完了させる）
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="openai-hedge")
+
+
+def get_circuit_breaker(endpoint: str, model: str) -> CircuitBreaker:
+    """(エンドポイント, モデル) ごとの共有サーキットブレーカーを取得
+
+    しきい値は環境変数 OPENAI_CIRCUIT_FAILURE_THRESHOLD / OPENAI_CIRCUIT_MIN_REQUESTS /
+    OPENAI_CIRCUIT_OPEN_SECONDS で設定する。
+    """
+    key = (endpoint, model)
+    with _registry_lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(
+                name=f"{endpoint}:{model}",
+                failure_threshold=float(os.getenv("OPENAI_CIRCUIT_FAILURE_THRESHOLD", "0.5")),
+                min_requests=int(os.getenv("OPENAI_CIRCUIT_MIN_REQUESTS", "5")),
+                open_seconds=float(os.getenv("OPENAI_CIRCUIT_OPEN_SECONDS", "30"))
+            )
+        return _breakers[key]
+
+
+def get_latency_tracker(endpoint: str, model: str) -> LatencyTracker:
+    """(エンドポイント, モデル) ごとのレイテンシ統計を取得"""
+    key = (endpoint, model)
+    with _registry_lock:
+        if key not in _trackers:
+            _trackers[key] = LatencyTracker()
+        return _trackers[key]
+
+
+def mark_rate_limited(endpoint: str, model: str, seconds: float) -> None:
+    """429を受けたモデルを一定時間レート制限中として扱う"""
+    with _registry_lock:
+        key = (endpoint, model)
+        _rate_limited_until[key] = max(_rate_limited_until.get(key, 0.0), time.monotonic() + seconds)
+
+
+def is_rate_limited(endpoint: str, model: str) -> bool:
+    with _registry_lock:
+        return _rate_limited_until.get((endpoint, model), 0.0) > time.monotonic()
+
+
+def get_circuit_states() -> Dict[str, Dict[str, Any]]:
+    """全サーキットの状態とp95レイテンシ（表示用）"""
+    with _registry_lock:
+        keys = list(_breakers.keys())
+    states = {}
+    for endpoint, model in keys:
+        p95 = get_latency_tracker(endpoint, model).percentile(0.95)
+        states[f"{endpoint}:{model}"] = {
+            "state": get_circuit_breaker(endpoint, model).state,
+            "p95_latency_ms": int(p95 * 1000) if p95 is not None else None
+        }
+    return states
+
+
+def is_hedging_enabled() -> bool:
+    """ヘッジリクエストの既定値（OPENAI_HEDGE_REQUESTS=true で有効化）"""
+    return os.getenv("OPENAI_HEDGE_REQUESTS", "false").lower() in ("true", "1", "yes")
+
+
+def hedged_call(
+    func: Callable[[], Any],
+    hedge_after: Optional[float],
+    can_hedge: Optional[Callable[[], bool]] = None,
+    on_discarded: Optional[Callable[[Any], None]] = None
+) -> Any:
+    """ヘッジ付きで関数を呼び出す
+
+    hedge_after 秒経っても1本目が終わらなければ2本目を送り、先に成功した方を返す。
+    両方失敗した場合は最後の例外を送出する。
+
+    Args:
+        func: 呼び出す関数（スレッドセーフであること）
+        hedge_after: 2本目を送るまでの秒数（None ならヘッジしない）
+        can_hedge: 2本目を送る直前の確認（レート制限の空きなど）
+        on_discarded: 採用されなかった成功結果を受け取るコールバック（利用記録用）
+    """
+    if hedge_after is None:
+        return func()
+
+    futures = [_hedge_executor.submit(func)]
+    done, _ = wait(futures, timeout=hedge_after)
+    if not done and (can_hedge is None or can_hedge()):
+        print(f"INFO: 応答が{hedge_after:.1f}秒を超えたためヘッジリクエストを送信")
+        futures.append(_hedge_executor.submit(func))
+
+    pending = set(futures)
+    last_error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is not None:
+                last_error = error
+                continue
+            for other in pending:
+                if on_discarded is not None:
+                    other.add_done_callback(
+                        lambda f: on_discarded(f.result()) if f.exception() is None else None
+                    )
+            return future.result()
+
+    raise last_error
+
+
+def test_resilience():
+    """サーキットブレーカーとヘッジのテスト"""
+    print("=== Resilience Test ===")
+
+    class FakeServerError(Exception):
+        status_code = 503
+
+    breaker = CircuitBreaker("test", failure_threshold=0.5, min_requests=4, open_seconds=0.2)
+
+    def failing():
+        raise FakeServerError("unavailable")
+
+    for _ in range(4):
+        try:
+            breaker.call(failing)
+        except FakeServerError:
+            pass
+    assert breaker.state == CircuitBreaker.OPEN
+    try:
+        breaker.call(lambda: "ok")
+        raise AssertionError("open circuit should fail fast")
+    except CircuitOpenError as e:
+        print(f"fail fast: {e}")
+
+    time.sleep(0.25)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+    print("half-open → closed OK")
+
+    # 1本目だけ遅い場合、2本目の結果が採用される
+    calls = []
+    discarded = []
+
+    def slow_then_fast():
+        calls.append(1)
+        delay = 0.5 if len(calls) == 1 else 0.05
+        time.sleep(delay)
+        return delay
+
+    started = time.monotonic()
+    result = hedged_call(slow_then_fast, hedge_after=0.1, on_discarded=discarded.append)
+    elapsed = time.monotonic() - started
+    assert result == 0.05 and elapsed < 0.4, (result, elapsed)
+    time.sleep(0.5)
+    assert discarded == [0.5]
+    print(f"hedged call: {elapsed:.2f}秒で応答")
+
+    tracker = LatencyTracker(min_samples=10)
+    for i in range(100):
+        tracker.record(i / 100)
+    print(f"p95: {tracker.percentile(0.95):.2f}")
+    print("✅ Resilience test completed")
+
+
+if __name__ == "__main__":
+    test_resilience()
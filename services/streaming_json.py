@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+ストリーミングJSON解析
+ストリーミング応答を逐次解析し、問題JSONの構造不正を生成途中で検出する
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+
+class StreamingJSONError(ValueError):
+    """ストリーミング中に検出された構造エラー"""
+    pass
+
+
+class IncrementalQuestionParser:
+    """問題生成JSONのインクリメンタルパーサー
+
+    チャンクを受け取るたびに新しい文字だけを走査し、
+    トップレベルのフィールドが確定した時点で on_field を呼び出す。
+    choices が配列でない・選択肢数が期待値と異なる・正解数が不正などの
+    構造エラーは、応答の完了を待たずに StreamingJSONError として送出する。
+    """
+
+    def __init__(
+        self,
+        expected_choices: int = 4,
+        allow_multiple_correct: bool = False,
+        required_fields: tuple = ("title", "content", "explanation", "choices"),
+        on_field: Optional[Callable[[str, Any], None]] = None
+    ):
+        self.expected_choices = expected_choices
+        self.allow_multiple_correct = allow_multiple_correct
+        self.required_fields = required_fields
+        self.on_field = on_field
+
+        self.buffer = ""
+        self.fields: Dict[str, Any] = {}
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._started = False
+        self._closed = False
+
+        # トップレベルのキーと値の位置
+        self._current_key = None
+        self._value_start = None
+        self._await_value_for = None
+
+        # choices配列の状態
+        self._choice_start = None
+        self._choice_count = 0
+        self._correct_count = 0
+
+    def feed(self, delta: str) -> None:
+        """受信したテキスト断片を追加して解析"""
+        if not delta:
+            return
+        self.buffer += delta
+
+        while self._pos < len(self.buffer):
+            i = self._pos
+            ch = self.buffer[i]
+            self._pos += 1
+
+            if self._closed:
+                if not ch.isspace():
+                    raise StreamingJSONError("JSONオブジェクトの後に余分な文字があります")
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = self.buffer[self._string_start:i + 1]
+                continue
+
+            if ch.isspace():
+                continue
+
+            if not self._started:
+                if ch != "{":
+                    raise StreamingJSONError(f"JSONオブジェクトではありません: 先頭文字 '{ch}'")
+                self._started = True
+                self._stack.append("{")
+                continue
+
+            if self._await_value_for is not None:
+                self._check_value_type(self._await_value_for, ch)
+                self._await_value_for = None
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                if self._in_choices_array() and ch == "{":
+                    self._choice_start = i
+                    self._choice_count += 1
+                    if self._choice_count > self.expected_choices:
+                        raise StreamingJSONError(
+                            f"選択肢が多すぎます（{self.expected_choices}個を超過）"
+                        )
+                self._stack.append(ch)
+            elif ch in "}]":
+                if not self._stack:
+                    raise StreamingJSONError("対応しない閉じ括弧があります")
+                opener = self._stack.pop()
+                if (opener == "{") != (ch == "}"):
+                    raise StreamingJSONError("括弧の対応が不正です")
+
+                if self._in_choices_array() and ch == "}" and self._choice_start is not None:
+                    self._check_choice(self.buffer[self._choice_start:i + 1])
+                    self._choice_start = None
+
+                if len(self._stack) == 1 and ch == "]" and self._current_key == "choices":
+                    if self._choice_count != self.expected_choices:
+                        raise StreamingJSONError(
+                            f"選択肢は{self.expected_choices}個必要です（{self._choice_count}個）"
+                        )
+
+                if not self._stack:
+                    # トップレベルのオブジェクトが閉じた
+                    self._emit_value(i)
+                    self._closed = True
+            elif ch == ":":
+                if len(self._stack) == 1:
+                    self._current_key = json.loads(self._last_string) if self._last_string else None
+                    self._value_start = self._pos
+                    self._await_value_for = self._current_key
+            elif ch == ",":
+                if len(self._stack) == 1:
+                    self._emit_value(i)
+
+    def finish(self) -> Dict[str, Any]:
+        """ストリーム終了時の最終検証"""
+        if not self._closed:
+            raise StreamingJSONError("JSONが途中で終了しました")
+
+        missing = [f for f in self.required_fields if f not in self.fields]
+        if missing:
+            raise StreamingJSONError(f"必須フィールドが不足しています: {missing}")
+
+        if self._correct_count == 0:
+            raise StreamingJSONError("正解の選択肢がありません")
+
+        return json.loads(self.buffer)
+
+    def _in_choices_array(self) -> bool:
+        return self._current_key == "choices" and self._stack == ["{", "["]
+
+    def _check_value_type(self, key: str, first_char: str) -> None:
+        """値の先頭文字から型を早期判定"""
+        if key == "choices" and first_char != "[":
+            raise StreamingJSONError("choicesが配列ではありません")
+        if key in ("title", "content", "explanation") and first_char != '"':
+            raise StreamingJSONError(f"{key}が文字列ではありません")
+
+    def _check_choice(self, raw_choice: str) -> None:
+        """確定した選択肢オブジェクトを検証"""
+        try:
+            choice = json.loads(raw_choice)
+        except json.JSONDecodeError as e:
+            raise StreamingJSONError(f"選択肢のJSONが不正です: {e}")
+
+        if "content" not in choice:
+            raise StreamingJSONError(f"選択肢{self._choice_count}にcontentがありません")
+
+        if choice.get("is_correct", False):
+            self._correct_count += 1
+            if not self.allow_multiple_correct and self._correct_count > 1:
+                raise StreamingJSONError("正解が複数含まれています")
+
+    def _emit_value(self, end: int) -> None:
+        """トップレベルの値が確定したらフィールドとして通知"""
+        if self._current_key is None or self._value_start is None:
+            return
+
+        raw_value = self.buffer[self._value_start:end]
+        try:
+            value = json.loads(raw_value)
+        except json.JSONDecodeError as e:
+            raise StreamingJSONError(f"フィールド '{self._current_key}' のJSONが不正です: {e}")
+
+        self.fields[self._current_key] = value
+        if self.on_field:
+            try:
+                self.on_field(self._current_key, value)
+            except Exception as callback_error:
+                print(f"WARN: on_field callback error: {callback_error}")
+
+        self._current_key = None
+        self._value_start = None
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+トークン数ベースのテキスト分割
+PDF問題生成・過去問抽出・議事録作成で共通して使うチャンカー
+
+tiktoken がインストールされていればモデルのトークナイザーで数え、
+ない場合は日本語を考慮した近似値で数える。
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# tiktokenのインポート（オプション）
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+# モデル別のコンテキストウィンドウ（トークン）
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o-mini": 128000,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# 見出しとみなすパターン（行単位）
+HEADING_PATTERNS = [
+    r'^\s*第[\d一二三四五六七八九十百]+[章節条項]',  # 第1章、第1節など
+    r'^\s*\d+\.\s*\S',  # 1. タイトル
+    r'^\s*[A-Z]\.\s*\S',  # A. タイトル
+    r'^\s*【[^】]+】\s*$',  # 【タイトル】
+    r'^\s*■',  # ■タイトル
+    r'^\s*#+\s*\S',  # Markdown見出し
+    r'^\s*(問題?|設問|Q)\s*\d+',  # 問1、問題1、Q1
+]
+_HEADING_RE = re.compile("|".join(f"(?:{p})" for p in HEADING_PATTERNS), re.MULTILINE)
+
+# 文末（句点類・改行）で区切る。区切り文字は前の文に含める
+_SENTENCE_RE = re.compile(r'[^。！？!?\n]*(?:[。！？!?]+|\n+|$)')
+
+# 近似カウント用: CJK・かな・全角記号
+_CJK_RE = re.compile(r'[　-ヿ㐀-鿿豈-﫿＀-￯]')
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """モデルのトークナイザー（取得できなければ None で近似カウント。None もキャッシュする）
+
+    tiktoken は初回にBPEファイルをダウンロードするため、オフラインでは例外になる。
+    """
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    except Exception as e:
+        print(f"WARN: トークナイザーを取得できないため近似値で数えます ({model}): {e}")
+        return None
+    # 未知のモデル名
+    for encoding_name in ("o200k_base", "cl100k_base"):
+        try:
+            return tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            error = e
+    print(f"WARN: トークナイザーを取得できないため近似値で数えます ({model}): {error}")
+    return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """テキストのトークン数を数える"""
+    if not text:
+        return 0
+
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    # 近似: 日本語は1文字≒1トークン、英数字は4文字≒1トークン
+    cjk_chars = len(_CJK_RE.findall(text))
+    other_chars = len(text) - cjk_chars
+    return cjk_chars + (other_chars + 3) // 4
+
+
+def find_headings(text: str) -> List[Tuple[int, str]]:
+    """見出し行の (開始位置, 見出し) のリストを返す"""
+    headings = []
+    for match in _HEADING_RE.finditer(text):
+        line_end = text.find("\n", match.end())
+        line = text[match.start():line_end if line_end != -1 else len(text)].strip()
+        if line:
+            headings.append((match.start(), line[:100]))
+    return headings
+
+
+def get_context_window(model: str) -> int:
+    """モデルのコンテキストウィンドウを取得（日付付きモデル名にも対応）"""
+    if model in MODEL_CONTEXT_WINDOWS:
+        return MODEL_CONTEXT_WINDOWS[model]
+    for name in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_CONTEXT_WINDOWS[name]
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def input_token_budget(
+    model: str,
+    max_output_tokens: int,
+    prompt_overhead_tokens: int = 0,
+    cap: Optional[int] = None
+) -> int:
+    """入力テキストに使えるトークン数を計算
+
+    Args:
+        model: モデル名
+        max_output_tokens: 応答用に確保するトークン数（max_tokens）
+        prompt_overhead_tokens: システムメッセージ・指示文など本文以外のトークン数
+        cap: 上限（1回の呼び出しを小さく保ちたい場合）
+    """
+    budget = get_context_window(model) - max_output_tokens - prompt_overhead_tokens
+    if cap is not None:
+        budget = min(budget, cap)
+    return max(budget, 1)
+
+
+@dataclass
+class TextChunk:
+    """分割されたテキスト"""
+    text: str
+    token_count: int
+    index: int
+    start: int  # 元テキスト中の開始位置（文字）
+    end: int  # 元テキスト中の終了位置（文字）
+
+
+class TextChunker:
+    """トークン予算に合わせてテキストを詰めるチャンカー
+
+    見出し → 段落 → 文 → 文字 の順に境界を探し、できるだけ大きな単位を
+    保ったまま max_tokens 以内のチャンクに詰める。overlap_tokens を指定すると
+    前のチャンク末尾の文を次のチャンクの先頭に重ねる。
+    """
+
+    def __init__(
+        self,
+        model: str = "gpt-4o-mini",
+        max_tokens: int = 2000,
+        overlap_tokens: int = 0,
+        min_chunk_tokens: int = 0
+    ):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens は max_tokens より小さくしてください")
+        self.model = model
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_chunk_tokens = min_chunk_tokens
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def split_text(self, text: str) -> List[str]:
+        """チャンクのテキストのみを返す"""
+        return [chunk.text for chunk in self.chunk(text)]
+
+    def chunk(self, text: str) -> List[TextChunk]:
+        """テキストをトークン予算内のチャンクに分割"""
+        if not text or not text.strip():
+            return []
+
+        total_tokens = self.count(text)
+        if total_tokens <= self.max_tokens:
+            stripped = text.strip()
+            start = text.find(stripped)
+            return [TextChunk(stripped, total_tokens, 0, start, start + len(stripped))]
+
+        units = self._split_units(text)
+        chunks: List[TextChunk] = []
+        current: List[tuple] = []  # (start, end, tokens)
+        current_tokens = 0
+
+        for unit in units:
+            unit_tokens = unit[2]
+            if current and current_tokens + unit_tokens > self.max_tokens:
+                chunks.append(self._make_chunk(text, current, len(chunks)))
+                current = self._overlap_units(current)
+                current_tokens = sum(u[2] for u in current)
+                # 重なり分を入れると収まらない場合は重なりを諦める
+                if current_tokens + unit_tokens > self.max_tokens:
+                    current, current_tokens = [], 0
+            current.append(unit)
+            current_tokens += unit_tokens
+
+        if current:
+            chunks.append(self._make_chunk(text, current, len(chunks)))
+
+        if self.min_chunk_tokens:
+            chunks = [c for c in chunks if c.token_count >= self.min_chunk_tokens]
+            for i, c in enumerate(chunks):
+                c.index = i
+
+        return chunks
+
+    def chunk_stream(self, texts: Iterable[str], separator: str = "\n") -> Iterator[TextChunk]:
+        """テキスト（ページなど）を順に受け取りながらチャンクを返す
+
+        バッファが max_tokens の数倍になるたびに分割し、確定したチャンクを返す。
+        最後のチャンクは続きのテキストとつながる可能性があるため次回に持ち越す。
+        メモリに保持するのはバッファ分だけなので、文書の長さに依存しない。
+        start / end は連結したテキスト全体での位置。
+        """
+        flush_tokens = self.max_tokens * 3
+        buffer = ""
+        buffer_tokens = 0
+        offset = 0  # buffer 先頭の連結テキスト中の位置
+        index = 0
+
+        for text in texts:
+            if not text:
+                continue
+            piece = text + separator
+            buffer += piece
+            buffer_tokens += self.count(piece)
+            if buffer_tokens < flush_tokens:
+                continue
+
+            chunks = self.chunk(buffer)
+            for chunk in chunks[:-1]:
+                yield TextChunk(chunk.text, chunk.token_count, index, offset + chunk.start, offset + chunk.end)
+                index += 1
+            carry_from = chunks[-1].start if chunks else len(buffer)
+            offset += carry_from
+            buffer = buffer[carry_from:]
+            buffer_tokens = self.count(buffer)
+
+        for chunk in self.chunk(buffer):
+            yield TextChunk(chunk.text, chunk.token_count, index, offset + chunk.start, offset + chunk.end)
+            index += 1
+
+    def _make_chunk(self, text: str, units: List[tuple], index: int) -> TextChunk:
+        start, end = units[0][0], units[-1][1]
+        chunk_text = text[start:end].strip()
+        return TextChunk(chunk_text, self.count(chunk_text), index, start, end)
+
+    def _overlap_units(self, units: List[tuple]) -> List[tuple]:
+        """直前のチャンク末尾から重ねる単位を選ぶ"""
+        if not self.overlap_tokens:
+            return []
+        overlap: List[tuple] = []
+        tokens = 0
+        for unit in reversed(units):
+            if tokens + unit[2] > self.overlap_tokens:
+                break
+            overlap.insert(0, unit)
+            tokens += unit[2]
+        return overlap
+
+    def _split_units(self, text: str) -> List[tuple]:
+        """テキストを max_tokens 以下の単位 (start, end, tokens) に分解"""
+        units: List[tuple] = []
+        for start, end in self._section_spans(text):
+            self._split_span(text, start, end, units, level=0)
+        return units
+
+    def _split_span(self, text: str, start: int, end: int, units: List[tuple], level: int) -> None:
+        segment = text[start:end]
+        if not segment.strip():
+            return
+        tokens = self.count(segment)
+        if tokens <= self.max_tokens:
+            units.append((start, end, tokens))
+            return
+
+        if level == 0:
+            spans = self._paragraph_spans(segment)
+        elif level == 1:
+            spans = self._sentence_spans(segment)
+        else:
+            spans = self._hard_spans(segment, tokens)
+
+        if len(spans) <= 1 and level < 2:
+            self._split_span(text, start, end, units, level + 1)
+            return
+
+        for s, e in spans:
+            self._split_span(text, start + s, start + e, units, level + 1)
+
+    @staticmethod
+    def _section_spans(text: str) -> List[tuple]:
+        """見出し行の直前で区切る"""
+        boundaries = sorted({m.start() for m in _HEADING_RE.finditer(text)} | {0, len(text)})
+        return [(boundaries[i], boundaries[i + 1]) for i in range(len(boundaries) - 1)]
+
+    @staticmethod
+    def _paragraph_spans(text: str) -> List[tuple]:
+        spans = []
+        last = 0
+        for match in re.finditer(r'\n\s*\n', text):
+            spans.append((last, match.end()))
+            last = match.end()
+        if last < len(text):
+            spans.append((last, len(text)))
+        return spans
+
+    @staticmethod
+    def _sentence_spans(text: str) -> List[tuple]:
+        return [(m.start(), m.end()) for m in _SENTENCE_RE.finditer(text) if m.end() > m.start()]
+
+    def _hard_spans(self, text: str, tokens: int) -> List[tuple]:
+        """境界が見つからない長文はトークン比で文字数を割り当てて分割"""
+        pieces = -(-tokens // self.max_tokens)
+        # 近似誤差を見込んで少し小さめに切る
+        size = max(1, int(len(text) / pieces * 0.9))
+        return [(i, min(i + size, len(text))) for i in range(0, len(text), size)]
+
+
+def test_text_chunker():
+    """テキスト分割のテスト"""
+    print("=== Text Chunker Test ===")
+    print(f"tiktoken: {'利用可能' if TIKTOKEN_AVAILABLE else '未インストール（近似カウント）'}")
+
+    section = "第{n}章 テスト\n" + "これはテスト用の文章です。" * 40 + "\n\n" + "段落二です。" * 30 + "\n"
+    text = "".join(section.format(n=n) for n in range(1, 6))
+
+    chunker = TextChunker(max_tokens=500, overlap_tokens=50)
+    chunks = chunker.chunk(text)
+    print(f"総トークン: {count_tokens(text)} → {len(chunks)}チャンク")
+    for chunk in chunks:
+        assert chunk.token_count <= 500, chunk.token_count
+        print(f"  #{chunk.index}: {chunk.token_count}トークン, {chunk.start}-{chunk.end}")
+
+    # 見出しも句点もない長文
+    long_line = "あ" * 3000
+    hard_chunks = TextChunker(max_tokens=400).chunk(long_line)
+    assert all(c.token_count <= 400 for c in hard_chunks)
+    assert sum(len(c.text) for c in hard_chunks) == 3000
+    print(f"境界なしの長文: {len(hard_chunks)}チャンク")
+
+    # ページ単位で流し込んでも一括分割と同じ内容になる
+    pages = [section.format(n=n) for n in range(1, 6)]
+    streamed = list(TextChunker(max_tokens=500).chunk_stream(pages, separator=""))
+    assert all(c.token_count <= 500 for c in streamed)
+    assert "".join(text[c.start:c.end] for c in streamed).replace("\n", "") == text.replace("\n", "")
+    print(f"ストリーム分割: {len(pages)}ページ → {len(streamed)}チャンク")
+
+    print(f"gpt-4o-mini 入力予算 (出力2000): {input_token_budget('gpt-4o-mini', 2000)}")
+    print("✅ Text chunker test completed")
+
+
+if __name__ == "__main__":
+    test_text_chunker()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+文字起こし結果のキャッシュ
+音声データのSHA-256・言語・プロンプトをキーに Whisper の結果を保存し、
+同じ音声を再度アップロードして議事録のテンプレートやモデルだけを変える場合に
+文字起こしを省略する
+
+分割した音声はチャンクごとにも保存するため、一部のチャンクが失敗した処理を
+やり直すと失敗したチャンクだけを送信する。
+上限サイズは環境変数 TRANSCRIPTION_CACHE_MAX_MB（既定: 200MB）。
+"""
+
+import hashlib
+import os
+from typing import Any, Dict, Optional
+
+from services.disk_cache import DiskLRUCache
+
+# エントリ形式のバージョン（形式を変えたら上げる）
+TRANSCRIPTION_CACHE_VERSION = 1
+TRANSCRIPTION_MODEL = "whisper-1"
+
+
+def compute_audio_hash(file_data: bytes) -> str:
+    """音声データのSHA-256"""
+    return hashlib.sha256(file_data).hexdigest()
+
+
+class TranscriptionCache:
+    """文字起こし結果のキャッシュ"""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("TRANSCRIPTION_CACHE_MAX_MB", "200")) * 1024 * 1024)
+        self.cache = DiskLRUCache("transcription", max_bytes=max_bytes)
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """TRANSCRIPTION_CACHE_ENABLED=false で無効化"""
+        return os.getenv("TRANSCRIPTION_CACHE_ENABLED", "true").lower() not in ("false", "0", "no")
+
+    @staticmethod
+    def make_key(audio_hash: str, language: Optional[str], prompt: Optional[str]) -> str:
+        raw = f"{TRANSCRIPTION_MODEL}:{audio_hash}:{language or ''}:{prompt or ''}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, file_data: bytes, language: Optional[str], prompt: Optional[str]) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みの結果を返す（なければ None）。返す結果には "cached": True を付ける"""
+        key = self.make_key(compute_audio_hash(file_data), language, prompt)
+        entry = self.cache.get_json(key)
+        if not entry or entry.get("version") != TRANSCRIPTION_CACHE_VERSION:
+            return None
+        result = entry["result"]
+        result["cached"] = True
+        return result
+
+    def set(self, file_data: bytes, language: Optional[str], prompt: Optional[str], result: Dict[str, Any]) -> None:
+        """成功した結果を保存（保存できなくても文字起こしは続ける）"""
+        if not result.get("success"):
+            return
+        key = self.make_key(compute_audio_hash(file_data), language, prompt)
+        stored = {k: v for k, v in result.items() if k != "cached"}
+        try:
+            self.cache.set_json(key, {"version": TRANSCRIPTION_CACHE_VERSION, "result": stored})
+        except (OSError, TypeError, ValueError) as e:
+            print(f"WARN: 文字起こし結果をキャッシュできませんでした: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return self.cache.stats()
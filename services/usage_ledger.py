@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+LLM利用量の記録（トークン・コスト台帳）
+すべてのChat/Whisper呼び出しのトークン数・レイテンシ・リトライ回数・コストを
+機能とセッションに紐付けて llm_usage テーブルへ記録する
+"""
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from services.rate_limiter import RateLimitTimeout, get_rate_limiter
+from services.resilience import (
+    get_circuit_breaker, get_latency_tracker, hedged_call, is_availability_error, mark_rate_limited
+)
+from services.text_chunker import count_tokens
+
+# モデル別の料金（USD / 1Mトークン）
+MODEL_PRICING = {
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+    "gpt-4o": {"input": 2.50, "output": 10.00},
+    "gpt-4-turbo": {"input": 10.00, "output": 30.00},
+    "gpt-4": {"input": 30.00, "output": 60.00},
+    "gpt-3.5-turbo": {"input": 0.50, "output": 1.50},
+}
+
+# Whisperの料金（USD / 分）
+WHISPER_COST_PER_MINUTE = 0.006
+
+# Batch APIの割引率
+BATCH_DISCOUNT = 0.5
+
+_current_feature: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("llm_usage_feature", default=None)
+_current_session: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("llm_usage_session", default=None)
+
+
+def is_ledger_enabled() -> bool:
+    """台帳記録が有効かどうか（USAGE_LEDGER_ENABLED=false で無効化）"""
+    return os.getenv("USAGE_LEDGER_ENABLED", "true").lower() not in ("false", "0", "no")
+
+
+def set_usage_session(session_id: Optional[str]) -> None:
+    """現在のセッションIDを設定（Streamlitの各実行の先頭で呼ぶ）"""
+    _current_session.set(session_id)
+
+
+@contextmanager
+def usage_context(feature: Optional[str] = None, session_id: Optional[str] = None) -> Iterator[None]:
+    """ブロック内のLLM呼び出しを指定した機能・セッションに帰属させる
+
+    使用例:
+        with usage_context("pdf_extraction"):
+            extractor.extract_from_text(text)
+    """
+    feature_token = _current_feature.set(feature) if feature else None
+    session_token = _current_session.set(session_id) if session_id else None
+    try:
+        yield
+    finally:
+        if feature_token is not None:
+            _current_feature.reset(feature_token)
+        if session_token is not None:
+            _current_session.reset(session_token)
+
+
+def current_feature(default: str = "other") -> str:
+    return _current_feature.get() or default
+
+
+def estimate_cost(
+    model: str,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    audio_seconds: float = 0.0,
+    batch: bool = False
+) -> float:
+    """トークン数・音声長からコストを見積もる（USD）"""
+    if model.startswith("whisper"):
+        cost = (audio_seconds / 60.0) * WHISPER_COST_PER_MINUTE
+    else:
+        # 日付付きのモデル名（gpt-4o-mini-2024-07-18 など）は前方一致で解決
+        pricing = MODEL_PRICING.get(model)
+        if pricing is None:
+            for name in sorted(MODEL_PRICING, key=len, reverse=True):
+                if model.startswith(name):
+                    pricing = MODEL_PRICING[name]
+                    break
+        if pricing is None:
+            return 0.0
+        cost = (prompt_tokens / 1_000_000) * pricing["input"] + (completion_tokens / 1_000_000) * pricing["output"]
+
+    if batch:
+        cost *= BATCH_DISCOUNT
+    return round(cost, 6)
+
+
+def record_usage(
+    model: str,
+    feature: Optional[str] = None,
+    endpoint: str = "chat",
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    audio_seconds: float = 0.0,
+    latency_ms: int = 0,
+    retries: int = 0,
+    success: bool = True,
+    error: Optional[str] = None,
+    batch: bool = False,
+    session_id: Optional[str] = None
+) -> Optional[float]:
+    """利用記録をDBへ保存し、見積もりコストを返す
+
+    台帳の書き込みに失敗しても呼び出し元の処理は継続する。
+    """
+    cost = estimate_cost(model, prompt_tokens, completion_tokens, audio_seconds, batch)
+    if not is_ledger_enabled():
+        return cost
+
+    try:
+        from database.connection import get_session_context
+        from database.operations import LLMUsageService
+
+        with get_session_context() as session:
+            LLMUsageService(session).record_usage(
+                feature=feature or current_feature(),
+                model=model,
+                endpoint=endpoint,
+                session_id=session_id or _current_session.get(),
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+                audio_seconds=audio_seconds,
+                latency_ms=latency_ms,
+                retries=retries,
+                cost_usd=cost,
+                success=success,
+                error=error[:500] if error else None
+            )
+    except Exception as e:
+        print(f"WARN: 利用記録の保存に失敗しました: {e}")
+    return cost
+
+
+def record_chat_response(
+    response: Any,
+    model: str,
+    feature: Optional[str] = None,
+    started_at: Optional[float] = None,
+    retries: int = 0,
+    batch: bool = False
+) -> Optional[float]:
+    """Chat Completionsの応答（SDKオブジェクトまたはdict）から利用記録を作成"""
+    usage = response.get("usage") if isinstance(response, dict) else getattr(response, "usage", None)
+    if isinstance(usage, dict):
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+    else:
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+
+    latency_ms = int((time.time() - started_at) * 1000) if started_at else 0
+    return record_usage(
+        model=model,
+        feature=feature,
+        endpoint="batch" if batch else "chat",
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        latency_ms=latency_ms,
+        retries=retries,
+        batch=batch
+    )
+
+
+def _retry_after_seconds(error: Exception, default: float = 2.0) -> float:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", default))
+    except (TypeError, ValueError):
+        return default
+
+
+def tracked_chat_completion(
+    client: Any,
+    feature: Optional[str] = None,
+    retries: int = 0,
+    hedge: bool = False,
+    time_limit: Optional[float] = None,
+    **kwargs
+) -> Any:
+    """chat.completions.create を呼び出し、利用量を記録する
+
+    共有レートリミッターで待機してから、モデルごとのサーキットブレーカーを確認する
+    （開いていれば CircuitOpenError）。ブレーカーの確認を後にするのは、
+    送信しなかった呼び出しで半開状態の試行枠を消費しないため。
+    429を受けた場合は全スレッドの送信を一時停止する。
+    time_limit を指定すると待機とリクエストを合わせてその秒数で打ち切る
+    （待機で超えたら RateLimitTimeout、リクエストには待機後の残り時間をタイムアウトとして渡す）。
+    hedge=True の場合、p95レイテンシを超えても応答がなければ2本目を送る。
+    失敗した呼び出しもレイテンシとエラー内容を記録してから例外を再送出する。
+    ストリーミング呼び出しは呼び出し側で usage チャンクから記録すること。
+    """
+    model = kwargs.get("model", "unknown")
+    prompt_text = "".join(str(m.get("content", "")) for m in kwargs.get("messages", []))
+    estimated_tokens = count_tokens(prompt_text, model) + (kwargs.get("max_tokens") or 0)
+    limiter = get_rate_limiter()
+    wait_started = time.monotonic()
+    if not limiter.acquire(estimated_tokens, timeout=time_limit):
+        raise RateLimitTimeout(f"レート制限の待機が制限時間（{time_limit:.1f}秒）を超えました")
+    if time_limit is not None:
+        remaining = time_limit - (time.monotonic() - wait_started)
+        if remaining <= 0:
+            raise RateLimitTimeout(f"レート制限の待機が制限時間（{time_limit:.1f}秒）を超えました")
+        request_timeout = kwargs.get("timeout")
+        if not isinstance(request_timeout, (int, float)) or request_timeout > remaining:
+            kwargs["timeout"] = remaining
+
+    breaker = get_circuit_breaker("chat", model)
+    breaker.before_call()
+
+    tracker = get_latency_tracker("chat", model)
+    started_at = time.time()
+    try:
+        if hedge:
+            # 採用されなかった応答もトークンを消費しているので同じコンテキストで記録する
+            context = contextvars.copy_context()
+            response = hedged_call(
+                lambda: client.chat.completions.create(**kwargs),
+                hedge_after=tracker.percentile(0.95),
+                can_hedge=lambda: limiter.acquire(estimated_tokens, timeout=0),
+                on_discarded=lambda discarded: context.run(
+                    record_chat_response, discarded, model, feature, started_at, retries
+                )
+            )
+        else:
+            response = client.chat.completions.create(**kwargs)
+    except Exception as e:
+        if is_availability_error(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if getattr(e, "status_code", None) == 429:
+            retry_after = _retry_after_seconds(e)
+            limiter.pause(retry_after)
+            mark_rate_limited("chat", model, max(retry_after, 30.0))
+        record_usage(
+            model=model,
+            feature=feature,
+            latency_ms=int((time.time() - started_at) * 1000),
+            retries=retries,
+            success=False,
+            error=f"{type(e).__name__}: {e}"
+        )
+        raise
+
+    breaker.record_success()
+    tracker.record(time.time() - started_at)
+    record_chat_response(response, model, feature, started_at, retries)
+    return response